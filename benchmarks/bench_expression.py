@@ -0,0 +1,73 @@
+# Benchmark the evaluation of Expression components
+#
+# Creates a number of Expression components that depend on the time and
+# measures the per-frame cost of evaluating all of them. The compiled
+# evaluation (Expression.outProc()) is compared with the previous
+# implementation which executed one exec statement per parameter and
+# compiled the expression string again on every evaluation.
+
+import time
+import optparse
+from cgkit.all import *
+from cgkit import expression
+
+EXPRESSIONS = [
+    ("float", "1.0 + amp*sin(freq*t)", {"amp":0.2, "freq":2.0}),
+    ("vec3", "vec3(cos(freq*t), sin(freq*t), 0)*radius + offset", {"freq":1.5, "radius":2.0, "offset":vec3(0,1,0)}),
+    ("float", "smoothstep(0.0, 1.0, t*speed) * scale", {"speed":0.5, "scale":3.0}),
+]
+
+def oldOutProc(e):
+    """The previous implementation of Expression.outProc().
+    """
+    ns = {"e":e}
+    for _v in e.vars:
+        exec "%s = e.%s_slot.getValue()"%(_v, _v) in expression.__dict__, ns
+    return eval("%s(%s)"%(e.exprtype, e.expr), expression.__dict__, ns)
+
+def createExpressions(num):
+    """Create num Expression components.
+    """
+    res = []
+    for i in range(num):
+        exprtype,expr,params = EXPRESSIONS[i%len(EXPRESSIONS)]
+        res.append(Expression(expr, exprtype, **params))
+    return res
+
+def runFrames(exprs, frames, evalFunc):
+    """Evaluate all expressions for the given number of frames.
+
+    Returns the average time per frame in seconds.
+    """
+    timer = getScene().timer()
+    t0 = time.time()
+    for frame in range(frames):
+        timer.frame = frame
+        for e in exprs:
+            evalFunc(e)
+    return (time.time()-t0)/frames
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("-n", "--expressions", type="int", default=300, help="Number of expression components")
+    parser.add_option("-f", "--frames", type="int", default=50, help="Number of frames to evaluate")
+    opts,args = parser.parse_args()
+
+    exprs = createExpressions(opts.expressions)
+
+    # Make sure both versions compute the same values
+    for e in exprs:
+        if e.outProc()!=oldOutProc(e):
+            raise RuntimeError("Mismatch in expression %s"%e.expr)
+
+    old = runFrames(exprs, opts.frames, oldOutProc)
+    new = runFrames(exprs, opts.frames, lambda e: e.outProc())
+    print "%d expressions, %d frames"%(opts.expressions, opts.frames)
+    print "previous: %8.3f ms per frame"%(1000.0*old)
+    print "compiled: %8.3f ms per frame"%(1000.0*new)
+    print "speedup:  %8.2fx"%(old/new)
+
+######################################################################
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,72 @@
+# Benchmark the job submission of the job queue
+#
+# Creates a job hierarchy with many sub-jobs using the XML and the JSON
+# job definition format (and using the bulk creation method createJobs())
+# and measures the time it takes to create the jobs and to read all job
+# definitions back (as it is done when a job is run).
+
+import sys, os, os.path, time, tempfile, shutil
+import optparse
+from cgkit.jobqueue import createJobQueue, JobQueue
+from cgkit.jobqueue.jobhandle import JobHandle
+
+def createJobs(jobQueue, numJobs):
+    """Create a job root with numJobs sub-jobs.
+    """
+    jobRoot = jobQueue.createJobRoot("renderrib", rib="main.rib")
+    for i in range(numJobs):
+        jobRoot.createJob("renderrib", rib="frame%04d.rib"%i, renderer="aqsis")
+    jobRoot.activate()
+    return jobRoot
+
+def createJobsBulk(jobQueue, numJobs, numThreads):
+    """Create a job root with numJobs sub-jobs using createJobs().
+    """
+    jobRoot = jobQueue.createJobRoot("renderrib", rib="main.rib")
+    table = [{"rib":"frame%04d.rib"%i} for i in range(numJobs)]
+    jobRoot.createJobs("renderrib", table, commonParams={"renderer":"aqsis"}, numThreads=numThreads)
+    jobRoot.activate()
+    return jobRoot
+
+def readJobDefs(jobQueue, jobRoot):
+    """Read the job definitions of all sub-jobs.
+    """
+    rootHandle = JobHandle(jobRoot._location, jobRoot._location)
+    for job in rootHandle.listSubJobs():
+        jobQueue._readJobDef(job.procDefFile)
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("-n", "--jobs", type="int", default=2000, help="Number of sub-jobs")
+    parser.add_option("-t", "--threads", type="int", default=4, help="Number of threads for the bulk creation")
+    opts,args = parser.parse_args()
+    
+    tmpDir = tempfile.mkdtemp()
+    try:
+        for fmt,bulk in [("xml", False), ("json", False), ("json", True)]:
+            name = fmt
+            if bulk:
+                name += "/bulk"
+            location = os.path.join(tmpDir, name.replace("/", "_"))
+            createJobQueue(location)
+            jobQueue = JobQueue(location)
+            jobQueue.jobDefFormat = fmt
+            
+            t0 = time.time()
+            if bulk:
+                jobRoot = createJobsBulk(jobQueue, opts.jobs, opts.threads)
+            else:
+                jobRoot = createJobs(jobQueue, opts.jobs)
+            t1 = time.time()
+            readJobDefs(jobQueue, jobRoot)
+            t2 = time.time()
+            
+            defSize = os.path.getsize(JobHandle(jobRoot._location, None).procDefFile)
+            print "%-9s: create %6.3fs  read %6.3fs  (%d bytes per job definition)"%(name, t1-t0, t2-t1, defSize)
+    finally:
+        shutil.rmtree(tmpDir)
+
+######################################################################
+
+if __name__=="__main__":
+    main()
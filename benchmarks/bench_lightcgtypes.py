@@ -0,0 +1,115 @@
+# Benchmark the pure Python vector/matrix types (cgkit.light.cgtypes)
+#
+# Times the basic arithmetic operations of vec3, vec4, mat3, mat4 and quat
+# and reports the memory used by a single vec3. With the --reference option
+# the benchmark is also run against another cgkit source tree (e.g. a
+# checkout of an older version) and the speedup is reported.
+
+import sys, os, timeit, subprocess
+import optparse
+
+SETUP = """
+from cgkit.light.cgtypes import vec3, vec4, mat3, mat4, quat
+a = vec3(1.0, 0.5, -1.8)
+b = vec3(-0.3, 0.75, 0.5)
+c = vec3(a)
+u = vec4(1.0, 0.5, -1.8, 0.2)
+w = vec4(-0.3, 0.75, 0.5, 0.3)
+M3 = mat3.rotation(0.5, vec3(1,1,0))
+M = mat4.rotation(0.5, vec3(1,1,0)).translate(vec3(1,2,3))
+N = mat4(1.0)
+q = quat(0.5, vec3(1,1,0)).normalize()
+r = quat(0.3, vec3(0,1,1)).normalize()
+"""
+
+# (name, statement)
+OPERATIONS = [
+    ("vec3(x,y,z)", "vec3(1.0, 2.0, 3.0)"),
+    ("vec3+vec3", "a+b"),
+    ("vec3-vec3", "a-b"),
+    ("vec3*scalar", "a*2.0"),
+    ("vec3*vec3", "a*b"),
+    ("-vec3", "-a"),
+    ("vec3.cross()", "a.cross(b)"),
+    ("vec3.normalize()", "a.normalize()"),
+    ("abs(vec3)", "abs(a)"),
+    ("vec3+=vec3", "c+=b"),
+    ("vec4+vec4", "u+w"),
+    ("vec4*scalar", "u*2.0"),
+    ("mat3*vec3", "M3*a"),
+    ("mat3*mat3", "M3*M3"),
+    ("mat4*vec3", "M*a"),
+    ("mat4*vec4", "M*u"),
+    ("mat4*mat4", "M*M"),
+    ("mat4*=mat4", "N*=N"),
+    ("mat4+mat4", "M+M"),
+    ("mat4.transpose()", "M.transpose()"),
+    ("quat*quat", "q*r"),
+    ("quat.rotateVec()", "q.rotateVec(a)"),
+]
+
+def vec3Size():
+    """Return the number of bytes used by a vec3 instance.
+    """
+    from cgkit.light.cgtypes import vec3
+    v = vec3(1,2,3)
+    size = sys.getsizeof(v)
+    if hasattr(v, "__dict__"):
+        size += sys.getsizeof(v.__dict__)
+    return size
+
+def runBenchmark(number, repeat):
+    """Time all operations.
+
+    Returns a list of (name, usec) tuples where usec is the time in
+    microseconds that one operation took.
+    """
+    res = []
+    for name,stmt in OPERATIONS:
+        t = min(timeit.Timer(stmt, SETUP).repeat(repeat, number))
+        res.append((name, 1000000.0*t/number))
+    return res
+
+def runReference(refDir, number, repeat):
+    """Run the benchmark in a separate process using the cgkit tree refDir.
+
+    Returns the same list as runBenchmark() and the vec3 size.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [refDir, env.get("PYTHONPATH")]))
+    cmd = [sys.executable, os.path.abspath(__file__), "--raw", "-n", str(number), "-r", str(repeat)]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, cwd=refDir)
+    out = proc.communicate()[0]
+    if proc.returncode!=0:
+        raise RuntimeError("Running the reference benchmark failed")
+    return eval(out)
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option("-n", "--number", type="int", default=100000, help="Number of times each operation is executed")
+    parser.add_option("-r", "--repeat", type="int", default=3, help="Number of repetitions (the best time is reported)")
+    parser.add_option("-R", "--reference", metavar="DIR", default=None, help="Compare against the cgkit source tree in DIR")
+    parser.add_option("--raw", action="store_true", default=False, help=optparse.SUPPRESS_HELP)
+    opts,args = parser.parse_args()
+
+    res = runBenchmark(opts.number, opts.repeat)
+    size = vec3Size()
+    if opts.raw:
+        print repr((res, size))
+        return
+
+    if opts.reference is None:
+        for name,usec in res:
+            print "%-18s %7.3f usec"%(name, usec)
+        print "vec3 instance: %d bytes"%size
+    else:
+        refRes,refSize = runReference(opts.reference, opts.number, opts.repeat)
+        print "%-18s %10s %10s %8s"%("", "reference", "current", "speedup")
+        for (name,usec),(refName,refUsec) in zip(res, refRes):
+            print "%-18s %7.3f us %7.3f us %7.2fx"%(name, refUsec, usec, refUsec/usec)
+        print "%-18s %7d B  %7d B"%("vec3 instance", refSize, size)
+
+######################################################################
+
+if __name__=="__main__":
+    main()
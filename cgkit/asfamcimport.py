@@ -42,6 +42,11 @@ from valuetable import ValueTable
 import asfamc
 import pluginmanager
 from sl import *
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
 
 # ASFReader
 class ASFReader(asfamc.ASFReader):
@@ -182,32 +187,19 @@ class AMCReader(asfamc.AMCReader):
         data = asf.bones[name]
         order = data["dof"]
         order = [s.lower() for s in order]
-        vtabx = []
-        vtaby = []
-        vtabz = []
-        framenr = 0
-        for vals in track:
-            t = float(framenr)/framerate
-            d = self.valueDict(vals, order)
-            if "rx" in d:
-                vtabx.append((t,d["rx"]))
-            if "ry" in d:
-                vtaby.append((t,d["ry"]))
-            if "rz" in d:
-                vtabz.append((t,d["rz"]))
-            framenr += 1
-
-        total_t = float(framenr)/framerate
+        columns = self.trackColumns(track, order)
+        times = [float(framenr)/framerate for framenr in range(len(track))]
+        total_t = float(len(track))/framerate
 
         joint = asf.joints[name]
-        if vtabx!=[]:
-            vt = ValueTable(type="double", values=vtabx, modulo=total_t)
+        if "rx" in columns:
+            vt = ValueTable.fromArrays(times, columns["rx"], type="double", modulo=total_t)
             vt.output_slot.connect(joint.anglex_slot)
-        if vtaby!=[]:
-            vt = ValueTable(type="double", values=vtaby, modulo=total_t)
+        if "ry" in columns:
+            vt = ValueTable.fromArrays(times, columns["ry"], type="double", modulo=total_t)
             vt.output_slot.connect(joint.angley_slot)
-        if vtabz!=[]:
-            vt = ValueTable(type="double", values=vtabz, modulo=total_t)
+        if "rz" in columns:
+            vt = ValueTable.fromArrays(times, columns["rz"], type="double", modulo=total_t)
             vt.output_slot.connect(joint.anglez_slot)
             
 
@@ -219,29 +211,53 @@ class AMCReader(asfamc.AMCReader):
         order = [s.lower() for s in order]
         ao = data["axis_order"]
         axis_order = ao[2]+ao[1]+ao[0]
-        vtab = []
-        vtabrot = []
-        framenr = 0
-        for vals in track:
-            t = float(framenr)/framerate
-            d = self.valueDict(vals, order)
-            pos = len_scale*vec3(d["tx"], d["ty"], d["tz"])
-            vtab.append((t, pos))
-            
-            ang = vec3(d["rx"], d["ry"], d["rz"])
-            exec "fromEuler = mat3.fromEuler%s"%axis_order.upper()
-            R = fromEuler(radians(ang.x), radians(ang.y), radians(ang.z))
-            vtabrot.append((t, R))
-            
-            framenr += 1
+        columns = self.trackColumns(track, order)
+        times = [float(framenr)/framerate for framenr in range(len(track))]
+        total_t = float(len(track))/framerate
 
-        total_t = float(framenr)/framerate
+        if _has_numpy:
+            pos = len_scale*numpy.column_stack((columns["tx"], columns["ty"], columns["tz"]))
+        else:
+            pos = [len_scale*vec3(p) for p in zip(columns["tx"], columns["ty"], columns["tz"])]
 
-        vt = ValueTable(values=vtab, modulo=total_t)
+        fromEuler = getattr(mat3, "fromEuler%s"%axis_order.upper())
+        rot = []
+        for ang in zip(columns["rx"], columns["ry"], columns["rz"]):
+            rot.append(fromEuler(*[radians(float(a)) for a in ang]))
+
+        vt = ValueTable.fromArrays(times, pos, modulo=total_t)
         vt.output_slot.connect(asf.joints["root"].pos_slot)
-        vr = ValueTable(values=vtabrot, type="mat3", modulo=total_t)
+        vr = ValueTable.fromArrays(times, rot, type="mat3", modulo=total_t)
         vr.output_slot.connect(asf.joints["root"].rot_slot)
             
+    # trackColumns
+    def trackColumns(self, track, order):
+        """Split a track into its individual channels.
+
+        track is a list of value lists (one list per frame) whose order
+        is defined by the argument order (see valueDict()).
+        The return value is a dictionary that contains the values of
+        each channel over all frames. The values are stored in numpy
+        arrays if numpy is available.
+        Example: track = [[10,20], [11,21]]  order = ["rx", "ry"]
+        Result: {"rx":[10,11], "ry":[20,21]}
+        """
+        for values in track:
+            if len(values)!=len(order):
+                raise ValueError("Invalid number of values")
+
+        if _has_numpy:
+            data = numpy.array(track, dtype=float).reshape((len(track), len(order)))
+            columns = data.T
+        else:
+            columns = zip(*track)
+            if columns==[]:
+                columns = len(order)*[()]
+
+        res = {}
+        for col,t in zip(columns, order):
+            res[t] = col
+        return res
 
     # valueDict
     def valueDict(self, values, order):
@@ -38,6 +38,11 @@
 ## Contains the BVHReader class.
 
 import string
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
 
 # Node
 class Node:
@@ -58,6 +63,16 @@ class Node:
 # BVHReader
 class BVHReader:
     """Read BioVision Hierarchical (BVH) files.
+
+    Derived classes can implement the following callbacks:
+
+    - onHierarchy(root): Called with the root node of the skeleton
+    - onMotion(frames, dt): Called before the motion samples are read
+    - onFrame(values): Called with the channel values of one frame
+    - onFrames(data): Called with the channel values of all frames as a
+      numpy array of shape (frames, channels). This method is only called
+      when numpy is available. The default implementation calls onFrame()
+      for every frame.
     """
 
     def __init__(self, filename):
@@ -84,6 +99,10 @@ class BVHReader:
     def onFrame(self, values):
         pass
 
+    def onFrames(self, data):
+        for values in data.tolist():
+            self.onFrame(values)
+
     # read
     def read(self):
         """Read the entire file.
@@ -127,6 +146,10 @@ class BVHReader:
         self.onMotion(frames, dt)
 
         # Read the channel values
+        if _has_numpy:
+            self.onFrames(self.readFrameArray(frames))
+            return
+
         for i in range(frames):
             s = self.readLine()
             a = s.split()
@@ -135,6 +158,27 @@ class BVHReader:
             values = map(lambda x: float(x), a)
             self.onFrame(values)
 
+    # readFrameArray
+    def readFrameArray(self, frames):
+        """Read the channel values of the given number of frames.
+
+        Returns a numpy array of shape (frames, channels).
+        """
+        lines = []
+        for i in range(frames):
+            lines.append(self.readLine())
+        data = numpy.fromstring(" ".join(lines), sep=" ")
+        n = self._numchannels
+        if data.size!=frames*n:
+            # Locate the line with the error
+            firstline = self.linenr-frames+1
+            for i,s in enumerate(lines):
+                a = s.split()
+                if len(a)!=n:
+                    raise SyntaxError("Syntax error in line %d: %d float values expected, got %d instead"%(firstline+i, n, len(a)))
+                map(float, a)
+        return data.reshape((frames, n))
+
 
     # readHierarchy
     def readHierarchy(self):
@@ -40,6 +40,11 @@ from valuetable import ValueTable
 import bvh
 import pluginmanager
 from sl import *
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
 
 # BVHReader
 class BVHReader(bvh.BVHReader):
@@ -55,6 +60,11 @@ class BVHReader(bvh.BVHReader):
     def onHierarchy(self, root):
         self.createSkeleton(root)
         self.root = root
+        # A list of (node, rotation channels, position channels) tuples.
+        # The channel lists contain (column, value table) tuples and
+        # (column, component) tuples, respectively.
+        self._channelmap = []
+        self.mapChannels(root, 0)
 
     def onMotion(self, frames, dt):
         self.frames = frames
@@ -62,47 +72,57 @@ class BVHReader(bvh.BVHReader):
         self.currentframe = 0
 
     def onFrame(self, values):
-        self.applyMotion(self.root, values)
+        t = self.currentframe*self.dt
+        for node,rotchannels,poschannels in self._channelmap:
+            for col,vt in rotchannels:
+                vt.add(t, values[col])
+            if poschannels!=[]:
+                pos = vec3()
+                for col,k in poschannels:
+                    pos[k] = values[col]
+                node.vtpos.add(t, pos)
         self.currentframe += 1
 
-    def applyMotion(self, node, values):
-        """Apply a motion sample to the skeleton.
+    def onFrames(self, data):
+        """Apply all motion samples at once.
 
-        node is the current joint and values the joint angles for the
-        entire skeleton.
-        The method returns the remaining joint angles.
+        data is a numpy array of shape (frames, channels). The values
+        of each channel are stored in the value tables in one go.
         """
-
-        t = self.currentframe*self.dt
-        
-        nc = len(node.channels)
-        vals = values[:nc]
-        pos = vec3()
-        pos_flag = False
-        for ch,v in zip(node.channels, vals):
-            if ch=="Xrotation":
-                node.vtx.add(t, v)
-            elif ch=="Yrotation":
-                node.vty.add(t, v)
-            elif ch=="Zrotation":
-                node.vtz.add(t, v)
-            elif ch=="Xposition":
-                pos.x = v
-                pos_flag = True
-            elif ch=="Yposition":
-                pos.y = v
-                pos_flag = True
-            elif ch=="Zposition":
-                pos.z = v
-                pos_flag = True
-
-        if pos_flag:
-            node.vtpos.add(t, pos)
-            
-        values = values[nc:]
+        frames = len(data)
+        times = [(self.currentframe+i)*self.dt for i in range(frames)]
+        for node,rotchannels,poschannels in self._channelmap:
+            for col,vt in rotchannels:
+                vt.setValues(times, data[:,col])
+            if poschannels!=[]:
+                pos = numpy.zeros((frames, 3))
+                for col,k in poschannels:
+                    pos[:,k] = data[:,col]
+                node.vtpos.setValues(times, pos)
+        self.currentframe += frames
+
+    def mapChannels(self, node, col):
+        """Determine which columns of the motion data belong to which node.
+
+        node is the current node and col the column of its first channel.
+        The result is stored in self._channelmap. The method returns the
+        column of the first channel after the channels of node and its
+        children.
+        """
+        rotchannels = []
+        poschannels = []
+        tables = {"Xrotation":node.vtx, "Yrotation":node.vty, "Zrotation":node.vtz}
+        components = {"Xposition":0, "Yposition":1, "Zposition":2}
+        for ch in node.channels:
+            if ch in tables:
+                rotchannels.append((col, tables[ch]))
+            elif ch in components:
+                poschannels.append((col, components[ch]))
+            col += 1
+        self._channelmap.append((node, rotchannels, poschannels))
         for c in node.children:
-            values = self.applyMotion(c, values)
-        return values
+            col = self.mapChannels(c, col)
+        return col
 
     # createSkeleton
     def createSkeleton(self, node, parent=None):
@@ -129,7 +149,10 @@ class BVHReader(bvh.BVHReader):
         node.vtx = vtx
         node.vty = vty
         node.vtz = vtz
-        if node.isRoot():
+        # The root and all other joints with position channels also get
+        # a value table for the position
+        poschannels = ["Xposition", "Yposition", "Zposition"]
+        if node.isRoot() or filter(lambda ch: ch in poschannels, node.channels)!=[]:
             vtpos = ValueTable(type="vec3")
             vtpos.output_slot.connect(j.pos_slot)
             node.vtpos = vtpos
@@ -73,7 +73,9 @@ class Expression(Component):
     e = Expression("1.0 + amp*sin(freq*t)", amp=0.2, freq=2.0)
     e.output_slot.connect(s.radius_slot)
     \endcode
-    
+
+    The expression is compiled into a function once and is only
+    recompiled when the "expr" attribute is changed.
     """
 
     protocols.advise(instancesProvide=[ISceneItem])
@@ -100,6 +102,12 @@ class Expression(Component):
         self.expr = expr
         self.exprtype = exprtype
 
+        # The compiled expression (a function that takes the parameter
+        # values as arguments) and the expression/type it was compiled from
+        self._func = None
+        self._funcExpr = None
+        self._funcType = None
+
         # Create a parameter slot for every extra key arg...
         for k in keyargs:
             T = type(keyargs[k])
@@ -142,6 +150,8 @@ class Expression(Component):
         self.vars = keyargs.keys()
         if "t" not in self.vars:
             self.vars.append("t")
+        # The parameter slots (in the same order as self.vars)
+        self._varSlots = [getattr(self, "%s_slot"%v) for v in self.vars]
 
         if self.exprtype==None:
             self.exprtype = self._determineReturnType()
@@ -163,9 +173,11 @@ class Expression(Component):
         return [ISceneItem, IComponent]
 
     def outProc(self):
-        for _v in self.vars:
-            exec "%s = self.%s_slot.getValue()"%(_v, _v)
-        return eval("%s(%s)"%(self.exprtype, self.expr))
+        if self.expr!=self._funcExpr or self.exprtype!=self._funcType:
+            self._func = self._compile("%s(%s)"%(self.exprtype, self.expr))
+            self._funcExpr = self.expr
+            self._funcType = self.exprtype
+        return self._func(*[slot.getValue() for slot in self._varSlots])
      
     ## protected:
         
@@ -175,9 +187,8 @@ class Expression(Component):
     def _determineReturnType(self):
         """Try to execute the stored expression and return the output type.
         """
-        for _v in self.vars:
-            exec "%s = self.%s_slot.getValue()"%(_v, _v)
-        out = eval(self.expr)
+        func = self._compile(self.expr)
+        out = func(*[slot.getValue() for slot in self._varSlots])
         T = type(out)
         if T==float or T==int:
             return "float"
@@ -204,6 +215,17 @@ class Expression(Component):
             raise ValueError("Unsupported sequence size: %d"%len(out))
 
         raise ValueError("Unknown expression type: %s"%T)
+
+    def _compile(self, expr):
+        """Compile an expression into a function.
+
+        The returned function takes the values of the parameters as
+        arguments (in the order of self.vars) and returns the value of
+        the expression. The expression is evaluated in the namespace of
+        this module and may refer to the component as "self".
+        """
+        src = "lambda self: lambda %s: (%s)"%(", ".join(self.vars), expr)
+        return eval(compile(src, "<expression>", "eval"), globals())(self)
         
         
         
@@ -78,6 +78,11 @@
 
 from math import pi, sqrt, cos, sin
 from cgtypes import *
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
 
 # planeHammersley
 def planeHammersley(n):
@@ -211,4 +216,165 @@ def sphereHalton(n=None, p2=3):
         phirad = phi*4.0*pi
         yield vec3(st*cos(phirad), st*sin(phirad), t)
         k += 1
-    
+
+######################################################################
+# Array versions
+
+# planeHammersleyArray
+def planeHammersleyArray(n, start=0, count=None, scramble=None, rotation=None):
+    """Return Hammersley points on the unit square as a numpy array.
+
+    Returns an array of shape (count, 2) that contains the points with
+    the indices start to start+count-1 of the Hammersley point set with
+    n points (by default, all n points are returned). Without scrambling
+    and rotation, the points are the same as the ones generated by
+    planeHammersley(n). The point set can be computed in chunks (e.g. by
+    separate processes), the result is the same as computing all points
+    at once.
+
+    scramble can be set to an integer seed that is used to scramble the
+    digits of the radical inverse. rotation can be a tuple (du, dv) that is
+    added to all points (modulo 1) (Cranley-Patterson rotation).
+    """
+    k = _indexArray(start, count, n)
+    return _rotate(_hammersleyUV(k, n, scramble), rotation)
+
+# sphereHammersleyArray
+def sphereHammersleyArray(n, start=0, count=None, scramble=None, rotation=None):
+    """Return Hammersley points on the unit sphere as a numpy array.
+
+    Returns an array of shape (count, 3). This is the array version of
+    sphereHammersley(), see planeHammersleyArray() for a description of
+    the arguments.
+    """
+    k = _indexArray(start, count, n)
+    u,v = _rotate(_hammersleyUV(k, n, scramble), rotation).T
+    return _spherePoints(2.0*u-1.0, v*2.0*pi)
+
+# hemisphereHammersleyArray
+def hemisphereHammersleyArray(n, start=0, count=None, scramble=None, rotation=None):
+    """Return Hammersley points on the upper unit hemisphere (z>=0).
+
+    Returns an array of shape (count, 3) with points that are uniformly
+    distributed on the hemisphere. See planeHammersleyArray() for a
+    description of the arguments.
+    """
+    k = _indexArray(start, count, n)
+    u,v = _rotate(_hammersleyUV(k, n, scramble), rotation).T
+    return _spherePoints(u, v*2.0*pi)
+
+# planeHaltonArray
+def planeHaltonArray(n, p2=3, start=0, scramble=None, rotation=None):
+    """Return Halton points on the unit square as a numpy array.
+
+    Returns an array of shape (n, 2) that contains the points with the
+    indices start to start+n-1 of the Halton sequence. With start=0 and
+    without scrambling and rotation, the points are the same as the ones
+    generated by planeHalton(). As the sequence is hierarchical, it can be
+    computed in chunks by using the start argument.
+
+    p2 is the second prime base (the first base is 2). See
+    planeHammersleyArray() for a description of scramble and rotation.
+    """
+    k = _indexArray(start, n)
+    return _rotate(_haltonUV(k, p2, scramble), rotation)
+
+# sphereHaltonArray
+def sphereHaltonArray(n, p2=3, start=0, scramble=None, rotation=None):
+    """Return Halton points on the unit sphere as a numpy array.
+
+    Returns an array of shape (n, 3). This is the array version of
+    sphereHalton(), see planeHaltonArray() for a description of the
+    arguments.
+    """
+    k = _indexArray(start, n)
+    u,v = _rotate(_haltonUV(k, p2, scramble), rotation).T
+    return _spherePoints(2.0*u-1.0, v*4.0*pi)
+
+# hemisphereHaltonArray
+def hemisphereHaltonArray(n, p2=3, start=0, scramble=None, rotation=None):
+    """Return Halton points on the upper unit hemisphere (z>=0).
+
+    Returns an array of shape (n, 3) with points that are uniformly
+    distributed on the hemisphere. See planeHaltonArray() for a
+    description of the arguments.
+    """
+    k = _indexArray(start, n)
+    u,v = _rotate(_haltonUV(k, p2, scramble), rotation).T
+    return _spherePoints(u, v*2.0*pi)
+
+def _indexArray(start, count, n=None):
+    """Return an array with the point indices start..start+count-1.
+
+    If n is given, the indices must be smaller than n (and count defaults
+    to the remaining number of points).
+    """
+    if not _has_numpy:
+        raise ImportError("The array functions of the hammersley module require the numpy package")
+    if count is None:
+        count = n-start
+    if start<0 or count<0 or (n is not None and start+count>n):
+        raise ValueError("Invalid point range: start=%s, count=%s"%(start, count))
+    return numpy.arange(start, start+count, dtype=numpy.int64)
+
+def _radicalInverse(k, base, scramble=None):
+    """Compute the radical inverse of the indices k in the given base.
+
+    k is an integer array. If scramble is an integer seed, the digits are
+    scrambled using random permutations (one per digit position).
+    """
+    if scramble is None:
+        res = numpy.zeros(len(k))
+        ip = 1.0/base
+        p = ip
+        kk = k.copy()
+        while kk.any():
+            if base==2:
+                res = res + numpy.where(kk & 1, p, 0.0)
+                kk >>= 1
+            else:
+                res = res + (kk % base)*p
+                kk //= base
+            p *= ip
+        return res
+
+    # Scrambled version (random digit scrambling). All digit positions that
+    # contribute to a double value are permuted (including leading zeros)
+    rnd = numpy.random.RandomState([scramble, base])
+    ndigits = int(numpy.ceil(53*numpy.log(2)/numpy.log(base)))
+    res = numpy.zeros(len(k))
+    p = 1.0
+    kk = k.copy()
+    for i in range(ndigits):
+        p /= base
+        perm = rnd.permutation(base)
+        res = res + perm[kk % base]*p
+        kk //= base
+    return numpy.minimum(res, 1.0-numpy.finfo(float).epsneg)
+
+def _hammersleyUV(k, n, scramble):
+    """Return the Hammersley points with index k as an array of shape (len(k),2).
+    """
+    u = _radicalInverse(k, 2, scramble)
+    v = (k+0.5)/n
+    return numpy.column_stack((u, v))
+
+def _haltonUV(k, p2, scramble):
+    """Return the Halton points with index k as an array of shape (len(k),2).
+    """
+    u = _radicalInverse(k, 2, scramble)
+    v = _radicalInverse(k, p2, scramble)
+    return numpy.column_stack((u, v))
+
+def _rotate(uv, rotation):
+    """Apply a Cranley-Patterson rotation to the points in the unit square.
+    """
+    if rotation is None:
+        return uv
+    return numpy.mod(uv + numpy.asarray(rotation, dtype=numpy.float64), 1.0)
+
+def _spherePoints(t, phirad):
+    """Map cylindrical coordinates (z, angle) onto the unit sphere.
+    """
+    st = numpy.sqrt(1.0-t*t)
+    return numpy.column_stack((st*numpy.cos(phirad), st*numpy.sin(phirad), t))
@@ -36,6 +36,7 @@
 import os
 from jobqueue import createJobQueue, JobQueue, JobQueueError
 from jobproc import JobProc
+from jobrunner import JobRunner
 
 def defaultJobQueueLocation():
     """Return the directory location of the default job queue.
@@ -14,6 +14,7 @@ class dumpenv(cgkit.jobqueue.JobProc):
         print ("Host name   : %s"%socket.gethostname())
         print ("User name   : %s"%getpass.getuser())
         print ("Current dir : %s"%os.getcwd())
+        print ("Running dir : %s"%self.runningDir)
         print ("\nEnvironment variables:\n")
         vars = os.environ.keys()
         for var in sorted(vars):
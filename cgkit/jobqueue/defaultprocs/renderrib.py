@@ -14,7 +14,7 @@ class renderrib(cgkit.jobqueue.JobProc):
         args = [self._rendererExecutable(), self._rib]
         cmd = " ".join(args)
         proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                shell=True)
+                                shell=True, cwd=self.runningDir)
         outdata,errdata = proc.communicate()
         outdata = outdata.rstrip()
         errdata = errdata.rstrip()
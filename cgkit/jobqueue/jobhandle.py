@@ -239,6 +239,14 @@ class JobHandle(object):
     def procDefFile(self):
         return os.path.join(self._realLocation, ".proc_def")
 
+    @property
+    def parentsFile(self):
+        """Return the location of the file that lists the parent jobs.
+        
+        This file is used to update the ready-list index of the job queue.
+        """
+        return os.path.join(self._realLocation, ".parents")
+
     @property
     def labelFile(self):
         """Return the location of the file that contains the job label.
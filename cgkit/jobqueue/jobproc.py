@@ -114,8 +114,12 @@ class JobProc(object):
     def run(self):
         """Do whatever this job has to do.
         
-        When this method is run, the current directory is set to the 
-        corresponding :file:`.running` directory.
+        When this method is run by :meth:`JobQueue.runNextAvailableJob()`, the
+        current directory is usually set to the corresponding :file:`.running`
+        directory. This is not the case when the job is run by a
+        :class:`JobRunner` (or when the current directory was not changed for
+        other reasons), so file names should be made relative to
+        :attr:`runningDir` explicitly.
         This method has to be implemented in a derived class. The base
         method does nothing.
         
@@ -145,6 +149,7 @@ class JobProc(object):
         """Execute a command line string.
         
         *cmds* is a string containing a command that will be executed.
+        The command is run inside the :file:`.running` directory of the job.
         stdout/stderr is captured into the job's stdout/stderr stream.
         The return value is the return code that was returned by the command.
         
@@ -152,7 +157,10 @@ class JobProc(object):
         and :meth:`stderrCallback()<JobProc.stderrCallback>` which get called
         for every line.
         """
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        cwd = None
+        if self._jobHandle is not None:
+            cwd = self.runningDir
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True, cwd=cwd)
         stdoutReader = _StreamPipe(proc.stdout, self.stdout, lineCallback=self.stdoutCallback, errStream=self.stderr, name="StdOutReader")
         stderrReader = _StreamPipe(proc.stderr, self.stderr, lineCallback=self.stderrCallback, errStream=self.stderr, name="StdErrReader")
         stdoutReader.start()
@@ -34,9 +34,14 @@
 # ***** END LICENSE BLOCK *****
 
 import sys, os, os.path, glob, inspect, socket
-import random, traceback, shutil
+import random, traceback, shutil, threading
 import xml.dom.minidom
 import ConfigParser as configparser
+try:
+    import json
+    _has_json = True
+except ImportError:
+    _has_json = False
 from jobproc import JobProc
 from jobhandle import JobHandle
 
@@ -76,6 +81,114 @@ def _convertPyValueToDOM(val, doc):
     
     return el
 
+def _convertPyValueToJSON(val):
+    """Convert a Python value into a value that can be stored in a JSON file.
+    
+    val can be a bool, int, float, str, tuple, list, dict or None (the same
+    types as in _convertPyValueToDOM()). Lists, bools, numbers, strings and
+    None are stored as they are, tuples and dicts are stored as JSON objects
+    with a single key "tuple" or "dict" (dicts are stored as a list of
+    key/value pairs so that the keys don't have to be strings).
+    Strings are written with latin-1 encoding, so that arbitrary byte
+    strings survive the round trip.
+    """
+    t = type(val)
+    if val is None or t in [bool, int, float, str]:
+        return val
+    elif t==list:
+        return map(_convertPyValueToJSON, val)
+    elif t==tuple:
+        return {"tuple":map(_convertPyValueToJSON, val)}
+    elif t==dict:
+        return {"dict":[[_convertPyValueToJSON(key), _convertPyValueToJSON(v)] for key,v in val.items()]}
+    else:
+        raise ValueError("Unsupport parameter type: %s"%t.__name__)
+
+def _convertJSONToPyValue(val):
+    """Convert a value read from a JSON file into a Python object.
+    
+    This is the inverse of _convertPyValueToJSON().
+    """
+    t = type(val)
+    if t is unicode:
+        return val.encode("latin-1")
+    elif t is list:
+        return map(_convertJSONToPyValue, val)
+    elif t is dict:
+        if len(val)!=1:
+            raise ValueError("Invalid container value in job definition file")
+        typeName,items = val.items()[0]
+        if typeName=="tuple":
+            return tuple(map(_convertJSONToPyValue, items))
+        elif typeName=="dict":
+            res = {}
+            for key,v in items:
+                res[_convertJSONToPyValue(key)] = _convertJSONToPyValue(v)
+            return res
+        else:
+            raise ValueError("Unknown parameter type: %s"%typeName)
+    elif t is long:
+        return int(val)
+    return val
+
+def _jobDefToJSON(jobType, params):
+    """Return the content of a JSON job definition file.
+    """
+    data = {"type":jobType, "parameters":_convertPyValueToJSON(params)}
+    return json.dumps(data, separators=(",", ":"), encoding="latin-1")
+
+def _writeFileData(fileName, data):
+    """Write a string into a new file.
+    
+    This uses the low-level file functions to keep the number of system
+    calls down (which matters on network file systems).
+    """
+    fd = os.open(fileName, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0666)
+    try:
+        while data:
+            n = os.write(fd, data)
+            data = data[n:]
+    finally:
+        os.close(fd)
+
+def _processInThreads(func, items, numThreads):
+    """Call func(item) for every item using several threads.
+    
+    If func raises an exception, the remaining items are not processed
+    anymore and the first exception is raised again in the calling thread.
+    """
+    items = list(items)
+    lock = threading.Lock()
+    errors = []
+    
+    def worker():
+        while 1:
+            lock.acquire()
+            try:
+                if len(items)==0 or len(errors)>0:
+                    return
+                item = items.pop()
+            finally:
+                lock.release()
+            try:
+                func(item)
+            except:
+                lock.acquire()
+                errors.append(sys.exc_info())
+                lock.release()
+    
+    threads = []
+    for i in range(min(numThreads, len(items))):
+        thread = threading.Thread(target=worker, name="JobWriter%d"%i)
+        thread.setDaemon(True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    if len(errors)>0:
+        excType,excValue,tb = errors[0]
+        raise excType, excValue, tb
+
 def _convertDOMToPyValue(element):
     """Convert a DOM element into a Python object.
     
@@ -153,6 +266,17 @@ class Job(object):
         params are the job parameters which must be passed as keyword
         arguments.
         """
+        self._initAttributes(jobRoot, jobType, params)
+        
+        # The job location on disk.
+        self._location = self._initJobDir(jobType, **params)
+        # Indicates whether the job directory is inside the repository or not
+        # (all jobs begin in the repository except for the root job)
+        self._isInsideRepository = True
+    
+    def _initAttributes(self, jobRoot, jobType, params):
+        """Initialize the attributes (except for the job location).
+        """
         if not isinstance(jobRoot, JobRoot):
             raise TypeError("jobRoot must be a JobRoot object")
         if not isinstance(jobType, basestring):
@@ -176,12 +300,12 @@ class Job(object):
         self._maxLeafDist = 0
         # This is used later on to remove redundant dependencies
         self._depNr = 0
-        
-        # The job location on disk.
-        self._location = self._initJobDir(jobType, **params)
-        # Indicates whether the job directory is inside the repository or not
-        # (all jobs begin in the repository except for the root job)
-        self._isInsideRepository = True
+        # The jobs that have a job directory (or link) for this job (this is
+        # set in _writeDependencies() and used for the ready-list index)
+        self._parents = []
+        # The location of the job within the dependency hierarchy (this may
+        # be a link). Set in _writeDependencies().
+        self._hierarchyLocation = None
     
     def createJob(self, jobType, **params):
         """Create a new sub-job.
@@ -199,6 +323,94 @@ class Job(object):
         self.addDependency(job)
         return job
 
+    def createJobs(self, jobType, paramTable, commonParams=None, numThreads=0):
+        """Create several sub-jobs of the same type at once.
+        
+        *jobType* is the name of the job procedure that should be created for
+        every job. *paramTable* is a sequence of dicts with one dict per job
+        that contains the keyword arguments for the job procedure. The
+        optional dict *commonParams* contains arguments that are used for
+        all jobs (the arguments in *paramTable* take precedence).
+        
+        This is equivalent to calling :meth:`createJob()<jobqueue.Job.createJob>`
+        for every entry in the table, but the job directories are created in
+        one pass which is considerably faster when a large number of jobs
+        is submitted (especially on network file systems). If *numThreads*
+        is greater than 0, the job directories are written by that many
+        threads in parallel (in this case, the
+        :meth:`postCreate()<JobProc.postCreate>` method of the job procedures
+        is also called from those threads).
+        
+        As with :meth:`createJob()<jobqueue.Job.createJob>`, the jobs won't be
+        processed before the job root has been activated.
+        
+        Returns a list of :class:`Job<jobqueue.Job>` objects (in the same
+        order as the parameter table).
+        """
+        if type(jobType) is not str:
+            raise TypeError("Job type must be a string")
+        if commonParams is None:
+            commonParams = {}
+        
+        jobRoot = self._jobRoot
+        jobDefFormat = jobRoot._jobDefFormat
+        
+        # Create the job procedures (to validate the parameters) and the
+        # job objects.
+        jobs = []
+        tasks = []
+        for params in paramTable:
+            allParams = dict(commonParams)
+            allParams.update(params)
+            jobProc = self._instantiateJobProc(jobType, **allParams)
+            job = Job.__new__(Job)
+            job._initAttributes(jobRoot, jobType, allParams)
+            job._location = jobRoot._newSubJobDirName()
+            job._isInsideRepository = True
+            jobs.append(job)
+            if jobDefFormat=="json":
+                jobDef = _jobDefToJSON(jobType, allParams)
+            else:
+                jobDef = None
+            tasks.append((job, jobProc, jobDef))
+        
+        if len(jobs)==0:
+            return []
+        
+        # The names of the files inside a job directory
+        jobHandle = JobHandle(jobs[0]._location, None)
+        labelName = os.path.basename(jobHandle.labelFile)
+        procDefName = os.path.basename(jobHandle.procDefFile)
+        
+        def initJobDir(task):
+            job,jobProc,jobDef = task
+            jobDir = job._location
+            os.mkdir(jobDir)
+            jobProc.postCreate(jobDir)
+            jobProc._jobDir = jobDir
+            if jobProc.label is not None:
+                _writeFileData(os.path.join(jobDir, labelName), jobProc.label)
+            procDefFile = os.path.join(jobDir, procDefName)
+            if jobDef is None:
+                job._writeXMLJobDef(procDefFile, jobType, job._params)
+            else:
+                _writeFileData(procDefFile, jobDef)
+        
+        # Create the repository dir if it doesn't already exist
+        subJobRepo = jobRoot._getSubJobRepo()
+        if not os.path.exists(subJobRepo):
+            os.mkdir(subJobRepo)
+        
+        # Write the job directories
+        if numThreads>0:
+            _processInThreads(initJobDir, tasks, numThreads)
+        else:
+            for task in tasks:
+                initJobDir(task)
+        
+        self._dependencies.extend(jobs)
+        return jobs
+
     def addDependency(self, job):
         """Establish a dependency between another job.
         
@@ -260,6 +472,22 @@ class Job(object):
         return jobDir
     
     def _writeJobDef(self, fileName, jobType, params):
+        """Write the job definition file.
+        
+        The file format is determined by the jobDefFormat attribute of the
+        job queue.
+        """
+        if self._jobRoot._jobDefFormat=="json":
+            self._writeJSONJobDef(fileName, jobType, params)
+        else:
+            self._writeXMLJobDef(fileName, jobType, params)
+    
+    def _writeJSONJobDef(self, fileName, jobType, params):
+        """Write the job definition as JSON file.
+        """
+        _writeFileData(fileName, _jobDefToJSON(jobType, params))
+    
+    def _writeXMLJobDef(self, fileName, jobType, params):
         """Write the job definition XML file.
         """
         impl = xml.dom.minidom.getDOMImplementation()
@@ -342,11 +570,16 @@ class Job(object):
                 continue
             
             dirName = os.path.join(jobDir, "job%d"%(jobNr))
+            if self not in subJob._parents:
+                subJob._parents.append(self)
+            if subJob._hierarchyLocation is None:
+                subJob._hierarchyLocation = dirName
             if not self._jobRoot._keepJobsInRepository and subJob._isInsideRepository:
                 # Move the directory from the repository into the dependency hierarchy 
                 shutil.move(subJob._location, dirName)
                 subJob._location = dirName
                 subJob._isInsideRepository = False
+                subJob._hierarchyLocation = dirName
             else:
                 # Create a link to the actual job dir
                 self._jobRoot._linkJobDir(subJob._location, dirName)
@@ -394,6 +627,10 @@ class JobRoot(Job):
         self._keepJobsInRepository = self._jobQueue.keepJobsInRepository
         # Can we use sym links or do we have to emulate them?
         self._useSymLinks = self._jobQueue.useSymLinks
+        # The file format of the job definition files
+        self._jobDefFormat = self._jobQueue.jobDefFormat
+        if self._jobDefFormat=="json" and not _has_json:
+            self._jobDefFormat = "xml"
         
         Job.__init__(self, self, jobType, **params)
         
@@ -413,8 +650,13 @@ class JobRoot(Job):
         self._preprocessGraph()
         
         # Create the actual job* directories that make up the job hierarchy
+        self._hierarchyLocation = self._location
         self._writeDependencies()
         
+        # Write the parent information that is required for updating the
+        # ready-list index
+        readyJobs = self._jobQueue._initIndex(self)
+        
         # Clean up the job repo dir if the jobs have been moved out.
         if not self._keepJobsInRepository:
             subJobRepo = self._getSubJobRepo()
@@ -431,6 +673,10 @@ class JobRoot(Job):
         if not os.path.exists(tmpProcDefFile):
             raise JobQueueError("Failed to activate")
         os.rename(tmpProcDefFile, procDefFile)
+        
+        # Now that the job is active, add the leaf jobs to the ready-list
+        for seqNr,job in readyJobs:
+            self._jobQueue._addReadyEntry(self._location, seqNr, job._hierarchyLocation)
 
     def _linkJobDir(self, src, dst):
         """Create a link at dst pointing to src.
@@ -452,17 +698,22 @@ class JobRoot(Job):
         
         Note: The sub-job may be anywhere in the final dependency graph.
         """
-        self._subJobCounter += 1
         # The directory where all sub-jobs are stored
         subJobRepo = self._getSubJobRepo()
         # Create the repo dir if it doesn't already exist
         if not os.path.exists(subJobRepo):
             os.mkdir(subJobRepo)
         # Create the actual sub-job directory
-        subJobDir = os.path.join(self._location, ".jobs", "j%d"%self._subJobCounter)
+        subJobDir = self._newSubJobDirName()
         os.mkdir(subJobDir)
         return subJobDir
     
+    def _newSubJobDirName(self):
+        """Return the name of the next sub-job directory (without creating it).
+        """
+        self._subJobCounter += 1
+        return os.path.join(self._location, ".jobs", "j%d"%self._subJobCounter)
+    
     def _getNextDepNr(self):
         self._depNr += 1
         return self._depNr
@@ -545,11 +796,22 @@ class JobQueue:
         self._location = location
         self.keepJobsInRepository = False
         self.useSymLinks = False
+        # The file format for new job definitions ("json" or "xml")
+        self.jobDefFormat = "json"
         
         # The default parameter values for job procedures.
         # Key:Proc name - Value:Keyword params dict
         self._defaultProcParams = {}
         
+        # The maximum number of jobs of a particular type that may run
+        # concurrently on one machine (this is only used by the JobRunner).
+        # Key:Proc name - Value:Max number of jobs
+        self.jobTypeLimits = {}
+        
+        # An optional object with acquire(jobType) and release(jobType)
+        # methods that is used to enforce the job type limits.
+        self._resourceGuard = None
+        
         self._nextDepNr = 0
         
         # Read the config file
@@ -658,12 +920,25 @@ class JobQueue:
                     pass
                 # Now delete everything
                 shutil.rmtree(job.location)
+        
+        # Remove the ready-list entries of the deleted jobs
+        prefixes = ["%010d_"%job.number for job in jobs]
+        for entry in self._listReadyEntries():
+            for prefix in prefixes:
+                if entry.startswith(prefix):
+                    self._removeReadyEntry(entry)
+                    break
     
-    def runNextAvailableJob(self, retries=10):
+    def runNextAvailableJob(self, retries=10, changeDir=True):
         """Run the next available job in the queue that is in a waiting state.
         
         The return value is ``True`` if a job could be run or ``False`` if there
         are no more waiting jobs at the moment.
+        If *changeDir* is ``True``, the current directory is set to the
+        :file:`.running` directory of the job while the job is run (it is
+        restored afterwards). As the current directory is a process-wide
+        setting, *changeDir* must be ``False`` when several threads are
+        running jobs.
         When there are waiting jobs but the method fails to allocate one of them,
         then the integer *retries* determines how many attempts should be made
         before giving up. Once the last attempt has failed, a :exc:`JobQueueError`
@@ -675,24 +950,65 @@ class JobQueue:
         - There is a broken job directory somewhere (if it's in waiting state
           but can't be run for some reason (maybe the proc is missing))
         """
-        for i in range(retries):
-            # Get a list of all available jobs
-            jobs = self.listJobs()
-            # Pick the next available job
-            job = self._findNextWaitingJob(jobs)
-            if job is None:
+        # Old job queue without a ready-list index? Then scan the job directories
+        if not os.path.exists(self._readyListDir()):
+            # The locations of the jobs whose job type limit was reached
+            skip = set()
+            failures = 0
+            while 1:
+                # Get a list of all available jobs
+                jobs = self.listJobs()
+                # Pick the next available job
+                job = self._findNextWaitingJob(jobs, skip)
+                if job is None:
+                    return False
+                # Try to run it
+                res = self._runJob(job, changeDir=changeDir)
+                if res:
+                    return True
+                # Skip the job if its job type limit was reached
+                if res is None:
+                    skip.add(job.location)
+                    continue
+                failures += 1
+                if failures>=retries:
+                    raise JobQueueError("Failed to get permission to run a job")
+        
+        # Pick the next job from the ready-list
+        failures = 0
+        while 1:
+            entries = self._listReadyEntries()
+            if len(entries)==0:
+                return False
+            failed = False
+            for entry in entries:
+                job = self._readReadyEntry(entry)
+                # Remove stale entries (the job has been deleted or was
+                # picked up by another process)
+                if job is None or not job.isWaiting():
+                    self._removeReadyEntry(entry)
+                    continue
+                # Try to run it
+                res = self._runJob(job, readyEntry=entry, changeDir=changeDir)
+                if res:
+                    return True
+                # Skip the job if its job type limit was reached
+                if res is None:
+                    continue
+                failed = True
+                failures += 1
+                if failures>=retries:
+                    raise JobQueueError("Failed to get permission to run a job")
+            # Only entries that can't be run at the moment are left?
+            if not failed:
                 return False
-            # Try to run it
-            if self._runJob(job):
-                return True
-        
-        raise JobQueueError("Failed to get permission to run a job")
     
-    def _findNextWaitingJob(self, jobs):
+    def _findNextWaitingJob(self, jobs, skip=None):
         """Find the next job that should be processed.
         
         jobs is a sequence of JobHandle objects. The method returns a JobHandle
         object that is the "deepest" job that is in waiting state.
+        skip may be a set of job locations that should not be returned.
         """
         # Ignore any job that is not currently waiting
         jobs = filter(lambda job: job.isWaiting(), jobs)
@@ -701,10 +1017,12 @@ class JobQueue:
         for job in jobs:
             subJobs = job.listSubJobs()
             if self._isReady(subJobs):
-                return job
+                if skip is None or job.location not in skip:
+                    return job
+                continue
                     
             # The job is not ready, so try to pick one of the sub-jobs...
-            j = self._findNextWaitingJob(subJobs)
+            j = self._findNextWaitingJob(subJobs, skip)
             if j is not None:
                 return j
         
@@ -722,16 +1040,23 @@ class JobQueue:
                 return False
         return True
     
-    def _runJob(self, job):
+    def _runJob(self, job, readyEntry=None, changeDir=True):
         """Try to run the job.
         
         job is a JobHandle object representing the job to run.
+        readyEntry is the name of the ready-list entry of the job (or None).
+        The entry is removed as soon as the job is in running state.
+        If changeDir is True, the current directory is set to the running
+        directory of the job while the job procedure is run.
         The return value is True if the job could be run, otherwise the
         value is False. A value of False means, this process couldn't bring
         the job into running state (e.g. because it was not in waiting state
         or another process was slightly quicker to run it or there were
         permission issues). It is absolutely possible that the method returns
         False even when a previous call to isWaiting() returned True.
+        None is returned when the job was not run because the resource guard
+        didn't allow another job of that type or because the job procedure
+        could not be instantiated.
         
         Note: A return value of True only means this process got permission
         to run the job. It doesn't mean that the job also completed successfully.
@@ -753,30 +1078,50 @@ class JobQueue:
             if name not in params:
                 params[name] = val
         
-        # Create a new instance of the job procedure
-        proc = self._instantiateJobProc(jobType, **params)
-
-        # Try to bring the job into running state
-        if not self._setJobToRunningState(job):
-            return False
+        # Check if we are allowed to run another job of this type
+        guard = self._resourceGuard
+        if guard is not None and not guard.acquire(jobType):
+            self._logger.info("Job type limit reached for %s"%jobType)
+            return None
 
-        # Run the job procedure
-        self._logger.info("Running job")
-        os.chdir(job.runningDir)
         try:
-            proc._begin(job)
-            proc.run()
-            self._logger.info("Job succeeded")
-        except:
-            self._logger.info("Job failed to run successfully")
-            job.setError()
-            f = open(job.procTracebackFile, "wt")
-            traceback.print_exc(file=f)
-            f.close()
-        try:
-            proc._end()
-        except:
-            pass
+            # Create a new instance of the job procedure
+            try:
+                proc = self._instantiateJobProc(jobType, **params)
+            except:
+                self._logger.info("Failed to instantiate job procedure: %s"%sys.exc_info()[1])
+                return None
+            
+            # Try to bring the job into running state
+            if not self._setJobToRunningState(job):
+                return False
+            if readyEntry is not None:
+                self._removeReadyEntry(readyEntry)
+    
+            # Run the job procedure
+            self._logger.info("Running job")
+            if changeDir:
+                prevDir = os.getcwd()
+                os.chdir(job.runningDir)
+            try:
+                proc._begin(job)
+                proc.run()
+                self._logger.info("Job succeeded")
+            except:
+                self._logger.info("Job failed to run successfully")
+                job.setError()
+                f = open(job.procTracebackFile, "wt")
+                traceback.print_exc(file=f)
+                f.close()
+            try:
+                proc._end()
+            except:
+                pass
+            if changeDir:
+                os.chdir(prevDir)
+        finally:
+            if guard is not None:
+                guard.release(jobType)
             
         # Mark the job as being finished
         self._logger.debug("Creating finished directory %s"%job.finishedDir)
@@ -784,6 +1129,9 @@ class JobQueue:
             os.mkdir(job.finishedDir, 0777)
         except:
             self._logger.warn("Failed to create directory %s: "%(job.finishedDir, sys.exc_info()[1]))
+        
+        # Check if the parents are ready to run now
+        self._updateReadyList(job)
             
         return True
     
@@ -846,13 +1194,198 @@ class JobQueue:
         return True
 
     
+    def _hasReadyJobs(self):
+        """Check if there are jobs that are ready to run.
+        
+        Returns True if at least one job is waiting and could be run.
+        """
+        if not os.path.exists(self._readyListDir()):
+            return self._findNextWaitingJob(self.listJobs()) is not None
+        return len(self._listReadyEntries())>0
+    
+    def _readyListDir(self):
+        """Return the location of the ready-list directory.
+        
+        The ready-list is an index of all jobs that are waiting and whose
+        sub-jobs have all been finished successfully. There is one file
+        per job which contains the job location (relative to the queue
+        directory). The file names are chosen so that sorting them yields
+        the order in which the jobs should be processed.
+        Old job queues may not have this directory.
+        """
+        return os.path.join(self._location, ".ready")
+    
+    def _listReadyEntries(self):
+        """Return the sorted list of ready-list entry names.
+        """
+        if self._location is None:
+            return []
+        try:
+            names = os.listdir(self._readyListDir())
+        except OSError:
+            return []
+        # Skip entries that are just being written
+        names = filter(lambda name: not name.startswith("."), names)
+        names.sort()
+        return names
+    
+    def _readReadyEntry(self, entry):
+        """Return the JobHandle object for a ready-list entry.
+        
+        Returns None if the entry doesn't exist anymore.
+        """
+        try:
+            f = open(os.path.join(self._readyListDir(), entry), "rt")
+            try:
+                relLocation = f.read().strip()
+            finally:
+                f.close()
+        except IOError:
+            return None
+        if relLocation=="":
+            return None
+        location = os.path.join(self._location, relLocation)
+        rootLocation = os.path.join(self._location, relLocation.split(os.sep)[0])
+        return JobHandle(location, rootLocation)
+    
+    def _addReadyEntry(self, rootLocation, seqNr, location):
+        """Add a job to the ready-list.
+        
+        rootLocation is the location of the job root, seqNr the number of
+        the job within the job hierarchy (which determines the processing
+        order) and location is the location of the job itself.
+        The entry is written under a temporary name and then renamed so
+        that other processes never see an incomplete entry.
+        """
+        readyDir = self._readyListDir()
+        if not os.path.exists(readyDir):
+            return
+        rootNr = int(os.path.basename(rootLocation)[3:])
+        entry = "%010d_%08d"%(rootNr, seqNr)
+        tmpName = os.path.join(readyDir, ".%s_%s_%s"%(entry, socket.gethostname(), os.getpid()))
+        f = open(tmpName, "wt")
+        try:
+            f.write(location[len(self._location)+1:])
+        finally:
+            f.close()
+        os.rename(tmpName, os.path.join(readyDir, entry))
+    
+    def _removeReadyEntry(self, entry):
+        """Remove an entry from the ready-list.
+        
+        It is not an error if the entry doesn't exist anymore.
+        """
+        try:
+            os.remove(os.path.join(self._readyListDir(), entry))
+        except OSError:
+            pass
+    
+    def _initIndex(self, jobRoot):
+        """Prepare the ready-list index for a job hierarchy that is about to be activated.
+        
+        jobRoot is a JobRoot object whose dependencies have already been
+        written. Every job gets a sequence number in the order in which the
+        jobs would be processed (sub-jobs first). For each job, the sequence
+        numbers and locations of its parents are stored in the job directory,
+        so that the parents can be added to the ready-list once all their
+        sub-jobs are finished.
+        Returns a list of tuples (seqNr, job) with the jobs that don't have
+        any sub-jobs and that are ready to run right away.
+        """
+        # Assign the sequence numbers (post-order)
+        seqNrs = {}
+        order = []
+        stack = [(jobRoot, 0)]
+        while len(stack)>0:
+            job,i = stack.pop()
+            if i<len(job._dependencies):
+                stack.append((job, i+1))
+                subJob = job._dependencies[i]
+                if subJob not in seqNrs:
+                    seqNrs[subJob] = None
+                    stack.append((subJob, 0))
+            else:
+                seqNrs[job] = len(order)
+                order.append(job)
+        
+        readyJobs = []
+        for job in order:
+            # Write the parents file
+            jobHandle = JobHandle(job._location, None)
+            f = open(jobHandle.parentsFile, "wt")
+            try:
+                for parent in job._parents:
+                    f.write("%d %s\n"%(seqNrs[parent], parent._hierarchyLocation[len(self._location)+1:]))
+            finally:
+                f.close()
+            if len(job._dependencies)==0:
+                readyJobs.append((seqNrs[job], job))
+        return readyJobs
+    
+    def _updateReadyList(self, job):
+        """Add the parents of a finished job to the ready-list if they are ready to run.
+        
+        job is a JobHandle object of a job that has just been finished.
+        """
+        if job.hasError():
+            return
+        try:
+            f = open(job.parentsFile, "rt")
+            try:
+                lines = f.readlines()
+            finally:
+                f.close()
+        except IOError:
+            return
+        
+        for line in lines:
+            line = line.strip()
+            if line=="":
+                continue
+            seqNr,relLocation = line.split(" ", 1)
+            location = os.path.join(self._location, relLocation)
+            rootLocation = os.path.join(self._location, relLocation.split(os.sep)[0])
+            parent = JobHandle(location, rootLocation)
+            # Note: If several sub-jobs finish at the same time, the parent
+            # may be added more than once which is harmless as the entry
+            # name is always the same.
+            if parent.isWaiting() and self._isReady(parent.listSubJobs()):
+                self._addReadyEntry(rootLocation, int(seqNr), location)
+    
     def _readJobDef(self, fileName):
         """Read the job definition.
         
+        The file may either be a JSON or an XML file.
         Returns the job type string and the parameter dict.
         Raises an error when there was an error reading the file.
         """
-        doc = xml.dom.minidom.parse(fileName)
+        f = open(fileName, "rb")
+        try:
+            data = f.read()
+        finally:
+            f.close()
+        
+        # XML file?
+        if data.lstrip()[:1]=="<":
+            return self._readXMLJobDef(data)
+        
+        data = json.loads(data)
+        if type(data) is not dict:
+            raise ValueError("Error in job definition file, expected a job procedure object")
+        jobType = data.get("type")
+        if not jobType:
+            raise ValueError("Error in job definition file. No job type given.")
+        params = _convertJSONToPyValue(data.get("parameters"))
+        if type(params) is not dict:
+            raise ValueError("Error in job definition file. Invalid parameter element.")
+        return jobType,params
+    
+    def _readXMLJobDef(self, data):
+        """Read a job definition in XML format.
+        
+        data is the content of the job definition file.
+        """
+        doc = xml.dom.minidom.parseString(data)
         
         jobProc = doc.documentElement
         if jobProc.nodeName!="JobProcedure":
@@ -895,7 +1428,8 @@ class JobQueue:
         # [main] section. The values are the default values which also 
         # define the valid type of the variable.
         cfgDict = {"keepJobsInRepository":self.keepJobsInRepository,
-                   "useSymLinks":self.useSymLinks}
+                   "useSymLinks":self.useSymLinks,
+                   "jobDefFormat":self.jobDefFormat}
         
         # Check if there are unknown options on the main section and issue
         # warnings if there are...
@@ -916,10 +1450,23 @@ class JobQueue:
             if cp.has_option("main", key):
                 if type(defaultVal) is bool:
                     val = cp.getboolean("main", key)
+                elif type(defaultVal) is str:
+                    val = cp.get("main", key)
                 else:
                     raise TypeError("Internal error: Unknown config var type")
             setattr(self, key, val)
         
+        if self.jobDefFormat not in ["json", "xml"]:
+            raise ValueError("Invalid job definition format in file %s: %s"%(fileName, self.jobDefFormat))
+        
+        # Read the job type limits
+        if cp.has_section("limits"):
+            for procName in cp.options("limits"):
+                limit = cp.getint("limits", procName)
+                if limit<1:
+                    raise ValueError("Invalid job type limit for %s in file %s: %s"%(procName, fileName, limit))
+                self.jobTypeLimits[procName] = limit
+        
         # Read the proc defaults
         for section in cp.sections():
             if section.endswith(" proc"):
@@ -1005,6 +1552,9 @@ def createJobQueue(location, keepJobsInRepository=False, useSymLinks=False):
         # Create the root job queue directory
         os.mkdir(location)
     
+    # Create the ready-list index directory
+    os.mkdir(os.path.join(location, ".ready"))
+    
     # Create the procs directory (only writable for the current user)
     procPath = os.path.join(location, "procs")
     os.mkdir(procPath, 0755)
@@ -1029,4 +1579,7 @@ def createJobQueue(location, keepJobsInRepository=False, useSymLinks=False):
     f.write("[main]\n\n")
     f.write("KeepJobsInRepository = %s\n"%bool(keepJobsInRepository))
     f.write("UseSymLinks = %s\n"%bool(useSymLinks))
+    f.write("\n# The maximum number of jobs per job type that a JobRunner\n")
+    f.write("# may run at the same time (e.g. blender = 1)\n")
+    f.write("[limits]\n\n")
     f.close()
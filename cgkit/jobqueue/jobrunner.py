@@ -0,0 +1,298 @@
+# ***** BEGIN LICENSE BLOCK *****
+# Version: MPL 1.1/GPL 2.0/LGPL 2.1
+#
+# The contents of this file are subject to the Mozilla Public License Version
+# 1.1 (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS" basis,
+# WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License
+# for the specific language governing rights and limitations under the
+# License.
+#
+# The Original Code is the Python Computer Graphics Kit.
+#
+# The Initial Developer of the Original Code is Matthias Baas.
+# Portions created by the Initial Developer are Copyright (C) 2009
+# the Initial Developer. All Rights Reserved.
+#
+# Contributor(s):
+#
+# Alternatively, the contents of this file may be used under the terms of
+# either the GNU General Public License Version 2 or later (the "GPL"), or
+# the GNU Lesser General Public License Version 2.1 or later (the "LGPL"),
+# in which case the provisions of the GPL or the LGPL are applicable instead
+# of those above. If you wish to allow use of your version of this file only
+# under the terms of either the GPL or the LGPL, and not to allow others to
+# use your version of this file under the terms of the MPL, indicate your
+# decision by deleting the provisions above and replace them with the notice
+# and other provisions required by the GPL or the LGPL. If you do not delete
+# the provisions above, a recipient may use your version of this file under
+# the terms of any one of the MPL, the GPL or the LGPL.
+#
+# ***** END LICENSE BLOCK *****
+
+import time, Queue
+import multiprocessing
+from jobqueue import JobQueue, JobQueueError, _DummyLogger
+
+
+class _ResourceGuard:
+    """Enforces the job type limits among the worker processes.
+
+    An instance of this class is used as resource guard of the JobQueue
+    object inside a worker process. All workers share the array running
+    which contains the index of the limited job type that is currently
+    run by a worker (or -1).
+    """
+
+    def __init__(self, slot, lock, running, limitNames, limits):
+        self._slot = slot
+        self._lock = lock
+        self._running = running
+        self._limitNames = limitNames
+        self._limits = limits
+        # The type and start time of the last job that was allowed to run
+        self.lastJobType = None
+        self.lastStartTime = None
+
+    def acquire(self, jobType):
+        """Check if another job of the given type may be run.
+        """
+        if jobType in self._limitNames:
+            idx = self._limitNames.index(jobType)
+            self._lock.acquire()
+            try:
+                n = len(filter(lambda i: i==idx, self._running[:]))
+                if n>=self._limits[idx]:
+                    return False
+                self._running[self._slot] = idx
+            finally:
+                self._lock.release()
+        self.lastJobType = jobType
+        self.lastStartTime = time.time()
+        return True
+
+    def release(self, jobType):
+        """Release a job type that was acquired before.
+        """
+        if jobType in self._limitNames:
+            self._lock.acquire()
+            self._running[self._slot] = -1
+            self._lock.release()
+
+
+def _workerMain(location, slot, lock, busy, idle, running, limitNames, limits, messages, stopEvent, pollInterval):
+    """Main function of a worker process.
+
+    The worker keeps running jobs from the queue at location until the
+    stop event is set. When there is no job available, the worker waits
+    pollInterval seconds before it tries again. Every job that was run is
+    reported via the messages queue as a tuple (slot, jobType, duration).
+    idle[slot] is set to 1 when the last attempt didn't run a job.
+    """
+    jobQueue = JobQueue(location)
+    guard = _ResourceGuard(slot, lock, running, limitNames, limits)
+    jobQueue._resourceGuard = guard
+    while 1:
+        # Mark the worker as busy (unless the runner has already decided to stop)
+        lock.acquire()
+        try:
+            if stopEvent.is_set():
+                break
+            busy[slot] = 1
+        finally:
+            lock.release()
+
+        try:
+            try:
+                ran = jobQueue.runNextAvailableJob(changeDir=False)
+            except JobQueueError:
+                ran = False
+        finally:
+            lock.acquire()
+            busy[slot] = 0
+            idle[slot] = int(not ran)
+            lock.release()
+
+        if ran:
+            messages.put((slot, guard.lastJobType, time.time()-guard.lastStartTime))
+        else:
+            stopEvent.wait(pollInterval)
+
+
+class JobRunner:
+    """Run the jobs of a job queue using several local worker processes.
+
+    The workers are separate processes that pick up jobs from the queue
+    concurrently. The number of jobs of a particular type that may run at
+    the same time can be limited in the ``[limits]`` section of the job queue
+    config file. Workers that die unexpectedly are replaced by new workers.
+
+    Jobs run by the workers do not change the current directory (the
+    command line applications started via :meth:`JobProc.execCmd()` are
+    still run inside the :file:`.running` directory of the job).
+    """
+
+    def __init__(self, location, numWorkers=None, pollInterval=1.0, reportInterval=60.0, maxRestarts=10, logger=None):
+        """Constructor.
+
+        *location* is the directory of the job queue. *numWorkers* is the
+        number of worker processes to run (the default is the number of CPUs).
+        *pollInterval* is the time in seconds that an idle worker waits
+        before it checks the queue again. Every *reportInterval* seconds, the
+        current throughput is reported to the logger. *maxRestarts* is the
+        maximum number of workers that may be restarted after a crash before
+        the runner gives up.
+
+        *logger* can be set to a logger object from the :mod:`logging` module
+        (or an object with the same interface) which will receive log message.
+        """
+        if numWorkers is None:
+            numWorkers = multiprocessing.cpu_count()
+        numWorkers = int(numWorkers)
+        if numWorkers<1:
+            raise ValueError("The number of workers must be at least 1")
+
+        if logger is None:
+            logger = _DummyLogger()
+
+        self._logger = logger
+        self._jobQueue = JobQueue(location)
+        self._location = self._jobQueue.location
+        self._numWorkers = numWorkers
+        self._pollInterval = pollInterval
+        self._reportInterval = reportInterval
+        self._maxRestarts = maxRestarts
+
+        # The number of finished jobs per job type
+        self.finishedJobs = {}
+        # The total time (in seconds) that was spent in the jobs
+        self.jobTime = 0.0
+        # The number of workers that had to be restarted
+        self.restarts = 0
+        # The time in seconds that the last call to run() took
+        self.elapsedTime = 0.0
+
+    def run(self, waitForJobs=False):
+        """Run jobs until the queue is empty.
+
+        If *waitForJobs* is ``True``, the method doesn't return when the
+        queue is empty but keeps waiting for new jobs (until the process
+        is interrupted).
+        The method returns the number of jobs that have been run. A summary
+        is available via the attributes :attr:`finishedJobs`,
+        :attr:`jobTime`, :attr:`restarts` and :attr:`elapsedTime`.
+        Raises a :exc:`JobQueueError` if workers have crashed more often
+        than allowed.
+        """
+        limitNames = self._jobQueue.jobTypeLimits.keys()
+        limits = [self._jobQueue.jobTypeLimits[name] for name in limitNames]
+
+        lock = multiprocessing.Lock()
+        busy = multiprocessing.Array("i", self._numWorkers*[0], lock=False)
+        idle = multiprocessing.Array("i", self._numWorkers*[0], lock=False)
+        running = multiprocessing.Array("i", self._numWorkers*[-1], lock=False)
+        messages = multiprocessing.Queue()
+        stopEvent = multiprocessing.Event()
+
+        def startWorker(slot):
+            args = (self._location, slot, lock, busy, idle, running, limitNames, limits, messages, stopEvent, self._pollInterval)
+            proc = multiprocessing.Process(target=_workerMain, args=args, name="JobWorker%d"%slot)
+            proc.daemon = True
+            proc.start()
+            return proc
+
+        self._logger.info("Starting %d workers on %s"%(self._numWorkers, self._location))
+        startTime = time.time()
+        lastReport = startTime
+        numJobs = 0
+        workers = [startWorker(slot) for slot in range(self._numWorkers)]
+        try:
+            while 1:
+                # Collect the job reports
+                numJobs += self._collectReports(messages, self._pollInterval)
+
+                # Restart crashed workers
+                for slot,proc in enumerate(workers):
+                    if proc.is_alive():
+                        continue
+                    self._logger.warning("Worker %d died (exit code %s)"%(slot, proc.exitcode))
+                    if self.restarts>=self._maxRestarts:
+                        raise JobQueueError("Too many worker processes have crashed")
+                    lock.acquire()
+                    busy[slot] = 0
+                    idle[slot] = 0
+                    running[slot] = -1
+                    lock.release()
+                    self.restarts += 1
+                    workers[slot] = startWorker(slot)
+
+                # Report the throughput
+                now = time.time()
+                if now-lastReport>=self._reportInterval:
+                    self._logger.info(self._throughputMessage(numJobs, now-startTime))
+                    lastReport = now
+
+                # Are we done? (this is checked while holding the lock so
+                # that no worker can pick up a job in the meantime). This is
+                # also the case when there are still ready jobs but the last
+                # attempt of every worker didn't run anything (the remaining
+                # jobs can't be run, e.g. because of a job type limit or a
+                # missing procedure).
+                if not waitForJobs:
+                    lock.acquire()
+                    try:
+                        if 1 not in busy[:]:
+                            if not self._jobQueue._hasReadyJobs():
+                                stopEvent.set()
+                            elif 0 not in idle[:]:
+                                self._logger.warning("Stopping although there are jobs left that could not be run")
+                                stopEvent.set()
+                    finally:
+                        lock.release()
+                    if stopEvent.is_set():
+                        break
+        finally:
+            # Wait for the workers to finish their current job (the queue
+            # must be emptied in the meantime, otherwise a worker may block)
+            stopEvent.set()
+            for proc in workers:
+                while proc.is_alive():
+                    numJobs += self._collectReports(messages, None)
+                    proc.join(0.1)
+            numJobs += self._collectReports(messages, None)
+            self.elapsedTime = time.time()-startTime
+
+        self._logger.info(self._throughputMessage(numJobs, self.elapsedTime))
+        return numJobs
+
+    def _collectReports(self, messages, timeout):
+        """Read the job reports sent by the workers.
+
+        Waits at most timeout seconds for the first report (if timeout is
+        None, the method doesn't wait at all). Returns the number of reports.
+        """
+        n = 0
+        while 1:
+            try:
+                if n==0 and timeout is not None:
+                    slot,jobType,duration = messages.get(True, timeout)
+                else:
+                    slot,jobType,duration = messages.get(False)
+            except Queue.Empty:
+                return n
+            self.finishedJobs[jobType] = self.finishedJobs.get(jobType, 0)+1
+            self.jobTime += duration
+            n += 1
+            self._logger.debug("Worker %d finished a %s job in %1.1fs"%(slot, jobType, duration))
+
+    def _throughputMessage(self, numJobs, elapsedTime):
+        """Return a message string that reports the throughput.
+        """
+        if elapsedTime>0:
+            rate = 60.0*numJobs/elapsedTime
+        else:
+            rate = 0.0
+        return "%d jobs finished in %1.1fs (%1.2f jobs/min, %d restarts)"%(numJobs, elapsedTime, rate, self.restarts)
@@ -47,6 +47,12 @@ from mat3 import mat3
 from mat4 import mat4
 from quat import quat, slerp, squad
 
+# The array types require numpy
+try:
+    from arrays import vec3array, vec4array, mat4array, quatarray
+except ImportError:
+    pass
+
 # getEpsilon
 def getEpsilon():
     """Return the epsilon threshold which is used for doing comparisons."""
@@ -0,0 +1,463 @@
+# ***** BEGIN LICENSE BLOCK *****
+# Version: MPL 1.1/GPL 2.0/LGPL 2.1
+#
+# The contents of this file are subject to the Mozilla Public License Version
+# 1.1 (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS" basis,
+# WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License
+# for the specific language governing rights and limitations under the
+# License.
+#
+# The Original Code is the Python Computer Graphics Kit.
+#
+# The Initial Developer of the Original Code is Matthias Baas.
+# Portions created by the Initial Developer are Copyright (C) 2009
+# the Initial Developer. All Rights Reserved.
+#
+# Contributor(s):
+#
+# Alternatively, the contents of this file may be used under the terms of
+# either the GNU General Public License Version 2 or later (the "GPL"), or
+# the GNU Lesser General Public License Version 2.1 or later (the "LGPL"),
+# in which case the provisions of the GPL or the LGPL are applicable instead
+# of those above. If you wish to allow use of your version of this file only
+# under the terms of either the GPL or the LGPL, and not to allow others to
+# use your version of this file under the terms of the MPL, indicate your
+# decision by deleting the provisions above and replace them with the notice
+# and other provisions required by the GPL or the LGPL. If you do not delete
+# the provisions above, a recipient may use your version of this file under
+# the terms of any one of the MPL, the GPL or the LGPL.
+#
+# ***** END LICENSE BLOCK *****
+# $Id: vec3.py,v 1.1 2005/08/15 15:39:48 mbaas Exp $
+
+"""NumPy-backed arrays of vectors, matrices and quaternions.
+
+The array types store N elements in one contiguous numpy array and provide
+the operations of the corresponding single-element types vectorized over
+all elements. Operations between an array with one element and an array
+with N elements apply the single element to all N elements.
+"""
+
+import numpy
+from vec3 import vec3 as _vec3
+from vec4 import vec4 as _vec4
+from mat4 import mat4 as _mat4
+from quat import quat as _quat
+
+_scalarTypes = (int, float, long, numpy.number)
+
+class _array(object):
+    """Base class for the array types.
+
+    Derived classes must set the attributes _itemType (the single element
+    class) and _itemShape (the shape of one element in the numpy array)
+    and implement _itemValues() and _item().
+    """
+    
+    _itemType = None
+    _itemShape = ()
+
+    def __init__(self, data=0):
+        """Constructor.
+
+        data may be one of the following:
+
+        - An integer n: Creates an array with n zero elements
+        - A sequence of single elements (or sequences of floats)
+        - A single element
+        - A numpy array (the data is shared if the array contains float64 values)
+        - Another array of the same type (the data is copied)
+        """
+        shape = self._itemShape
+        if isinstance(data, (int, long)):
+            a = numpy.zeros((data,)+shape)
+        elif isinstance(data, self.__class__):
+            a = data.array.copy()
+        elif isinstance(data, numpy.ndarray):
+            a = numpy.asarray(data, dtype=numpy.float64).reshape((-1,)+shape)
+        elif isinstance(data, self._itemType):
+            a = numpy.array([self._itemValues(data)]).reshape((1,)+shape)
+        else:
+            values = [self._itemValues(item) for item in data]
+            a = numpy.array(values, dtype=numpy.float64).reshape((len(values),)+shape)
+        self.array = a
+    
+    def __repr__(self):
+        return "%s(%r)"%(self.__class__.__name__, self.array.tolist())
+    
+    def __len__(self):
+        return len(self.array)
+    
+    def __iter__(self):
+        for i in xrange(len(self.array)):
+            yield self._item(self.array[i])
+    
+    def __getitem__(self, key):
+        """Return one element or a sub-array.
+
+        An integer index returns a single element, a slice (or an index
+        array) returns an array of the same type that shares its data
+        with this array (for slices).
+        """
+        if isinstance(key, (int, long, numpy.integer)):
+            return self._item(self.array[key])
+        return self._new(self.array[key])
+    
+    def __setitem__(self, key, value):
+        self.array[key] = self._operand(value)
+    
+    def toList(self):
+        """Return the elements as a list of single elements."""
+        return [self._item(a) for a in self.array]
+    
+    def _new(self, a):
+        """Create a new array of the same type that uses a as data.
+        """
+        res = self.__class__.__new__(self.__class__)
+        res.array = a
+        return res
+    
+    def _operand(self, other):
+        """Convert an operand into a numpy array with the element shape.
+
+        Returns None if other is not a compatible operand.
+        """
+        if isinstance(other, self.__class__):
+            return other.array
+        if isinstance(other, self._itemType):
+            return numpy.array(self._itemValues(other)).reshape(self._itemShape)
+        if isinstance(other, (list, tuple, numpy.ndarray)):
+            a = numpy.asarray(other, dtype=numpy.float64)
+            if a.shape[-len(self._itemShape):]==self._itemShape:
+                return a
+        return None
+    
+    def _scalars(self, other):
+        """Convert a scalar or an array of n scalars into a broadcastable array.
+
+        Returns None if other is not a scalar operand.
+        """
+        if isinstance(other, _scalarTypes):
+            return other
+        if isinstance(other, numpy.ndarray) and other.ndim==1:
+            return other.reshape((-1,)+len(self._itemShape)*(1,))
+        return None
+    
+    def __add__(self, other):
+        b = self._operand(other)
+        if b is None:
+            raise TypeError("unsupported operand type for +")
+        return self._new(self.array+b)
+    
+    __radd__ = __add__
+    
+    def __sub__(self, other):
+        b = self._operand(other)
+        if b is None:
+            raise TypeError("unsupported operand type for -")
+        return self._new(self.array-b)
+    
+    def __rsub__(self, other):
+        b = self._operand(other)
+        if b is None:
+            raise TypeError("unsupported operand type for -")
+        return self._new(b-self.array)
+    
+    def __truediv__(self, other):
+        """Division by a scalar or by an array of n scalars."""
+        s = self._scalars(other)
+        if s is None:
+            raise TypeError("unsupported operand type for /")
+        return self._new(self.array/s)
+    
+    __div__ = __truediv__
+    
+    def __neg__(self):
+        return self._new(-self.array)
+    
+    def __pos__(self):
+        return self._new(self.array.copy())
+    
+    def _scale(self, other):
+        """Multiplication by a scalar or by an array of n scalars.
+
+        Returns None if other is not a scalar operand.
+        """
+        s = self._scalars(other)
+        if s is None:
+            return None
+        return self._new(self.array*s)
+
+
+class _vecarray(_array):
+    """Base class for the vector arrays.
+    """
+    
+    def __mul__(self, other):
+        """Multiplication with scalars or dot product."""
+        res = self._scale(other)
+        if res is not None:
+            return res
+        b = self._operand(other)
+        if b is not None:
+            return (self.array*b).sum(axis=-1)
+        raise TypeError("unsupported operand type for *")
+    
+    __rmul__ = __mul__
+    
+    def __abs__(self):
+        """Return the lengths of the vectors as a numpy array."""
+        return numpy.sqrt((self.array*self.array).sum(axis=-1))
+    
+    length = __abs__
+    
+    def dot(self, other):
+        """Return the dot products as a numpy array."""
+        b = self._operand(other)
+        if b is None:
+            raise TypeError("unsupported operand type for dot()")
+        return (self.array*b).sum(axis=-1)
+    
+    def normalize(self):
+        """Return an array with the normalized vectors."""
+        return self._new(self.array/self.length()[:,numpy.newaxis])
+
+
+class vec3array(_vecarray):
+    """Array of 3D vectors.
+
+    The vectors are stored in the attribute array which is a numpy array
+    of shape (n, 3).
+    """
+    
+    _itemType = _vec3
+    _itemShape = (3,)
+    
+    def _itemValues(self, v):
+        return tuple(v)
+    
+    def _item(self, a):
+        x,y,z = a.tolist()
+        return _vec3(x, y, z)
+    
+    def __mul__(self, other):
+        """Multiplication with scalars, dot product or v*M.
+
+        Multiplying with a mat4 or mat4array transforms the vectors as row
+        vectors (see mat4).
+        """
+        if isinstance(other, _mat4):
+            other = mat4array(other)
+        if isinstance(other, mat4array):
+            return other._transformRows(self.array)
+        return _vecarray.__mul__(self, other)
+    
+    def __rmul__(self, other):
+        # M*v
+        if isinstance(other, _mat4):
+            return mat4array(other)*self
+        return _vecarray.__mul__(self, other)
+    
+    def cross(self, other):
+        """Return the cross products as a vec3array."""
+        b = self._operand(other)
+        if b is None:
+            raise TypeError("unsupported operand type for cross()")
+        return self._new(numpy.cross(self.array, b))
+
+
+class vec4array(_vecarray):
+    """Array of 4D vectors.
+
+    The vectors are stored in the attribute array which is a numpy array
+    of shape (n, 4).
+    """
+    
+    _itemType = _vec4
+    _itemShape = (4,)
+    
+    def _itemValues(self, v):
+        return tuple(v)
+    
+    def _item(self, a):
+        x,y,z,w = a.tolist()
+        return _vec4(x, y, z, w)
+    
+    def __rmul__(self, other):
+        # M*v
+        if isinstance(other, _mat4):
+            return mat4array(other)*self
+        return _vecarray.__mul__(self, other)
+
+
+class mat4array(_array):
+    """Array of 4x4 matrices.
+
+    The matrices are stored in the attribute array which is a numpy array
+    of shape (n, 4, 4) (where the last index is the column).
+    """
+    
+    _itemType = _mat4
+    _itemShape = (4,4)
+    
+    def _itemValues(self, m):
+        if isinstance(m, _mat4):
+            return m.toList(rowmajor=1)
+        return _mat4(m).toList(rowmajor=1)
+    
+    def _item(self, a):
+        return _mat4(*a.reshape(16).tolist())
+    
+    def __mul__(self, other):
+        """Multiplication with scalars, vectors or matrices.
+
+        M*v with a vec3array (or vec3) applies the transformation to the
+        points (including the division by the homogeneous coordinate).
+        """
+        res = self._scale(other)
+        if res is not None:
+            return res
+        if isinstance(other, _vec3):
+            other = vec3array(other)
+        elif isinstance(other, _vec4):
+            other = vec4array(other)
+        if isinstance(other, vec3array):
+            M = self.array
+            v = other.array
+            res = (M[:,:3,:3]*v[:,numpy.newaxis,:]).sum(axis=-1)+M[:,:3,3]
+            w = (M[:,3,:3]*v).sum(axis=-1)+M[:,3,3]
+            return vec3array(res/w[:,numpy.newaxis])
+        if isinstance(other, vec4array):
+            res = (self.array*other.array[:,numpy.newaxis,:]).sum(axis=-1)
+            return vec4array(res)
+        b = self._operand(other)
+        if b is not None:
+            return self._new(numpy.matmul(self.array, b))
+        raise TypeError("unsupported operand type for *")
+    
+    def __rmul__(self, other):
+        res = self._scale(other)
+        if res is not None:
+            return res
+        b = self._operand(other)
+        if b is not None:
+            return self._new(numpy.matmul(b, self.array))
+        raise TypeError("unsupported operand type for *")
+    
+    def _transformRows(self, v):
+        """Return v*M (v as row vectors) as a vec3array.
+        """
+        M = self.array
+        res = (v[:,:,numpy.newaxis]*M[:,:3,:3]).sum(axis=1)+M[:,3,:3]
+        w = (v*M[:,:3,3]).sum(axis=-1)+M[:,3,3]
+        return vec3array(res/w[:,numpy.newaxis])
+    
+    def transpose(self):
+        """Return the transposed matrices."""
+        return self._new(self.array.transpose(0,2,1).copy())
+    
+    def determinant(self):
+        """Return the determinants as a numpy array."""
+        return numpy.linalg.det(self.array)
+    
+    def inverse(self):
+        """Return the inverse matrices."""
+        return self._new(numpy.linalg.inv(self.array))
+
+
+class quatarray(_array):
+    """Array of quaternions.
+
+    The quaternions are stored in the attribute array which is a numpy
+    array of shape (n, 4) (the components are stored in the order w,x,y,z).
+    """
+    
+    _itemType = _quat
+    _itemShape = (4,)
+    
+    def _itemValues(self, q):
+        if isinstance(q, _quat):
+            return (q.w, q.x, q.y, q.z)
+        return tuple(q)
+    
+    def _item(self, a):
+        w,x,y,z = a.tolist()
+        return _quat(w, x, y, z)
+    
+    def __mul__(self, other):
+        """Multiplication with scalars or quaternion product."""
+        res = self._scale(other)
+        if res is not None:
+            return res
+        b = self._operand(other)
+        if b is None:
+            raise TypeError("unsupported operand type for *")
+        return self._new(_quatProduct(self.array, b))
+    
+    def __rmul__(self, other):
+        res = self._scale(other)
+        if res is not None:
+            return res
+        b = self._operand(other)
+        if b is None:
+            raise TypeError("unsupported operand type for *")
+        return self._new(_quatProduct(b, self.array))
+    
+    def __abs__(self):
+        """Return the lengths of the quaternions as a numpy array."""
+        return numpy.sqrt((self.array*self.array).sum(axis=-1))
+    
+    def conjugate(self):
+        """Return the conjugated quaternions."""
+        return self._new(self.array*(1.0,-1.0,-1.0,-1.0))
+    
+    def normalize(self):
+        """Return the normalized quaternions."""
+        return self._new(self.array/abs(self)[:,numpy.newaxis])
+    
+    def rotateVec(self, v):
+        """Return the rotated vectors as a vec3array.
+
+        v is a vec3array (or anything that can be converted into one).
+        The quaternions must be unit quaternions.
+        """
+        if not isinstance(v, vec3array):
+            v = vec3array(v)
+        q = self.array
+        w = q[:,0:1]
+        u = q[:,1:4]
+        v = v.array
+        # v' = v + 2w(u x v) + 2u x (u x v)
+        t = 2.0*numpy.cross(u, v)
+        return vec3array(v+w*t+numpy.cross(u, t))
+    
+    def toMat4(self):
+        """Return the rotation matrices as mat4array."""
+        w,x,y,z = [self.array[:,i] for i in range(4)]
+        res = numpy.zeros((len(self.array),4,4))
+        res[:,0,0] = 1.0-2.0*(y*y+z*z)
+        res[:,0,1] = 2.0*(x*y-z*w)
+        res[:,0,2] = 2.0*(x*z+y*w)
+        res[:,1,0] = 2.0*(x*y+z*w)
+        res[:,1,1] = 1.0-2.0*(x*x+z*z)
+        res[:,1,2] = 2.0*(y*z-x*w)
+        res[:,2,0] = 2.0*(x*z-y*w)
+        res[:,2,1] = 2.0*(y*z+x*w)
+        res[:,2,2] = 1.0-2.0*(x*x+y*y)
+        res[:,3,3] = 1.0
+        return mat4array(res)
+
+
+def _quatProduct(a, b):
+    """Return the quaternion products of two (n,4) arrays.
+    """
+    w1,x1,y1,z1 = [a[...,i] for i in range(4)]
+    w2,x2,y2,z2 = [b[...,i] for i in range(4)]
+    return numpy.array([w1*w2-x1*x2-y1*y2-z1*z2,
+                        w1*x2+x1*w2+y1*z2-z1*y2,
+                        w1*y2+y1*w2-x1*z2+z1*x2,
+                        w1*z2+z1*w2+x1*y2-y1*x2]).T
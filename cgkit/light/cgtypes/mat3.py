@@ -35,8 +35,8 @@
 # ***** END LICENSE BLOCK *****
 # $Id: mat3.py,v 1.2 2005/08/17 19:38:29 mbaas Exp $
 
-import types, math, copy
-from vec3 import vec3 as _vec3
+import types, math, copy, operator
+from vec3 import vec3 as _vec3, _newvec3
 
 # [  0   1   2 ]
 # [  3   4   5 ]
@@ -45,15 +45,20 @@ from vec3 import vec3 as _vec3
 # Comparison threshold
 _epsilon = 1E-12
 
+# Types that are treated as scalars by the operators
+_scalarTypes = frozenset([types.FloatType, types.IntType, types.LongType])
+
 
 # mat3
-class mat3:
+class mat3(object):
     """Matrix class (3x3).
 
     This class represents a 3x3 matrix that can be used to store
     linear transformations.
     """
 
+    __slots__ = ("mlist",)
+
     def __init__(self, *args):
         """Constructor.
 
@@ -80,7 +85,7 @@ class mat3:
         elif len(args)==1:
             T = type(args[0])
             # Scalar
-            if T==types.FloatType or T==types.IntType or T==types.LongType:
+            if T in _scalarTypes:
                 f = float(args[0])
                 self.mlist = [f,0.0,0.0,
                               0.0,f,0.0,
@@ -125,13 +130,23 @@ class mat3:
                 '['+fmt%m21+', '+fmt%m22+', '+fmt%m23+']\n'+
                 '['+fmt%m31+', '+fmt%m32+', '+fmt%m33+']')
 
+    def __getstate__(self):
+        return self.mlist
+
+    def __setstate__(self, state):
+        # Pickles from older versions contain the instance dict
+        if isinstance(state, dict):
+            state = state["mlist"]
+        self.mlist = list(state)
+
     def __eq__(self, other):
         """== operator"""
         global _epsilon
         if isinstance(other, mat3):
-#            return self.mlist==other.mlist
-            lst = filter(lambda a: abs(a[0]-a[1])>_epsilon, zip(self.mlist, other.mlist))
-            return len(lst)==0
+            for a,b in zip(self.mlist, other.mlist):
+                if abs(a-b)>_epsilon:
+                    return False
+            return True
         else:
             return False
 
@@ -142,57 +157,43 @@ class mat3:
 
     def __add__(self, other):
         if isinstance(other, mat3):
-            return mat3(map(lambda x,y: x+y, self.mlist, other.mlist))
+            return _newmat3(map(operator.add, self.mlist, other.mlist))
         else:
             raise TypeError("unsupported operand type for +")
 
     def __sub__(self, other):
         if isinstance(other, mat3):
-            return mat3(map(lambda x,y: x-y, self.mlist, other.mlist))
+            return _newmat3(map(operator.sub, self.mlist, other.mlist))
         else:
             raise TypeError("unsupported operand type for -")
 
     def __mul__(self, other):
-        T = type(other)
         # mat3*scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return mat3(map(lambda x,other=other: x*other, self.mlist))
+        if type(other) in _scalarTypes:
+            return _newmat3([x*other for x in self.mlist])
         # mat3*vec3
         if isinstance(other, _vec3):
             m11,m12,m13,m21,m22,m23,m31,m32,m33 = self.mlist
-            return _vec3(m11*other.x + m12*other.y + m13*other.z, 
-                         m21*other.x + m22*other.y + m23*other.z, 
-                         m31*other.x + m32*other.y + m33*other.z)            
+            return _newvec3(m11*other.x + m12*other.y + m13*other.z, 
+                            m21*other.x + m22*other.y + m23*other.z, 
+                            m31*other.x + m32*other.y + m33*other.z)            
         # mat3*mat3
         if isinstance(other, mat3):
-            m11,m12,m13,m21,m22,m23,m31,m32,m33 = self.mlist
-            n11,n12,n13,n21,n22,n23,n31,n32,n33 = other.mlist
-            return mat3( m11*n11+m12*n21+m13*n31,
-                         m11*n12+m12*n22+m13*n32,
-                         m11*n13+m12*n23+m13*n33,
-
-                         m21*n11+m22*n21+m23*n31,
-                         m21*n12+m22*n22+m23*n32,
-                         m21*n13+m22*n23+m23*n33,
-
-                         m31*n11+m32*n21+m33*n31,
-                         m31*n12+m32*n22+m33*n32,
-                         m31*n13+m32*n23+m33*n33)
+            return _newmat3(_matmul(self.mlist, other.mlist))
         # unsupported
         else:
             raise TypeError("unsupported operand type for *")
 
     def __rmul__(self, other):
-        T = type(other)
         # scalar*mat3
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return mat3(map(lambda x,other=other: other*x, self.mlist))
+        if type(other) in _scalarTypes:
+            return _newmat3([other*x for x in self.mlist])
         # vec3*mat3
         if isinstance(other, _vec3):
             m11,m12,m13,m21,m22,m23,m31,m32,m33 = self.mlist
-            return _vec3(other.x*m11 + other.y*m21 + other.z*m31, 
-                         other.x*m12 + other.y*m22 + other.z*m32, 
-                         other.x*m13 + other.y*m23 + other.z*m33)
+            return _newvec3(other.x*m11 + other.y*m21 + other.z*m31, 
+                            other.x*m12 + other.y*m22 + other.z*m32, 
+                            other.x*m13 + other.y*m23 + other.z*m33)
         # mat3*mat3
         if isinstance(other, mat3):
             return self.__mul__(other)
@@ -202,32 +203,67 @@ class mat3:
 
 
     def __div__(self, other):
-        T = type(other)
         # mat3/scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return mat3(map(lambda x,other=other: x/other, self.mlist))
+        if type(other) in _scalarTypes:
+            return _newmat3([x/other for x in self.mlist])
         # unsupported
         else:
             raise TypeError("unsupported operand type for /")
 
     def __mod__(self, other):
-        T = type(other)
         # mat3%scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return mat3(map(lambda x,other=other: x%other, self.mlist))
+        if type(other) in _scalarTypes:
+            return _newmat3([x%other for x in self.mlist])
         # mat3%mat3
         if isinstance(other, mat3):
-            return mat3(map(lambda a: a[0]%a[1], zip(self.mlist, other.mlist)))
+            return _newmat3(map(operator.mod, self.mlist, other.mlist))
         # unsupported
         else:
             raise TypeError("unsupported operand type for %")
 
+    def __iadd__(self, other):
+        """Inline matrix addition."""
+        if isinstance(other, mat3):
+            self.mlist[:] = map(operator.add, self.mlist, other.mlist)
+            return self
+        else:
+            raise TypeError("unsupported operand type for +=")
+
+    def __isub__(self, other):
+        """Inline matrix subtraction."""
+        if isinstance(other, mat3):
+            self.mlist[:] = map(operator.sub, self.mlist, other.mlist)
+            return self
+        else:
+            raise TypeError("unsupported operand type for -=")
+
+    def __imul__(self, other):
+        """Inline multiplication with a scalar or a matrix (self = self*other)."""
+        # mat3*=scalar
+        if type(other) in _scalarTypes:
+            self.mlist[:] = [x*other for x in self.mlist]
+            return self
+        # mat3*=mat3
+        if isinstance(other, mat3):
+            self.mlist[:] = _matmul(self.mlist, other.mlist)
+            return self
+        else:
+            raise TypeError("unsupported operand type for *=")
+
+    def __idiv__(self, other):
+        """Inline division by a scalar."""
+        if type(other) in _scalarTypes:
+            self.mlist[:] = [x/other for x in self.mlist]
+            return self
+        else:
+            raise TypeError("unsupported operand type for /=")
+
 
     def __neg__(self):
-        return mat3(map(lambda x: -x, self.mlist))
+        return _newmat3([-x for x in self.mlist])
 
     def __pos__(self):
-        return mat3(map(lambda x: +x, self.mlist))
+        return _newmat3([+x for x in self.mlist])
 
 
     def __len__(self):
@@ -237,11 +273,11 @@ class mat3:
         """Return a column or an individual element."""
         if type(key)==int:
             if   key==0:
-                return _vec3(self.mlist[0],self.mlist[3],self.mlist[6])
+                return _newvec3(self.mlist[0],self.mlist[3],self.mlist[6])
             elif key==1:
-                return _vec3(self.mlist[1],self.mlist[4],self.mlist[7])
+                return _newvec3(self.mlist[1],self.mlist[4],self.mlist[7])
             elif key==2:
-                return _vec3(self.mlist[2],self.mlist[5],self.mlist[8])
+                return _newvec3(self.mlist[2],self.mlist[5],self.mlist[8])
             else:
                 raise IndexError("index out of range")
         elif type(key)==types.TupleType:
@@ -354,9 +390,9 @@ class mat3:
     def transpose(self):
         """Return the transposed matrix."""
         m11,m12,m13,m21,m22,m23,m31,m32,m33 = self.mlist
-        return mat3(m11,m21,m31,
-                    m12,m22,m32,
-                    m13,m23,m33)
+        return _newmat3([m11,m21,m31,
+                         m12,m22,m32,
+                         m13,m23,m33])
 
     def determinant(self):
         """Return determinant."""
@@ -744,6 +780,34 @@ class mat3:
             r3 = tmp
         return r1,r2,r3
 
+_object_new = object.__new__
+
+def _newmat3(mlist):
+    """Create a mat3 from a list of 9 floats without checking the list.
+
+    The list is used as is (it is not copied).
+    """
+    m = _object_new(mat3)
+    m.mlist = mlist
+    return m
+
+def _matmul(m, n):
+    """Return the product of two matrices given as lists in row-major order.
+    """
+    m11,m12,m13,m21,m22,m23,m31,m32,m33 = m
+    n11,n12,n13,n21,n22,n23,n31,n32,n33 = n
+    return [m11*n11+m12*n21+m13*n31,
+            m11*n12+m12*n22+m13*n32,
+            m11*n13+m12*n23+m13*n33,
+
+            m21*n11+m22*n21+m23*n31,
+            m21*n12+m22*n22+m23*n32,
+            m21*n13+m22*n23+m23*n33,
+
+            m31*n11+m32*n21+m33*n31,
+            m31*n12+m32*n22+m33*n32,
+            m31*n13+m32*n23+m33*n33]
+
 def _eulerIndices(i, neg, alt):
     """Helper function for _getRotation()."""
     next = [1, 2, 0, 1]
@@ -34,9 +34,9 @@
 # ***** END LICENSE BLOCK *****
 # $Id: mat4.py,v 1.2 2005/08/17 19:52:41 mbaas Exp $
 
-import types, math, copy
-from vec3 import vec3 as _vec3
-from vec4 import vec4 as _vec4
+import types, math, copy, operator
+from vec3 import vec3 as _vec3, _newvec3
+from vec4 import vec4 as _vec4, _newvec4
 from mat3 import mat3 as _mat3
 
 
@@ -48,15 +48,20 @@ from mat3 import mat3 as _mat3
 # Comparison threshold
 _epsilon = 1E-12
 
+# Types that are treated as scalars by the operators
+_scalarTypes = frozenset([types.FloatType, types.IntType, types.LongType])
+
 
 # mat4
-class mat4:
+class mat4(object):
     """Matrix class (4x4).
 
     This class represents a 4x4 matrix that can be used to store
     affine transformations.
     """
 
+    __slots__ = ("mlist",)
+
     def __init__(self, *args):
         "Constructor"
 
@@ -67,7 +72,7 @@ class mat4:
         # 1 argument (list, scalar or mat4)
         elif len(args)==1:
             T = type(args[0])
-            if T==types.FloatType or T==types.IntType or T==types.LongType:
+            if T in _scalarTypes:
                 f = float(args[0])
                 self.mlist = [f,0.0,0.0,0.0,
                               0.0,f,0.0,0.0,
@@ -114,13 +119,23 @@ class mat4:
                 '['+fmt%m31+', '+fmt%m32+', '+fmt%m33+', '+fmt%m34+']\n'+
                 '['+fmt%m41+', '+fmt%m42+', '+fmt%m43+', '+fmt%m44+']')
 
+    def __getstate__(self):
+        return self.mlist
+
+    def __setstate__(self, state):
+        # Pickles from older versions contain the instance dict
+        if isinstance(state, dict):
+            state = state["mlist"]
+        self.mlist = list(state)
+
     def __eq__(self, other):
         """== operator"""
         global _epsilon
         if isinstance(other, mat4):
-#            return self.mlist==other.mlist
-            lst = filter(lambda a: abs(a[0]-a[1])>_epsilon, zip(self.mlist, other.mlist))
-            return len(lst)==0
+            for a,b in zip(self.mlist, other.mlist):
+                if abs(a-b)>_epsilon:
+                    return False
+            return True
         else:
             return False
 
@@ -139,7 +154,7 @@ class mat4:
         [  26.0000,   28.0000,   30.0000,   32.0000]
         """
         if isinstance(other, mat4):
-            return mat4(map(lambda x,y: x+y, self.mlist, other.mlist))
+            return _newmat4(map(operator.add, self.mlist, other.mlist))
         else:
             raise TypeError("unsupported operand type for +")
 
@@ -154,7 +169,7 @@ class mat4:
         [   0.0000,    0.0000,    0.0000,    0.0000]
         """
         if isinstance(other, mat4):
-            return mat4(map(lambda x,y: x-y, self.mlist, other.mlist))
+            return _newmat4(map(operator.sub, self.mlist, other.mlist))
         else:
             raise TypeError("unsupported operand type for -")
 
@@ -182,70 +197,52 @@ class mat4:
         >>> print _vec3(1,2,3)*M
         (0.7083, 0.8056, 0.9028)
         """
-        T = type(other)
         # mat4*scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return mat4(map(lambda x,other=other: x*other, self.mlist))
+        if type(other) in _scalarTypes:
+            return _newmat4([x*other for x in self.mlist])
         # mat4*vec3
         if isinstance(other, _vec3):
             m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44 = self.mlist
             w = float(m41*other.x + m42*other.y + m43*other.z + m44)
-            return _vec3(m11*other.x + m12*other.y + m13*other.z + m14, 
-                         m21*other.x + m22*other.y + m23*other.z + m24, 
-                         m31*other.x + m32*other.y + m33*other.z + m34)/w
+            return _newvec3((m11*other.x + m12*other.y + m13*other.z + m14)/w, 
+                            (m21*other.x + m22*other.y + m23*other.z + m24)/w, 
+                            (m31*other.x + m32*other.y + m33*other.z + m34)/w)
         # mat4*vec4
         if isinstance(other, _vec4):
             m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44 = self.mlist
-            return _vec4(m11*other.x + m12*other.y + m13*other.z + m14*other.w, 
-                         m21*other.x + m22*other.y + m23*other.z + m24*other.w, 
-                         m31*other.x + m32*other.y + m33*other.z + m34*other.w,
-                         m41*other.x + m42*other.y + m43*other.z + m44*other.w)
+            return _newvec4(m11*other.x + m12*other.y + m13*other.z + m14*other.w, 
+                            m21*other.x + m22*other.y + m23*other.z + m24*other.w, 
+                            m31*other.x + m32*other.y + m33*other.z + m34*other.w,
+                            m41*other.x + m42*other.y + m43*other.z + m44*other.w)
         # mat4*mat4
         if isinstance(other, mat4):
-            m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44 = self.mlist
-            n11,n12,n13,n14,n21,n22,n23,n24,n31,n32,n33,n34,n41,n42,n43,n44 = other.mlist
-            return mat4( m11*n11+m12*n21+m13*n31+m14*n41,
-                         m11*n12+m12*n22+m13*n32+m14*n42,
-                         m11*n13+m12*n23+m13*n33+m14*n43,
-                         m11*n14+m12*n24+m13*n34+m14*n44,
-
-                         m21*n11+m22*n21+m23*n31+m24*n41,
-                         m21*n12+m22*n22+m23*n32+m24*n42,
-                         m21*n13+m22*n23+m23*n33+m24*n43,
-                         m21*n14+m22*n24+m23*n34+m24*n44,
-
-                         m31*n11+m32*n21+m33*n31+m34*n41,
-                         m31*n12+m32*n22+m33*n32+m34*n42,
-                         m31*n13+m32*n23+m33*n33+m34*n43,
-                         m31*n14+m32*n24+m33*n34+m34*n44,
-
-                         m41*n11+m42*n21+m43*n31+m44*n41,
-                         m41*n12+m42*n22+m43*n32+m44*n42,
-                         m41*n13+m42*n23+m43*n33+m44*n43,
-                         m41*n14+m42*n24+m43*n34+m44*n44)
+            return _newmat4(_matmul(self.mlist, other.mlist))
         # unsupported
         else:
-            raise TypeError("unsupported operand type for *")
+            # Try to delegate the operation to the other operand
+            if getattr(other,"__rmul__",None)!=None:
+                return other.__rmul__(self)
+            else:
+                raise TypeError("unsupported operand type for *")
 
     def __rmul__(self, other):
-        T = type(other)
         # scalar*mat4
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return mat4(map(lambda x,other=other: other*x, self.mlist))
+        if type(other) in _scalarTypes:
+            return _newmat4([other*x for x in self.mlist])
         # vec4*mat4
         if isinstance(other, _vec4):
             m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44 = self.mlist
-            return _vec4(other.x*m11 + other.y*m21 + other.z*m31 + other.w*m41, 
-                         other.x*m12 + other.y*m22 + other.z*m32 + other.w*m42,
-                         other.x*m13 + other.y*m23 + other.z*m33 + other.w*m43,
-                         other.x*m14 + other.y*m24 + other.z*m34 + other.w*m44)
+            return _newvec4(other.x*m11 + other.y*m21 + other.z*m31 + other.w*m41, 
+                            other.x*m12 + other.y*m22 + other.z*m32 + other.w*m42,
+                            other.x*m13 + other.y*m23 + other.z*m33 + other.w*m43,
+                            other.x*m14 + other.y*m24 + other.z*m34 + other.w*m44)
         # vec3*mat4
         if isinstance(other, _vec3):
             m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44 = self.mlist
             w = float(other.x*m14 + other.y*m24 + other.z*m34 + m44)
-            return _vec3(other.x*m11 + other.y*m21 + other.z*m31 + m41, 
-                         other.x*m12 + other.y*m22 + other.z*m32 + m42,
-                         other.x*m13 + other.y*m23 + other.z*m33 + m43)/w
+            return _newvec3((other.x*m11 + other.y*m21 + other.z*m31 + m41)/w, 
+                            (other.x*m12 + other.y*m22 + other.z*m32 + m42)/w,
+                            (other.x*m13 + other.y*m23 + other.z*m33 + m43)/w)
         # mat4*mat4
         if isinstance(other, mat4):
             return self.__mul__(other)
@@ -263,10 +260,9 @@ class mat4:
         [   4.5000,    5.0000,    5.5000,    6.0000]
         [   6.5000,    7.0000,    7.5000,    8.0000]
         """
-        T = type(other)
         # mat4/scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return mat4(map(lambda x,other=other: x/other, self.mlist))
+        if type(other) in _scalarTypes:
+            return _newmat4([x/other for x in self.mlist])
         # unsupported
         else:
             raise TypeError("unsupported operand type for /")
@@ -281,17 +277,62 @@ class mat4:
         [   4.0000,    0.0000,    1.0000,    2.0000]
         [   3.0000,    4.0000,    0.0000,    1.0000]
         """
-        T = type(other)
         # mat4%scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return mat4(map(lambda x,other=other: x%other, self.mlist))
+        if type(other) in _scalarTypes:
+            return _newmat4([x%other for x in self.mlist])
         # mat4%mat4
         if isinstance(other, mat4):
-            return mat4(map(lambda a,b: a%b, self.mlist, other.mlist))
+            return _newmat4(map(operator.mod, self.mlist, other.mlist))
         # unsupported
         else:
             raise TypeError("unsupported operand type for %")
 
+    def __iadd__(self, other):
+        """Inline matrix addition."""
+        if isinstance(other, mat4):
+            self.mlist[:] = map(operator.add, self.mlist, other.mlist)
+            return self
+        else:
+            raise TypeError("unsupported operand type for +=")
+
+    def __isub__(self, other):
+        """Inline matrix subtraction."""
+        if isinstance(other, mat4):
+            self.mlist[:] = map(operator.sub, self.mlist, other.mlist)
+            return self
+        else:
+            raise TypeError("unsupported operand type for -=")
+
+    def __imul__(self, other):
+        """Inline multiplication with a scalar or a matrix (self = self*other).
+
+        >>> M=mat4(1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16)
+        >>> M*=M
+        >>> print M
+        [  90.0000,  100.0000,  110.0000,  120.0000]
+        [ 202.0000,  228.0000,  254.0000,  280.0000]
+        [ 314.0000,  356.0000,  398.0000,  440.0000]
+        [ 426.0000,  484.0000,  542.0000,  600.0000]
+        """
+        # mat4*=scalar
+        if type(other) in _scalarTypes:
+            self.mlist[:] = [x*other for x in self.mlist]
+            return self
+        # mat4*=mat4
+        if isinstance(other, mat4):
+            self.mlist[:] = _matmul(self.mlist, other.mlist)
+            return self
+        else:
+            raise TypeError("unsupported operand type for *=")
+
+    def __idiv__(self, other):
+        """Inline division by a scalar."""
+        if type(other) in _scalarTypes:
+            self.mlist[:] = [x/other for x in self.mlist]
+            return self
+        else:
+            raise TypeError("unsupported operand type for /=")
+
     def __neg__(self):
         """Negation.
 
@@ -302,7 +343,7 @@ class mat4:
         [  -9.0000,  -10.0000,  -11.0000,  -12.0000]
         [ -13.0000,  -14.0000,  -15.0000,  -16.0000]
         """
-        return mat4(map(lambda x: -x, self.mlist))
+        return _newmat4([-x for x in self.mlist])
 
     def __pos__(self):
         """
@@ -313,7 +354,7 @@ class mat4:
         [   9.0000,   10.0000,   11.0000,   12.0000]
         [  13.0000,   14.0000,   15.0000,   16.0000]
         """
-        return mat4(map(lambda x: +x, self.mlist))
+        return _newmat4([+x for x in self.mlist])
 
 
     def __len__(self):
@@ -324,10 +365,10 @@ class mat4:
             if key<0 or key>3:
                 raise IndexError("index out of range")
             m=self.mlist
-            if   key==0: return _vec4(m[0],m[4],m[8],m[12])
-            elif key==1: return _vec4(m[1],m[5],m[9],m[13])
-            elif key==2: return _vec4(m[2],m[6],m[10],m[14])
-            elif key==3: return _vec4(m[3],m[7],m[11],m[15])
+            if   key==0: return _newvec4(m[0],m[4],m[8],m[12])
+            elif key==1: return _newvec4(m[1],m[5],m[9],m[13])
+            elif key==2: return _newvec4(m[2],m[6],m[10],m[14])
+            elif key==3: return _newvec4(m[3],m[7],m[11],m[15])
         elif type(key)==types.TupleType:
             i,j=key
             if i<0 or i>3 or j<0 or j>3:
@@ -465,10 +506,10 @@ class mat4:
         [   4.0000,    8.0000,   12.0000,   16.0000]
         """
         m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44 = self.mlist
-        return mat4(m11,m21,m31,m41,
-                    m12,m22,m32,m42,
-                    m13,m23,m33,m43,
-                    m14,m24,m34,m44)
+        return _newmat4([m11,m21,m31,m41,
+                         m12,m22,m32,m42,
+                         m13,m23,m33,m43,
+                         m14,m24,m34,m44])
 
     def determinant(self):
         """Return determinant.
@@ -781,6 +822,42 @@ class mat4:
         self.mlist[4:7] = m3.mlist[3:6]
         self.mlist[8:11] = m3.mlist[6:9]
 
+_object_new = object.__new__
+
+def _newmat4(mlist):
+    """Create a mat4 from a list of 16 floats without checking the list.
+
+    The list is used as is (it is not copied).
+    """
+    m = _object_new(mat4)
+    m.mlist = mlist
+    return m
+
+def _matmul(m, n):
+    """Return the product of two matrices given as lists in row-major order.
+    """
+    m11,m12,m13,m14,m21,m22,m23,m24,m31,m32,m33,m34,m41,m42,m43,m44 = m
+    n11,n12,n13,n14,n21,n22,n23,n24,n31,n32,n33,n34,n41,n42,n43,n44 = n
+    return [m11*n11+m12*n21+m13*n31+m14*n41,
+            m11*n12+m12*n22+m13*n32+m14*n42,
+            m11*n13+m12*n23+m13*n33+m14*n43,
+            m11*n14+m12*n24+m13*n34+m14*n44,
+
+            m21*n11+m22*n21+m23*n31+m24*n41,
+            m21*n12+m22*n22+m23*n32+m24*n42,
+            m21*n13+m22*n23+m23*n33+m24*n43,
+            m21*n14+m22*n24+m23*n34+m24*n44,
+
+            m31*n11+m32*n21+m33*n31+m34*n41,
+            m31*n12+m32*n22+m33*n32+m34*n42,
+            m31*n13+m32*n23+m33*n33+m34*n43,
+            m31*n14+m32*n24+m33*n34+m34*n44,
+
+            m41*n11+m42*n21+m43*n31+m44*n41,
+            m41*n12+m42*n22+m43*n32+m44*n42,
+            m41*n13+m42*n23+m43*n33+m44*n43,
+            m41*n14+m42*n24+m43*n34+m44*n44]
+
 ######################################################################
 
 def _test():
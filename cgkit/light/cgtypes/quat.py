@@ -35,15 +35,18 @@
 # $Id: quat.py,v 1.1 2005/08/15 15:39:48 mbaas Exp $
 
 import types, math
-from vec3 import vec3 as _vec3
+from vec3 import vec3 as _vec3, _newvec3
 from mat3 import mat3 as _mat3
 from mat4 import mat4 as _mat4
 
 # Comparison threshold
 _epsilon = 1E-12
 
+# Types that are treated as scalars by the operators
+_scalarTypes = frozenset([types.FloatType, types.IntType, types.LongType])
+
 # quat
-class quat:
+class quat(object):
     """Quaternion class.
 
     Quaternions are an extension to complex numbers and can be used
@@ -51,6 +54,8 @@ class quat:
     seen as an angle and an axis of rotation.
     """
 
+    __slots__ = ("w", "x", "y", "z")
+
     def __init__(self, *args):
         """Constructor.
 
@@ -71,7 +76,7 @@ class quat:
         elif len(args)==1:
             T = type(args[0])
             # Scalar
-            if T==types.FloatType or T==types.IntType or T==types.LongType:
+            if T in _scalarTypes:
                 self.w = float(args[0])
                 self.x, self.y, self.z = (0.0, 0.0, 0.0)
             # quat
@@ -128,6 +133,15 @@ class quat:
     def __str__(self):
         return '(%1.4f, %1.4f, %1.4f, %1.4f)'%(self.w, self.x, self.y, self.z)
 
+    def __getstate__(self):
+        return (self.w, self.x, self.y, self.z)
+
+    def __setstate__(self, state):
+        # Pickles from older versions contain the instance dict
+        if isinstance(state, dict):
+            state = (state["w"], state["x"], state["y"], state["z"])
+        self.w, self.x, self.y, self.z = state
+
     def __eq__(self, other):
         """== operator
 
@@ -173,8 +187,8 @@ class quat:
         (1.9378, 0.4320, 0.2160, 0.1080)
         """
         if isinstance(other, quat):
-            return quat(self.w+other.w, self.x+other.x,
-                        self.y+other.y, self.z+other.z)
+            return _newquat(self.w+other.w, self.x+other.x,
+                            self.y+other.y, self.z+other.z)
         else:
             raise TypeError("unsupported operand type for +")
 
@@ -186,8 +200,8 @@ class quat:
         (0.0000, 0.0000, 0.0000, 0.0000)
         """
         if isinstance(other, quat):
-            return quat(self.w-other.w, self.x-other.x,
-                        self.y-other.y, self.z-other.z)
+            return _newquat(self.w-other.w, self.x-other.x,
+                            self.y-other.y, self.z-other.z)
         else:
             raise TypeError("unsupported operand type for +")
 
@@ -202,18 +216,12 @@ class quat:
         >>> print q*q
         (0.8775, 0.4186, 0.2093, 0.1046)
         """
-        T = type(other)
         # quat*scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return quat(self.w*other, self.x*other, self.y*other, self.z*other)
+        if type(other) in _scalarTypes:
+            return _newquat(self.w*other, self.x*other, self.y*other, self.z*other)
         # quat*quat
         if isinstance(other, quat):
-            w1,x1,y1,z1 = self.w,self.x,self.y,self.z
-            w2,x2,y2,z2 = other.w,other.x,other.y,other.z
-            return quat(w1*w2-x1*x2-y1*y2-z1*z2,
-                        w1*x2+x1*w2+y1*z2-z1*y2,
-                        w1*y2+y1*w2-x1*z2+z1*x2,
-                        w1*z2+z1*w2+x1*y2-y1*x2)
+            return _newquat(*_quatmul(self, other))
         # unsupported
         else:
             # Try to delegate the operation to the other operand
@@ -231,13 +239,73 @@ class quat:
         >>> print q/2.0
         (0.4844, 0.1080, 0.0540, 0.0270)
         """
-        T = type(other)
         # quat/scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return quat(self.w/other, self.x/other, self.y/other, self.z/other)
+        if type(other) in _scalarTypes:
+            return _newquat(self.w/other, self.x/other, self.y/other, self.z/other)
         # unsupported
         else:
             raise TypeError("unsupported operand type for /")
+
+    def __iadd__(self, other):
+        """Inline addition.
+
+        >>> q=quat(0.9689, 0.2160, 0.1080, 0.0540)
+        >>> q+=q
+        >>> print q
+        (1.9378, 0.4320, 0.2160, 0.1080)
+        """
+        if isinstance(other, quat):
+            self.w+=other.w
+            self.x+=other.x
+            self.y+=other.y
+            self.z+=other.z
+            return self
+        else:
+            raise TypeError("unsupported operand type for +=")
+
+    def __isub__(self, other):
+        """Inline subtraction."""
+        if isinstance(other, quat):
+            self.w-=other.w
+            self.x-=other.x
+            self.y-=other.y
+            self.z-=other.z
+            return self
+        else:
+            raise TypeError("unsupported operand type for -=")
+
+    def __imul__(self, other):
+        """Inline multiplication with a scalar or a quaternion (self = self*other).
+
+        >>> q=quat(0.9689, 0.2160, 0.1080, 0.0540)
+        >>> q*=q
+        >>> print q
+        (0.8775, 0.4186, 0.2093, 0.1046)
+        """
+        # quat*=scalar
+        if type(other) in _scalarTypes:
+            self.w*=other
+            self.x*=other
+            self.y*=other
+            self.z*=other
+            return self
+        # quat*=quat
+        if isinstance(other, quat):
+            self.w, self.x, self.y, self.z = _quatmul(self, other)
+            return self
+        else:
+            raise TypeError("unsupported operand type for *=")
+
+    def __idiv__(self, other):
+        """Inline division by a scalar."""
+        if type(other) in _scalarTypes:
+            self.w/=other
+            self.x/=other
+            self.y/=other
+            self.z/=other
+            return self
+        else:
+            raise TypeError("unsupported operand type for /=")
         
     def __pow__(self, other):
         """Return self**q."""
@@ -253,7 +321,7 @@ class quat:
         >>> print -q
         (-0.9689, -0.2160, -0.1080, -0.0540)
         """
-        return quat(-self.w, -self.x, -self.y, -self.z)
+        return _newquat(-self.w, -self.x, -self.y, -self.z)
 
     def __pos__(self):
         """
@@ -261,7 +329,7 @@ class quat:
         >>> print +q
         (0.9689, 0.2160, 0.1080, 0.0540)
         """
-        return quat(+self.w, +self.x, +self.y, +self.z)
+        return _newquat(+self.w, +self.x, +self.y, +self.z)
 
     def __abs__(self):
         """Return magnitude.
@@ -280,7 +348,7 @@ class quat:
         >>> print q.conjugate()
         (0.9689, -0.2160, -0.1080, -0.0540)
         """
-        return quat(self.w, -self.x, -self.y, -self.z)
+        return _newquat(self.w, -self.x, -self.y, -self.z)
 
     def normalize(self):
         """Return normalized quaternion.
@@ -293,7 +361,7 @@ class quat:
         1.0
         """
         nlen = 1.0/abs(self)
-        return quat(self.w*nlen, self.x*nlen, self.y*nlen, self.z*nlen)
+        return _newquat(self.w*nlen, self.x*nlen, self.y*nlen, self.z*nlen)
 
     def inverse(self):
         """Return inverse.
@@ -483,7 +551,8 @@ class quat:
         self*v*self.conjugate() and turning the result back into a vec3.
         """
 
-        v = _vec3(v)
+        if not isinstance(v, _vec3):
+            v = _vec3(v)
         ww = self.w*self.w
         xx = self.x*self.x
         yy = self.y*self.y
@@ -495,11 +564,35 @@ class quat:
         xz = self.x*self.z
         yz = self.y*self.z
 
-        return _vec3(ww*v.x + xx*v.x - yy*v.x - zz*v.x + 2*((xy-wz)*v.y + (xz+wy)*v.z),
-                     ww*v.y - xx*v.y + yy*v.y - zz*v.y + 2*((xy+wz)*v.x + (yz-wx)*v.z),
-                     ww*v.z - xx*v.z - yy*v.z + zz*v.z + 2*((xz-wy)*v.x + (yz+wx)*v.y))
+        return _newvec3(ww*v.x + xx*v.x - yy*v.x - zz*v.x + 2*((xy-wz)*v.y + (xz+wy)*v.z),
+                        ww*v.y - xx*v.y + yy*v.y - zz*v.y + 2*((xy+wz)*v.x + (yz-wx)*v.z),
+                        ww*v.z - xx*v.z - yy*v.z + zz*v.z + 2*((xz-wy)*v.x + (yz+wx)*v.y))
     
 
+_object_new = object.__new__
+
+def _newquat(w, x, y, z):
+    """Create a quat without checking or converting the components.
+
+    This is used for results whose components are already floats.
+    """
+    q = _object_new(quat)
+    q.w = w
+    q.x = x
+    q.y = y
+    q.z = z
+    return q
+
+def _quatmul(q1, q2):
+    """Return the components (w,x,y,z) of the product q1*q2.
+    """
+    w1,x1,y1,z1 = q1.w,q1.x,q1.y,q1.z
+    w2,x2,y2,z2 = q2.w,q2.x,q2.y,q2.z
+    return (w1*w2-x1*x2-y1*y2-z1*z2,
+            w1*x2+x1*w2+y1*z2-z1*y2,
+            w1*y2+y1*w2-x1*z2+z1*x2,
+            w1*z2+z1*w2+x1*y2-y1*x2)
+
 def slerp(t, q0, q1, shortest=True):
     """Spherical linear interpolation between two quaternions.
 
@@ -40,14 +40,21 @@ import math
 # Comparison threshold
 _epsilon = 1E-12
 
+# Types that are treated as scalars by the operators
+_scalarTypes = frozenset([int, float, long])
+# Types that are accepted as index
+_indexTypes = frozenset([int, long])
+
 # vec3
-class vec3:
+class vec3(object):
     """Three-dimensional vector.
 
     This class can be used to represent points, vectors, normals
     or even colors. The usual vector operations are available.
     """
 
+    __slots__ = ("x", "y", "z")
+
     def __init__(self, *args):
         """Constructor.
 
@@ -75,7 +82,7 @@ class vec3:
         elif len(args)==1:
             T = type(args[0])
             # scalar
-            if T in [int, float, long]:
+            if T in _scalarTypes:
                 f = float(args[0])
                 self.x, self.y, self.z = (f, f, f)
             # vec3  
@@ -99,7 +106,7 @@ class vec3:
                 else:
                     raise TypeError("vec3() takes at most 3 arguments")
             # String
-            elif T in [str, unicode]:
+            elif T is str or T is unicode:
                 s=args[0].replace(","," ").replace("  "," ").strip().split(" ")
                 if s==[""]:
                     s=[]
@@ -132,6 +139,15 @@ class vec3:
     # Make the object unhashable (as it is mutable)
     __hash__ = None
 
+    def __getstate__(self):
+        return (self.x, self.y, self.z)
+
+    def __setstate__(self, state):
+        # Pickles from older versions contain the instance dict
+        if isinstance(state, dict):
+            state = (state["x"], state["y"], state["z"])
+        self.x, self.y, self.z = state
+
     def __eq__(self, other):
         """== operator
 
@@ -214,7 +230,7 @@ class vec3:
         (0.7000, 1.2500, -1.3000)
         """
         if isinstance(other, vec3):
-            return vec3(self.x+other.x, self.y+other.y, self.z+other.z)
+            return _newvec3(self.x+other.x, self.y+other.y, self.z+other.z)
         else:
             raise TypeError("unsupported operand type for +")
 
@@ -227,7 +243,7 @@ class vec3:
         (1.3000, -0.2500, -2.3000)
         """
         if isinstance(other, vec3):
-            return vec3(self.x-other.x, self.y-other.y, self.z-other.z)
+            return _newvec3(self.x-other.x, self.y-other.y, self.z-other.z)
         else:
             raise TypeError("unsupported operand type for -")
 
@@ -244,10 +260,9 @@ class vec3:
         -0.825
         """
         
-        T = type(other)
         # vec3*scalar
-        if T in [int, float, long]:
-            return vec3(self.x*other, self.y*other, self.z*other)
+        if type(other) in _scalarTypes:
+            return _newvec3(self.x*other, self.y*other, self.z*other)
         # vec3*vec3
         if isinstance(other, vec3):
             return self.x*other.x + self.y*other.y + self.z*other.z
@@ -268,10 +283,9 @@ class vec3:
         >>> print a/2.0
         (0.5000, 0.2500, -0.9000)
         """
-        T = type(other)
         # vec3/scalar
-        if T in [int, float, long]:
-            return vec3(self.x/other, self.y/other, self.z/other)
+        if type(other) in _scalarTypes:
+            return _newvec3(self.x/other, self.y/other, self.z/other)
         # unsupported
         else:
             raise TypeError("unsupported operand type for /")
@@ -286,13 +300,12 @@ class vec3:
         >>> print a%2.0
         (1.0000, 0.5000, 0.2000)
         """
-        T = type(other)
         # vec3%scalar
-        if T in [int, float, long]:
-            return vec3(self.x%other, self.y%other, self.z%other)
+        if type(other) in _scalarTypes:
+            return _newvec3(self.x%other, self.y%other, self.z%other)
         # vec3%vec3
         if isinstance(other, vec3):
-            return vec3(self.x%other.x, self.y%other.y, self.z%other.z)
+            return _newvec3(self.x%other.x, self.y%other.y, self.z%other.z)
         # unsupported
         else:
             raise TypeError("unsupported operand type for %")
@@ -370,9 +383,8 @@ class vec3:
         >>> print a
         (1.0000, 0.5000, 0.2000)
         """
-        T = type(other)
         # vec3%=scalar
-        if T in [int, float, long]:
+        if type(other) in _scalarTypes:
             self.x%=other
             self.y%=other
             self.z%=other
@@ -393,7 +405,7 @@ class vec3:
         >>> print -a
         (-3.0000, -2.5000, 1.8000)
         """
-        return vec3(-self.x, -self.y, -self.z)
+        return _newvec3(-self.x, -self.y, -self.z)
 
     def __pos__(self):
         """
@@ -401,7 +413,7 @@ class vec3:
         >>> print +a
         (3.0000, 2.5000, -1.8000)
         """
-        return vec3(+self.x, +self.y, +self.z)
+        return _newvec3(+self.x, +self.y, +self.z)
 
     def __abs__(self):
         """Return the length of the vector.
@@ -412,7 +424,7 @@ class vec3:
         >>> print abs(a)
         2.11896201004
         """
-        return math.sqrt(self*self)
+        return math.sqrt(self.x*self.x + self.y*self.y + self.z*self.z)
 
 
     def __len__(self):
@@ -431,8 +443,7 @@ class vec3:
         -1.8
         """
         
-        T=type(key)
-        if T not in [int, long]:
+        if type(key) not in _indexTypes:
             raise TypeError("index must be integer")
 
         if   key==0: return self.x
@@ -450,8 +461,7 @@ class vec3:
         (1.5000, 0.7000, -0.3000)
         """
         
-        T=type(key)
-        if T not in [int, long]:
+        if type(key) not in _indexTypes:
             raise TypeError("index must be integer")
 
         if   key==0: self.x = value
@@ -471,9 +481,9 @@ class vec3:
         """
         
         if isinstance(other, vec3):
-            return vec3(self.y*other.z-self.z*other.y,
-                        self.z*other.x-self.x*other.z,
-                        self.x*other.y-self.y*other.x)
+            return _newvec3(self.y*other.z-self.z*other.y,
+                            self.z*other.x-self.x*other.z,
+                            self.x*other.y-self.y*other.x)
         else:
             raise TypeError("unsupported operand type for cross()")
         
@@ -488,7 +498,7 @@ class vec3:
         2.11896201004
         """
 
-        return math.sqrt(self*self)
+        return math.sqrt(self.x*self.x + self.y*self.y + self.z*self.z)
 
     def normalize(self):
         """Return normalized vector.
@@ -498,8 +508,9 @@ class vec3:
         (0.4719, 0.2360, -0.8495)
         """
 
-        nlen = 1.0/math.sqrt(self*self)
-        return vec3(self.x*nlen, self.y*nlen, self.z*nlen)
+        x,y,z = self.x, self.y, self.z
+        nlen = 1.0/math.sqrt(x*x + y*y + z*z)
+        return _newvec3(x*nlen, y*nlen, z*nlen)
 
     def angle(self, other):
         """Return angle (in radians) between self and other.
@@ -640,6 +651,19 @@ class vec3:
             return 2
 
 
+_object_new = object.__new__
+
+def _newvec3(x, y, z):
+    """Create a vec3 without checking or converting the components.
+
+    This is used for results whose components are already floats.
+    """
+    v = _object_new(vec3)
+    v.x = x
+    v.y = y
+    v.z = z
+    return v
+
 ######################################################################
 def _test():
     import doctest, vec3
@@ -39,6 +39,11 @@ import types, math
 # Comparison threshold
 _epsilon = 1E-12
 
+# Types that are treated as scalars by the operators
+_scalarTypes = frozenset([types.FloatType, types.IntType, types.LongType])
+# Types that are accepted as index
+_indexTypes = frozenset([types.IntType, types.LongType])
+
 
 # vec4
 class vec4(object):
@@ -47,6 +52,8 @@ class vec4(object):
     This class represents a 4D vector.
     """
 
+    __slots__ = ("x", "y", "z", "w")
+
     def __init__(self, *args):
         """Constructor.
 
@@ -74,7 +81,7 @@ class vec4(object):
         elif len(args)==1:
             T = type(args[0])
             # scalar
-            if T==types.FloatType or T==types.IntType or T==types.LongType:
+            if T in _scalarTypes:
                 f = float(args[0])
                 self.x, self.y, self.z, self.w = (f, f, f, f)
             # vec4
@@ -148,6 +155,15 @@ class vec4(object):
     # Make the object unhashable (as it is mutable)
     __hash__ = None
 
+    def __getstate__(self):
+        return (self.x, self.y, self.z, self.w)
+
+    def __setstate__(self, state):
+        # Pickles from older versions contain the instance dict
+        if isinstance(state, dict):
+            state = (state["x"], state["y"], state["z"], state["w"])
+        self.x, self.y, self.z, self.w = state
+
     def __eq__(self, other):
         """== operator
 
@@ -235,7 +251,7 @@ class vec4(object):
         (0.7000, 1.2500, -1.3000, 0.5000)
         """
         if isinstance(other, vec4):
-            return vec4(self.x+other.x, self.y+other.y, self.z+other.z, self.w+other.w)
+            return _newvec4(self.x+other.x, self.y+other.y, self.z+other.z, self.w+other.w)
         else:
             raise TypeError("unsupported operand type for +")
 
@@ -248,7 +264,7 @@ class vec4(object):
         (1.3000, -0.2500, -2.3000, -0.1000)
         """
         if isinstance(other, vec4):
-            return vec4(self.x-other.x, self.y-other.y, self.z-other.z, self.w-other.w)
+            return _newvec4(self.x-other.x, self.y-other.y, self.z-other.z, self.w-other.w)
         else:
             raise TypeError("unsupported operand type for -")
 
@@ -265,10 +281,9 @@ class vec4(object):
         -0.765
         """
 
-        T = type(other)
         # vec4*scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return vec4(self.x*other, self.y*other, self.z*other, self.w*other)
+        if type(other) in _scalarTypes:
+            return _newvec4(self.x*other, self.y*other, self.z*other, self.w*other)
         # vec4*vec4
         if isinstance(other, vec4):
             return self.x*other.x + self.y*other.y + self.z*other.z + self.w*other.w
@@ -289,10 +304,9 @@ class vec4(object):
         >>> print a/2.0
         (0.5000, 0.2500, -0.9000, 0.1000)
         """
-        T = type(other)
         # vec4/scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return vec4(self.x/other, self.y/other, self.z/other, self.w/other)
+        if type(other) in _scalarTypes:
+            return _newvec4(self.x/other, self.y/other, self.z/other, self.w/other)
         # unsupported
         else:
             raise TypeError("unsupported operand type for /")
@@ -304,13 +318,12 @@ class vec4(object):
         >>> print a%2.0
         (1.0000, 0.5000, 0.2000, 0.2000)
         """
-        T = type(other)
         # vec4%scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
-            return vec4(self.x%other, self.y%other, self.z%other, self.w%other)
+        if type(other) in _scalarTypes:
+            return _newvec4(self.x%other, self.y%other, self.z%other, self.w%other)
         # vec4%vec4
         if isinstance(other, vec4):
-            return vec4(self.x%other.x, self.y%other.y, self.z%other.z, self.w%other.w)
+            return _newvec4(self.x%other.x, self.y%other.y, self.z%other.z, self.w%other.w)
         # unsupported
         else:
             raise TypeError("unsupported operand type for %")
@@ -359,9 +372,8 @@ class vec4(object):
         >>> print a
         (2.0000, 1.0000, -3.6000, 0.4000)
         """
-        T = type(other)
         # vec4*=scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
+        if type(other) in _scalarTypes:
             self.x*=other
             self.y*=other
             self.z*=other
@@ -378,9 +390,8 @@ class vec4(object):
         >>> print a
         (0.5000, 0.2500, -0.9000, 0.1000)
         """
-        T = type(other)
         # vec4/=scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
+        if type(other) in _scalarTypes:
             self.x/=other
             self.y/=other
             self.z/=other
@@ -397,9 +408,8 @@ class vec4(object):
         >>> print a
         (1.0000, 0.5000, 0.2000, 0.2000)
         """
-        T = type(other)
         # vec4%=scalar
-        if T==types.FloatType or T==types.IntType or T==types.LongType:
+        if type(other) in _scalarTypes:
             self.x%=other
             self.y%=other
             self.z%=other
@@ -422,7 +432,7 @@ class vec4(object):
         >>> print -a
         (-3.0000, -2.5000, 1.8000, -0.2000)
         """
-        return vec4(-self.x, -self.y, -self.z, -self.w)
+        return _newvec4(-self.x, -self.y, -self.z, -self.w)
 
     def __pos__(self):
         """
@@ -430,7 +440,7 @@ class vec4(object):
         >>> print +a
         (3.0000, 2.5000, -1.8000, 0.2000)
         """
-        return vec4(+self.x, +self.y, +self.z, +self.w)
+        return _newvec4(+self.x, +self.y, +self.z, +self.w)
 
     def __abs__(self):
         """Return the length of the vector.
@@ -441,7 +451,7 @@ class vec4(object):
         >>> print abs(a)
         2.12837966538
         """
-        return math.sqrt(self*self)
+        return math.sqrt(self.x*self.x + self.y*self.y + self.z*self.z + self.w*self.w)
 
 
     def __len__(self):
@@ -461,8 +471,7 @@ class vec4(object):
         >>> print a[3]
         0.2
         """
-        T=type(key)
-        if T!=types.IntType and T!=types.LongType:
+        if type(key) not in _indexTypes:
             raise TypeError("index must be integer")
 
         if   key==0: return self.x
@@ -480,8 +489,7 @@ class vec4(object):
         >>> print a
         (1.5000, 0.7000, -0.3000, 0.2000)
         """
-        T=type(key)
-        if T!=types.IntType and T!=types.LongType:
+        if type(key) not in _indexTypes:
             raise TypeError("index must be integer")
 
         if   key==0: self.x = value
@@ -502,7 +510,7 @@ class vec4(object):
         2.12837966538
         """
 
-        return math.sqrt(self*self)
+        return math.sqrt(self.x*self.x + self.y*self.y + self.z*self.z + self.w*self.w)
 
     def normalize(self):
         """Return normalized vector.
@@ -512,8 +520,9 @@ class vec4(object):
         (0.4107, 0.2053, -0.7392, 0.4928)
         """
 
-        nlen = 1.0/math.sqrt(self*self)
-        return vec4(self.x*nlen, self.y*nlen, self.z*nlen, self.w*nlen)
+        x,y,z,w = self.x, self.y, self.z, self.w
+        nlen = 1.0/math.sqrt(x*x + y*y + z*z + w*w)
+        return _newvec4(x*nlen, y*nlen, z*nlen, w*nlen)
 
     def min(self):
         """Return the minimum value of the components.
@@ -605,6 +614,20 @@ class vec4(object):
     t = property(_getT, _setT, None, "4th component")
 
 
+_object_new = object.__new__
+
+def _newvec4(x, y, z, w):
+    """Create a vec4 without checking or converting the components.
+
+    This is used for results whose components are already floats.
+    """
+    v = _object_new(vec4)
+    v.x = x
+    v.y = y
+    v.z = z
+    v.w = w
+    return v
+
 
 ######################################################################
 
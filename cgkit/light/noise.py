@@ -1,63 +1,539 @@
-# ***** BEGIN LICENSE BLOCK *****
-# Version: MPL 1.1/GPL 2.0/LGPL 2.1
-#
-# The contents of this file are subject to the Mozilla Public License Version
-# 1.1 (the "License"); you may not use this file except in compliance with
-# the License. You may obtain a copy of the License at
-# http://www.mozilla.org/MPL/
-#
-# Software distributed under the License is distributed on an "AS IS" basis,
-# WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License
-# for the specific language governing rights and limitations under the
-# License.
-#
-# The Original Code is the Python Computer Graphics Kit.
-#
-# The Initial Developer of the Original Code is Matthias Baas.
-# Portions created by the Initial Developer are Copyright (C) 2004
-# the Initial Developer. All Rights Reserved.
-#
-# Contributor(s):
-#
-# Alternatively, the contents of this file may be used under the terms of
-# either the GNU General Public License Version 2 or later (the "GPL"), or
-# the GNU Lesser General Public License Version 2.1 or later (the "LGPL"),
-# in which case the provisions of the GPL or the LGPL are applicable instead
-# of those above. If you wish to allow use of your version of this file only
-# under the terms of either the GPL or the LGPL, and not to allow others to
-# use your version of this file under the terms of the MPL, indicate your
-# decision by deleting the provisions above and replace them with the notice
-# and other provisions required by the GPL or the LGPL. If you do not delete
-# the provisions above, a recipient may use your version of this file under
-# the terms of any one of the MPL, the GPL or the LGPL.
-#
-# ***** END LICENSE BLOCK *****
-# $Id: noise.py,v 1.3 2006/02/14 19:29:39 mbaas Exp $
-
-"""Dummy noise module for cgkit light.
-
-This module will allow importing the module without an error. An error will
-only be triggered when the module is actually used.
-This means the sl module can be imported and all non-noise related functions
-can still be used in the light version.
-"""
-
-def noise(*args, **kwargs):
-    raise NotImplementedError("This function is not yet implemented in the light version of cgkit")
-
-snoise = noise
-cellnoise = noise
-scellnoise = noise
-fBm = noise
-turbulence = noise
-pnoise = noise
-spnoise = noise
-
-vnoise = noise
-vsnoise = noise
-vcellnoise = noise
-vscellnoise = noise
-vfBm = noise
-vturbulence = noise
-vpnoise = noise
-vspnoise = noise
+# ***** BEGIN LICENSE BLOCK *****
+# Version: MPL 1.1/GPL 2.0/LGPL 2.1
+#
+# The contents of this file are subject to the Mozilla Public License Version
+# 1.1 (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS" basis,
+# WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License
+# for the specific language governing rights and limitations under the
+# License.
+#
+# The Original Code is the Python Computer Graphics Kit.
+#
+# The Initial Developer of the Original Code is Matthias Baas.
+# Portions created by the Initial Developer are Copyright (C) 2004
+# the Initial Developer. All Rights Reserved.
+#
+# Contributor(s):
+#
+# Alternatively, the contents of this file may be used under the terms of
+# either the GNU General Public License Version 2 or later (the "GPL"), or
+# the GNU Lesser General Public License Version 2.1 or later (the "LGPL"),
+# in which case the provisions of the GPL or the LGPL are applicable instead
+# of those above. If you wish to allow use of your version of this file only
+# under the terms of either the GPL or the LGPL, and not to allow others to
+# use your version of this file under the terms of the MPL, indicate your
+# decision by deleting the provisions above and replace them with the notice
+# and other provisions required by the GPL or the LGPL. If you do not delete
+# the provisions above, a recipient may use your version of this file under
+# the terms of any one of the MPL, the GPL or the LGPL.
+#
+# ***** END LICENSE BLOCK *****
+# $Id: noise.py,v 1.3 2006/02/14 19:29:39 mbaas Exp $
+
+
+"""Noise functions for cgkit light.
+
+This is a NumPy implementation of the noise functions of the compiled
+version of cgkit. It uses the same tables and the same algorithms as the
+C++ implementation (supportlib/src/noise.cpp), so both versions return
+the same values.
+
+Besides single values, the functions also accept numpy arrays. Each
+coordinate can be an array (the arrays are broadcast against each other)
+and a point can be given as an array of shape (..., n) where the last axis
+holds the n coordinates. A 1-dimensional array is always treated as a
+sequence of x values and if several arguments are passed, an array is only
+treated as points if it has more dimensions than the time argument. If any
+input is an array, the return value is an array as well (the vector
+versions return an array of shape (..., dim)).
+
+The module requires numpy. Without numpy, the functions raise a
+NotImplementedError (so the module can still be imported).
+"""
+
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
+from cgtypes import vec3, vec4
+import _noisetabs
+
+# Table mask which is used to create indexing values
+_TABMASK = 0xff
+
+# The offsets that are used for the components of the periodic vector noise
+_POFFSETS = (0, 37, 99, 105)
+
+if _has_numpy:
+    _perm = numpy.array(_noisetabs.perm, dtype=numpy.int_)
+    _uniform = numpy.array(_noisetabs.uniform, dtype=numpy.float64)
+    # Key: Dimension - Value: List of gradient component arrays
+    _grads = {}
+    for _n,_tab in [(2, _noisetabs.grads2), (3, _noisetabs.grads3), (4, _noisetabs.grads4)]:
+        _g = numpy.array(_tab, dtype=numpy.float64)
+        _grads[_n] = [_g[:,_i].copy() for _i in range(_n)]
+    del _n, _tab, _g, _i
+
+
+# noise
+def noise(*args):
+    """noise(x[, y[, z[, t]]]) -> float
+
+    Returns a noise value (Perlin) in the range from 0 to 1. The arguments
+    can be up to 4 floating point values or a sequence with up to 4 floating
+    point values. Time can be specified separately.
+    """
+    coords,dim,isArray = _noiseArgs(args, 2)
+    return _result(0.5*(_snoise(coords)+1.0), isArray)
+
+# snoise
+def snoise(*args):
+    """snoise(x[, y[, z[, t]]]) -> float
+
+    Returns a signed noise value (Perlin) in the range from -1 to 1.
+    A call to snoise(args) is equivalent to 2*noise(args)-1.
+    """
+    coords,dim,isArray = _noiseArgs(args, 2)
+    return _result(_snoise(coords), isArray)
+
+# pnoise
+def pnoise(*args):
+    """pnoise(point, period) / pnoise(point, t, pperiod, tperiod) -> float
+
+    Periodic noise function. Basically this is the same than noise
+    but with a periodic return value: pnoise(point) = pnoise(point+period).
+    The time value can be either part of the point or it can be
+    specified separately. The point and period must always have the
+    same dimension. The return value is in the range from 0 to 1.
+    """
+    coords,periods,dim,isArray = _periodicNoiseArgs(args)
+    return _result(0.5*(_snoise(coords, periods)+1.0), isArray)
+
+# spnoise
+def spnoise(*args):
+    """spnoise(point, period) / spnoise(point, t, pperiod, tperiod) -> float
+
+    Signed periodic noise function. The return value is in the range
+    from -1 to 1. A call to spnoise(args) is equivalent to
+    2*pnoise(args)-1.
+    """
+    coords,periods,dim,isArray = _periodicNoiseArgs(args)
+    return _result(_snoise(coords, periods), isArray)
+
+# cellnoise
+def cellnoise(*args):
+    """cellnoise(x, y=0, z=0, t=0) -> float
+
+    Returns a cellnoise value in the range from 0 to 1. The return value
+    is constant between integer lattice points. The arguments can be up
+    to 4 floating point values or a sequence with up to 4 floating point
+    values. Time can be specified separately.
+    """
+    coords,dim,isArray = _noiseArgs(args, 4)
+    return _result(_cellnoise(coords), isArray)
+
+# scellnoise
+def scellnoise(*args):
+    """scellnoise(x, y=0, z=0, t=0) -> float
+
+    Signed cell noise. The return value is in the range from -1 to 1.
+    A call to scellnoise(args) is equivalent to 2*cellnoise(args)-1.
+    """
+    coords,dim,isArray = _noiseArgs(args, 4)
+    return _result(2.0*_cellnoise(coords)-1.0, isArray)
+
+# fBm
+def fBm(point, octaves, lacunarity=2.0, gain=0.5):
+    """fBm(point, octaves, lacunarity=2.0, gain=0.5) -> float
+
+    Fractional Brownian motion. The argument point must be a sequence of
+    either 2 or 3 float values (e.g. a vec3). This function is a sum of
+    noise values with different frequencies and amplitudes.
+    """
+    coords,isArray = _pointArgs(point)
+    res = numpy.zeros(coords[0].shape)
+    amp = 1.0
+    for i in range(octaves):
+        res = res + amp*_snoise(coords)
+        amp *= gain
+        coords = [c*lacunarity for c in coords]
+    return _result(0.5*(res+1.0), isArray)
+
+# turbulence
+def turbulence(point, octaves, lacunarity=2.0, gain=0.5):
+    """turbulence(point, octaves, lacunarity=2.0, gain=0.5) -> float
+
+    The code of the turbulence function is very similar to fBm. The
+    difference is that it sums up abs(snoise) instead of snoise.
+    However, the return value is in the range from 0 to 1 again.
+    """
+    coords,isArray = _pointArgs(point)
+    res = numpy.zeros(coords[0].shape)
+    amp = 1.0
+    for i in range(octaves):
+        res = res + amp*numpy.abs(_snoise(coords))
+        amp *= gain
+        coords = [c*lacunarity for c in coords]
+    return _result(0.5*(res+1.0), isArray)
+
+# vnoise
+def vnoise(*args):
+    """vnoise(x[, y[, z[, t]]]) -> noiseval
+
+    Vector version of noise(). The dimension of the result is the number
+    of coordinates (a separately specified time value does not count).
+    """
+    coords,dim,isArray = _noiseArgs(args, 2)
+    res = [0.5*(v+1.0) for v in _vsnoise(coords, dim)]
+    return _vresult(res, isArray)
+
+# vsnoise
+def vsnoise(*args):
+    """vsnoise(x[, y[, z[, t]]]) -> noiseval
+
+    Vector version of snoise().
+    """
+    coords,dim,isArray = _noiseArgs(args, 2)
+    return _vresult(_vsnoise(coords, dim), isArray)
+
+# vpnoise
+def vpnoise(*args):
+    """vpnoise(point, period) / vpnoise(point, t, pperiod, tperiod) -> noiseval
+
+    Vector version of pnoise(). The components of the return value are in
+    the range from 0 to 1.
+    """
+    coords,periods,dim,isArray = _periodicNoiseArgs(args)
+    res = [0.5*(v+1.0) for v in _vsnoise(coords, dim, periods)]
+    return _vresult(res, isArray)
+
+# vspnoise
+def vspnoise(*args):
+    """vspnoise(point, period) / vspnoise(point, t, pperiod, tperiod) -> noiseval
+
+    Vector version of spnoise(). The components of the return value are in
+    the range from -1 to 1.
+    """
+    coords,periods,dim,isArray = _periodicNoiseArgs(args)
+    return _vresult(_vsnoise(coords, dim, periods), isArray)
+
+# vcellnoise
+def vcellnoise(*args):
+    """vcellnoise(x[, y[, z[, t]]]) -> noiseval
+
+    Vector version of cellnoise().
+    """
+    coords,dim,isArray = _noiseArgs(args, 4)
+    return _vresult(_vcellnoise(coords, dim), isArray)
+
+# vscellnoise
+def vscellnoise(*args):
+    """vscellnoise(x[, y[, z[, t]]]) -> noiseval
+
+    Vector version of scellnoise().
+    """
+    coords,dim,isArray = _noiseArgs(args, 4)
+    res = [2*v-1.0 for v in _vcellnoise(coords, dim)]
+    return _vresult(res, isArray)
+
+# vfBm
+def vfBm(point, octaves, lacunarity=2.0, gain=0.5):
+    """vfBm(point, octaves, lacunarity=2.0, gain=0.5) -> vec3
+
+    Vector version of fBm().
+    """
+    coords,isArray = _pointArgs(point)
+    res = 3*[numpy.zeros(coords[0].shape)]
+    amp = 1.0
+    for i in range(octaves):
+        res = [r+amp*n for r,n in zip(res, _vsnoise(coords, 3))]
+        amp *= gain
+        coords = [c*lacunarity for c in coords]
+    return _vresult([0.5*(r+1.0) for r in res], isArray)
+
+# vturbulence
+def vturbulence(point, octaves, lacunarity=2.0, gain=0.5):
+    """vturbulence(point, octaves, lacunarity=2.0, gain=0.5) -> vec3
+
+    Vector version of turbulence().
+    """
+    coords,isArray = _pointArgs(point)
+    res = 3*[numpy.zeros(coords[0].shape)]
+    amp = 1.0
+    for i in range(octaves):
+        res = [r+amp*numpy.abs(n) for r,n in zip(res, _vsnoise(coords, 3))]
+        amp *= gain
+        coords = [c*lacunarity for c in coords]
+    return _vresult([0.5*(r+1.0) for r in res], isArray)
+
+######################################################################
+
+def _tabindex(cells):
+    """Return the table index for a lattice point.
+
+    cells is a list with 2-4 integer arrays that contain the lattice
+    coordinates. Returns an integer array with values between 0 and 255
+    that only depends on the lattice coordinates.
+    """
+    perm = _perm
+    m = _TABMASK
+    if len(cells)==2:
+        ix,iy = cells
+        return perm[(ix + perm[iy&m])&m]
+    elif len(cells)==3:
+        ix,iy,iz = cells
+        return perm[(ix + perm[(iy + perm[iz&m])&m])&m]
+    else:
+        ix,iy,iz,it = cells
+        return perm[(it + perm[(ix + perm[(iy + perm[iz&m])&m])&m])&m]
+
+def _imod(a, b):
+    """Return a mod b (with the same convention as the C++ version).
+    """
+    r = numpy.fmod(a, b)
+    return numpy.where(r<0, r+b, r)
+
+def _ptabindex(cells, periods, offset):
+    """Periodic version of _tabindex().
+
+    The lattice coordinates are taken modulo the periods. offset is added
+    to the y coordinate (2D) or z coordinate (3D and 4D) and is used for
+    the components of the vector noise.
+    """
+    cells = [_imod(c, p) for c,p in zip(cells, periods)]
+    if offset!=0:
+        k = min(len(cells)-1, 2)
+        cells[k] = cells[k]+offset
+    return _tabindex(cells)
+
+def _snoise(coords, periods=None, offset=0):
+    """Compute signed gradient noise.
+
+    coords is a list of 2-4 float arrays (all of the same shape) that
+    contain the coordinates. If periods is given, it must contain one
+    integer period per coordinate and the noise is periodic.
+    Returns an array with noise values in the range from -1 to 1.
+    """
+    n = len(coords)
+    grads = _grads[n]
+    cells = []
+    rel = []
+    smooth = []
+    for x in coords:
+        f = numpy.floor(x)
+        cells.append(f.astype(numpy.int_))
+        r = x-f
+        rel.append((r, r-1.0))
+        smooth.append(r*r*(3.0-2.0*r))
+
+    # Dot products with the gradients at the 2^n cell vertices (the bits
+    # of k select the vertex, the x coordinate varies fastest)
+    vals = []
+    for k in range(1<<n):
+        bits = [(k>>i)&1 for i in range(n)]
+        vcells = [c+b for c,b in zip(cells, bits)]
+        if periods is None:
+            idx = _tabindex(vcells)
+        else:
+            idx = _ptabindex(vcells, periods, offset)
+        v = grads[0][idx]*rel[0][bits[0]]
+        for i in range(1, n):
+            v = v + grads[i][idx]*rel[i][bits[i]]
+        vals.append(v)
+
+    # Interpolate along x, then y, z and t
+    for s in smooth:
+        vals = [a+(b-a)*s for a,b in zip(vals[0::2], vals[1::2])]
+    return vals[0]
+
+def _vsnoise(coords, dim, periods=None):
+    """Compute signed vector noise.
+
+    Returns a list with dim arrays. The components are obtained by
+    evaluating the noise at offset locations.
+    """
+    coords = list(coords)
+    res = []
+    for i in range(dim):
+        if i>0:
+            coords[i-1] = coords[i-1]+10.0
+        if periods is None:
+            res.append(_snoise(coords))
+        else:
+            res.append(_snoise(coords, periods, _POFFSETS[i]))
+    return res
+
+def _cellnoise(coords):
+    """Compute cell noise.
+
+    coords is a list of 4 float arrays.
+    """
+    cells = [numpy.floor(x).astype(numpy.int_) for x in coords]
+    return _uniform[_tabindex(cells)]
+
+def _vcellnoise(coords, dim):
+    """Compute vector cell noise (returns a list with dim arrays).
+    """
+    coords = list(coords)
+    res = []
+    for i in range(dim):
+        if i>0:
+            coords[i-1] = coords[i-1]+10.0
+        res.append(_cellnoise(coords))
+    return res
+
+def _splitPoint(p):
+    """Return the coordinates of a point (or an array of points) as a list.
+
+    Returns None if p is not a point (i.e. a single value or a
+    1-dimensional array).
+    """
+    if isinstance(p, numpy.ndarray):
+        if p.ndim<2:
+            return None
+        return [p[...,i] for i in range(p.shape[-1])]
+    try:
+        return list(p)
+    except TypeError:
+        return None
+
+def _prepare(coords):
+    """Convert the coordinates into float arrays of a common shape.
+
+    Returns the list of arrays and a flag that indicates whether the
+    input contained an array.
+    """
+    if not _has_numpy:
+        raise NotImplementedError("The noise functions of cgkit light require numpy")
+    isArray = False
+    for c in coords:
+        if isinstance(c, numpy.ndarray):
+            isArray = True
+    coords = numpy.broadcast_arrays(*[numpy.asarray(c, dtype=numpy.float64) for c in coords])
+    return coords, isArray
+
+def _noiseArgs(args, minDim):
+    """Process the arguments of the noise functions.
+
+    args may be up to 4 coordinates, a point or a point and a time value.
+    The coordinates are padded with zeros so that there are at least
+    minDim coordinates.
+    Returns the list of coordinates, the dimension of the result of
+    the vector versions and the array flag.
+    """
+    if not _has_numpy:
+        raise NotImplementedError("The noise functions of cgkit light require numpy")
+    n = len(args)
+    if n<1 or n>4:
+        raise TypeError("the function takes between 1 and 4 arguments (%s given)"%n)
+    p = None
+    if n==1 or (n==2 and numpy.ndim(args[0])>numpy.ndim(args[1])):
+        p = _splitPoint(args[0])
+    if p is None:
+        coords = list(args)
+        dim = n
+    elif n==1:
+        if len(p)<1 or len(p)>4:
+            raise ValueError("the point must have between 1 and 4 components")
+        coords = p
+        dim = len(p)
+    else:
+        if len(p)<1 or len(p)>3:
+            raise ValueError("the point must have between 1 and 3 components")
+        coords = p + (3-len(p))*[0.0] + [args[1]]
+        dim = 3
+    coords = coords + (minDim-len(coords))*[0.0]
+    coords,isArray = _prepare(coords)
+    return coords, dim, isArray
+
+def _periodicNoiseArgs(args):
+    """Process the arguments of the periodic noise functions.
+
+    Returns the list of coordinates, the list of periods, the dimension
+    of the result of the vector versions and the array flag.
+    """
+    if not _has_numpy:
+        raise NotImplementedError("The noise functions of cgkit light require numpy")
+    n = len(args)
+    if n==2:
+        v,pv = args
+        t,pt = None,None
+    elif n==4:
+        v,t,pv,pt = args
+    else:
+        raise TypeError("only 2 or 4 arguments allowed")
+
+    p = _splitPoint(v)
+    if p is None:
+        p = [v]
+        pp = [pv]
+    else:
+        try:
+            pp = list(pv)
+        except TypeError:
+            pp = None
+        if pp is None or len(pp)!=len(p):
+            raise ValueError("the point and the period must have the same dimension")
+
+    m = len(p)
+    if t is None:
+        if m==1:
+            coords,periods = p+[0.0], pp+[1]
+        elif m<=4:
+            coords,periods = p, pp
+        else:
+            raise ValueError("Invalid arguments")
+        dim = m
+    else:
+        if m>3:
+            raise ValueError("Invalid arguments")
+        coords,periods = p+[t], pp+[pt]
+        dim = min(m+1, 3)
+
+    periods = [int(x) for x in periods]
+    if 0 in periods:
+        raise ValueError("period must not be zero")
+    coords,isArray = _prepare(coords)
+    return coords, periods, dim, isArray
+
+def _pointArgs(point):
+    """Process the point argument of fBm() and turbulence().
+
+    Returns the list of 3 coordinates and the array flag.
+    """
+    if not _has_numpy:
+        raise NotImplementedError("The noise functions of cgkit light require numpy")
+    p = _splitPoint(point)
+    if p is None or len(p)<2 or len(p)>3:
+        raise TypeError("the point must be a sequence of 2 or 3 floats")
+    return _prepare(p + (3-len(p))*[0.0])
+
+def _result(v, isArray):
+    """Return the result of a scalar noise function.
+    """
+    if isArray:
+        return v
+    return float(v)
+
+def _vresult(vals, isArray):
+    """Return the result of a vector noise function.
+
+    vals is a list with the component arrays.
+    """
+    if len(vals)==1:
+        return _result(vals[0], isArray)
+    if isArray:
+        return numpy.stack(vals, axis=-1)
+    vals = map(float, vals)
+    if len(vals)==2:
+        return tuple(vals)
+    elif len(vals)==3:
+        return vec3(vals)
+    else:
+        return vec4(vals)
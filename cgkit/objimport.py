@@ -46,6 +46,12 @@ from cgkit.all import UNIFORM, VARYING, FACEVARYING, NORMAL, FLOAT, INT, OBJMate
 import cmds
 import objmtl
 
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
 
 class _MTLReader(objmtl.MTLReader):
     """Read MTL files and create a list of materials.
@@ -201,6 +207,22 @@ class _OBJReader(objmtl.OBJReader):
 
         # The collected faces
         self.faces = []
+        # The collected faces when the file is read with readArrays().
+        # Each item is a tuple (sizes, verts, tverts, normals) as passed
+        # to fArray().
+        self.facechunks = []
+        # The number of faces in self.faces or self.facechunks
+        self.numfaces = 0
+        # Vertices, normals and texture vertices that were read with
+        # readArrays(). Each item is an array with 3 columns. The first
+        # chunk only contains the dummy element at position 0.
+        self.vertchunks = None
+        self.normalchunks = None
+        self.tvertchunks = None
+        if _has_numpy:
+            self.vertchunks = [numpy.zeros((1,3))]
+            self.normalchunks = [numpy.zeros((1,3))]
+            self.tvertchunks = [numpy.zeros((1,3))]
         # Flag that indicates if self.faces only contains triangles
         self.trimesh_flag = True
 
@@ -242,11 +264,11 @@ class _OBJReader(objmtl.OBJReader):
 
         # Put the material on the stack (replace the top material if it has
         # the same offset (i.e. it is unused))
-        offset = len(self.faces)
+        offset = self.numfaces
         mat = self.materials[name]
         if self.materialstack[-1][0]==offset:
             self.materialstack.pop()
-        self.materialstack.append((len(self.faces), self.materials[name]))
+        self.materialstack.append((offset, self.materials[name]))
 
     # v
     def v(self, vert):
@@ -293,14 +315,39 @@ class _OBJReader(objmtl.OBJReader):
 
         self.faces.append(verts)
 #        self.faces.append(ve)
+        self.numfaces += 1
         if len(verts)!=3:
             self.trimesh_flag = False
 
+    # vArray
+    def vArray(self, verts):
+        """Vertices (bulk version)."""
+        w = verts[:,3:]
+        self.vertchunks.append(verts[:,:3]/numpy.where(w==0, 1.0, w))
+
+    # vnArray
+    def vnArray(self, normals):
+        """Normals (bulk version)."""
+        self.normalchunks.append(normals)
+
+    # vtArray
+    def vtArray(self, tverts):
+        """Texture vertices (bulk version)."""
+        self.tvertchunks.append(tverts)
+
+    # fArray
+    def fArray(self, sizes, verts, tverts, normals):
+        """Faces (bulk version)."""
+        self.facechunks.append((sizes, verts, tverts, normals))
+        self.numfaces += len(sizes)
+        if (sizes!=3).any():
+            self.trimesh_flag = False
+
     # g
     def g(self, *groups):
         """Grouping info.
         """
-        if len(self.faces)!=0:
+        if self.numfaces!=0:
             parent, names, node = self.findParent(self.groupnames)
             name = "_".join(names)
             if name=="":
@@ -311,6 +358,8 @@ class _OBJReader(objmtl.OBJReader):
                 obj = self.createPolyhedron(parent=parent, name=name)
             self.updateHierarchy(node, obj)
         self.faces = []
+        self.facechunks = []
+        self.numfaces = 0
         self.trimesh_flag = True
         self.groupnames = groups
         # Clear the stack (the last material remains)
@@ -326,6 +375,9 @@ class _OBJReader(objmtl.OBJReader):
         Returns the TriMesh object.
         """
 
+        if len(self.facechunks)>0:
+            return self.createTriMeshFromArrays(parent=parent, name=name)
+
         # Build lookup tables (so that only the verts that are really
         # required are stored in the TriMesh)
         #
@@ -397,6 +449,9 @@ class _OBJReader(objmtl.OBJReader):
         Returns the Polyhedron object.
         """
 
+        if len(self.facechunks)>0:
+            return self.createPolyhedronFromArrays(parent=parent, name=name)
+
         # Build lookup tables (so that only the verts that are really
         # required are stored in the Polyhedron)
         #
@@ -462,6 +517,117 @@ class _OBJReader(objmtl.OBJReader):
         self.initMaterial(obj)
         return obj
 
+    # createTriMeshFromArrays
+    def createTriMeshFromArrays(self, parent=None, name=None):
+        """Create a triangle mesh from the faces collected by fArray().
+
+        Returns the TriMesh object.
+        """
+        sizes, faceverts, verts, normals, tverts = self.faceArrays()
+
+        tm = TriMeshGeom()
+        tm.verts.resize(len(verts))
+        tm.faces.resize(len(sizes))
+
+        tm.verts.setBuffer(verts)
+        tm.faces.setBuffer(faceverts)
+
+        if normals is not None:
+            tm.newVariable("N", FACEVARYING, NORMAL)
+            tm.slot("N").setBuffer(normals)
+
+        if tverts is not None:
+            tm.newVariable("st", FACEVARYING, FLOAT, 2)
+            tm.slot("st").setBuffer(numpy.ascontiguousarray(tverts[:,:2]))
+
+        obj = TriMesh(name=name, parent=parent)
+        obj.geom = tm
+        # Set the materials
+        self.initMaterial(obj)
+        return obj
+
+    # createPolyhedronFromArrays
+    def createPolyhedronFromArrays(self, parent=None, name=None):
+        """Create a polyhedron from the faces collected by fArray().
+
+        Returns the Polyhedron object.
+        """
+        sizes, faceverts, verts, normals, tverts = self.faceArrays()
+
+        pg = PolyhedronGeom()
+        pg.verts.resize(len(verts))
+        pg.setNumPolys(len(sizes))
+
+        pg.verts.setBuffer(verts)
+
+        # Set polys (this has to be done *before* any FACEVARYING variable
+        # is created, otherwise the size of the variable wouldn't be known)
+        faceverts = faceverts.tolist()
+        offset = 0
+        for i,size in enumerate(sizes.tolist()):
+            pg.setPoly(i, [faceverts[offset:offset+size]])
+            offset += size
+
+        if normals is not None:
+            pg.newVariable("N", FACEVARYING, NORMAL)
+            pg.slot("N").setBuffer(normals)
+
+        if tverts is not None:
+            pg.newVariable("st", FACEVARYING, FLOAT, 2)
+            pg.slot("st").setBuffer(numpy.ascontiguousarray(tverts[:,:2]))
+
+        obj = Polyhedron(name=name, parent=parent)
+        obj.geom = pg
+        # Set the materials
+        self.initMaterial(obj)
+        return obj
+
+    # faceArrays
+    def faceArrays(self):
+        """Return the faces collected by fArray() in compact form.
+
+        Only the vertices that are actually referenced by the faces are
+        kept (in the order of their first use).
+        Returns a tuple (sizes, faceverts, verts, normals, tverts) where
+        sizes contains the number of vertices per face, faceverts the
+        (0-based) indices into verts and verts the vertex positions.
+        normals and tverts are the facevarying normals and texture
+        vertices or None if not every face vertex has one.
+        """
+        chunks = self.facechunks
+        sizes = numpy.concatenate([c[0] for c in chunks])
+        vidx = numpy.concatenate([c[1] for c in chunks])
+
+        # Build the lookup table (first-use order)
+        used, first, inverse = numpy.unique(vidx, return_index=True, return_inverse=True)
+        order = numpy.argsort(first, kind="mergesort")
+        rank = numpy.empty(len(order), dtype=int)
+        rank[order] = numpy.arange(len(order))
+        faceverts = rank[inverse.reshape(-1)]
+        verts = self._joinChunks(self.vertchunks)[used[order]]
+
+        res = []
+        for j,datachunks in [(3, self.normalchunks), (2, self.tvertchunks)]:
+            idxchunks = [c[j] for c in chunks]
+            if len([idx for idx in idxchunks if idx is None])>0:
+                res.append(None)
+                continue
+            idx = numpy.concatenate(idxchunks)
+            # Is there a face vertex without a value?
+            if not idx.all():
+                res.append(None)
+                continue
+            res.append(self._joinChunks(datachunks)[idx])
+
+        return sizes, faceverts, verts, res[0], res[1]
+
+    # _joinChunks
+    def _joinChunks(self, chunks):
+        """Concatenate a list of arrays in place and return the result.
+        """
+        if len(chunks)>1:
+            chunks[:] = [numpy.concatenate(chunks)]
+        return chunks[0]
 
     # initMaterial
     def initMaterial(self, obj):
@@ -477,6 +643,11 @@ class _OBJReader(objmtl.OBJReader):
         if nummats>1:
             obj.geom.newVariable("matid", UNIFORM, INT)
             matid = obj.geom.slot("matid")
+            if _has_numpy:
+                offsets = [offset for offset, mat in self.materialstack]
+                counts = numpy.diff(offsets+[matid.size()])
+                matid.setBuffer(numpy.repeat(numpy.arange(nummats), counts))
+                return
             for id in range(len(self.materialstack)):
                 begin = self.materialstack[id][0]
                 if id+1<len(self.materialstack):
@@ -553,7 +724,10 @@ class OBJImporter:
         f = file(filename)
 
         reader = _OBJReader(root=parent)
-        reader.read(f)
+        if _has_numpy:
+            reader.readArrays(f)
+        else:
+            reader.read(f)
 
 ######################################################################
 
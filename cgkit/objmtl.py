@@ -34,8 +34,18 @@
 # ***** END LICENSE BLOCK *****
 # $Id: objmtl.py,v 1.3 2006/03/20 19:32:12 mbaas Exp $
 
+import re, itertools
 from cgtypes import *
 
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
+# Matches a 0-index inside the vertex references of a 'f' statement
+_zeroIndexPattern = re.compile(r"(?:^|[\s/])[-+]?0+(?=[\s/]|$)")
+
 # WavefrontReaderBase
 class WavefrontReaderBase:
     """Wavefront OBJ/MTL reader base class.
@@ -404,6 +414,247 @@ class OBJReader(WavefrontReaderBase):
         self.vn_count = 0
         WavefrontReaderBase.read(self, f)
 
+    # readArrays
+    def readArrays(self, f, chunksize=100000):
+        """Read the content of a file using bulk array parsing.
+
+        This is a faster alternative to read() that requires numpy.
+        The 'v', 'vt', 'vn' and 'f' records are collected and converted
+        into numpy arrays in chunks of up to chunksize records. The arrays
+        are passed to the vArray(), vtArray(), vnArray() and fArray()
+        methods. All other keywords are processed by their
+        handle_<keyword>() methods as usual. Pending records are always
+        flushed before such a keyword is processed, so the order of the
+        callbacks is retained (except that inside a chunk, the vertex
+        data is always delivered before the faces).
+        The default implementations of the array methods invoke the
+        per-element methods v(), vt(), vn() and f(), so a reader that
+        only implements those methods also works with readArrays().
+        """
+        if not _has_numpy:
+            raise ImportError("OBJReader.readArrays() requires the numpy package")
+
+        self.v_count = 0
+        self.vp_count = 0
+        self.vt_count = 0
+        self.vn_count = 0
+        self.linenr = 0
+        self._resetChunk()
+        self.begin()
+        for self.line in f:
+            self.linenr+=1
+            a = self.line.split(None, 1)
+            # Ignore empty lines and comments
+            if len(a)==0 or a[0][0] in "#$!@":
+                continue
+
+            cmd = a[0]
+            if len(a)==2:
+                if cmd=="v":
+                    self._vlines.append(a[1])
+                    self._vlinenrs.append(self.linenr)
+                    self.v_count += 1
+                elif cmd=="f":
+                    self._flines.append(a[1])
+                    self._flinenrs.append(self.linenr)
+                    self._fcounts.append((self.v_count, self.vt_count, self.vn_count))
+                elif cmd=="vt":
+                    self._vtlines.append(a[1])
+                    self._vtlinenrs.append(self.linenr)
+                    self.vt_count += 1
+                elif cmd=="vn":
+                    self._vnlines.append(a[1])
+                    self._vnlinenrs.append(self.linenr)
+                    self.vn_count += 1
+                else:
+                    cmd = None
+                if cmd!=None:
+                    self._chunksize += 1
+                    if self._chunksize>=chunksize:
+                        self._flushChunk()
+                    continue
+
+            # Process the line with the regular handler method...
+            self._flushChunk()
+            args = a[1:] and a[1].split()
+            handler = getattr(self, "handle_%s"%a[0], None)
+            if handler!=None:
+                handler(*args)
+            else:
+                self.handleUnknown(a[0], args)
+
+        self._flushChunk()
+        self.end()
+
+    # _resetChunk
+    def _resetChunk(self):
+        """Clear the records that were collected by readArrays().
+        """
+        self._chunksize = 0
+        self._vlines = []
+        self._vtlines = []
+        self._vnlines = []
+        self._flines = []
+        # The line numbers of the above records
+        self._vlinenrs = []
+        self._vtlinenrs = []
+        self._vnlinenrs = []
+        self._flinenrs = []
+        # The values of (v_count, vt_count, vn_count) for each face
+        self._fcounts = []
+
+    # _flushChunk
+    def _flushChunk(self):
+        """Convert the currently collected records and pass them on.
+        """
+        if self._chunksize==0:
+            return
+
+        vlines = self._vlines
+        vtlines = self._vtlines
+        vnlines = self._vnlines
+        flines = self._flines
+        fcounts = self._fcounts
+
+        if len(vlines)>0:
+            self.vArray(self._parseRows("v", vlines, self._vlinenrs, 3, 4, [1.0]))
+        if len(vtlines)>0:
+            self.vtArray(self._parseRows("vt", vtlines, self._vtlinenrs, 1, 3, [0.0, 0.0]))
+        if len(vnlines)>0:
+            self.vnArray(self._parseRows("vn", vnlines, self._vnlinenrs, 3, 3, []))
+        if len(flines)>0:
+            self.fArray(*self._parseFaces(flines, self._flinenrs, fcounts))
+        self._resetChunk()
+
+    # _recordError
+    def _recordError(self, exccls, msg, cmd, linenr, data):
+        """Return an exception object for an invalid record inside a chunk.
+
+        linenr is the line number of the record and data the string
+        with the values of the record.
+        """
+        return exccls("%s in line %d: %s %s"%(msg, linenr, cmd, data.strip()))
+
+    # _parseRows
+    def _parseRows(self, cmd, lines, linenrs, mincomps, maxcomps, defaults):
+        """Convert the data of several 'v', 'vt' or 'vn' records.
+
+        lines is a list of strings containing the values of one record
+        each and linenrs contains the corresponding line numbers.
+        mincomps/maxcomps is the valid number of values per record
+        and defaults contains the values for the optional components.
+        Returns a float array of shape (n, maxcomps).
+        """
+        n = len(lines)
+        rows = [line.split() for line in lines]
+        sizes = map(len, rows)
+        kmin = min(sizes)
+        kmax = max(sizes)
+        if kmin<mincomps or kmax>maxcomps:
+            for i,k in enumerate(sizes):
+                if k<mincomps or k>maxcomps:
+                    raise self._recordError(SyntaxError, "Invalid number of values in '%s' statement"%cmd, cmd, linenrs[i], lines[i])
+
+        res = numpy.empty((n, maxcomps))
+        try:
+            # Do all records have the same number of values?
+            if kmin==kmax:
+                tokens = list(itertools.chain(*rows))
+                res[:,:kmin] = numpy.array(tokens, dtype=float).reshape(n, kmin)
+                res[:,kmin:] = defaults[kmin-mincomps:]
+            else:
+                for i,vals in enumerate(rows):
+                    res[i] = map(float, vals)+defaults[len(vals)-mincomps:]
+        except ValueError:
+            # Locate the record with the invalid value
+            for i,vals in enumerate(rows):
+                try:
+                    map(float, vals)
+                except ValueError:
+                    raise self._recordError(ValueError, "Invalid '%s' value"%cmd, cmd, linenrs[i], lines[i])
+            raise
+        return res
+
+    # _parseFaces
+    def _parseFaces(self, lines, linenrs, counts):
+        """Convert the data of several 'f' records.
+
+        lines is a list of strings containing the vertex references of one
+        face each, linenrs contains the corresponding line numbers and
+        counts contains the (v_count, vt_count, vn_count) tuples that were
+        valid at each face.
+        Returns the arguments for the fArray() method.
+        """
+        def error(exccls, msg, i):
+            return self._recordError(exccls, msg, "f", linenrs[i], lines[i])
+
+        def faceIndex(pos):
+            """Return the index of the face that contains reference pos."""
+            return numpy.searchsorted(numpy.cumsum(sizes), pos, side="right")
+
+        sizes = numpy.array([len(line.split()) for line in lines], dtype=int)
+        if sizes.min()<3:
+            raise error(SyntaxError, "At least 3 vertices required", numpy.argmax(sizes<3))
+
+        data = " ".join(lines)
+        if _zeroIndexPattern.search(data)!=None:
+            for i,line in enumerate(lines):
+                if _zeroIndexPattern.search(line)!=None:
+                    raise error(ValueError, "0-index", i)
+
+        tokens = numpy.array(data.split())
+        slashes = numpy.char.count(tokens, "/")
+        if slashes.max()>2:
+            raise error(SyntaxError, "Syntax error", faceIndex(numpy.argmax(slashes>2)))
+
+        try:
+            if slashes.min()==slashes.max():
+                # All references have the same form
+                numcomps = slashes[0]+1
+                if numcomps>1:
+                    data = data.replace("//", "/0/")
+                    data = re.sub(r"/(?=\s|$)", "/0", data)
+                    data = data.replace("/", " ")
+                vals = numpy.array(data.split(), dtype=int).reshape(-1, numcomps)
+            else:
+                # Mixed forms (missing values are filled with 0)
+                vals = numpy.zeros((len(tokens), 3), dtype=int)
+                for i,ref in enumerate(tokens):
+                    for j,s in enumerate(ref.split("/")):
+                        if s!="":
+                            vals[i,j] = int(s)
+        except ValueError:
+            # Locate the face with the invalid reference
+            for i,line in enumerate(lines):
+                try:
+                    for ref in line.split():
+                        map(int, filter(None, ref.split("/")))
+                except ValueError:
+                    raise error(ValueError, "Invalid vertex reference", i)
+            raise
+
+        # Convert negative indices using the counts that were valid at the
+        # position of each face
+        counts = numpy.repeat(numpy.array(counts, dtype=int), sizes, axis=0)
+        res = []
+        for j in range(3):
+            if j>=vals.shape[1]:
+                res.append(None)
+                continue
+            idx = vals[:,j]
+            neg = idx<0
+            if neg.any():
+                idx[neg] += counts[neg,j]+1
+                invalid = neg & (idx<=0)
+                if invalid.any():
+                    raise error(ValueError, "0-index", faceIndex(numpy.argmax(invalid)))
+            # Are all values missing?
+            if j>0 and not idx.any():
+                idx = None
+            res.append(idx)
+
+        return sizes, res[0], res[1], res[2]
+
     # Pre handler methods (they must be called "handle_<keyword>")
 
     def handle_mtllib(self, *files):
@@ -681,6 +932,64 @@ class OBJReader(WavefrontReaderBase):
         """
         pass
 
+    # Array handler methods (only used by readArrays())
+
+    def vArray(self, verts):
+        """Geometric vertices.
+
+        verts is a numpy array of shape (n, 4) containing n vertices.
+        The default implementation calls v() for every vertex.
+        """
+        for x,y,z,w in verts.tolist():
+            self.v(vec4(x,y,z,w))
+
+    def vnArray(self, normals):
+        """Normal vectors.
+
+        normals is a numpy array of shape (n, 3) containing n normals.
+        The default implementation calls vn() for every normal.
+        """
+        for x,y,z in normals.tolist():
+            self.vn(vec3(x,y,z))
+
+    def vtArray(self, tverts):
+        """Texture vertices.
+
+        tverts is a numpy array of shape (n, 3) containing n texture
+        vertices. The default implementation calls vt() for every texture
+        vertex.
+        """
+        for u,v,w in tverts.tolist():
+            self.vt(vec3(u,v,w))
+
+    def fArray(self, sizes, verts, tverts, normals):
+        """Polygonal faces.
+
+        sizes is an int array that contains the number of vertices of
+        each face. verts, tverts and normals are flat int arrays that
+        contain the vertex, texture vertex and normal indices of all faces.
+        All indices are 1-based and always >0 (negative indices have
+        already been converted). tverts and normals may be None if none
+        of the faces had a texture vertex or normal, otherwise missing
+        entries are 0.
+        The default implementation calls f() for every face.
+        """
+        verts = verts.tolist()
+        if tverts is None:
+            tverts = len(verts)*[None]
+        else:
+            tverts = [x or None for x in tverts.tolist()]
+        if normals is None:
+            normals = len(verts)*[None]
+        else:
+            normals = [x or None for x in normals.tolist()]
+
+        offset = 0
+        for size in sizes.tolist():
+            end = offset+size
+            self.f(*zip(verts[offset:end], tverts[offset:end], normals[offset:end]))
+            offset = end
+
     def o(self, name):
         """Optional object name.
 
@@ -44,11 +44,21 @@ from polyhedron import Polyhedron
 from polyhedrongeom import PolyhedronGeom
 import pluginmanager
 
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
 # OffImporter
 class OffImporter:
 
     _protocols = ["Import"]
 
+    # The maximum number of lines that are converted at once by the
+    # numpy versions of the read methods
+    chunksize = 100000
+
     # extension
     def extension():
         """Return the file extensions for this format."""
@@ -104,11 +114,13 @@ class OffImporter:
         self.geom.verts.resize(self.numverts)
         self.geom.faces.resize(self.numfaces)
 
-        # Read the vertices...
-        self.readVertices()
-
-        # Read the faces...
-        self.readFaces()
+        # Read the vertices and faces...
+        if _has_numpy:
+            self.readVerticesBulk()
+            self.readFacesBulk()
+        else:
+            self.readVertices()
+            self.readFaces()
 
         self.fhandle.close()
 
@@ -189,6 +201,101 @@ class OffImporter:
                 Cs[i] = col
                     
 
+    # readFacesBulk
+    def readFacesBulk(self):
+        """Read the faces and set them using array operations.
+
+        This is the numpy version of readFaces(). The faces are read in
+        chunks of up to self.chunksize lines.
+        """
+        # Indices of the faces with less than 3 vertices
+        self.invalidfaces = []
+        self.facecolor_flag = False
+        start = 0
+        while start<self.numfaces:
+            count = min(self.chunksize, self.numfaces-start)
+            lines = [self.readLine() for i in range(count)]
+            self.setFaceChunk(start, lines)
+            start += count
+
+    # setFaceChunk
+    def setFaceChunk(self, start, lines):
+        """Convert several face lines and store the faces in the geom.
+
+        start is the index of the first face in lines.
+        """
+        count = len(lines)
+        # The number of values per line and the offset of each line
+        # into the flat array of values
+        sizes = numpy.array([len(z.split()) for z in lines], dtype=int)
+        offsets = numpy.cumsum(sizes)-sizes
+        values = numpy.fromstring(" ".join(lines), sep=" ")
+        if values.size!=sizes.sum():
+            # Let the first invalid value trigger the error
+            for z in lines:
+                map(lambda x: int(x), z.split())
+            raise SyntaxError("Invalid face data")
+
+        # Get the number of vertices in each face
+        Nv = values[offsets].astype(int)
+        if (sizes<Nv+1).any():
+            i = numpy.nonzero(sizes<Nv+1)[0][0]
+            raise SyntaxError("Not enough vertex indices for face %d"%(start+i))
+        valid = Nv>=3
+        for i in numpy.nonzero(~valid)[0].tolist():
+            print >>sys.stderr, "Warning: Faces must have at least three vertices"
+            self.invalidfaces.append(start+i)
+        # Faces with a color (more than 2 values after the vertex indices)
+        colored = numpy.nonzero(valid & (sizes-Nv-1>2))[0].tolist()
+
+        # Set the faces...
+        if self.is_trimesh and (Nv[valid]==3).all():
+            # Only gather the indices of the valid faces (an invalid face
+            # may not have three indices), the invalid faces remain 0
+            data = numpy.zeros((count, 3), dtype=int)
+            data[valid] = values[offsets[valid,numpy.newaxis]+numpy.arange(1,4)]
+            if self.invertfaces:
+                data = data[:,::-1]
+            self.geom.faces.setBuffer(numpy.ascontiguousarray(data), start)
+        else:
+            if self.is_trimesh:
+                # Convert the TriMeshGeom into a PolyhedronGeom and
+                # initialize the faces processed so far...
+                tm = self.geom
+                self.geom = self.triMesh2Polyhedron(tm)
+                self.is_trimesh = False
+                invalid = set(self.invalidfaces)
+                for j in range(start):
+                    if j not in invalid:
+                        self.geom.setPoly(j, [tm.faces[j]])
+            values = values.astype(int).tolist()
+            offsets = offsets.tolist()
+            Nv = Nv.tolist()
+            for i in numpy.nonzero(valid)[0].tolist():
+                a = offsets[i]+1
+                face = values[a:a+Nv[i]]
+                if self.invertfaces:
+                    face.reverse()
+                self.geom.setPoly(start+i, [face])
+
+        # Process color...
+        if colored==[]:
+            return
+        geom = self.geom
+        if not self.facecolor_flag:
+            geom.newVariable("Cs", UNIFORM, COLOR)
+            self.facecolor_flag = True
+        data = numpy.zeros((count, 3))
+        for i in colored:
+            ca = lines[i].split()[Nv[i]+1:Nv[i]+4]
+            # Check and see if the rgb values are given as ints, in this
+            # case they have to be scaled down.
+            try:
+                data[i] = map(lambda x: int(x)/255.0, ca)
+            except:
+                data[i] = map(lambda x: float(x), ca)
+        geom.slot("Cs").setBuffer(data, start)
+
     # triMesh2Polyhedron
     def triMesh2Polyhedron(self, tm):
         """Convert a TriMeshGeom into a PolyhedronGeom.
@@ -251,6 +358,76 @@ class OffImporter:
                 st[i] = f[:2]
         
 
+    # readVerticesBulk
+    def readVerticesBulk(self):
+        """Read the vertices (and varying variables) using array operations.
+
+        This is the numpy version of readVertices(). The vertices are read
+        in chunks of up to self.chunksize lines.
+        """
+        geom = self.geom
+
+        # Determine the columns of the vertex data...
+        numcols = self.ndim
+        if self.four_flag:
+            numcols += 1
+        if self.normal_flag:
+            numcols += 3
+            geom.newVariable("N", VARYING, NORMAL)
+        if self.color_flag:
+            numcols += 3
+            geom.newVariable("Cs", VARYING, COLOR)
+        if self.texcoord_flag:
+            numcols += 2
+            geom.newVariable("st", VARYING, FLOAT, 2)
+
+        start = 0
+        while start<self.numverts:
+            count = min(self.chunksize, self.numverts-start)
+            lines = [self.readLine() for i in range(count)]
+            data = self.parseVertexLines(start, lines, numcols)
+
+            verts = numpy.zeros((count, 3))
+            verts[:,:self.ndim] = data[:,:self.ndim]
+            col = self.ndim
+            if self.four_flag:
+                w = data[:,col:col+1]
+                verts /= numpy.where(w==0, 1.0, w)
+                col += 1
+            geom.verts.setBuffer(verts, start)
+
+            if self.normal_flag:
+                geom.slot("N").setBuffer(numpy.ascontiguousarray(data[:,col:col+3]), start)
+                col += 3
+            if self.color_flag:
+                geom.slot("Cs").setBuffer(numpy.ascontiguousarray(data[:,col:col+3]), start)
+                col += 3
+            if self.texcoord_flag:
+                geom.slot("st").setBuffer(numpy.ascontiguousarray(data[:,col:col+2]), start)
+            start += count
+
+    # parseVertexLines
+    def parseVertexLines(self, start, lines, numcols):
+        """Convert several vertex lines into an array.
+
+        start is the index of the first vertex in lines. Returns an array
+        of shape (len(lines), numcols). Additional values are ignored.
+        """
+        count = len(lines)
+        values = numpy.fromstring(" ".join(lines), sep=" ")
+        if values.size==count*numcols:
+            return values.reshape((count, numcols))
+
+        # The lines contain more values than required (or an error),
+        # so convert them individually
+        data = numpy.zeros((count, numcols))
+        for i,z in enumerate(lines):
+            f = map(lambda x: float(x), z.split()[:numcols])
+            if len(f)<numcols:
+                raise SyntaxError("Not enough values for vertex %d"%(start+i))
+            data[i] = f
+        return data
+
     # parseHeaderKeyWord
     def parseHeaderKeyWord(self, header):
         """Parses the first line of an OFF file.
@@ -34,13 +34,592 @@
 # ***** END LICENSE BLOCK *****
 # $Id: plyimport.py,v 1.4 2005/05/09 14:34:24 mbaas Exp $
 
-import os.path
+import os.path, struct
 import _core
 from cgtypes import *
 from geomobject import *
 from polyhedron import *
 import pluginmanager
 
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
+# The numpy type codes of the PLY types
+_ply_types = {"char":"i1", "int8":"i1", "uchar":"u1", "uint8":"u1",
+              "short":"i2", "int16":"i2", "ushort":"u2", "uint16":"u2",
+              "int":"i4", "int32":"i4", "uint":"u4", "uint32":"u4",
+              "float":"f4", "float32":"f4", "double":"f8", "float64":"f8"}
+
+# PLYReader
+class PLYReader:
+    """Read PLY files using numpy.
+
+    This class has the same interface as the PLYReader class from the
+    _core module (which reads the file value by value using the RPly
+    library). Here, the element data is read in chunks of up to
+    chunksize elements using array operations. Binary data is decoded
+    with a structured dtype, ASCII data is converted line block by line
+    block (or value by value if the element instances don't match the
+    lines). List properties are passed around as a tuple (lengths,
+    offsets, values) where values contains the items of all lists and
+    offsets the index of the first item of each list.
+    """
+
+    def __init__(self, chunksize=100000):
+        self.chunksize = chunksize
+        self.fhandle = None
+        # The file format ("ascii", "binary_little_endian" or
+        # "binary_big_endian")
+        self.format = None
+        # A list of (name, ninstances, properties) tuples. properties is a
+        # list of (name, type, len_type, val_type) tuples.
+        self.elements = []
+        # The ASCII values that were read but not used by the previous
+        # chunk (or None)
+        self.asciivalues = None
+
+    # open
+    def open(self, name):
+        """Open a PLY file."""
+        self.close()
+        self.fhandle = file(name, "rb")
+
+    # close
+    def close(self):
+        """Close the file (if it is open)."""
+        if self.fhandle!=None:
+            self.fhandle.close()
+            self.fhandle = None
+
+    # readHeader
+    def readHeader(self):
+        """Read the file header.
+
+        The return value is a tuple (elements, comment, objinfo) (see the
+        PLYReader class in the _core module).
+        """
+        f = self.fhandle
+        if f.readline().strip()!="ply":
+            raise SyntaxError("Not a PLY file")
+
+        self.format = None
+        self.elements = []
+        self.asciivalues = None
+        comments = []
+        objinfos = []
+        while 1:
+            z = f.readline()
+            if z=="":
+                raise SyntaxError("premature end of file")
+            a = z.split(None, 1)
+            if len(a)==0:
+                continue
+            kw = a[0]
+            args = a[1:] and a[1].split()
+            if kw=="end_header":
+                break
+            elif kw=="comment":
+                comments.append(a[1:] and a[1].rstrip("\r\n") or "")
+            elif kw=="obj_info":
+                objinfos.append(a[1:] and a[1].rstrip("\r\n") or "")
+            elif kw=="format" and len(args)==2:
+                if args[0] not in ["ascii", "binary_little_endian", "binary_big_endian"]:
+                    raise SyntaxError("Unknown PLY format: %s"%args[0])
+                self.format = args[0]
+            elif kw=="element" and len(args)==2:
+                self.elements.append((args[0], int(args[1]), []))
+            elif kw=="property" and len(args)==2 and len(self.elements)>0:
+                self.checkType(args[0])
+                self.elements[-1][2].append((args[1], args[0], "?", "?"))
+            elif kw=="property" and len(args)==4 and args[0]=="list" and len(self.elements)>0:
+                self.checkType(args[1])
+                self.checkType(args[2])
+                self.elements[-1][2].append((args[3], "list", args[1], args[2]))
+            else:
+                raise SyntaxError("Invalid PLY header line: %s"%z.strip())
+
+        if self.format==None:
+            raise SyntaxError("The PLY format is missing")
+
+        return self.elements, "\n".join(comments), "\n".join(objinfos)
+
+    # read
+    def read(self, geom, vardecl, invertfaces):
+        """Read the data.
+
+        This may only be called after readHeader() was called.
+        geom is an empty PolyhedronGeom that receives the result, vardecl
+        a list of variable declarations (see the PLYReader class in the
+        _core module) and invertfaces specifies if the poly orientations
+        should be inverted or not.
+        """
+        numverts = 0
+        numfaces = 0
+        for elname,ninstances,props in self.elements:
+            if elname=="vertex":
+                numverts = ninstances
+            elif elname=="face":
+                numfaces = ninstances
+        geom.verts.resize(numverts)
+        geom.setNumPolys(numfaces)
+
+        # Key: Element name  Value: List of (setter, args) tuples that
+        # are called for every chunk of the element
+        setters = {}
+        for decl in vardecl:
+            varname,vartype,elname,propnames = decl
+            info = self.findVariable(elname, propnames, vartype)
+            if info==None:
+                continue
+            ninstances,proptype = info
+            if elname=="vertex":
+                storage = VARYING
+            elif elname=="face":
+                storage = UNIFORM
+            else:
+                storage = USER
+            if len(propnames)==3:
+                geom.newVariable(varname, storage, vartype, 1, ninstances)
+                args = (geom.slot(varname), propnames)
+                setters.setdefault(elname, []).append((self.setVec3Chunk, args))
+            elif proptype=="list":
+                # The variable is created when the first list is known
+                args = (geom, varname, storage, vartype, ninstances, propnames[0])
+                setters.setdefault(elname, []).append((self.setListChunk, args))
+            else:
+                geom.newVariable(varname, storage, vartype, 1, ninstances)
+                args = (geom.slot(varname), propnames[0])
+                setters.setdefault(elname, []).append((self.setScalarChunk, args))
+
+        # The vertices and faces
+        setters.setdefault("vertex", []).append((self.setVec3Chunk, (geom.verts, ("x", "y", "z"))))
+        setters.setdefault("face", []).append((self.setPolyChunk, (geom, "vertex_indices", invertfaces)))
+
+        # Read the model
+        for element in self.elements:
+            for start,data in self.iterChunks(element):
+                for setter,args in setters.get(element[0], []):
+                    setter(start, data, *args)
+
+    # findVariable
+    def findVariable(self, elname, propnames, vartype):
+        """Check a variable declaration.
+
+        Returns a tuple (ninstances, proptype) or None if the variable
+        is not valid (in which case it is ignored).
+        """
+        if len(propnames)==1:
+            if vartype not in [INT, FLOAT]:
+                return None
+        elif len(propnames)==3:
+            if vartype not in [COLOR, POINT, VECTOR, NORMAL]:
+                return None
+        else:
+            return None
+
+        for name,ninstances,props in self.elements:
+            if name==elname:
+                for propname,type,len_type,val_type in props:
+                    if propname in propnames:
+                        return ninstances,type
+                return None
+        return None
+
+    # setScalarChunk
+    def setScalarChunk(self, start, data, slot, propname):
+        col = data.get(propname)
+        if col is not None and not isinstance(col, tuple):
+            slot.setBuffer(numpy.ascontiguousarray(col), start)
+
+    # setVec3Chunk
+    def setVec3Chunk(self, start, data, slot, propnames):
+        values = None
+        for i,propname in enumerate(propnames):
+            col = data.get(propname)
+            if col is not None and not isinstance(col, tuple):
+                if values is None:
+                    values = numpy.zeros((len(col), 3))
+                values[:,i] = col
+        if values is not None:
+            slot.setBuffer(values, start)
+
+    # setListChunk
+    def setListChunk(self, start, data, geom, varname, storage, vartype, ninstances, propname):
+        if not isinstance(data.get(propname), tuple):
+            return
+        lengths,offsets,values = data[propname]
+        if len(lengths)==0:
+            return
+        # Create a new variable before the first element is set. The size of
+        # the first list determines the multiplicity.
+        if start==0:
+            geom.newVariable(varname, storage, vartype, int(lengths[0]), ninstances)
+        slot = geom.slot(varname)
+        mult = slot.multiplicity()
+        block = numpy.zeros((len(lengths), mult))
+        for j in range(mult):
+            mask = lengths>j
+            block[mask,j] = values[offsets[mask]+j]
+        slot.setBuffer(block, start)
+
+    # setPolyChunk
+    def setPolyChunk(self, start, data, geom, propname, invertfaces):
+        if not isinstance(data.get(propname), tuple):
+            return
+        lengths,offsets,values = data[propname]
+        if values.dtype.kind=="f":
+            # +0.1 to make sure the conversion to int will be the true int...
+            values = values+0.1
+        values = values.astype(int).tolist()
+        offsets = offsets.tolist()
+        for i,n in enumerate(lengths.tolist()):
+            loop = values[offsets[i]:offsets[i]+n]
+            if invertfaces:
+                loop.reverse()
+            geom.setLoop(start+i, 0, loop)
+
+    # iterChunks
+    def iterChunks(self, element):
+        """Iterate over the data of an element in chunks.
+
+        Yields tuples (start, data) where start is the index of the first
+        element instance in the chunk and data is a dictionary with the
+        property values (key: Property name). The value of a scalar
+        property is a 1D array, the value of a list property is a tuple
+        (lengths, offsets, values).
+        """
+        elname,ninstances,props = element
+        if props==[]:
+            return
+        start = 0
+        while start<ninstances:
+            count = min(self.chunksize, ninstances-start)
+            if self.format=="ascii":
+                data = self.readAsciiChunk(props, count)
+            else:
+                data = self.readBinaryChunk(props, count)
+            yield start, data
+            start += count
+
+    # readAsciiChunk
+    def readAsciiChunk(self, props, count):
+        """Read count element instances from an ASCII file.
+
+        The chunk is converted at once if every instance is stored in a
+        line of its own. Otherwise, the values are decoded with
+        readAsciiStream().
+        """
+        if self.asciivalues is not None:
+            values = self.asciivalues
+            self.asciivalues = None
+            return self.readAsciiStream(props, count, values)
+
+        lines = []
+        while len(lines)<count:
+            z = self.fhandle.readline()
+            if z=="":
+                break
+            if z.strip()!="":
+                lines.append(z)
+
+        values = numpy.fromstring(" ".join(lines), sep=" ")
+        haslists = "list" in [p[1] for p in props]
+        if not haslists and values.size==count*len(props):
+            values = values.reshape((count, len(props)))
+            data = {}
+            for i,p in enumerate(props):
+                data[p[0]] = values[:,i]
+            return data
+
+        # The number of values per line and the offset of each line into
+        # the flat array of values
+        sizes = numpy.array([len(z.split()) for z in lines], dtype=int)
+        if values.size!=sizes.sum():
+            raise SyntaxError("Invalid value in element data")
+
+        if len(lines)==count:
+            offsets = numpy.cumsum(sizes)-sizes
+            ends = offsets+sizes
+            # Determine the properties column by column (as long as
+            # every instance matches its line)
+            data = {}
+            pos = offsets
+            for propname,type,len_type,val_type in props:
+                if not (pos<ends).all():
+                    break
+                if type=="list":
+                    lengths = values[pos].astype(int)
+                    data[propname] = self.gatherLists(values, pos+1, lengths)
+                    pos = pos+1+lengths
+                else:
+                    data[propname] = values[pos]
+                    pos = pos+1
+            else:
+                if (pos==ends).all():
+                    return data
+
+        # An instance spans several lines or a line contains several
+        # instances
+        return self.readAsciiStream(props, count, values)
+
+    # readAsciiStream
+    def readAsciiStream(self, props, count, values):
+        """Read count element instances from a stream of ASCII values.
+
+        values is a flat array with the values that were already read.
+        The instances are located by walking the values using the
+        property declaration, further lines are read when necessary.
+        The values behind the last instance are kept for the next chunk.
+        """
+        items = values.tolist()
+        # The index of the first value of each instance
+        starts = []
+        pos = 0
+        for i in xrange(count):
+            starts.append(pos)
+            for propname,type,len_type,val_type in props:
+                while pos>=len(items):
+                    items.extend(self.readAsciiLine())
+                if type=="list":
+                    pos += 1+int(items[pos])
+                else:
+                    pos += 1
+        while pos>len(items):
+            items.extend(self.readAsciiLine())
+
+        values = numpy.array(items)
+        if pos<len(items):
+            self.asciivalues = values[pos:]
+        data = {}
+        pos = numpy.array(starts, dtype=int)
+        for propname,type,len_type,val_type in props:
+            if type=="list":
+                lengths = values[pos].astype(int)
+                data[propname] = self.gatherLists(values, pos+1, lengths)
+                pos = pos+1+lengths
+            else:
+                data[propname] = values[pos]
+                pos = pos+1
+        return data
+
+    # readAsciiLine
+    def readAsciiLine(self):
+        """Return the values of the next non-empty line as a list of floats.
+        """
+        while 1:
+            z = self.fhandle.readline()
+            if z=="":
+                raise SyntaxError("premature end of file")
+            try:
+                values = map(float, z.split())
+            except ValueError:
+                raise SyntaxError("Invalid value in element data")
+            if values!=[]:
+                return values
+
+    # gatherLists
+    def gatherLists(self, values, starts, lengths):
+        """Extract lists from a flat array.
+
+        starts contains the index of the first item of each list in
+        values. Returns a tuple (lengths, offsets, items) where items only
+        contains the list items.
+        """
+        offsets = numpy.cumsum(lengths)-lengths
+        # The index of every item in values
+        idx = numpy.repeat(starts-offsets, lengths)+numpy.arange(lengths.sum())
+        return lengths, offsets, values[idx]
+
+    # readBinaryChunk
+    def readBinaryChunk(self, props, count):
+        """Read count element instances from a binary file.
+
+        The chunk is decoded with a structured dtype using the list
+        lengths of the first instance. If not all lists have the same
+        length, the chunk is re-read with readVaryingChunk().
+        """
+        if self.format=="binary_little_endian":
+            byteorder = "<"
+        else:
+            byteorder = ">"
+        f = self.fhandle
+
+        dtype = self.binaryDtype(props, byteorder)
+        # Elements with list properties have to read the first instance
+        # to determine the list lengths
+        listlens = {}
+        if dtype is None:
+            pos = f.tell()
+            for propname,type,len_type,val_type in props:
+                if type=="list":
+                    s = f.read(numpy.dtype(_ply_types[len_type]).itemsize)
+                    length = self.unpack(s, len_type, byteorder)
+                    listlens[propname] = length
+                    f.read(length*numpy.dtype(_ply_types[val_type]).itemsize)
+                else:
+                    f.read(numpy.dtype(_ply_types[type]).itemsize)
+            f.seek(pos)
+            dtype = self.binaryDtype(props, byteorder, listlens)
+
+        pos = f.tell()
+        s = f.read(count*dtype.itemsize)
+        block = numpy.frombuffer(s, dtype=dtype, count=len(s)//dtype.itemsize)
+        if listlens!={}:
+            uniform = len(block)==count
+            for propname,length in listlens.items():
+                if (block[propname+"_len"]!=length).any():
+                    uniform = False
+            if not uniform:
+                f.seek(pos)
+                return self.readVaryingChunk(props, count, byteorder)
+        if len(block)<count:
+            raise SyntaxError("premature end of file")
+
+        # Convert the data (using the native byte order)
+        data = {}
+        for propname,type,len_type,val_type in props:
+            if type=="list":
+                length = listlens[propname]
+                lengths = numpy.repeat(length, count)
+                offsets = numpy.arange(count)*length
+                items = block[propname].reshape(-1)
+                data[propname] = (lengths, offsets, items.astype(_ply_types[val_type]))
+            else:
+                data[propname] = block[propname].astype(_ply_types[type])
+        return data
+
+    # readVaryingChunk
+    def readVaryingChunk(self, props, count, byteorder):
+        """Read count element instances whose list lengths vary.
+
+        Only the list lengths are scanned instance by instance. The
+        resulting instance offsets are then used to gather the values of
+        each property from the whole chunk at once.
+        """
+        f = self.fhandle
+
+        # The layout of an instance as a list of (skip, propname,
+        # lenstruct, itemsize) tuples (one per list property) where skip
+        # is the number of bytes of the scalar properties in front of the
+        # list. tail is the number of bytes after the last list.
+        layout = []
+        tail = 0
+        for propname,type,len_type,val_type in props:
+            if type=="list":
+                lenstruct = struct.Struct(byteorder+numpy.dtype(_ply_types[len_type]).char)
+                itemsize = numpy.dtype(_ply_types[val_type]).itemsize
+                layout.append((tail, propname, lenstruct, itemsize))
+                tail = 0
+            else:
+                tail += numpy.dtype(_ply_types[type]).itemsize
+
+        # Scan the list lengths
+        lists = dict([(item[1], []) for item in layout])
+        buf = ""
+        pos = 0
+        for i in xrange(count):
+            for skip,propname,lenstruct,itemsize in layout:
+                pos += skip
+                while pos+lenstruct.size>len(buf):
+                    buf = self.readMore(buf)
+                length = int(lenstruct.unpack_from(buf, pos)[0])
+                lists[propname].append(length)
+                pos += lenstruct.size+length*itemsize
+            pos += tail
+        while pos>len(buf):
+            buf = self.readMore(buf)
+        # Go back to the end of the last instance
+        f.seek(pos-len(buf), 1)
+
+        # The offset of each instance
+        sizes = numpy.zeros(count, dtype=int)
+        for propname,type,len_type,val_type in props:
+            if type=="list":
+                lists[propname] = numpy.array(lists[propname], dtype=int)
+                sizes += numpy.dtype(_ply_types[len_type]).itemsize
+                sizes += lists[propname]*numpy.dtype(_ply_types[val_type]).itemsize
+            else:
+                sizes += numpy.dtype(_ply_types[type]).itemsize
+        pos = numpy.cumsum(sizes)-sizes
+
+        # Gather the properties (pos is the offset of the current
+        # property in each instance)
+        raw = numpy.frombuffer(buf, dtype=numpy.uint8)
+        data = {}
+        for propname,type,len_type,val_type in props:
+            if type=="list":
+                lengths = lists[propname]
+                offsets = numpy.cumsum(lengths)-lengths
+                pos = pos+numpy.dtype(_ply_types[len_type]).itemsize
+                itemsize = numpy.dtype(_ply_types[val_type]).itemsize
+                # The offset of every list item
+                idx = numpy.repeat(pos-offsets*itemsize, lengths)+itemsize*numpy.arange(lengths.sum())
+                items = self.gatherValues(raw, idx, byteorder+_ply_types[val_type])
+                data[propname] = (lengths, offsets, items.astype(_ply_types[val_type]))
+                pos = pos+lengths*itemsize
+            else:
+                col = self.gatherValues(raw, pos, byteorder+_ply_types[type])
+                data[propname] = col.astype(_ply_types[type])
+                pos = pos+col.itemsize
+        return data
+
+    # readMore
+    def readMore(self, buf):
+        """Append the next block of data to buf and return the result.
+        """
+        s = self.fhandle.read(max(len(buf), 65536))
+        if s=="":
+            raise SyntaxError("premature end of file")
+        return buf+s
+
+    # gatherValues
+    def gatherValues(self, raw, offsets, dtype):
+        """Extract binary values from a byte array.
+
+        raw is a uint8 array, offsets contains the byte offset of every
+        value and dtype is the type of the values.
+        """
+        dtype = numpy.dtype(dtype)
+        idx = offsets[:,numpy.newaxis]+numpy.arange(dtype.itemsize)
+        return raw[idx].view(dtype).reshape(-1)
+
+    # binaryDtype
+    def binaryDtype(self, props, byteorder, listlens=None):
+        """Return the structured dtype of one element instance.
+
+        listlens is a dictionary with the lengths of the list properties.
+        If the element has list properties and listlens is None, the
+        return value is None.
+        """
+        fields = []
+        for propname,type,len_type,val_type in props:
+            if type=="list":
+                if listlens==None:
+                    return None
+                fields.append((propname+"_len", byteorder+_ply_types[len_type]))
+                fields.append((propname, byteorder+_ply_types[val_type], (listlens[propname],)))
+            else:
+                fields.append((propname, byteorder+_ply_types[type]))
+        return numpy.dtype(fields)
+
+    # unpack
+    def unpack(self, s, type, byteorder):
+        """Convert a single binary value.
+        """
+        dtype = numpy.dtype(byteorder+_ply_types[type])
+        if len(s)!=dtype.itemsize:
+            raise SyntaxError("premature end of file")
+        return int(numpy.frombuffer(s, dtype=dtype)[0])
+
+    # checkType
+    def checkType(self, type):
+        if type not in _ply_types:
+            raise SyntaxError("Unknown PLY type: %s"%type)
+
+
 
 # PLYImporter
 class PLYImporter:
@@ -73,7 +652,10 @@ class PLYImporter:
         self.includevar = includevar
         self.excludevar = excludevar
 
-        imp = _core.PLYReader()
+        if _has_numpy:
+            imp = PLYReader()
+        else:
+            imp = _core.PLYReader()
         imp.open(filename)
         # Obtain the header information
         header = imp.readHeader()
@@ -34,17 +34,32 @@
 # ***** END LICENSE BLOCK *****
 # $Id: riutil.py,v 1.1.1.1 2004/12/12 14:31:21 mbaas Exp $
 
-import os.path
+import os, os.path
+import struct
 import ctypes
 import cgtypes
 import rmanlibutil
-import _pointcloud
+try:
+    import _pointcloud
+except ImportError:
+    # The extension is only required by the PtcReader/PtcWriter classes
+    _pointcloud = None
 try:
     import numpy
     _numpy_available = True
 except ImportError:
     _numpy_available = False
 
+# The library name that selects the built-in point cloud format
+CGPTC_FORMAT = "cgptc"
+
+# Magic number and version of the built-in point cloud format
+_CGPTC_MAGIC = "CGKITPTC"
+_CGPTC_VERSION = 1
+# Header: magic, version, data offset, npoints, number of variables,
+# bbox, world2eye, world2ndc, format (followed by the variable types/names)
+_CGPTC_HEADER = "<8sIIQI6f16f16f3f"
+
 def _arrayPointer(a, n):
     """Check an array and return a pointer to its start.
     
@@ -86,6 +101,42 @@ def _arrayPointer(a, n):
     else:
         raise TypeError("Unknown array type")
 
+def _checkExtension():
+    """Raise an ImportError if the _pointcloud extension is not available.
+    """
+    if _pointcloud is None:
+        raise ImportError("The _pointcloud extension module is not available")
+
+def _varSize(type):
+    """Return the number of floats of a point cloud variable type.
+    """
+    if type=="float":
+        return 1
+    elif type in ["vector", "point", "normal", "color"]:
+        return 3
+    elif type=="matrix":
+        return 16
+    else:
+        raise RuntimeError("Unknown point cloud variable type: %s"%type)
+
+def _matrixValues(m):
+    """Return the 16 values of a matrix as a list of floats.
+    
+    m can be any object that contains 16 floats (the values may be nested).
+    """
+    if isinstance(m, cgtypes.mat4):
+        values = m.toList(rowmajor=True)
+    else:
+        values = []
+        for v in m:
+            try:
+                values.extend(list(v))
+            except:
+                values.append(v)
+        if len(values)!=16:
+            raise ValueError("Matrix must be composed of 16 values, got %s instead."%len(values))
+    return map(float, values)
+
 
 class PtcReader(object):
     """Point cloud reader class.
@@ -330,6 +381,7 @@ class PtcReader(object):
         num = min(numPoints, self._numPointsLeft)
         
         # Read the points
+        _checkExtension()
         self._numPointsLeft -= num
         _pointcloud.readDataPoints(ctypes.addressof(self._PtcReadDataPoint), self._handle, num,
                                    pntPtr, pntStride, normPtr, normStride, radPtr, radStride, dataPtr, dataStride)
@@ -489,18 +541,7 @@ class PtcWriter:
         
         m can be any object that contains 16 floats (the values may be nested).
         """
-        if isinstance(m, cgtypes.mat4):
-            values = m.toList(rowmajor=True)
-        else:
-            values = []
-            for v in m:
-                try:
-                    values.extend(list(v))
-                except:
-                    values.append(v)
-            if len(values)!=16:
-                raise ValueError("Matrix must be composed of 16 values, got %s instead."%len(values))
-        return (16*ctypes.c_float)(*values)
+        return (16*ctypes.c_float)(*_matrixValues(m))
         
     def __del__(self):
         self.close()
@@ -569,6 +610,7 @@ class PtcWriter:
             dataPtr = radPtr+sizeOfFloat
         
         # Write the points
+        _checkExtension()
         _pointcloud.writeDataPoints(ctypes.addressof(self._PtcWriteDataPoint), self._handle, numPoints,
                                     pntPtr, pntStride, normPtr, normStride, radPtr, radStride, dataPtr, dataStride)
 
@@ -603,12 +645,417 @@ class PtcWriter:
         return ptclib
 
 
+def _floatView(a, n):
+    """Return a flat float32 numpy view of a buffer.
+    
+    a is a ctypes float array or a contiguous numpy float32 array and n the
+    minimum number of values the array must contain. The returned array
+    shares the memory with a.
+    """
+    if isinstance(a, ctypes.Array):
+        if a._type_!=ctypes.c_float:
+            raise TypeError("Float array expected")
+        v = numpy.ctypeslib.as_array(a)
+    elif isinstance(a, numpy.ndarray):
+        if a.dtype!=numpy.float32:
+            raise TypeError("Unsupported array type (the array must contain 4-byte floats)")
+        if not a.flags.c_contiguous:
+            raise TypeError("Unsupported array type (strides are not supported)")
+        v = a.reshape(-1)
+    else:
+        raise TypeError("Unknown array type")
+    if v.size<n:
+        raise TypeError("Array is not large enough")
+    return v
+
+
+class CgPtcReader(PtcReader):
+    """Reader for the built-in point cloud format.
+    
+    The file is memory-mapped, the points, normals, radii and the extra
+    variables are available as numpy arrays via the attributes
+    :attr:`points`, :attr:`normals`, :attr:`radii` and the method
+    :meth:`variableData()`. Slicing these arrays only reads the
+    required part of the file.
+    
+    An instance of this class is returned by the open() function.
+    """
+    
+    def __init__(self, fileName):
+        """Constructor.
+        
+        fileName is the name of the point cloud file.
+        """
+        object.__init__(self)
+        
+        if not _numpy_available:
+            raise ImportError("numpy is required for reading %s point cloud files"%CGPTC_FORMAT)
+        
+        self._handle = None
+        self.name = fileName
+        
+        f = file(fileName, "rb")
+        try:
+            data = f.read(struct.calcsize(_CGPTC_HEADER))
+            if len(data)!=struct.calcsize(_CGPTC_HEADER) or not data.startswith(_CGPTC_MAGIC):
+                raise IOError("%s is not a %s point cloud file"%(fileName, CGPTC_FORMAT))
+            values = struct.unpack(_CGPTC_HEADER, data)
+            version,dataOffset,npoints,numVars = values[1:5]
+            if version>_CGPTC_VERSION:
+                raise IOError("Unsupported %s version in point cloud file %s: %s"%(CGPTC_FORMAT, fileName, version))
+            vars = []
+            for i in range(numVars):
+                vars.append((self._readString(f), self._readString(f)))
+        finally:
+            f.close()
+        
+        self._ptcAttrs = {}
+        self._ptcAttrs["variables"] = vars
+        self._ptcAttrs["npoints"] = npoints
+        self._ptcAttrs["datasize"] = sum([_varSize(type) for type,name in vars])
+        self._ptcAttrs["bbox"] = list(values[5:11])
+        self._ptcAttrs["world2eye"] = list(values[11:27])
+        self._ptcAttrs["world2ndc"] = list(values[27:43])
+        self._ptcAttrs["format"] = tuple(values[43:46])
+        
+        # Map the float columns (an empty file cannot be mapped)
+        numFloats = npoints*(7+self.datasize)
+        if numFloats>0:
+            self._handle = numpy.memmap(fileName, dtype="<f4", mode="r", offset=dataOffset, shape=(numFloats,))
+        else:
+            self._handle = numpy.zeros(0, dtype=numpy.float32)
+        
+        # Create the views on the individual columns
+        pos = 0
+        self._columns = []
+        for size in [3, 3, 1]+[_varSize(type) for type,name in vars]:
+            col = self._handle[pos:pos+npoints*size].reshape(npoints, size)
+            self._columns.append(col)
+            pos += npoints*size
+        
+        self._numPointsLeft = npoints
+    
+    def _readString(self, f):
+        """Read a string from the header.
+        """
+        data = f.read(2)
+        if len(data)!=2:
+            raise IOError("Premature end of file in point cloud file %s"%self.name)
+        n = struct.unpack("<H", data)[0]
+        s = f.read(n)
+        if len(s)!=n:
+            raise IOError("Premature end of file in point cloud file %s"%self.name)
+        return s
+
+    @property
+    def points(self):
+        """Return the point positions as a numpy array of shape (npoints, 3)."""
+        self._checkOpen()
+        return self._columns[0]
+
+    @property
+    def normals(self):
+        """Return the normals as a numpy array of shape (npoints, 3)."""
+        self._checkOpen()
+        return self._columns[1]
+
+    @property
+    def radii(self):
+        """Return the radii as a numpy array of shape (npoints,)."""
+        self._checkOpen()
+        return self._columns[2][:,0]
+    
+    def variableData(self, name):
+        """Return the values of an extra variable.
+        
+        Returns a numpy array of shape (npoints,) for float variables and
+        (npoints, n) for all other types (where n is 3 or 16).
+        A KeyError exception is thrown if there is no variable called *name*.
+        """
+        self._checkOpen()
+        for i,(type,varName) in enumerate(self.variables):
+            if varName==name:
+                col = self._columns[3+i]
+                if type=="float":
+                    col = col[:,0]
+                return col
+        raise KeyError("Point cloud file %s has no variable %s"%(self.name, name))
+    
+    def close(self):
+        """Close the point cloud file.
+        
+        Arrays that were obtained from the reader remain valid.
+        """
+        self._handle = None
+        self._columns = []
+    
+    def readDataPoint(self):
+        """Read the next data point.
+        
+        See :meth:`PtcReader.readDataPoint()`.
+        """
+        self._checkOpen()
+        if self._numPointsLeft==0:
+            raise EOFError("There are no more points left to read from point cloud file %s"%self.name)
+        
+        idx = self.npoints-self._numPointsLeft
+        self._numPointsLeft -= 1
+        dataDict = {}
+        for (type,name),col in zip(self.variables, self._columns[3:]):
+            if type=="float":
+                dataDict[name] = float(col[idx,0])
+            else:
+                dataDict[name] = tuple(map(float, col[idx]))
+        return (tuple(map(float, self._columns[0][idx])),
+                tuple(map(float, self._columns[1][idx])),
+                float(self._columns[2][idx,0]),
+                dataDict)
+    
+    def readDataPoints(self, numPoints, buffer):
+        """Read a sequence of data points.
+        
+        See :meth:`PtcReader.readDataPoints()`.
+        """
+        self._checkOpen()
+        if numPoints<=0:
+            return 0
+        
+        num = min(numPoints, self._numPointsLeft)
+        i = self.npoints-self._numPointsLeft
+        j = i+num
+        ds = self.datasize
+        
+        # Are there 4 individual buffers?
+        if type(buffer) is tuple:
+            if len(buffer)!=4:
+                raise ValueError("Expected four individual buffers, but got %s"%len(buffer))
+            pbuf,nbuf,rbuf,dbuf = buffer
+            pv = _floatView(pbuf, 3*numPoints)
+            nv = _floatView(nbuf, 3*numPoints)
+            rv = _floatView(rbuf, numPoints)
+            dv = _floatView(dbuf, ds*numPoints)
+            pv[:3*num] = self._columns[0][i:j].reshape(-1)
+            nv[:3*num] = self._columns[1][i:j].reshape(-1)
+            rv[:num] = self._columns[2][i:j,0]
+            if ds>0:
+                self._copyData(i, j, dv[:ds*num].reshape(num, ds))
+        # There is only one single buffer for all values
+        else:
+            stride = 7+ds
+            v = _floatView(buffer, stride*numPoints)[:stride*num].reshape(num, stride)
+            v[:,0:3] = self._columns[0][i:j]
+            v[:,3:6] = self._columns[1][i:j]
+            v[:,6] = self._columns[2][i:j,0]
+            self._copyData(i, j, v[:,7:])
+        
+        self._numPointsLeft -= num
+        return num
+    
+    def _copyData(self, i, j, out):
+        """Copy the extra variables of the points i to j-1 into out.
+        
+        out is an array of shape (j-i, datasize).
+        """
+        pos = 0
+        for col in self._columns[3:]:
+            size = col.shape[1]
+            out[:,pos:pos+size] = col[i:j]
+            pos += size
+    
+    def _checkOpen(self):
+        """Raise an IOError if the file has already been closed.
+        """
+        if self._handle is None:
+            raise IOError("The point cloud file has already been closed (%s)"%self.name)
+
+
+class CgPtcWriter(PtcWriter):
+    """Writer for the built-in point cloud format.
+    
+    The points are first written into a temporary file next to the output
+    file. The final file (which stores each value in a separate column) is
+    created when the writer is closed.
+    
+    An instance of this class is returned by the open() function.
+    """
+    
+    def __init__(self, fileName, vars, world2eye, world2ndc, format):
+        """Constructor.
+        
+        See :class:`PtcWriter` for a description of the arguments.
+        world2eye and world2ndc may be None in which case the identity
+        matrix is stored.
+        """
+        if not _numpy_available:
+            raise ImportError("numpy is required for writing %s point cloud files"%CGPTC_FORMAT)
+        
+        self._handle = None
+        self.name = fileName
+        
+        for type,name in vars:
+            _varSize(type)
+        if world2eye is None:
+            world2eye = cgtypes.mat4(1)
+        if world2ndc is None:
+            world2ndc = cgtypes.mat4(1)
+        
+        self._vars = list(vars)
+        self._world2eye = _matrixValues(world2eye)
+        self._world2ndc = _matrixValues(world2ndc)
+        xres,yres,aspect = format
+        self._format = (float(xres), float(yres), float(aspect))
+        self.datasize = sum([_varSize(type) for type,name in vars])
+        
+        # Points that have been written via writeDataPoint() but that haven't
+        # been written to the temporary file yet
+        self._pending = []
+        self._numPoints = 0
+        self._tmpName = fileName+".tmp"
+        self._handle = file(self._tmpName, "wb")
+    
+    def close(self):
+        """Close the point cloud file.
+        
+        This method is also called from the destructor.
+        """
+        if self._handle is None:
+            return
+        try:
+            self._flushPending()
+            self._handle.close()
+            self._handle = None
+            self._writeColumns()
+        finally:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            os.remove(self._tmpName)
+    
+    def writeDataPoint(self, point, normal, radius, data):
+        """Write a point into the point cloud file.
+        
+        See :meth:`PtcWriter.writeDataPoint()`.
+        """
+        if self._handle is None:
+            raise IOError("The point cloud file has already been closed.")
+        
+        row = list(point)[:3]+list(normal)[:3]+[radius]
+        for type,name in self._vars:
+            size = _varSize(type)
+            if type=="matrix":
+                value = data.get(name)
+                if value is None:
+                    value = 16*[0.0]
+                else:
+                    value = _matrixValues(value)
+            elif size==1:
+                value = [data.get(name, 0.0)]
+            else:
+                value = list(data.get(name, (0.0,0.0,0.0)))
+            row.extend(value)
+        self._pending.append(row)
+        if len(self._pending)>=10000:
+            self._flushPending()
+    
+    def writeDataPoints(self, numPoints, buffer):
+        """Write a sequence of data points.
+        
+        See :meth:`PtcWriter.writeDataPoints()`.
+        """
+        if self._handle is None:
+            raise IOError("The point cloud file has already been closed.")
+        if numPoints<=0:
+            return
+        self._flushPending()
+        
+        ds = self.datasize
+        stride = 7+ds
+        # Are there 4 individual buffers?
+        if type(buffer) is tuple:
+            if len(buffer)!=4:
+                raise ValueError("Expected four individual buffers, but got %s"%len(buffer))
+            pbuf,nbuf,rbuf,dbuf = buffer
+            rows = numpy.empty((numPoints, stride), dtype="<f4")
+            rows[:,0:3] = _floatView(pbuf, 3*numPoints)[:3*numPoints].reshape(numPoints, 3)
+            rows[:,3:6] = _floatView(nbuf, 3*numPoints)[:3*numPoints].reshape(numPoints, 3)
+            rows[:,6] = _floatView(rbuf, numPoints)[:numPoints]
+            if ds>0:
+                rows[:,7:] = _floatView(dbuf, ds*numPoints)[:ds*numPoints].reshape(numPoints, ds)
+        # There is only one single buffer for all values
+        else:
+            rows = _floatView(buffer, stride*numPoints)[:stride*numPoints].astype("<f4")
+        rows.tofile(self._handle)
+        self._numPoints += numPoints
+    
+    def _flushPending(self):
+        """Write the pending points into the temporary file.
+        """
+        if len(self._pending)>0:
+            numpy.array(self._pending, dtype="<f4").tofile(self._handle)
+            self._numPoints += len(self._pending)
+            self._pending = []
+    
+    def _writeColumns(self, chunkSize=1000000):
+        """Create the final file from the temporary file.
+        """
+        n = self._numPoints
+        stride = 7+self.datasize
+        if n>0:
+            rows = numpy.memmap(self._tmpName, dtype="<f4", mode="r", shape=(n, stride))
+        else:
+            rows = numpy.zeros((0, stride), dtype="<f4")
+        
+        # Compute the bounding box of the points
+        bmin = numpy.zeros(3)
+        bmax = numpy.zeros(3)
+        for i in range(0, n, chunkSize):
+            chunk = rows[i:i+chunkSize,0:3]
+            cmin = chunk.min(axis=0)
+            cmax = chunk.max(axis=0)
+            if i==0:
+                bmin,bmax = cmin,cmax
+            else:
+                bmin = numpy.minimum(bmin, cmin)
+                bmax = numpy.maximum(bmax, cmax)
+        
+        # Build the header
+        varData = ""
+        for type,name in self._vars:
+            varData += struct.pack("<H", len(type))+type+struct.pack("<H", len(name))+name
+        headerSize = struct.calcsize(_CGPTC_HEADER)+len(varData)
+        # The float data starts at a 64 byte boundary
+        dataOffset = (headerSize+63)&~63
+        header = struct.pack(_CGPTC_HEADER, _CGPTC_MAGIC, _CGPTC_VERSION, dataOffset, n, len(self._vars),
+                             *(list(bmin)+list(bmax)+self._world2eye+self._world2ndc+list(self._format)))
+        
+        f = file(self.name, "wb")
+        try:
+            f.write(header+varData+(dataOffset-headerSize)*"\0")
+            # Write the columns (point, normal, radius, variables)
+            columns = [(0,3), (3,6), (6,7)]
+            pos = 7
+            for type,name in self._vars:
+                size = _varSize(type)
+                columns.append((pos, pos+size))
+                pos += size
+            for a,b in columns:
+                for i in range(0, n, chunkSize):
+                    numpy.ascontiguousarray(rows[i:i+chunkSize,a:b]).tofile(f)
+        finally:
+            f.close()
+        del rows
+
+
 def open(fileName, mode="r", libName=None, **kwargs):
     """Open a point cloud file for reading or writing.
     
     *fileName* is the name of the point cloud file. *mode* is either ``"r"``
     for reading a file or ``"w"`` for writing a new point cloud file.
     *libName* is the library name that implements the point cloud API.
+    If *libName* is ``"cgptc"``, the built-in point cloud format is used
+    which doesn't require an external library (but requires :mod:`numpy`).
+    Files in this format are also recognized when they are opened for
+    reading without a library name.
     When mode is ``"w"``, the following additional keyword arguments must
     be present:
     
@@ -618,15 +1065,67 @@ def open(fileName, mode="r", libName=None, **kwargs):
     - ``format``: A tuple (*xres*, *yres*, *aspect*)
     
     Depending on the mode, the function either returns a :class:`PtcReader` or
-    :class:`PtcWriter` object.
+    :class:`PtcWriter` object (or a :class:`CgPtcReader` or :class:`CgPtcWriter`
+    object for the built-in format).
     """
     if mode=="r":
+        if libName is None and _isCgPtcFile(fileName):
+            libName = CGPTC_FORMAT
+        if libName==CGPTC_FORMAT:
+            return CgPtcReader(fileName, **kwargs)
         return PtcReader(fileName, libName, **kwargs)
     elif mode=="w":
+        if libName==CGPTC_FORMAT:
+            return CgPtcWriter(fileName, **kwargs)
         return PtcWriter(fileName, libName=libName, **kwargs)
     else:
         raise ValueError('Invalid file mode: "%s" (expected "r" or "w")'%mode)
 
+def convert(srcFileName, dstFileName, srcLibName=None, dstLibName=CGPTC_FORMAT, batchSize=10000):
+    """Convert a point cloud file into another format.
+    
+    *srcFileName* is the name of the point cloud file that is read using
+    the library *srcLibName*. *dstFileName* is the name of the output file
+    that is written using the library *dstLibName*. By default, the output
+    file is written in the built-in format. The points are copied in
+    batches of *batchSize* points. Returns the number of points that were
+    copied.
+    """
+    src = open(srcFileName, "r", srcLibName)
+    try:
+        world2eye = src.world2eye
+        if world2eye is None:
+            world2eye = cgtypes.mat4(1)
+        world2ndc = src.world2ndc
+        if world2ndc is None:
+            world2ndc = cgtypes.mat4(1)
+        format = src.format
+        if format is None:
+            format = (0, 0, 1)
+        dst = open(dstFileName, "w", dstLibName, vars=src.variables,
+                   world2eye=world2eye, world2ndc=world2ndc, format=format)
+        try:
+            num = src.npoints
+            for buffer in src.iterBatches(batchSize, numpyArray=_numpy_available):
+                dst.writeDataPoints(min(batchSize, num), buffer)
+                num -= batchSize
+        finally:
+            dst.close()
+        return src.npoints
+    finally:
+        src.close()
+
+def _isCgPtcFile(fileName):
+    """Check if a file is stored in the built-in point cloud format.
+    """
+    try:
+        f = file(fileName, "rb")
+    except IOError:
+        return False
+    magic = f.read(len(_CGPTC_MAGIC))
+    f.close()
+    return magic==_CGPTC_MAGIC
+
 ###################################################################
 
 if __name__=="__main__":
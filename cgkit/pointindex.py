@@ -0,0 +1,319 @@
+# ***** BEGIN LICENSE BLOCK *****
+# Version: MPL 1.1/GPL 2.0/LGPL 2.1
+#
+# The contents of this file are subject to the Mozilla Public License Version
+# 1.1 (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+# http://www.mozilla.org/MPL/
+#
+# Software distributed under the License is distributed on an "AS IS" basis,
+# WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License
+# for the specific language governing rights and limitations under the
+# License.
+#
+# The Original Code is the Python Computer Graphics Kit.
+#
+# The Initial Developer of the Original Code is Matthias Baas.
+# Portions created by the Initial Developer are Copyright (C) 2009
+# the Initial Developer. All Rights Reserved.
+#
+# Contributor(s):
+#
+# Alternatively, the contents of this file may be used under the terms of
+# either the GNU General Public License Version 2 or later (the "GPL"), or
+# the GNU Lesser General Public License Version 2.1 or later (the "LGPL"),
+# in which case the provisions of the GPL or the LGPL are applicable instead
+# of those above. If you wish to allow use of your version of this file only
+# under the terms of either the GPL or the LGPL, and not to allow others to
+# use your version of this file under the terms of the MPL, indicate your
+# decision by deleting the provisions above and replace them with the notice
+# and other provisions required by the GPL or the LGPL. If you do not delete
+# the provisions above, a recipient may use your version of this file under
+# the terms of any one of the MPL, the GPL or the LGPL.
+#
+# ***** END LICENSE BLOCK *****
+
+"""Spatial index for point clouds.
+
+This module contains the PointIndex class which stores points in a
+k-d tree to answer radius and k-nearest-neighbor queries.
+"""
+
+import numpy
+
+
+class PointIndex(object):
+    """k-d tree over a set of 3D points.
+    
+    The tree is built from a numpy array and supports radius queries and
+    k-nearest-neighbor queries. The batched versions of the queries process
+    an entire array of query points at once which is considerably faster
+    than issuing individual queries from Python.
+    
+    All query methods return point indices that refer to the order of the
+    points that were passed to the constructor.
+    """
+    
+    def __init__(self, points, leafSize=16):
+        """Constructor.
+        
+        *points* is either an array-like object of shape (*n*, 3) (such as
+        the :attr:`points<cgkit.pointcloud.CgPtcReader.points>` attribute of
+        a point cloud reader) or a point cloud reader object whose points
+        will be read. *leafSize* is the maximum number of points stored in
+        a leaf of the tree.
+        """
+        object.__init__(self)
+        
+        if hasattr(points, "iterBatches"):
+            points = _readPoints(points)
+        pts = numpy.asarray(points, dtype=numpy.float64)
+        if pts.ndim!=2 or pts.shape[1]!=3:
+            raise ValueError("Expected an array of shape (n,3), got %s"%(pts.shape,))
+        if leafSize<1:
+            raise ValueError("Invalid leaf size: %s"%leafSize)
+        
+        n = len(pts)
+        perm = numpy.arange(n)
+        
+        # Node attributes (a node covers the points perm[start:end])
+        starts = []
+        ends = []
+        lefts = []
+        rights = []
+        bmins = []
+        bmaxs = []
+        
+        # Build the tree (the stack contains (nodeIndex, start, end) tuples)
+        starts.append(0)
+        ends.append(n)
+        lefts.append(-1)
+        rights.append(-1)
+        bmins.append(None)
+        bmaxs.append(None)
+        stack = [(0, 0, n)]
+        while len(stack)>0:
+            node,start,end = stack.pop()
+            nodePts = pts[perm[start:end]]
+            if end>start:
+                bmin = nodePts.min(axis=0)
+                bmax = nodePts.max(axis=0)
+            else:
+                bmin = numpy.zeros(3)
+                bmax = numpy.zeros(3)
+            bmins[node] = bmin
+            bmaxs[node] = bmax
+            if end-start<=leafSize:
+                continue
+            # Split along the largest extent at the median
+            dim = numpy.argmax(bmax-bmin)
+            mid = (start+end)//2
+            order = numpy.argpartition(nodePts[:,dim], mid-start)
+            perm[start:end] = perm[start:end][order]
+            for a,b in [(start,mid), (mid,end)]:
+                child = len(starts)
+                starts.append(a)
+                ends.append(b)
+                lefts.append(-1)
+                rights.append(-1)
+                bmins.append(None)
+                bmaxs.append(None)
+                stack.append((child, a, b))
+            lefts[node] = len(starts)-2
+            rights[node] = len(starts)-1
+        
+        self._numPoints = n
+        self._perm = perm
+        # The points in tree order (so that the points of a node are contiguous)
+        self._points = pts[perm]
+        self._starts = starts
+        self._ends = ends
+        self._lefts = lefts
+        self._rights = rights
+        self._leftArray = numpy.array(lefts)
+        self._rightArray = numpy.array(rights)
+        self._bmin = numpy.array(bmins)
+        self._bmax = numpy.array(bmaxs)
+    
+    def __len__(self):
+        return self._numPoints
+    
+    def radiusQuery(self, point, radius):
+        """Return the indices of all points within a given distance.
+        
+        *point* is the query point and *radius* the maximum distance.
+        Returns an array of point indices (in no particular order).
+        """
+        return self.radiusQueries([point], radius)[0]
+    
+    def radiusQueries(self, points, radius):
+        """Batched version of :meth:`radiusQuery()`.
+        
+        *points* is an array-like object of shape (*m*, 3) containing the
+        query points. *radius* is either a single value or an array of *m*
+        values. Returns a list of *m* index arrays.
+        """
+        q = self._queryPoints(points)
+        m = len(q)
+        r2 = numpy.empty(m)
+        r2[:] = numpy.asarray(radius, dtype=numpy.float64)**2
+        
+        qIdxs = []
+        pIdxs = []
+        for node,qi in self._traverse(q, lambda qi: r2[qi]):
+            start = self._starts[node]
+            d2 = self._distances2(q[qi], start, self._ends[node])
+            qq,pp = numpy.nonzero(d2<=r2[qi,numpy.newaxis])
+            qIdxs.append(qi[qq])
+            pIdxs.append(self._perm[start+pp])
+        
+        if len(qIdxs)==0:
+            return [numpy.zeros(0, dtype=int) for i in range(m)]
+        qIdxs = numpy.concatenate(qIdxs)
+        pIdxs = numpy.concatenate(pIdxs)
+        order = numpy.argsort(qIdxs, kind="mergesort")
+        bounds = numpy.searchsorted(qIdxs[order], numpy.arange(m+1))
+        pIdxs = pIdxs[order]
+        return [pIdxs[bounds[i]:bounds[i+1]] for i in range(m)]
+    
+    def knnQuery(self, point, k):
+        """Return the k nearest neighbors of a point.
+        
+        *point* is the query point and *k* the number of neighbors.
+        Returns a tuple (*indices*, *distances*) containing the point indices
+        and their distances sorted by increasing distance. If the index
+        contains less than *k* points, all points are returned.
+        """
+        indices,distances = self.knnQueries([point], k)
+        return indices[0], distances[0]
+    
+    def knnQueries(self, points, k):
+        """Batched version of :meth:`knnQuery()`.
+        
+        *points* is an array-like object of shape (*m*, 3) containing the
+        query points. Returns a tuple (*indices*, *distances*) where each
+        item is an array of shape (*m*, *k*). Each row is sorted by
+        increasing distance.
+        """
+        q = self._queryPoints(points)
+        m = len(q)
+        k = min(int(k), self._numPoints)
+        if k<1:
+            return numpy.zeros((m,0), dtype=int), numpy.zeros((m,0))
+        
+        # The current k best candidates for each query point (unsorted)
+        bestD2 = numpy.empty((m,k))
+        bestD2.fill(numpy.inf)
+        bestIdx = numpy.zeros((m,k), dtype=int)
+        # The largest distance among the current candidates
+        bound = numpy.empty(m)
+        bound.fill(numpy.inf)
+        
+        # Start with the leaves that contain the query points to obtain a
+        # good initial bound (this makes the traversal prune most nodes)
+        homeLeaves = self._findLeaves(q)
+        for leaf in numpy.unique(homeLeaves):
+            qi = numpy.nonzero(homeLeaves==leaf)[0]
+            self._updateKnn(q, qi, leaf, k, bestD2, bestIdx, bound)
+        
+        for node,qi in self._traverse(q, lambda qi: bound[qi]):
+            qi = qi[homeLeaves[qi]!=node]
+            if len(qi)>0:
+                self._updateKnn(q, qi, node, k, bestD2, bestIdx, bound)
+        
+        # Sort the results
+        order = numpy.argsort(bestD2, axis=1)
+        rows = numpy.arange(m)[:,numpy.newaxis]
+        return self._perm[bestIdx[rows,order]], numpy.sqrt(bestD2[rows,order])
+    
+    def _updateKnn(self, q, qi, leaf, k, bestD2, bestIdx, bound):
+        """Merge the points of a leaf into the current kNN candidates.
+        """
+        start = self._starts[leaf]
+        d2 = numpy.concatenate((bestD2[qi], self._distances2(q[qi], start, self._ends[leaf])), axis=1)
+        nLeaf = self._ends[leaf]-start
+        idx = numpy.concatenate((bestIdx[qi], numpy.tile(numpy.arange(start, start+nLeaf), (len(qi),1))), axis=1)
+        sel = numpy.argpartition(d2, k-1, axis=1)[:,:k]
+        rows = numpy.arange(len(qi))[:,numpy.newaxis]
+        bestD2[qi] = d2[rows,sel]
+        bestIdx[qi] = idx[rows,sel]
+        bound[qi] = bestD2[qi].max(axis=1)
+    
+    def _traverse(self, q, boundFunc):
+        """Traverse the tree for a set of query points.
+        
+        q is the (m,3) array of query points and boundFunc a function that
+        takes an array of query indices and returns the current squared
+        search radii of these queries. Yields tuples (leaf, qi) where qi
+        is the array of query indices whose search sphere intersects
+        the leaf. The bound is evaluated lazily, so it may shrink during
+        the traversal.
+        """
+        stack = [(0, numpy.arange(len(q)))]
+        while len(stack)>0:
+            node,qi = stack.pop()
+            # Squared distance between the query points and the node box
+            d = numpy.maximum(self._bmin[node]-q[qi], 0)+numpy.maximum(q[qi]-self._bmax[node], 0)
+            d2 = (d*d).sum(axis=1)
+            qi = qi[d2<=boundFunc(qi)]
+            if len(qi)==0 or self._ends[node]==self._starts[node]:
+                continue
+            if self._lefts[node]==-1:
+                yield node,qi
+            else:
+                stack.append((self._rights[node], qi))
+                stack.append((self._lefts[node], qi))
+    
+    def _findLeaves(self, q):
+        """Return the leaves that contain the query points.
+        
+        Returns an array with one leaf index per query point.
+        """
+        nodes = numpy.zeros(len(q), dtype=int)
+        lefts = self._leftArray
+        rights = self._rightArray
+        active = numpy.nonzero(lefts[nodes]!=-1)[0]
+        while len(active)>0:
+            node = nodes[active]
+            left = lefts[node]
+            right = rights[node]
+            # Descend into the child whose box is closer
+            dl = (numpy.maximum(self._bmin[left]-q[active], 0)+numpy.maximum(q[active]-self._bmax[left], 0))
+            dr = (numpy.maximum(self._bmin[right]-q[active], 0)+numpy.maximum(q[active]-self._bmax[right], 0))
+            useLeft = (dl*dl).sum(axis=1)<=(dr*dr).sum(axis=1)
+            nodes[active] = numpy.where(useLeft, left, right)
+            active = active[lefts[nodes[active]]!=-1]
+        return nodes
+    
+    def _distances2(self, q, start, end):
+        """Return the squared distances between query points and tree points.
+        
+        Returns an array of shape (len(q), end-start).
+        """
+        diff = q[:,numpy.newaxis,:]-self._points[numpy.newaxis,start:end,:]
+        return (diff*diff).sum(axis=2)
+    
+    def _queryPoints(self, points):
+        """Convert query points into a float array of shape (m,3).
+        """
+        q = numpy.asarray(points, dtype=numpy.float64)
+        if q.ndim==1:
+            q = q.reshape(1, -1)
+        if q.ndim!=2 or q.shape[1]!=3:
+            raise ValueError("Expected query points of shape (m,3), got %s"%(q.shape,))
+        return q
+
+
+def _readPoints(reader, batchSize=100000):
+    """Read the point positions from a point cloud reader.
+    
+    Returns an array of shape (npoints, 3).
+    """
+    if hasattr(reader, "points"):
+        return reader.points
+    res = numpy.empty((reader.npoints, 3), dtype=numpy.float32)
+    pos = 0
+    for pnts,norms,rads,data in reader.iterBatches(batchSize, numpyArray=True):
+        res[pos:pos+len(rads)] = pnts
+        pos += len(rads)
+    return res
@@ -72,11 +72,16 @@ For more details on using the module see the cgkit manual at
 http://cgkit.sourceforge.net/
 """
 
-import sys, types, time, os, os.path, getpass, inspect, gzip
+import sys, types, time, os, os.path, getpass, inspect, gzip, re, struct
 try:
     from _core import vec3 as _vec3
 except:
     from cgtypes import vec3 as _vec3
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
 
 ########################### Constants #############################
 
@@ -222,6 +227,9 @@ RI_HANDLEID     = "__handleid"
 # Tokens specific to the cgkit binding...
 RI_RIBOUTPUT    = "_riboutput"
 RI_VERSION      = "_version"
+RI_PRECISION    = "_precision"
+RI_ENCODING     = "_encoding"
+RI_COMPRESSION  = "_compression"
 
 # Error handling: severity levels
 RIE_INFO        = 0
@@ -282,19 +290,32 @@ class RIBStream:
     any "real" Ri calls are made. Output from RiArchiveRecord() will
     be placed before the version number. (Note: The version line is disabled
     for now).
+
+    The data is collected in an internal buffer and only passed on to
+    the actual output stream when the buffer exceeds bufsize bytes or
+    when flush() is called. precision is the number of significant
+    digits that are used for floats in arrays (None means the floats
+    are converted using str()).
     """
     
-    def __init__(self, outstream):
+    def __init__(self, outstream, bufsize=65536):
         self.out = outstream
         self.output_version = 1
+        self.precision = None
+        self.bufsize = bufsize
+        # The buffered strings and their total size
+        self._buffer = []
+        self._buffered = 0
 
     def close(self):
         """Close the stream, unless it's stdout."""
+        self._flushBuffer()
         if self.out!=sys.stdout:
             self.out.close()
 
     def flush(self):
         """Flush the internal buffer."""
+        self._flushBuffer()
         self.out.flush()
 
     def write(self, data):
@@ -304,7 +325,10 @@ class RIBStream:
             # might not be accurate anyway.
 #            self.out.write('version 3.03\n')
             self.output_version = 0
-        self.out.write(data)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered>=self.bufsize:
+            self._flushBuffer()
 
     def writeArchiveRecord(self, data):
         """Same as write() but suppresses the version number.
@@ -312,9 +336,149 @@ class RIBStream:
         This method is used by RiArchiveRecord(), everyone else uses
         write().
         """
-        self.out.write(data)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered>=self.bufsize:
+            self._flushBuffer()
+
+    def _flushBuffer(self):
+        """Pass the buffered data on to the output stream."""
+        if len(self._buffer)>0:
+            self.out.write("".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
         
 
+class BinaryRIBStream(RIBStream):
+    """Output stream that produces binary encoded RIB.
+
+    The Ri functions pass the request names and their values to
+    writeRequest(), writeString(), writeNumber() and writeArray() which
+    write them in their binary encoding. Request names and strings are
+    defined once and are later only referenced by their code. Float
+    arrays are written as blocks of single precision IEEE floats.
+    Data passed to write() (such as the output from RiArchiveRecord())
+    is written unmodified.
+    """
+
+    def __init__(self, outstream, bufsize=65536):
+        RIBStream.__init__(self, outstream, bufsize)
+        # Key: Request name - Value: Encoded request
+        self._requests = {}
+        # Key: String - Value: Encoded string reference
+        self._strings = {}
+
+    def writeRequest(self, name):
+        """Write a request name."""
+        self.write(self._encodeRequest(name))
+
+    def writeString(self, s):
+        """Write a string.
+
+        s is the string as it would appear between the apostrophes in
+        ASCII RIB, so escaped characters are resolved.
+        """
+        self.write(self._encodeString(_ribescape.sub(r"\1", s)))
+
+    def writeNumber(self, v):
+        """Write a single int or float."""
+        if _valuekind(type(v))=="i":
+            self.write(_encodeInt(int(v)))
+        else:
+            self.write("\244"+struct.pack(">f", float(v)))
+
+    def writeArray(self, seq):
+        """Write a sequence as a RIB array.
+
+        Sequences that contain only ints are written as encoded ints,
+        sequences with ints and floats as float array and sequences
+        with only strings as array of encoded strings. Any other
+        sequence is written in ASCII.
+        """
+        # NumPy float array? Then convert all values at once
+        if _has_numpy and isinstance(seq, numpy.ndarray) and seq.dtype.kind=="f":
+            self._writeFloatArray(seq.size, [seq.astype(">f4").tostring()])
+            return
+
+        chunks = list(_iterchunks(seq))
+        kinds = set()
+        for values,fmt in chunks:
+            kinds.update(map(_valuekind, set(map(type, values))))
+
+        if kinds.issubset(["i"]):
+            self.write("[")
+            for values,fmt in chunks:
+                self.write(_encodeInts(values))
+            self.write("]")
+        elif kinds==set(["s"]):
+            self.write("[")
+            for values,fmt in chunks:
+                for v in values:
+                    self.writeString(v[1:-1])
+            self.write("]")
+        elif kinds.issubset(["i", "f"]):
+            n = sum(map(lambda chunk: len(chunk[0]), chunks))
+            self._writeFloatArray(n, map(lambda chunk: struct.pack(">%df"%len(chunk[0]), *chunk[0]), chunks))
+        else:
+            self.write("[%s]"%" ".join(map(lambda chunk: _formatvalues(*chunk), chunks)))
+
+    def _writeFloatArray(self, n, blocks):
+        """Write a float array.
+
+        n is the number of floats and blocks is a list of strings
+        containing the packed floats.
+        """
+        if n<0x100:
+            header = "\310"+chr(n)
+        elif n<0x10000:
+            header = "\311"+struct.pack(">H", n)
+        elif n<0x1000000:
+            header = "\312"+struct.pack(">I", n)[1:]
+        else:
+            header = "\313"+struct.pack(">I", n)
+        self.write(header)
+        for block in blocks:
+            self.write(block)
+
+    def _encodeRequest(self, name):
+        """Return the encoded request name.
+
+        The request is defined the first time it is used.
+        """
+        code = self._requests.get(name, None)
+        if code is None:
+            n = len(self._requests)
+            # No more request codes available? Then use ASCII
+            if n>=0x100:
+                return name+" "
+            code = "\246"+chr(n)
+            self._requests[name] = code
+            return "\314"+chr(n)+_encodeStringValue(name)+code
+        return code
+
+    def _encodeString(self, s):
+        """Return the encoded string.
+
+        The string is defined the first time it is used.
+        """
+        ref = self._strings.get(s, None)
+        if ref is None:
+            n = len(self._strings)
+            if n<0x100:
+                token = chr(n)
+                ref = "\317"+token
+                define = "\315"
+            elif n<0x10000:
+                token = struct.pack(">H", n)
+                ref = "\320"+token
+                define = "\316"
+            else:
+                # No more string tokens available
+                return _encodeStringValue(s)
+            self._strings[s] = ref
+            return define+token+_encodeStringValue(s)+ref
+        return ref
+
 ###################### Standard error handlers #######################
 
 def RiErrorIgnore(code, severity, message):
@@ -398,15 +562,15 @@ def RiErrorHandler(handler):
     _errorhandler = handler
 
     if handler==RiErrorIgnore:
-        _ribout.write('ErrorHandler "ignore"\n')
+        _writeRequest("ErrorHandler", ["ignore"])
     elif handler==RiErrorPrint:
-        _ribout.write('ErrorHandler "print"\n')
+        _writeRequest("ErrorHandler", ["print"])
     elif handler==RiErrorAbort:
-        _ribout.write('ErrorHandler "abort"\n')
+        _writeRequest("ErrorHandler", ["abort"])
 
 
 # RiBegin
-def RiBegin(name):
+def RiBegin(name, *paramlist, **keyparams):
     """Starts the main block using a particular rendering method.
     
     The default renderer is selected by passing RI_NULL as name.
@@ -416,14 +580,29 @@ def RiBegin(name):
     external renderer (e.g. "rendrib" (BMRT), "rgl" (BMRT), "aqsis" (Aqsis),
     "renderdl" (3Delight),...) which is started and fed with the data.
 
+    The parameter list may contain the cgkit specific tokens RI_ENCODING
+    ("ascii" or "binary") and RI_COMPRESSION (None or "gzip") which select
+    the RIB encoding and whether RIB files are gzip compressed (files with
+    the extension ".gz" are always compressed).
+
     Example: RiBegin(RI_NULL)
              ...
              RiEnd()
+
+             RiBegin("scene.rib", RI_ENCODING, "binary", RI_COMPRESSION, "gzip")
     """
-    global _ribout, _colorsamples, _lighthandle, _errorhandler
+    global _ribout, _colorsamples, _lighthandle, _objecthandle, _errorhandler
     global _insideframe, _insideworld, _insideobject, _insidesolid
     global _insidemotion, _declarations
 
+    keyparams = _paramlist2lut(paramlist, keyparams)
+    encoding = keyparams.get(RI_ENCODING, "ascii")
+    compression = keyparams.get(RI_COMPRESSION, None)
+    if encoding not in ["ascii", "binary"]:
+        raise ValueError('Invalid RIB encoding: "%s"'%encoding)
+    if compression not in [None, "gzip"]:
+        raise ValueError('Invalid RIB compression: "%s"'%compression)
+
     _create_new_context()
 
     # Determine where the output should be directed to...
@@ -433,20 +612,27 @@ def RiBegin(name):
     else:
         root, ext = os.path.splitext(name)
         ext=ext.lower()
-        if ext==".rib":
-            # -> file (rib)
-            outstream = open(name,"w")
-        elif ext==".gz":
+        if ext==".gz" or (ext==".rib" and compression=="gzip"):
             outstream = gzip.open(name,"wb")
+        elif ext==".rib":
+            # -> file (rib)
+            if encoding=="binary":
+                outstream = open(name,"wb")
+            else:
+                outstream = open(name,"w")
         else:
             # -> pipe
             outstream = os.popen(name,"w")
 
-    _ribout = RIBStream(outstream)
+    if encoding=="binary":
+        _ribout = BinaryRIBStream(outstream)
+    else:
+        _ribout = RIBStream(outstream)
 
     # Initialize internal variables
     _colorsamples = 3
     _lighthandle  = 0
+    _objecthandle = 0
     _errorhandler = RiErrorPrint
     _insideframe  = 0
     _insideworld  = 0
@@ -484,7 +670,7 @@ def RiWorldBegin():
     if _insideworld:
         _error(RIE_ILLSTATE, RIE_ERROR, "World blocks cannot be nested.")
     
-    _ribout.write("WorldBegin\n")
+    _writeRequest("WorldBegin")
     _insideworld = 1
 
 # RiWorldEnd
@@ -493,7 +679,7 @@ def RiWorldEnd():
 
     global _insideworld
     
-    _ribout.write("WorldEnd\n")
+    _writeRequest("WorldEnd")
     _insideworld = 0
 
 # RiOption
@@ -511,9 +697,13 @@ def RiOption(name, *paramlist, **keyparams):
             # Disable the "version" call in the RIB stream...
             if hasattr(_ribout, "output_version"):
                 _ribout.output_version = 0
+        # Set the number of significant digits for floats in arrays...
+        if RI_PRECISION in keyparams:
+            if hasattr(_ribout, "precision"):
+                _ribout.precision = keyparams[RI_PRECISION] or None
         return
             
-    _ribout.write('Option "'+name+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Option", [name], paramlist, keyparams)
 
 # RiAttribute
 def RiAttribute(name, *paramlist, **keyparams):
@@ -522,7 +712,7 @@ def RiAttribute(name, *paramlist, **keyparams):
     Example: RiAttribute("displacementbound", "sphere", 0.5)
     """
     
-    _ribout.write('Attribute "'+name+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Attribute", [name], paramlist, keyparams)
 
 # RiAttributeBegin
 def RiAttributeBegin():
@@ -533,13 +723,13 @@ def RiAttributeBegin():
              RiAttributeEnd()
     """
     
-    _ribout.write("AttributeBegin\n")
+    _writeRequest("AttributeBegin")
 
 # RiAttributeEnd
 def RiAttributeEnd():
     """Pops the current set of attributes from the attribute stack."""
 
-    _ribout.write("AttributeEnd\n")
+    _writeRequest("AttributeEnd")
 
 # RiTransformBegin
 def RiTransformBegin():
@@ -550,13 +740,13 @@ def RiTransformBegin():
              RiTransformEnd()
     """
     
-    _ribout.write("TransformBegin\n")
+    _writeRequest("TransformBegin")
 
 # RiTransformEnd
 def RiTransformEnd():
     """Pop the current transformation from the stack."""
 
-    _ribout.write("TransformEnd\n")
+    _writeRequest("TransformEnd")
 
 # RiFrameBegin
 def RiFrameBegin(number):
@@ -572,7 +762,7 @@ def RiFrameBegin(number):
     if _insideframe:
         _error(RIE_ILLSTATE, RIE_ERROR, "Frame blocks cannot be nested.")
             
-    _ribout.write("FrameBegin %d\n"%number)
+    _writeRequest("FrameBegin", [int(number)])
     _insideframe = 1
     
 
@@ -582,7 +772,7 @@ def RiFrameEnd():
     
     global _insideframe
     
-    _ribout.write("FrameEnd\n")
+    _writeRequest("FrameEnd")
     _insideframe = 0
 
 # RiHider
@@ -593,7 +783,7 @@ def RiHider(type, *paramlist, **keyparams):
     """
     
     if type==RI_NULL: type="null"
-    _ribout.write('Hider "'+type+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Hider", [type], paramlist, keyparams)
 
 # RiSphere
 def RiSphere(radius,zmin,zmax,thetamax,*paramlist, **keyparams):
@@ -607,8 +797,7 @@ def RiSphere(radius,zmin,zmax,thetamax,*paramlist, **keyparams):
     Example: RiSphere(1.0, -1.0, 1.0, 360)
     """
 
-    _ribout.write('Sphere %s %s %s %s'%(radius, zmin, zmax, thetamax)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Sphere", [radius, zmin, zmax, thetamax], paramlist, keyparams)
 
 # RiCone
 def RiCone(height, radius, thetamax, *paramlist, **keyparams):
@@ -622,8 +811,7 @@ def RiCone(height, radius, thetamax, *paramlist, **keyparams):
     Example: RiCone(1.5, 0.7, 360)
     """
 
-    _ribout.write('Cone %s %s %s'%(height, radius, thetamax)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Cone", [height, radius, thetamax], paramlist, keyparams)
 
 # RiDisk
 def RiDisk(height, radius, thetamax, *paramlist, **keyparams):
@@ -636,8 +824,7 @@ def RiDisk(height, radius, thetamax, *paramlist, **keyparams):
 
     Example: RiDisk(0.0, 1.0, 360)"""
 
-    _ribout.write('Disk %s %s %s'%(height, radius, thetamax)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Disk", [height, radius, thetamax], paramlist, keyparams)
 
 # RiCylinder
 def RiCylinder(radius,zmin,zmax,thetamax,*paramlist, **keyparams):
@@ -651,8 +838,7 @@ def RiCylinder(radius,zmin,zmax,thetamax,*paramlist, **keyparams):
     Example: RiCylinder(1.5, 0.0, 1.0, 360)
     """
 
-    _ribout.write('Cylinder %s %s %s %s'%(radius, zmin, zmax, thetamax)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Cylinder", [radius, zmin, zmax, thetamax], paramlist, keyparams)
 
 # RiTorus
 def RiTorus(major, minor, phimin, phimax, thetamax, *paramlist, **keyparams):
@@ -666,8 +852,7 @@ def RiTorus(major, minor, phimin, phimax, thetamax, *paramlist, **keyparams):
     Example: RiTorus(1.5, 0.1, 0, 360, 360)
     """
 
-    _ribout.write('Torus %s %s %s %s %s'%(major, minor, phimin, phimax, thetamax)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Torus", [major, minor, phimin, phimax, thetamax], paramlist, keyparams)
 
 # RiHyperboloid
 def RiHyperboloid(point1, point2, thetamax, *paramlist, **keyparams):
@@ -676,9 +861,9 @@ def RiHyperboloid(point1, point2, thetamax, *paramlist, **keyparams):
     Example: RiHyperboloid([1,0,0],[1,1,1],360)
     """
 
-    p1 = _seq2list(point1, 3)
-    p2 = _seq2list(point2, 3)
-    _ribout.write('Hyperboloid %s %s %s%s\n'%(p1[1:-1], p2[1:-1], thetamax, _paramlist2string(paramlist, keyparams)))
+    _checkseq(point1, 3)
+    _checkseq(point2, 3)
+    _writeRequest("Hyperboloid", [_InlineSeq(point1), _InlineSeq(point2), thetamax], paramlist, keyparams)
 
 # RiParaboloid
 def RiParaboloid(rmax, zmin, zmax, thetamax, *paramlist, **keyparams):
@@ -692,8 +877,7 @@ def RiParaboloid(rmax, zmin, zmax, thetamax, *paramlist, **keyparams):
     Example: RiParaboloid(1.0, 0.0, 1.0, 360)
     """
 
-    _ribout.write('Paraboloid %s %s %s %s'%(rmax, zmin, zmax, thetamax)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Paraboloid", [rmax, zmin, zmax, thetamax], paramlist, keyparams)
 
 # RiPolygon
 def RiPolygon(*paramlist, **keyparams):
@@ -709,7 +893,7 @@ def RiPolygon(*paramlist, **keyparams):
     Example: RiPolygon(P=[0,1,0, 0,1,1, 0,0,1, 0,0,0])
     """
 
-    _ribout.write('Polygon'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Polygon", [], paramlist, keyparams)
 
 # RiGeneralPolygon
 def RiGeneralPolygon(nverts, *paramlist, **keyparams):
@@ -724,8 +908,7 @@ def RiGeneralPolygon(nverts, *paramlist, **keyparams):
                                         0,0.25,0.5, 0,0.75,0.75, 0,0.75,0.25])
     """
 
-    _ribout.write('GeneralPolygon '+_seq2list(nverts)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("GeneralPolygon", [nverts], paramlist, keyparams)
 
 # RiPointsPolygons
 def RiPointsPolygons(nverts, vertids, *paramlist, **keyparams):
@@ -743,9 +926,7 @@ def RiPointsPolygons(nverts, vertids, *paramlist, **keyparams):
     (*) max(vertids)+1
     """
 
-    _ribout.write('PointsPolygons '+_seq2list(nverts)+' '+ \
-                 _seq2list(vertids)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("PointsPolygons", [nverts, vertids], paramlist, keyparams)
 
 # RiPointsGeneralPolygons
 def RiPointsGeneralPolygons(nloops, nverts, vertids, *paramlist, **keyparams):
@@ -764,9 +945,7 @@ def RiPointsGeneralPolygons(nloops, nverts, vertids, *paramlist, **keyparams):
     (*) max(vertids)+1
     """
 
-    _ribout.write('PointsGeneralPolygons '+_seq2list(nloops)+' '+ \
-                 _seq2list(nverts)+' '+_seq2list(vertids)+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("PointsGeneralPolygons", [nloops, nverts, vertids], paramlist, keyparams)
 
 
 # Predefined basis matrices
@@ -793,17 +972,12 @@ def RiBasis(ubasis, ustep, vbasis, vstep):
                      RiHermiteBasis, RI_HERMITESTEP)
     """
 
-    if type(ubasis)==types.StringType:
-        ubasis = '"'+ubasis+'"'
-    else:
-        ubasis = _seq2list(ubasis, 16)
-        
-    if type(vbasis)==types.StringType:
-        vbasis = '"'+vbasis+'"'
-    else:
-        vbasis = _seq2list(vbasis, 16)
+    if type(ubasis)!=types.StringType:
+        _checkseq(ubasis, 16)
+    if type(vbasis)!=types.StringType:
+        _checkseq(vbasis, 16)
         
-    _ribout.write('Basis '+ubasis+' '+str(ustep)+' '+vbasis+' '+str(vstep)+"\n")
+    _writeRequest("Basis", [ubasis, ustep, vbasis, vstep])
 
 # RiPatch
 def RiPatch(type, *paramlist, **keyparams):
@@ -819,7 +993,7 @@ def RiPatch(type, *paramlist, **keyparams):
     Example: RiPatch(RI_BILINEAR, P=[0,0,0, 1,0,0, 0,1,0, 1,1,0])
     """
 
-    _ribout.write('Patch "'+type+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Patch", [type], paramlist, keyparams)
 
 # RiPatchMesh
 def RiPatchMesh(type, nu, uwrap, nv, vwrap, *paramlist, **keyparams):
@@ -836,9 +1010,7 @@ def RiPatchMesh(type, nu, uwrap, nv, vwrap, *paramlist, **keyparams):
 
     """
 
-    _ribout.write('PatchMesh "'+type+'" '+str(nu)+' "'+uwrap+'" '+\
-                 str(nv)+' "'+vwrap+'"'+\
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("PatchMesh", [type, nu, uwrap, nv, vwrap], paramlist, keyparams)
     
 
 # RiNuPatch
@@ -851,22 +1023,14 @@ def RiNuPatch(nu, uorder, uknot, umin, umax, nv, vorder, vknot, vmin, vmax, *par
     uniform:  #segments      vertex:  nu*nv
     """
 
-    _ribout.write('NuPatch '+str(nu)+" "+str(uorder)+' '+_seq2list(uknot)+" "+ \
-                 str(umin)+" "+str(umax)+" "+ \
-                str(nv)+" "+str(vorder)+' '+_seq2list(vknot)+" "+ \
-                 str(vmin)+" "+str(vmax)+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("NuPatch", [nu, uorder, uknot, umin, umax, nv, vorder, vknot, vmin, vmax], paramlist, keyparams)
 
 # RiTrimCurve
 def RiTrimCurve(ncurves, order, knot, min, max, n, u, v, w):
     """Set the current trim curve.
     """
 
-    _ribout.write('TrimCurve '+_seq2list(ncurves)+' '+\
-                 _seq2list(order)+' '+_seq2list(knot)+' '+\
-                 _seq2list(min)+' '+_seq2list(max)+' '+_seq2list(n)+' '+ \
-                 _seq2list(u)+' '+ \
-                 _seq2list(v)+' '+ \
-                 _seq2list(w)+'\n')
+    _writeRequest("TrimCurve", [ncurves, order, knot, min, max, n, u, v, w])
 
 # RiPoints
 def RiPoints(*paramlist, **keyparams):
@@ -882,7 +1046,7 @@ def RiPoints(*paramlist, **keyparams):
     uniform:  1              vertex:  #points    
     """
 
-    _ribout.write('Points'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Points", [], paramlist, keyparams)
 
 # RiCurves
 def RiCurves(type, nvertices, wrap, *paramlist, **keyparams):
@@ -904,8 +1068,7 @@ def RiCurves(type, nvertices, wrap, *paramlist, **keyparams):
                       width=[0.1, 0.04])
     """
 
-    _ribout.write('Curves "'+type+'" '+_seq2list(nvertices)+' "'+wrap+'"'+
-                  _paramlist2string(paramlist, keyparams)+'\n')
+    _writeRequest("Curves", [type, nvertices, wrap], paramlist, keyparams)
 
 # RiSubdivisionMesh
 def RiSubdivisionMesh(scheme, nverts, vertids, tags, nargs, intargs, floatargs, *paramlist, **keyparams):
@@ -929,16 +1092,10 @@ def RiSubdivisionMesh(scheme, nverts, vertids, tags, nargs, intargs, floatargs,
     (*) max(vertids)+1
     """
 
-    if len(tags)==0:
-        _ribout.write('SubdivisionMesh "'+scheme+'" '+_seq2list(nverts)+' '+ \
-                 _seq2list(vertids)+' '+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
-    else:
-        _ribout.write('SubdivisionMesh "'+scheme+'" '+_seq2list(nverts)+' '+ \
-                 _seq2list(vertids)+' '+_seq2list(tags)+' '+ \
-                 _seq2list(nargs)+' '+_seq2list(intargs)+' '+ \
-                 _seq2list(floatargs)+' '+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    args = [scheme, nverts, vertids]
+    if len(tags)!=0:
+        args += [tags, nargs, intargs, floatargs]
+    _writeRequest("SubdivisionMesh", args, paramlist, keyparams)
 
 # RiBlobby
 def RiBlobby(nleaf, code, floats, strings, *paramlist, **keyparams):
@@ -954,9 +1111,7 @@ def RiBlobby(nleaf, code, floats, strings, *paramlist, **keyparams):
                       0.4, 0.01,0.3, 0.08], ["flat.zfile"])
     """
 
-    _ribout.write('Blobby '+str(nleaf)+' '+_seq2list(code)+' '+_seq2list(floats)+
-                  ' '+_seq2list(strings)+
-                  _paramlist2string(paramlist, keyparams)+'\n')
+    _writeRequest("Blobby", [nleaf, code, floats, strings], paramlist, keyparams)
 
 # RiColorSamples
 def RiColorSamples(nRGB, RGBn):
@@ -982,7 +1137,7 @@ def RiColorSamples(nRGB, RGBn):
                "The number of values in the transformation matrices must be a multiple of 3.")
         
     _colorsamples = len(_flatten(nRGB))//3
-    _ribout.write('ColorSamples '+_seq2list(nRGB)+' '+_seq2list(RGBn)+'\n')
+    _writeRequest("ColorSamples", [nRGB, RGBn])
 
 # RiColor
 def RiColor(Cs):
@@ -994,8 +1149,7 @@ def RiColor(Cs):
     Example: RiColor([0.2,0.5,0.2])
     """
 
-    col=_seq2col(Cs)
-    _ribout.write("Color "+col+"\n")
+    _writeRequest("Color", [_seq2col(Cs)])
 
 # RiOpacity
 def RiOpacity(Os):
@@ -1009,8 +1163,7 @@ def RiOpacity(Os):
     Example: RiOpacity([0,0,1])
     """
 
-    col=_seq2col(Os)
-    _ribout.write("Opacity "+col+"\n")
+    _writeRequest("Opacity", [_seq2col(Os)])
 
 # RiShadingRate
 def RiShadingRate(size):
@@ -1019,7 +1172,7 @@ def RiShadingRate(size):
     Example: RiShadingRate(1.0)
     """
 
-    _ribout.write("ShadingRate %s\n"%size)
+    _writeRequest("ShadingRate", [size])
 
 # RiShadingInterpolation
 def RiShadingInterpolation(type):
@@ -1029,7 +1182,7 @@ def RiShadingInterpolation(type):
 
     Example: RiShadingInterpolation(RI_SMOOTH)"""
 
-    _ribout.write('ShadingInterpolation "'+type+'"\n')
+    _writeRequest("ShadingInterpolation", [type])
 
 # RiShader
 def RiShader(name, handle, *paramlist, **keyparams):
@@ -1037,8 +1190,7 @@ def RiShader(name, handle, *paramlist, **keyparams):
 
     Example: RiShader("plastic", "plastic_layer", Kd=0.7, Ks=0.3)"""
 
-    _ribout.write('Shader "'+name+'"'+' "'+handle+'"'+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Shader", [name, handle], paramlist, keyparams)
     
 # RiSurface
 def RiSurface(name, *paramlist, **keyparams):
@@ -1046,8 +1198,7 @@ def RiSurface(name, *paramlist, **keyparams):
 
     Example: RiSurface("plastic", Kd=0.7, Ks=0.3)"""
 
-    _ribout.write('Surface "'+name+'"'+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Surface", [name], paramlist, keyparams)
 
 # RiInterior
 def RiInterior(name, *paramlist, **keyparams):
@@ -1056,7 +1207,7 @@ def RiInterior(name, *paramlist, **keyparams):
     Example: RiInterior("water")
     """
 
-    _ribout.write('Interior "'+name+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Interior", [name], paramlist, keyparams)
 
 # RiExterior
 def RiExterior(name, *paramlist, **keyparams):
@@ -1065,7 +1216,7 @@ def RiExterior(name, *paramlist, **keyparams):
     Example: RiExterior("fog")
     """
 
-    _ribout.write('Exterior "'+name+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Exterior", [name], paramlist, keyparams)
 
 # RiAtmosphere
 def RiAtmosphere(name, *paramlist, **keyparams):
@@ -1077,10 +1228,9 @@ def RiAtmosphere(name, *paramlist, **keyparams):
     """
 
     if name==RI_NULL:
-        _ribout.write('Atmosphere\n')
+        _writeRequest("Atmosphere")
     else:
-        _ribout.write('Atmosphere "'+name+'"'+ \
-                      _paramlist2string(paramlist, keyparams)+"\n")
+        _writeRequest("Atmosphere", [name], paramlist, keyparams)
 
 # RiDisplacement
 def RiDisplacement(name, *paramlist, **keyparams):
@@ -1089,7 +1239,7 @@ def RiDisplacement(name, *paramlist, **keyparams):
     Example: RiDisplacement("dented", km=1.5)
     """
 
-    _ribout.write('Displacement "'+name+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Displacement", [name], paramlist, keyparams)
 
 # RiImager
 def RiImager(name, *paramlist, **keyparams):
@@ -1101,9 +1251,9 @@ def RiImager(name, *paramlist, **keyparams):
     """
 
     if name==RI_NULL:
-        _ribout.write('Imager\n')
+        _writeRequest("Imager")
     else:
-        _ribout.write('Imager "'+name+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+        _writeRequest("Imager", [name], paramlist, keyparams)
 
 # RiClipping
 def RiClipping(near, far):
@@ -1115,7 +1265,7 @@ def RiClipping(near, far):
     Example: RiClipping(0.1, 100)
     """
 
-    _ribout.write("Clipping %s %s\n"%(near,far))
+    _writeRequest("Clipping", [near,far])
 
 # RiClippingPlane
 def RiClippingPlane(x, y, z, nx, ny, nz):
@@ -1126,7 +1276,7 @@ def RiClippingPlane(x, y, z, nx, ny, nz):
     Example: RiClippingPlane(0,0,0, 0,0,-1) clips everything below the XY plane
     """
 
-    _ribout.write('ClippingPlane %s %s %s %s %s %s\n'%(x,y,z,nx,ny,nz))
+    _writeRequest("ClippingPlane", [x,y,z,nx,ny,nz])
 
 # RiDisplay
 def RiDisplay(name,type,mode, *paramlist, **keyparams):
@@ -1136,8 +1286,7 @@ def RiDisplay(name,type,mode, *paramlist, **keyparams):
              RiDisplay("myimage.tif", RI_FRAMEBUFFER, RI_RGB)
     """
 
-    _ribout.write('Display "'+name+'" "'+type+'" "'+mode+'"'+ \
-                 _paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Display", [name, type, mode], paramlist, keyparams)
 
 # RiDisplayChannel
 def RiDisplayChannel(channel, *paramlist, **keyparams):
@@ -1145,7 +1294,7 @@ def RiDisplayChannel(channel, *paramlist, **keyparams):
 
     Example: RiDisplayChannel("color aovCi", "string opacity", "aovOi")
     """
-    _ribout.write('DisplayChannel "%s"%s\n'%(channel, _paramlist2string(paramlist, keyparams)))
+    _writeRequest("DisplayChannel", [channel], paramlist, keyparams)
 
 # RiFormat
 def RiFormat(xres, yres, aspect):
@@ -1153,7 +1302,7 @@ def RiFormat(xres, yres, aspect):
 
     Example: RiFormat(720,576,1)"""
 
-    _ribout.write('Format %s %s %s\n'%(xres, yres, aspect))
+    _writeRequest("Format", [xres, yres, aspect])
 
 # RiFrameAspectRatio
 def RiFrameAspectRatio(frameratio):
@@ -1162,7 +1311,7 @@ def RiFrameAspectRatio(frameratio):
     Example: RiFrameAspectRatio(4.0/3)
     """
 
-    _ribout.write('FrameAspectRatio %s\n'%frameratio)
+    _writeRequest("FrameAspectRatio", [frameratio])
 
 # RiGeometricApproximation
 def RiGeometricApproximation(type, value):
@@ -1171,7 +1320,7 @@ def RiGeometricApproximation(type, value):
     Example: RiGeometricApproximation(RI_FLATNESS, 0.5)  (default value)
     """
 
-    _ribout.write('GeometricApproximation "'+type+'" '+str(value)+"\n")
+    _writeRequest("GeometricApproximation", [type, value])
 
 
 # RiProjection
@@ -1185,10 +1334,9 @@ def RiProjection(name, *paramlist, **keyparams):
     """
 
     if name==RI_NULL:
-        _ribout.write('Projection\n')
+        _writeRequest("Projection")
     else:
-        _ribout.write('Projection "'+name+'"'+ \
-                      _paramlist2string(paramlist, keyparams)+"\n")
+        _writeRequest("Projection", [name], paramlist, keyparams)
 
 # RiCamera
 def RiCamera(name, *paramlist, **keyparams):
@@ -1196,7 +1344,7 @@ def RiCamera(name, *paramlist, **keyparams):
 
     Example: RiCamera("rightcamera")
     """
-    _ribout.write('Camera "%s"%s\n'%(name, _paramlist2string(paramlist, keyparams)))
+    _writeRequest("Camera", [name], paramlist, keyparams)
 
 # RiScreenWindow
 def RiScreenWindow(left, right, bottom, top):
@@ -1205,7 +1353,7 @@ def RiScreenWindow(left, right, bottom, top):
     Example: RiScreenWindow(-1,1,-1,1)
     """
 
-    _ribout.write('ScreenWindow %s %s %s %s\n'%(left, right, bottom, top))
+    _writeRequest("ScreenWindow", [left, right, bottom, top])
 
 # RiCropWindow
 def RiCropWindow(left, right, bottom, top):
@@ -1217,7 +1365,7 @@ def RiCropWindow(left, right, bottom, top):
              RiCropWindow(0.5, 1.0 , 0.0, 0.5)  (renders the top right quarter)
     """
 
-    _ribout.write('CropWindow %s %s %s %s\n'%(left, right, bottom, top))
+    _writeRequest("CropWindow", [left, right, bottom, top])
 
 # RiPixelSamples
 def RiPixelSamples(xsamples, ysamples):
@@ -1225,7 +1373,7 @@ def RiPixelSamples(xsamples, ysamples):
 
     Example: RiPixelSamples(2,2)"""
 
-    _ribout.write("PixelSamples %s %s\n"%(max(1,xsamples), max(1,ysamples)))
+    _writeRequest("PixelSamples", [max(1,xsamples), max(1,ysamples)])
 
 # RiPixelVariance
 def RiPixelVariance(variance):
@@ -1233,7 +1381,7 @@ def RiPixelVariance(variance):
 
     Example: RiPixelVariance(0.01)"""
 
-    _ribout.write('PixelVariance %s\n'%variance)
+    _writeRequest("PixelVariance", [variance])
 
 # Predefined filter functions:
 RiGaussianFilter   = "gaussian"
@@ -1258,7 +1406,7 @@ def RiPixelFilter(function, xwidth, ywidth):
         _error(RIE_INCAPABLE, RIE_WARNING, "Only the standard filters can be stored in a RIB stream.")
         return
 
-    _ribout.write('PixelFilter "'+function+'" '+str(xwidth)+' '+str(ywidth)+'\n')
+    _writeRequest("PixelFilter", [function, xwidth, ywidth])
 
 # RiExposure
 def RiExposure(gain, gamma):
@@ -1269,7 +1417,7 @@ def RiExposure(gain, gamma):
     Example: RiExposure(1.3, 2.2)
     """
 
-    _ribout.write("Exposure %s %s\n"%(gain, gamma))
+    _writeRequest("Exposure", [gain, gamma])
 
 # RiQuantize
 def RiQuantize(type, one, min, max, ditheramplitude):
@@ -1278,7 +1426,7 @@ def RiQuantize(type, one, min, max, ditheramplitude):
     Example: RiQuantize(RI_RGBA, 2048, -1024, 3071, 1.0)
     """
 
-    _ribout.write('Quantize "%s" %s %s %s %s\n'%(type, one, min, max, ditheramplitude))
+    _writeRequest("Quantize", [type, one, min, max, ditheramplitude])
     
 
 # RiDepthOfField
@@ -1291,9 +1439,9 @@ def RiDepthOfField(fstop, focallength, focaldistance):
     """
 
     if fstop==RI_INFINITY:
-        _ribout.write('DepthOfField\n')
+        _writeRequest("DepthOfField")
     else:
-        _ribout.write('DepthOfField %s %s %s\n'%(fstop, focallength, focaldistance))
+        _writeRequest("DepthOfField", [fstop, focallength, focaldistance])
 
 # RiMotionBegin
 def RiMotionBegin(*times):
@@ -1313,7 +1461,7 @@ def RiMotionBegin(*times):
     if _insidemotion:
         _error(RIE_ILLSTATE, RIE_ERROR, "Motion blocks cannot be nested.")
 
-    _ribout.write('MotionBegin '+_seq2list(times)+'\n')
+    _writeRequest("MotionBegin", [times])
     _insidemotion = 1
 
 # RiMotionEnd
@@ -1322,7 +1470,7 @@ def RiMotionEnd():
 
     global _insidemotion
 
-    _ribout.write('MotionEnd\n')
+    _writeRequest("MotionEnd")
     _insidemotion = 0
 
 # RiShutter
@@ -1332,7 +1480,7 @@ def RiShutter(opentime, closetime):
     Example: RiShutter(0.1, 0.9)
     """
 
-    _ribout.write('Shutter %s %s\n'%(opentime, closetime))
+    _writeRequest("Shutter", [opentime, closetime])
 
 # RiTranslate
 def RiTranslate(*translation):
@@ -1348,12 +1496,12 @@ def RiTranslate(*translation):
 
     # Argument = sequence?
     if len(translation)==1:
-        s=_seq2list(translation,3)
-        _ribout.write('Translate '+s[1:-1]+"\n")
+        _checkseq(translation, 3)
+        _writeRequest("Translate", [_InlineSeq(translation)])
     # Argument = 3 scalars?
     elif len(translation)==3:
         dx,dy,dz=translation
-        _ribout.write('Translate %s %s %s\n'%(dx,dy,dz))
+        _writeRequest("Translate", [dx, dy, dz])
     # Invalid argument size
     else:
         raise TypeError("RiTranslate() only takes a sequence or three scalars as arguments")
@@ -1369,12 +1517,12 @@ def RiRotate(angle, *axis):
 
     # Argument = sequence?
     if len(axis)==1:
-        s=_seq2list(axis,3)
-        _ribout.write('Rotate %s %s\n'%(angle, s[1:-1]))
+        _checkseq(axis, 3)
+        _writeRequest("Rotate", [angle, _InlineSeq(axis)])
     # Argument = 3 scalars?
     elif len(axis)==3:
         ax,ay,az=axis
-        _ribout.write('Rotate %s %s %s %s\n'%(angle, ax, ay, az))
+        _writeRequest("Rotate", [angle, ax, ay, az])
     # Invalid argument size
     else:
         raise TypeError("RiRotate() only takes 2 or 4 arguments (%s given)"%(len(axis)+1))
@@ -1390,12 +1538,12 @@ def RiScale(*scaling):
 
     # Argument = sequence?
     if len(scaling)==1:
-        s=_seq2list(scaling,3)
-        _ribout.write('Scale '+s[1:-1]+"\n")
+        _checkseq(scaling, 3)
+        _writeRequest("Scale", [_InlineSeq(scaling)])
     # Argument = 3 scalars?
     elif len(scaling)==3:
         sx,sy,sz=scaling
-        _ribout.write('Scale %s %s %s\n'%(sx, sy, sz))
+        _writeRequest("Scale", [sx, sy, sz])
     # Invalid argument size
     else:
         raise TypeError("RiScale() only takes a sequence or three scalars as arguments")
@@ -1414,13 +1562,13 @@ def RiSkew(angle, *vecs):
 
     # Argument = two sequences?
     if len(vecs)==2:
-        s1=_seq2list(vecs[0],3)
-        s2=_seq2list(vecs[1],3)
-        _ribout.write('Skew '+str(angle)+" "+s1[1:-1]+" "+s2[1:-1]+"\n")
+        _checkseq(vecs[0], 3)
+        _checkseq(vecs[1], 3)
+        _writeRequest("Skew", [angle, _InlineSeq(vecs[0]), _InlineSeq(vecs[1])])
     # Argument = 6 scalars?
     elif len(vecs)==6:
         dx1,dy1,dz1,dx2,dy2,dz2=vecs
-        _ribout.write('Skew %s %s %s %s %s %s %s\n'%(angle, dx1, dy1, dz1, dx2, dy2, dz2))
+        _writeRequest("Skew", [angle, dx1, dy1, dz1, dx2, dy2, dz2])
     # Invalid argument size
     else:
         raise TypeError("RiSkew() only takes 3 or 7 arguments (%s given)"%(len(vecs)+1))
@@ -1432,7 +1580,7 @@ def RiPerspective(fov):
     
     Example: RiPerspective(45)"""
 
-    _ribout.write('Perspective %s\n'%fov)
+    _writeRequest("Perspective", [fov])
 
 # RiIdentity
 def RiIdentity():
@@ -1441,7 +1589,7 @@ def RiIdentity():
     Example: RiIdentity()
     """
 
-    _ribout.write('Identity\n')
+    _writeRequest("Identity")
 
 # RiConcatTransform
 def RiConcatTransform(transform):
@@ -1454,7 +1602,7 @@ def RiConcatTransform(transform):
              RiConcatTransform([[2,0,0,0], [0,2,0,0], [0,0,2,0], [0,0,0,1]])
     """
 
-    _ribout.write('ConcatTransform '+_seq2list(transform,16)+"\n")
+    _writeRequest("ConcatTransform", [_checkseq(transform, 16)])
 
 # RiTransform
 def RiTransform(transform):
@@ -1467,7 +1615,7 @@ def RiTransform(transform):
              RiTransform([[2,0,0,0], [0,2,0,0], [0,0,2,0], [0,0,0,1]])
     """
 
-    _ribout.write('Transform '+_seq2list(transform,16)+"\n")
+    _writeRequest("Transform", [_checkseq(transform, 16)])
 
 # RiSides
 def RiSides(nsides):
@@ -1478,7 +1626,7 @@ def RiSides(nsides):
     if nsides!=1 and nsides!=2:
         _error(RIE_RANGE, RIE_ERROR, "The number of sides (nsides) must be either 1 or 2.")
 
-    _ribout.write('Sides %s\n'%nsides)
+    _writeRequest("Sides", [nsides])
 
 # RiOrientation
 def RiOrientation(orientation):
@@ -1488,7 +1636,7 @@ def RiOrientation(orientation):
     or RI_RH (right handed).
     """
 
-    _ribout.write('Orientation "'+orientation+'"\n')
+    _writeRequest("Orientation", [orientation])
 
 # RiReverseOrientation
 def RiReverseOrientation():
@@ -1497,7 +1645,7 @@ def RiReverseOrientation():
     Example: RiReverseOrientation()
     """
 
-    _ribout.write('ReverseOrientation\n')
+    _writeRequest("ReverseOrientation")
 
 # RiMatte
 def RiMatte(onoff):
@@ -1506,9 +1654,9 @@ def RiMatte(onoff):
     Example: RiMatte(RI_TRUE)
     """
     if onoff:
-        _ribout.write('Matte 1\n')
+        _writeRequest("Matte", [1])
     else:
-        _ribout.write('Matte 0\n')
+        _writeRequest("Matte", [0])
 
 # RiLightSource
 def RiLightSource(name, *paramlist, **keyparams):
@@ -1534,9 +1682,9 @@ def RiLightSource(name, *paramlist, **keyparams):
     if lshandle is None:
         _lighthandle += 1
         lshandle = _lighthandle
-        _ribout.write('LightSource "%s" %d%s\n'%(name, lshandle, _paramlist2string(paramlist, {})))
+        _writeRequest("LightSource", [name, lshandle], paramlist)
     else:
-        _ribout.write('LightSource "%s" "%s"%s\n'%(name, lshandle, _paramlist2string(paramlist, {})))
+        _writeRequest("LightSource", [name, lshandle], paramlist)
         
     return lshandle
 
@@ -1548,9 +1696,9 @@ def RiIlluminate(light, onoff):
     """
 
     if type(light)==str or type(light)==unicode:
-        _ribout.write('Illuminate "%s" %d\n'%(light, onoff))
+        _writeRequest("Illuminate", [light, int(onoff)])
     else:
-        _ribout.write('Illuminate %d %d\n'%(light, onoff))
+        _writeRequest("Illuminate", [int(light), int(onoff)])
         
 
 # RiAreaLightSource
@@ -1571,11 +1719,11 @@ def RiAreaLightSource(name, *paramlist, **keyparams):
     if RI_HANDLEID in keyparams:
         lshandle = str(keyparams[RI_HANDLEID])
         del keyparams[RI_HANDLEID]
-        _ribout.write('AreaLightSource "%s" "%s"%s\n'%(name, lshandle, _paramlist2string((), keyparams)))
+        _writeRequest("AreaLightSource", [name, lshandle], (), keyparams)
     else:
         _lighthandle+=1
         lshandle = _lighthandle
-        _ribout.write('AreaLightSource "%s" %d%s\n'%(name, lshandle, _paramlist2string((), keyparams)))
+        _writeRequest("AreaLightSource", [name, lshandle], (), keyparams)
 
     return lshandle
 
@@ -1599,7 +1747,7 @@ def RiDeclare(name, declaration):
     if declaration==RI_NULL:
         declaration=""
         
-    _ribout.write('Declare "'+name+'" "'+declaration+'"\n')
+    _writeRequest("Declare", [name, declaration])
     _declarations[name]=declaration
     return name
 
@@ -1653,7 +1801,7 @@ def RiReadArchive(filename, callback=None, *ignore):
 
     Example: RiReadArchive("teapot.rib")"""
 
-    _ribout.write('ReadArchive "'+filename+'"\n')
+    _writeRequest("ReadArchive", [filename])
 
 # RiArchiveBegin
 def RiArchiveBegin(archivename, *paramlist, **keyparams):
@@ -1664,7 +1812,7 @@ def RiArchiveBegin(archivename, *paramlist, **keyparams):
              RiArchiveEnd()
              RiReadArchive("myarchive")
     """
-    _ribout.write('ArchiveBegin "%s"%s\n'%(archivename, _paramlist2string((), keyparams)))
+    _writeRequest("ArchiveBegin", [archivename], (), keyparams)
     return archivename
 
 # RiArchiveEnd
@@ -1676,7 +1824,7 @@ def RiArchiveEnd():
              RiArchiveEnd()
              RiReadArchive("myarchive")
     """
-    _ribout.write('ArchiveEnd\n')
+    _writeRequest("ArchiveEnd")
 
 
 def RiProcDelayedReadArchive(): return "DelayedReadArchive"
@@ -1713,8 +1861,7 @@ def RiProcedural(data, bound, subdividefunc, freefunc=None):
     if subdividefunc in [RiProcDelayedReadArchive, RiProcRunProgram, RiProcDynamicLoad]:
         if type(data)==types.StringType:
             data=[data]
-        _ribout.write('Procedural "'+subdividefunc()+'" '+_seq2list(data)+ \
-                     ' '+_seq2list(bound,6)+"\n")
+        _writeRequest("Procedural", [subdividefunc(), data, _checkseq(bound, 6)])
     else:
         # Call the custom procedure to generate all the data...
         subdividefunc(data, RI_INFINITY)
@@ -1728,7 +1875,7 @@ def RiGeometry(type, *paramlist, **keyparams):
     Example: RiGeometry("teapot")
     """
 
-    _ribout.write('Geometry "'+type+'"'+_paramlist2string(paramlist, keyparams)+"\n")
+    _writeRequest("Geometry", [type], paramlist, keyparams)
 
 # RiBound
 def RiBound(bound):
@@ -1741,7 +1888,7 @@ def RiBound(bound):
     Example: RiBound([-1,1, 0,1, 0.5,0.75])
     """
 
-    _ribout.write('Bound '+_seq2list(bound,6)+'\n')
+    _writeRequest("Bound", [_checkseq(bound, 6)])
     
 # RiSolidBegin
 def RiSolidBegin(type):
@@ -1759,13 +1906,13 @@ def RiSolidBegin(type):
              RiSolidEnd()
     """
 
-    _ribout.write('SolidBegin "'+type+'"\n')
+    _writeRequest("SolidBegin", [type])
 
 # RiSolidEnd
 def RiSolidEnd():
     """Terminate the definition of a solid object."""
 
-    _ribout.write('SolidEnd\n')
+    _writeRequest("SolidEnd")
 
 # RiObjectBegin
 def RiObjectBegin(*paramlist, **keyparams):
@@ -1788,11 +1935,11 @@ def RiObjectBegin(*paramlist, **keyparams):
     if RI_HANDLEID in keyparams:
         objhandle = str(keyparams[RI_HANDLEID])
         del keyparams[RI_HANDLEID]
-        _ribout.write('ObjectBegin "%s"\n'%objhandle)
+        _writeRequest("ObjectBegin", [objhandle])
     else:
         _objecthandle+=1
         objhandle = _objecthandle
-        _ribout.write('ObjectBegin %d\n'%objhandle)
+        _writeRequest("ObjectBegin", [objhandle])
     
     _insideobject=1
 
@@ -1804,7 +1951,7 @@ def RiObjectEnd():
 
     global _insideobject
     
-    _ribout.write('ObjectEnd\n')
+    _writeRequest("ObjectEnd")
     _insideobject=0
 
 # RiObjectInstance
@@ -1815,9 +1962,9 @@ def RiObjectInstance(handle):
     """
 
     if type(handle)==str or type(handle)==unicode:
-        _ribout.write('ObjectInstance "%s"\n'%handle)
+        _writeRequest("ObjectInstance", [handle])
     else:
-        _ribout.write('ObjectInstance %d\n'%handle)
+        _writeRequest("ObjectInstance", [int(handle)])
 
 # RiTextureCoordinates
 def RiTextureCoordinates(s1, t1, s2, t2, s3, t3, s4, t4):
@@ -1829,7 +1976,7 @@ def RiTextureCoordinates(s1, t1, s2, t2, s3, t3, s4, t4):
 
     Example: RiTextureCoordinates(0.0, 0.0, 2.0, -0.5, -0.5, 1.75, 3.0, 3.0)"""
 
-    _ribout.write('TextureCoordinates %s %s %s %s %s %s %s %s\n'%(s1,t1,s2,t2,s3,t3,s4,t4))
+    _writeRequest("TextureCoordinates", [s1,t1,s2,t2,s3,t3,s4,t4])
 
 # RiMakeTexture
 def RiMakeTexture(picname, texname, swrap, twrap, filterfunc, swidth, twidth, *paramlist, **keyparams):
@@ -1849,9 +1996,7 @@ def RiMakeTexture(picname, texname, swrap, twrap, filterfunc, swidth, twidth, *p
         _error(RIE_INCAPABLE, RIE_WARNING, "Only the standard filters can be stored in a RIB stream.")
         return
 
-    _ribout.write('MakeTexture "'+picname+'" "'+texname+'" "'+swrap+'" "'+
-                  twrap+'" "'+filterfunc+'" '+str(swidth)+' '+str(twidth)+
-                  _paramlist2string(paramlist, keyparams)+'\n')
+    _writeRequest("MakeTexture", [picname, texname, swrap, twrap, filterfunc, swidth, twidth], paramlist, keyparams)
 
 # RiMakeLatLongEnvironment
 def RiMakeLatLongEnvironment(picname, texname, filterfunc, swidth, twidth, *paramlist, **keyparams):
@@ -1870,9 +2015,7 @@ def RiMakeLatLongEnvironment(picname, texname, filterfunc, swidth, twidth, *para
         _error(RIE_INCAPABLE, RIE_WARNING, "Only the standard filters can be stored in a RIB stream.")
         return
 
-    _ribout.write('MakeLatLongEnvironment "'+picname+'" "'+texname+'" "'+
-                  filterfunc+'" '+str(swidth)+' '+str(twidth)+
-                  _paramlist2string(paramlist, keyparams)+'\n')
+    _writeRequest("MakeLatLongEnvironment", [picname, texname, filterfunc, swidth, twidth], paramlist, keyparams)
 
 # RiMakeCubeFaceEnvironment
 def RiMakeCubeFaceEnvironment(px,nx,py,ny,pz,nz, texname, fov, filterfunc, swidth, twidth, *paramlist, **keyparams):
@@ -1894,10 +2037,7 @@ def RiMakeCubeFaceEnvironment(px,nx,py,ny,pz,nz, texname, fov, filterfunc, swidt
         _error(RIE_INCAPABLE, RIE_WARNING, "Only the standard filters can be stored in a RIB stream.")
         return
 
-    _ribout.write('MakeCubeFaceEnvironment "'+px+'" "'+nx+'" "'+
-                  py+'" "'+ny+'" "'+pz+'" "'+nz+'" "'+ texname+'" '+
-                  str(fov)+' "'+filterfunc+'" '+str(swidth)+' '+str(twidth)+
-                  _paramlist2string(paramlist, keyparams)+'\n')
+    _writeRequest("MakeCubeFaceEnvironment", [px, nx, py, ny, pz, nz, texname, fov, filterfunc, swidth, twidth], paramlist, keyparams)
 
 # RiMakeShadow
 def RiMakeShadow(picname, shadowname, *paramlist, **keyparams):
@@ -1906,7 +2046,7 @@ def RiMakeShadow(picname, shadowname, *paramlist, **keyparams):
     Example: RiMakeShadow("depthimg.tif", "shadow.tif")
     """
     
-    _ribout.write('MakeShadow "'+picname+'" "'+shadowname+'"'+_paramlist2string(paramlist, keyparams)+'\n')
+    _writeRequest("MakeShadow", [picname, shadowname], paramlist, keyparams)
 
 # RiMakeBrickMap
 def RiMakeBrickMap(ptcnames, bkmname, *paramlist, **keyparams):
@@ -1914,8 +2054,7 @@ def RiMakeBrickMap(ptcnames, bkmname, *paramlist, **keyparams):
 
     Example: RiMakeBrickMap(["sphere.ptc", "box.ptc"], "spherebox.bkm", "float maxerror", 0.002)
     """
-    names = " ".join(map(lambda name: '"%s"'%name, ptcnames))
-    _ribout.write('MakeBrickMap [%s] "%s"%s\n'%(names, bkmname, _paramlist2string(paramlist, keyparams)))
+    _writeRequest("MakeBrickMap", [list(ptcnames), bkmname], paramlist, keyparams)
 
 # RiDetail
 def RiDetail(bound):
@@ -1928,7 +2067,7 @@ def RiDetail(bound):
     Example: RiDetail([10,20,40,70,0,1])
     """
 
-    _ribout.write('Detail '+_seq2list(bound,6)+'\n')
+    _writeRequest("Detail", [_checkseq(bound, 6)])
 
 # RiRelativeDetail
 def RiRelativeDetail(relativedetail):
@@ -1936,7 +2075,7 @@ def RiRelativeDetail(relativedetail):
 
     Example: RiRelativeDetail(0.7)"""
 
-    _ribout.write('RelativeDetail %s\n'%relativedetail)
+    _writeRequest("RelativeDetail", [relativedetail])
 
 # RiDetailRange
 def RiDetailRange(minvisible, lowertransition, uppertransition, maxvisible):
@@ -1956,7 +2095,7 @@ def RiDetailRange(minvisible, lowertransition, uppertransition, maxvisible):
     Example: RiDetailRange(0,0,10,20)
     """
 
-    _ribout.write('DetailRange %s %s %s %s\n'%(minvisible, lowertransition, uppertransition, maxvisible))
+    _writeRequest("DetailRange", [minvisible, lowertransition, uppertransition, maxvisible])
 
 # RiCoordinateSystem
 def RiCoordinateSystem(spacename):
@@ -1964,7 +2103,7 @@ def RiCoordinateSystem(spacename):
 
     Example: RiCoordinateSystem("lamptop")
     """
-    _ribout.write('CoordinateSystem "'+spacename+'"\n')
+    _writeRequest("CoordinateSystem", [spacename])
 
 # RiScopedCoordinateSystem
 def RiScopedCoordinateSystem(spacename):
@@ -1972,7 +2111,7 @@ def RiScopedCoordinateSystem(spacename):
 
     Example: RiScopedCoordinateSystem("lamptop")
     """
-    _ribout.write('ScopedCoordinateSystem "'+spacename+'"\n')
+    _writeRequest("ScopedCoordinateSystem", [spacename])
 
 # RiTransformPoints
 def RiTransformPoints(fromspace, tospace, points):
@@ -1990,7 +2129,7 @@ def RiCoordSysTransform(spacename):
     Example: RiCoordSysTransform("lamptop")
     """
 
-    _ribout.write('CoordSysTransform "'+spacename+'"\n')
+    _writeRequest("CoordSysTransform", [spacename])
 
 # RiContext
 def RiContext(handle):
@@ -2021,52 +2160,52 @@ def RiSystem(cmd):
     """
     # Escape quotes
     cmd = cmd.replace('"', r'\"')
-    _ribout.write('System "%s"\n'%cmd)
+    _writeRequest("System", [cmd])
 
 # RiIfBegin
 def RiIfBegin(expression, *paramlist, **keyparams):
     """Begin a conditional block.
     """
-    _ribout.write('IfBegin "%s"%s\n'%(expression, _paramlist2string(paramlist, keyparams)))
+    _writeRequest("IfBegin", [expression], paramlist, keyparams)
 
 # RiElseIf
 def RiElseIf(expression, *paramlist, **keyparams):
     """Add an else-if block to a conditional block.
     """
     
-    _ribout.write('ElseIf "%s"%s\n'%(expression, _paramlist2string(paramlist, keyparams)))
+    _writeRequest("ElseIf", [expression], paramlist, keyparams)
 
 # RiElse
 def RiElse():
     """Add an else block to a conditional block.
     """
     
-    _ribout.write('Else\n')
+    _writeRequest("Else")
 
 # RiIfEnd
 def RiIfEnd():
     """Terminate a conditional block.
     """
     
-    _ribout.write('IfEnd\n')
+    _writeRequest("IfEnd")
     
 # RiResource
 def RiResource(handle, type, *paramlist, **keyparams):
     """Create or operate on a named resource of a particular type.
     """
-    _ribout.write('Resource "%s" "%s"%s\n'%(handle, type, _paramlist2string(paramlist, keyparams)))
+    _writeRequest("Resource", [handle, type], paramlist, keyparams)
 
 # RiResourceBegin
 def RiResourceBegin():
     """Push the current set of resources. 
     """
-    _ribout.write('ResourceBegin\n')
+    _writeRequest("ResourceBegin")
 
 # RiResourceEnd
 def RiResourceEnd():
     """Pop the current set of resources. 
     """
-    _ribout.write('ResourceEnd\n')
+    _writeRequest("ResourceEnd")
 
 ##################### Global variabels (internal) ####################
 
@@ -2217,11 +2356,10 @@ def _error(code, severity, message):
     _errorhandler(code,severity,where+message)
 
 def _seq2col(seq):
-    """Convert a sequence containing a color into a string."""
+    """Return the color values of a sequence as a list."""
     if len(seq)<_colorsamples:
         _error(RIE_INVALIDSEQLEN, RIE_ERROR, "Invalid sequence length (%s instead of %s)"%(len(seq), _colorsamples))
-    colseq = tuple(seq)
-    return '[%s]'%(" ".join( map(lambda x: str(x), colseq[:_colorsamples]) ))
+    return list(seq)[:_colorsamples]
 
 def _flatten(seq):
     """Return a list of the individual items in a (possibly nested) sequence.
@@ -2256,21 +2394,269 @@ def _flatten(seq):
             res += _flatten(v)
     return res
 
-def _seq2list(seq, count=None):
-    """Convert a sequence into a string.
+def _checkseq(seq, count):
+    """Check if a (possibly nested) sequence contains count values.
 
-    The function checks if the sequence contains count elements (unless
-    count is None). If it doesn't an error is generated.
-    The return value is a string containing the sequence. The string can
-    be used as parameter value to RIB commands.
+    If it doesn't an error is generated. The sequence is returned.
     """
+    n = sum(map(lambda chunk: len(chunk[0]), _iterchunks(seq)))
+    if n!=count:
+        _error(RIE_INVALIDSEQLEN, RIE_ERROR, "Invalid sequence length (%s instead of %s)"%(n, count))
+    return seq
 
-    f = _flatten(seq)
-    # Has the sequence an incorrect length? then generate an error
-    if count!=None and len(f)!=count:
-        _error(RIE_INVALIDSEQLEN, RIE_ERROR, "Invalid sequence length (%s instead of %s)"%(len(f), count))
-        
-    return '[%s]'%" ".join(f)
+def _writeseq(out, seq):
+    """Write a sequence into an output stream.
+
+    The sequence is converted in chunks, so even large arrays never
+    have to be converted into one single string.
+    """
+    # Does the stream encode arrays itself? (binary RIB)
+    if hasattr(out, "writeArray"):
+        out.writeArray(seq)
+        return
+    out.write("[")
+    sep = ""
+    for values,fmt in _iterchunks(seq, getattr(_ribout, "precision", None)):
+        out.write(sep)
+        out.write(_formatvalues(values, fmt))
+        sep = " "
+    out.write("]")
+
+# Number of values that get converted into a string at once
+_CHUNKSIZE = 4096
+
+def _iterchunks(seq, precision=None):
+    """Iterate over the items of a (possibly nested) sequence in chunks.
+
+    seq may be any (nested) sequence, including sequences of vec3s,
+    array slots or NumPy arrays. The generator yields tuples (values, fmt)
+    where values is a list of at most _CHUNKSIZE items and fmt is the
+    format string that should be used for the floats in values (None
+    means str() is used). Strings are already enclosed in apostrophes.
+    precision is the number of significant digits for floats (None
+    means str() is used).
+    """
+    if precision:
+        fmt = "%%.%dg"%precision
+    else:
+        fmt = None
+
+    # Numeric NumPy array? Then the values are extracted in chunks
+    # (the string formatting is still done by Python)
+    if _has_numpy and isinstance(seq, numpy.ndarray) and seq.dtype.kind in "biuf":
+        flat = seq.ravel()
+        if flat.dtype.kind=="b":
+            flat = flat.astype(int)
+        elif flat.dtype.kind=="f" and fmt is None:
+            if flat.dtype.itemsize<8:
+                # Don't output more digits than a single precision float can hold
+                fmt = "%.8g"
+            else:
+                # Keep the full precision (str() would only write 12 digits)
+                fmt = "%r"
+        for i in range(0, len(flat), _CHUNKSIZE):
+            yield flat[i:i+_CHUNKSIZE].tolist(), fmt
+        return
+
+    values = []
+    ScalarTypes = [types.IntType, types.LongType, types.FloatType]
+    for v in seq:
+        vtype = type(v)
+        # v=scalar?
+        if vtype in ScalarTypes:
+            values.append(v)
+        # vec3?
+        elif isinstance(v, _vec3):
+            values.extend((v.x, v.y, v.z))
+        # v=string?
+        elif isinstance(v, basestring):
+            values.append('"%s"'%v)
+        # no scalar or string. Then it might be a sequence...
+        else:
+            # Check if it is really a sequence...
+            try:
+                n = len(v)
+            except:
+                values.append(v)
+                continue
+            for subvalues,subfmt in _iterchunks(v, precision):
+                if subfmt==fmt:
+                    values.extend(subvalues)
+                else:
+                    # Values that use a different format are passed on
+                    # as a chunk of their own
+                    if len(values)>0:
+                        yield values, fmt
+                        values = []
+                    yield subvalues, subfmt
+        if len(values)>=_CHUNKSIZE:
+            yield values, fmt
+            values = []
+    if len(values)>0:
+        yield values, fmt
+
+def _formatvalues(values, fmt=None):
+    """Convert a list of values into a string.
+
+    fmt is the format string that is used for floats. If it is None,
+    all values are converted using str().
+    """
+    if fmt is None:
+        return " ".join(map(str, values))
+    else:
+        return " ".join([isinstance(v, float) and fmt%v or str(v) for v in values])
+
+class _InlineSeq:
+    """Sequence whose values are written as individual arguments.
+
+    This is used for requests like Translate that may receive their
+    arguments as a vector.
+    """
+
+    def __init__(self, seq):
+        self.seq = seq
+
+def _isseq(value):
+    """Check if a value is a sequence (if it returns an iterator)."""
+    try:
+        return iter(value)!=None
+    except:
+        return False
+
+def _valuekind(vtype):
+    """Return the kind of value a type represents.
+
+    The return value is "i" (integer), "f" (float), "s" (string)
+    or None.
+    """
+    if issubclass(vtype, basestring):
+        return "s"
+    elif issubclass(vtype, (int, long)) or (_has_numpy and issubclass(vtype, numpy.integer)):
+        return "i"
+    elif issubclass(vtype, float) or (_has_numpy and issubclass(vtype, numpy.floating)):
+        return "f"
+    return None
+
+def _writeRequest(name, args=(), paramlist=(), keyparams={}):
+    """Write a request into the output stream.
+
+    args is a sequence with the arguments of the request. Strings are
+    written as strings, sequences as arrays and _InlineSeq objects as
+    individual numbers. paramlist and keyparams are the parameter list
+    as passed to the Ri function. Nothing is written when the error
+    handler aborts because of an undeclared parameter.
+    """
+    params = _checkparamlist(paramlist, keyparams)
+    out = _ribout
+    # Does the stream encode the values itself? (binary RIB)
+    if hasattr(out, "writeRequest"):
+        out.writeRequest(name)
+        for arg in args:
+            _writevalue(out, arg)
+        _writeparams(out, params)
+    else:
+        out.write(name)
+        for arg in args:
+            _writevalue(out, arg)
+        _writeparams(out, params)
+        out.write("\n")
+
+def _writevalue(out, value):
+    """Write a single request argument into the output stream."""
+    binary = hasattr(out, "writeRequest")
+    if isinstance(value, basestring):
+        if binary:
+            out.writeString(value)
+        else:
+            out.write(' "%s"'%value)
+    elif isinstance(value, _InlineSeq):
+        for values,fmt in _iterchunks(value.seq, getattr(out, "precision", None)):
+            if binary:
+                for v in values:
+                    out.writeNumber(v)
+            else:
+                out.write(" "+_formatvalues(values, fmt))
+    elif _isseq(value):
+        if not binary:
+            out.write(" ")
+        _writeseq(out, value)
+    elif binary:
+        out.writeNumber(value)
+    else:
+        out.write(" "+str(value))
+
+def _writeparams(out, params):
+    """Write a parameter list into the output stream.
+
+    params is a list of token/value pairs as returned by _checkparamlist().
+    Sequence values are written in chunks using _writeseq(), all other
+    values are written as arrays with one element.
+    """
+    binary = hasattr(out, "writeRequest")
+    for i in range(0, len(params), 2):
+        token = params[i].strip()
+        value = params[i+1]
+        if binary:
+            out.writeString(token)
+            if isinstance(value, basestring) or not _isseq(value):
+                value = [value]
+            out.writeArray(value)
+        else:
+            out.write(' "'+token+'" ')
+            if isinstance(value, basestring):
+                out.write('["'+value+'"]')
+            elif _isseq(value):
+                _writeseq(out, value)
+            else:
+                out.write('[%s]'%value)
+
+# Regular expression that matches escaped characters in strings
+_ribescape = re.compile(r"\\(.)")
+
+def _encodeInt(v):
+    """Return the binary encoding of an integer."""
+    if -0x80<=v<0x80:
+        return "\200"+struct.pack(">b", v)
+    elif -0x8000<=v<0x8000:
+        return "\201"+struct.pack(">h", v)
+    elif -0x800000<=v<0x800000:
+        return "\202"+struct.pack(">i", v)[1:]
+    elif -0x80000000<=v<0x80000000:
+        return "\203"+struct.pack(">i", v)
+    else:
+        # The value doesn't fit into 4 bytes, so use a double instead
+        return "\245"+struct.pack(">d", v)
+
+def _encodeInts(values):
+    """Return the binary encoding of a list of integers."""
+    if _has_numpy and len(values)>0:
+        vmin = min(values)
+        vmax = max(values)
+        # Use the same number of bytes for all values
+        for w,dtype in [(0,">i1"), (1,">i2"), (3,">i4")]:
+            lim = 1<<(8*w+7)
+            if -lim<=vmin and vmax<lim:
+                res = numpy.empty((len(values), w+2), dtype=numpy.uint8)
+                res[:,0] = 0200+w
+                res[:,1:] = numpy.array(values, dtype=dtype).view(numpy.uint8).reshape(-1, w+1)
+                return res.tostring()
+    return "".join(map(_encodeInt, values))
+
+def _encodeStringValue(s):
+    """Return the binary encoding of a string (without defining a token)."""
+    if isinstance(s, unicode):
+        s = s.encode("utf-8")
+    n = len(s)
+    if n<16:
+        return chr(0220+n)+s
+    elif n<0x100:
+        return "\240"+chr(n)+s
+    elif n<0x10000:
+        return "\241"+struct.pack(">H", n)+s
+    elif n<0x1000000:
+        return "\242"+struct.pack(">I", n)[1:]+s
+    else:
+        return "\243"+struct.pack(">I", n)+s
 
 def _paramlist2dict(paramlist, keyparams):
     """Combine the paramlists (tuple & dict) into one dict.
@@ -2334,27 +2720,23 @@ def _merge_paramlist(paramlist, keyparams):
     return res
     
 
-def _paramlist2string(paramlist, keyparams={}):
-    """Convert the paramlist into a string representation.
+def _checkparamlist(paramlist, keyparams={}):
+    """Merge the parameter list and check the declarations of its tokens.
 
     paramlist is a tuple with function arguments (token/value pairs or
     a dictionary). keyparams is a dictionary with keyword arguments.
-    Each token has to be a string, the value can be of any type. If the
-    value is a string, it's enclosed in apostrophes. A trailing token
-    without a value is ignored, which also means that a trailing RI_NULL
-    can be passed.
-    The resulting string contains a leading space, unless there are no
-    token/value pairs.
+    A trailing token without a value is ignored, which also means that
+    a trailing RI_NULL can be passed. An error is generated for every
+    token that is neither declared nor has an inline declaration.
+    The return value is a list with token/value pairs.
     """
 
     global _declarations
 
     paramlist = _merge_paramlist(paramlist, keyparams)
 
-    res=""
     for i in range(0, len(paramlist), 2):
         token = paramlist[i].strip()
-        value = paramlist[i+1]
         # Extract the name of the token (without inline declaration
         # if there is one)
         f = token.split(" ")
@@ -2364,25 +2746,8 @@ def _paramlist2string(paramlist, keyparams={}):
         if not (tokname in _declarations or inline!=[]):
             _error(RIE_UNDECLARED,RIE_ERROR,'Parameter "'+tokname+
                    '" is not declared.')
-        
-        # Check if the value is a sequence (if it returns an iterator)
-        isseq=0
-        try:
-            isseq = (iter(value)!=None)
-        except:
-            pass
-        # Convert value into the appropriate string representation
-        if isinstance(value, basestring):
-            value='["'+value+'"]'
-#        elif type(value)==types.ListType or type(value)==types.TupleType:
-        elif isseq:
-            value = _seq2list(value)
-        else:
-            value='[%s]'%value
-        res+=' "'+token+'" '+value
 
-    if (res==" "): res=""
-    return res
+    return paramlist
 
 
 ############################################################
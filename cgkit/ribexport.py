@@ -78,6 +78,13 @@ class RIBExporter:
 
     _protocols = ["Export"]
 
+    def __init__(self):
+        # A list of deferred file operations (func, args) or None if
+        # files are written immediately (see fileOperation())
+        self.deferred_ops = None
+        # Sub directory for the geometry archives (used by exportFrames())
+        self.geom_subdir = None
+
     # extension
     def extension():
         return ["rib"]
@@ -97,7 +104,9 @@ class RIBExporter:
                    output_framebuffer = True,
                    bake = False,
                    bakemodel = None,
-                   bakestvar = "st"):
+                   bakestvar = "st",
+                   encoding = "ascii",
+                   compression = None):
         """Export a RIB file.
 
         \a camera is the camera object to use. If None is passed, the
@@ -105,12 +114,17 @@ class RIBExporter:
         \a output is the output file name or a list of output specifiers
                   (which contain the parameters for a RiDisplay() call). If
                   output is None, no RiDisplay() call is done.
+        \a encoding is the RIB encoding ("ascii" or "binary") and
+        \a compression is either None or "gzip". Both settings are also
+        used for the geometry archives.
         """
 
         scene = getScene()
         self.timestep = scene.timer().timestep
         frameNr = int(round(scene.timer().frame))
         self.bake = bake
+        self.encoding = encoding
+        self.compression = compression
 
         # A list with all light sources in the scene
         # (the items are the original lights, *not* the adapted lights)
@@ -147,6 +161,9 @@ class RIBExporter:
 
         # Key: (geom, matid)  Value: File name
         self.geom_file = {}
+
+        # Key: (geom, matid)  Value: Object handle
+        self.geom_instance = {}
         
         # The geom file names creates so far
         # (this dictionary is used to create unique file names)
@@ -156,6 +173,8 @@ class RIBExporter:
         self.shader_path = "shaders"
         self.map_path = "maps"
         self.geom_path = "geoms"
+        if self.geom_subdir!=None:
+            self.geom_path = os.path.join(self.geom_path, self.geom_subdir)
 
         # The list with render passes
         passes = []
@@ -248,9 +267,10 @@ class RIBExporter:
         # Initialize the exporter attribute in the passes...
         for p in passes:
             p.exporter = self
+        self.passes = passes
 
         # Start export...
-        RiBegin(filename)
+        RiBegin(filename, RI_ENCODING, encoding, RI_COMPRESSION, compression)
 
         RiOption("searchpath", "shader", "%s:&"%self.shader_path)
         RiOption("searchpath", "archive", "%s:&"%self.geom_path)
@@ -260,6 +280,9 @@ class RIBExporter:
         if globalrib!=None:
             RiArchiveRecord(RI_VERBATIM, globalrib+"\n")
 
+        # Create object instances for the geoms that are rendered several times
+        self.defineGeomInstances(passes)
+
         # Do render passes...
         print len(passes),"passes..."
 #        nr = 0
@@ -282,6 +305,83 @@ class RIBExporter:
 
         RiEnd()
 
+    # exportFrames
+    def exportFrames(self, filename, frames, processes=None, chunksize=1, **options):
+        """Export one RIB file per frame using a pool of worker processes.
+
+        \a filename must contain a format specifier for the frame number
+        (e.g. "main%04d.rib"). If the output option is a string it may
+        contain a frame number specifier as well. Each worker steps the
+        timer to its frames and calls exportFile() (the remaining options
+        are passed to exportFile()). The geometry archives are stored in
+        a separate sub directory for each frame. Shaders and texture maps
+        are not written by the workers, this is done by the main process
+        once all frames have been exported.
+
+        Every chunk is exported by a new process that starts with the
+        current state of the scene and steps the timer forward from there.
+        So simulations produce the same output as in a sequential export
+        as long as the frames are increasing and don't lie before the
+        current frame (those frames are set directly). The cost is that
+        every chunk has to simulate all frames up to its first frame,
+        larger chunks reduce this overhead.
+
+        \param filename (\c str) RIB file name (with frame number specifier)
+        \param frames A sequence of frame numbers
+        \param processes (\c int) Number of worker processes (None = number of CPUs, 1 = export in this process)
+        \param chunksize (\c int) Number of consecutive frames that are passed to a worker at once
+        \return A dictionary with the frame numbers as keys and the merged filename tables of the render passes as values.
+        """
+        global _frame_exporter
+
+        frames = list(frames)
+        chunks = []
+        for i in range(0, len(frames), chunksize):
+            chunks.append(frames[i:i+chunksize])
+
+        # Create the geoms directory here so that the workers only have
+        # to create their sub directories
+        if not os.path.exists("geoms"):
+            os.mkdir("geoms")
+
+        # The workers access the exporter via a global variable that is
+        # inherited by the child processes (this is why there's no pool
+        # on Windows where there's no fork())
+        _frame_exporter = (self, filename, options)
+        try:
+            if processes==1 or sys.platform=="win32":
+                results = map(_exportFrameChunk, chunks)
+            else:
+                import multiprocessing
+                # Use a new process for every chunk so that each chunk
+                # starts with the scene state of this process (a reused
+                # worker would continue from the last frame of its previous
+                # chunk which may lie behind the next chunk).
+                pool = multiprocessing.Pool(processes, maxtasksperchild=1)
+                try:
+                    results = pool.map(_exportFrameChunk, chunks)
+                finally:
+                    pool.close()
+                    pool.join()
+        finally:
+            _frame_exporter = None
+
+        # Merge the results and do the file operations of the workers
+        # (operations that were requested by several frames are only
+        # done once)
+        tables = {}
+        done = {}
+        for chunkresult in results:
+            for frame, tab, ops in chunkresult:
+                tables[frame] = tab
+                for op in ops:
+                    if op not in done:
+                        func, args = op
+                        func(*args)
+                        done[op] = 1
+
+        return tables
+
     ## protected:
 
     # outputSpec
@@ -498,11 +598,59 @@ class RIBExporter:
         if geom==None:
             return
 
+        # Is there an object instance for the geom?
+        handle = self.geom_instance.get((geom, matid), None)
+        if handle!=None:
+            RiObjectInstance(handle)
+            return
+
+        filename = self.geomArchive(geom, matid)
+        if filename!=None:
+            RiReadArchive(filename)
+
+    # defineGeomInstances
+    def defineGeomInstances(self, passes):
+        """Create object instances for geoms that are rendered several times.
+
+        A geom is instanced when it is used by several visible objects or
+        when there is more than one pass that renders the scene. The
+        instances are defined outside of any frame block so that they can
+        be used by all passes.
+
+        \param passes A list of RenderPass objects
+        """
+        # Determine how often each (geom, matid) pair is used
+        usage = {}
+        keys = []
+        self._countGeomUsage(getScene().worldRoot(), usage, keys)
+        npasses = len(filter(lambda p: not isinstance(p, TexPass), passes))
+
+        for key in keys:
+            if usage[key]*npasses<2:
+                continue
+            geom, matid = key
+            filename = self.geomArchive(geom, matid)
+            if filename==None:
+                continue
+            handle = RiObjectBegin()
+            RiReadArchive(filename)
+            RiObjectEnd()
+            self.geom_instance[key] = handle
+
+    # geomArchive
+    def geomArchive(self, geom, matid=0):
+        """Return the name of the archive that contains a geometry.
+
+        The archive is written if the geom wasn't exported yet.
+
+        \param geom (\c GeomObject) Geometry
+        \param matid (\c int) Material id
+        \return Archive file name (without path) or None if the geometry is unknown.
+        """
+
         # Was the geom already exported?
         if (geom, matid) in self.geom_file:
-            filename = self.geom_file[geom, matid]
-            RiReadArchive(filename)
-            return
+            return self.geom_file[geom, matid]
 
         # The geom was not exported, so do it now...
 
@@ -510,11 +658,11 @@ class RIBExporter:
             expgeom = self.adapt(geom, IGeometry)
         except NotImplementedError:
             print 'Warning: Unknown geometry: "%s" (%s)'%(geom.name, geom.__class__.__name__)
-            return
+            return None
 
         # Create the geoms directory if it doesn't exist
         if not os.path.exists(self.geom_path):
-            os.mkdir(self.geom_path)
+            os.makedirs(self.geom_path)
 
         # Determine the output file name (without path)
         n = "%s_id%d_%s.rib"%(geom.__class__.__name__, matid, geom.name)
@@ -523,12 +671,33 @@ class RIBExporter:
         self.geom_file[geom, matid] = filename
 
         ctx = RiGetContext()
-        RiBegin(os.path.join(self.geom_path, filename))
+        RiBegin(os.path.join(self.geom_path, filename),
+                RI_ENCODING, self.encoding, RI_COMPRESSION, self.compression)
         RiOption(RI_RIBOUTPUT, RI_VERSION, 0)
         expgeom.render(matid)
         RiEnd()
         RiContext(ctx)
-        RiReadArchive(filename)        
+        return filename
+
+    # _countGeomUsage
+    def _countGeomUsage(self, obj, usage, keys):
+        """Count how often the geoms below obj are rendered.
+
+        \param obj (\c WorldObject) Parent object
+        \param usage (\c dict) Key: (geom, matid)  Value: Number of objects
+        \param keys (\c list) Receives the keys in the order they were encountered
+        """
+        for child in obj.iterChilds():
+            if not child.visible:
+                continue
+            if child.geom!=None:
+                for i in range(child.getNumMaterials()):
+                    key = (child.geom, i)
+                    if key not in usage:
+                        usage[key] = 0
+                        keys.append(key)
+                    usage[key] += 1
+            self._countGeomUsage(child, usage, keys)
 
 
     # writeShader
@@ -549,15 +718,11 @@ class RIBExporter:
         shadername = self.makeFilenameUnique(name, self.shader_names)
         self.shader_names[shadername]=1
 
-        # Create the shaders directory if it doesn't exist
-        if not os.path.exists(self.shader_path):
-            os.mkdir(self.shader_path)
-
         filename = os.path.join(self.shader_path, shadername+".sl")
-        f = file(filename, "wt")
+        lines = []
         # Add the macros that are used for baking...
         if self.bake:
-            f.write("#define BAKE_PASS\n")
+            lines.append("#define BAKE_PASS\n")
             begin = 'varying point _P_bake = transform("world", "current", transform("camera", "object", Pref));\\\n  varying point _P_orig = P;\\\n  P = _P_bake;'
             end = 'P = _P_orig;'
             normal = 'normalize(n);'
@@ -565,20 +730,42 @@ class RIBExporter:
             begin = ""
             end = ""
             normal = 'faceforward(normalize(n),I);'
-        f.write("#define BAKE_BEGIN %s\n"%begin)
-        f.write("#define BAKE_END %s\n"%end)
-        f.write("#define BAKE_NORMAL(n) %s\n\n"%normal)
+        lines.append("#define BAKE_BEGIN %s\n"%begin)
+        lines.append("#define BAKE_END %s\n"%end)
+        lines.append("#define BAKE_NORMAL(n) %s\n\n"%normal)
             
-        f.write(source.replace("$SHADERNAME", shadername))
-        f.close()
+        lines.append(source.replace("$SHADERNAME", shadername))
+        self.fileOperation(_writeFile, filename, "".join(lines))
         return shadername
 
+    # fileOperation
+    def fileOperation(self, func, *args):
+        """Call a function that writes an output file.
+
+        The function is called immediately unless the export is done
+        by a worker process of exportFrames(). In this case, the call is
+        stored and done by the main process. func must be a module level
+        function and args must be picklable.
+
+        \param func A function that writes a file
+        \param args The arguments for func
+        """
+        if self.deferred_ops==None:
+            func(*args)
+        else:
+            self.deferred_ops.append((func, args))
+
     # checkMapPath
     def checkMapPath(self):
         """Create the map directory if it doesn't already exist.
         """
         if not os.path.exists(self.map_path):
-            os.mkdir(self.map_path)
+            try:
+                os.mkdir(self.map_path)
+            except OSError:
+                # The directory might have been created by another process
+                if not os.path.isdir(self.map_path):
+                    raise
 
 
     # makePassOutputUnique
@@ -672,6 +859,69 @@ class RIBExporter:
         return protocols.adapt(obj, interface)
         
 
+# The exporter, file name and options used by the workers of exportFrames()
+_frame_exporter = None
+
+# _exportFrameChunk
+def _exportFrameChunk(frames):
+    """Export a chunk of frames.
+
+    This is the worker function of RIBExporter.exportFrames().
+    Returns a list of tuples (frame, filename table, file operations).
+    """
+    exporter, filename, options = _frame_exporter
+    timer = getScene().timer()
+    res = []
+    for frame in frames:
+        # Step the timer to the frame (so that simulations are updated
+        # as well). Only if the frame lies in the past, it's set directly.
+        while int(round(timer.frame))<frame:
+            timer.step()
+        if int(round(timer.frame))!=frame:
+            timer.frame = frame
+
+        opts = dict(options)
+        output = opts.get("output", None)
+        if isinstance(output, types.StringTypes) and "%" in output:
+            opts["output"] = output%frame
+
+        exporter.deferred_ops = []
+        exporter.geom_subdir = "%04d"%frame
+        try:
+            exporter.exportFile(filename%frame, **opts)
+        finally:
+            ops = exporter.deferred_ops
+            exporter.deferred_ops = None
+            exporter.geom_subdir = None
+
+        tab = {}
+        for rpass in exporter.passes:
+            tab.update(rpass.getFilenameTable())
+        res.append((frame, tab, ops))
+    return res
+
+# _writeFile
+def _writeFile(filename, data):
+    """Write a text file (and create its directory if necessary)."""
+    dir = os.path.dirname(filename)
+    if dir!="" and not os.path.exists(dir):
+        os.mkdir(dir)
+    f = file(filename, "wt")
+    f.write(data)
+    f.close()
+
+# _convertImageMap
+def _convertImageMap(texmap, tifname):
+    """Convert an image file into a TIF file."""
+    # Read original map
+    try:
+        img = Image.open(texmap)
+    except IOError, e:
+        print e
+        return
+    # Save map as TIF file
+    img.save(tifname)
+
 ######################################################################
 
 # RenderPass
@@ -1292,18 +1542,11 @@ class TexPass(RenderPass):
         if ext.lower()!=".tif":
             print 'Converting "%s"'%texmap
             tifname = os.path.join(self.exporter.map_path, name+".tif")
-            # Read original map
-            try:
-                img = Image.open(texmap)
-            except IOError, e:
-                print e
-                return
-            # Save map as TIF file
-            img.save(tifname)
+            self.exporter.fileOperation(_convertImageMap, texmap, tifname)
         else:
             print 'Copying "%s"'%texmap
             dest = os.path.join(self.exporter.map_path, os.path.basename(texmap))
-            shutil.copyfile(texmap, dest)
+            self.exporter.fileOperation(shutil.copyfile, texmap, dest)
 
 
 ######################################################################
@@ -39,8 +39,25 @@ import string
 import os.path
 import re
 import glob as _glob
+import fnmatch
 import copy
 import shutil
+import threading
+import Queue
+import bisect
+import itertools
+# Use os.scandir() (or the scandir backport) if available (this can
+# avoid calling stat() on every file when scanning directories)
+try:
+    from os import scandir as _scandir
+except ImportError:
+    try:
+        from scandir import scandir as _scandir
+    except ImportError:
+        _scandir = None
+
+# Regular expression that splits a string into text and number parts
+_numSplitRegexp = re.compile(r"([0-9]+)")
 
 class SeqString:
     """Sequence string class.
@@ -188,6 +205,17 @@ class SeqString:
         else:
             return 0
         
+    def _sortKey(self):
+        """Return a key for sorting sequence strings.
+        
+        Comparing the keys gives the same result as comparing the sequence
+        strings themselves, but it is much faster when sorting large lists.
+        """
+        res = list(self._value)
+        for i in range(1, len(res), 2):
+            res[i] = res[i][0]
+        return tuple(res)
+        
     def _initSeqString(self, s):
         """Initialize the sequence string with a string.
 
@@ -201,6 +229,17 @@ class SeqString:
             s = ""
             
         s = str(s)
+        
+        # Without number delimiters, the string can be split using a regular
+        # expression which is faster than the loop below
+        if self._number_delim is None:
+            res = _numSplitRegexp.split(s)
+            for i in range(1, len(res), 2):
+                v = res[i]
+                res[i] = (int(v),len(v))
+            self._value = res
+            return
+        
         textbuf = ""
         numtup = (0,0)
         res = []
@@ -518,17 +557,40 @@ class Sequence:
     
     The class can be used like a list (using :func:`len()`, index operator or
     iteration).
+    
+    If *compact* is ``True``, the sequence doesn't store the individual
+    names but only the text parts of the names (which are the same for
+    all names) and the numbers as runs of values (plus the padding of those
+    names whose padding deviates from the first name). The :class:`SeqString`
+    objects are then created on demand. This requires considerably less
+    memory for large sequences, but a compact sequence cannot store objects.
     """
     
-    def __init__(self):
+    def __init__(self, compact=False):
         """Constructor.
         """
-        # A list of file names (stored as SeqString objects)
+        # A list of file names (stored as SeqString objects). This is not
+        # used in compact mode.
         self._names = []
         
         # The actual objects. This is either a list that always has as many
         # items as _names or it is None.
         self._objects = None
+        
+        # Compact mode?
+        self._compact = compact
+        # The following attributes are only used in compact mode:
+        # The first name in the sequence (which provides the text parts)
+        self._first = None
+        # One _IntRuns object per number in the names
+        self._numbers = []
+        # The default widths of the numbers (taken from the first name)
+        self._widths = None
+        # The widths of the names that deviate from the default widths.
+        # Key: Index - Value: Tuple of widths
+        self._widthExceptions = {}
+        # The number of names
+        self._size = 0
     
     def __str__(self):
         placeholder,ranges = self.sequenceName()
@@ -537,7 +599,7 @@ class Sequence:
         else:
             infoStr = "; ".join(ranges)
             if len(infoStr)>20:
-                infoStr = "%d items"%len(self._names) 
+                infoStr = "%d items"%len(self) 
             return "%s (%s)"%(placeholder, infoStr)
 
     def __repr__(self):
@@ -546,6 +608,8 @@ class Sequence:
     def __len__(self):
         """Return the length of the sequence.
         """
+        if self._compact:
+            return self._size
         return len(self._names)
     
     def __getitem__(self, idx):
@@ -555,6 +619,14 @@ class Sequence:
         in the sequence or it is a SeqString containing the name if the
         original object was just a string.
         """
+        if self._compact:
+            if isinstance(idx, slice):
+                return [self._compactName(i) for i in range(*idx.indices(self._size))]
+            if idx<0:
+                idx += self._size
+            if idx<0 or idx>=self._size:
+                raise IndexError("sequence index out of range")
+            return self._compactName(idx)
         if self._objects is None:
             return self._names[idx]
         else:
@@ -565,6 +637,8 @@ class Sequence:
         
         Yields :class:`SeqString` objects.
         """
+        if self._compact:
+            return self._iterCompactNames()
         return iter(self._names)
     
     def iterObjects(self):
@@ -595,10 +669,10 @@ class Sequence:
         if not isinstance(name, SeqString):
             name = SeqString(name)
         
-        if len(self._names)==0:
+        if len(self)==0:
             return True
         else:
-            return self._names[0].match(name, numPos)
+            return self._firstName().match(name, numPos)
 
     def append(self, name, obj=None):
         """Append a name/object to the end of the sequence.
@@ -625,6 +699,12 @@ class Sequence:
             placeholder,ranges = self.sequenceName()
             raise ValueError("Cannot add '%s' to sequence %s. The name doesn't match the sequence."%(name, placeholder))
 
+        if self._compact:
+            if obj is not None:
+                raise ValueError("A compact sequence cannot store objects")
+            self._appendCompact(name)
+            return
+
         if obj is not None:
             if self._objects is None:
                 if len(self._names)==0:
@@ -636,6 +716,67 @@ class Sequence:
             raise ValueError("objects must be given for all or none of the names")
             
         self._names.append(name)
+    
+    def _appendCompact(self, name):
+        """Append a name to a compact sequence.
+        
+        name must be a SeqString that matches the sequence.
+        """
+        value = name._value
+        widths = tuple([value[i][1] for i in range(1, len(value), 2)])
+        if self._first is None:
+            self._first = copy.deepcopy(name)
+            self._widths = widths
+            self._numbers = [_IntRuns() for w in widths]
+        elif widths!=self._widths:
+            self._widthExceptions[self._size] = widths
+        for i,runs in enumerate(self._numbers):
+            runs.append(value[2*i+1][0])
+        self._size += 1
+    
+    def _firstName(self):
+        """Return the first name as SeqString (or None if the sequence is empty).
+        """
+        if self._compact:
+            return self._first
+        elif len(self._names)==0:
+            return None
+        return self._names[0]
+    
+    def _compactName(self, idx):
+        """Create the SeqString for a name in a compact sequence.
+        
+        idx must be a valid (positive) index.
+        """
+        widths = self._widthExceptions.get(idx, self._widths)
+        value = list(self._first._value)
+        for i,runs in enumerate(self._numbers):
+            value[2*i+1] = (runs[idx], widths[i])
+        res = SeqString()
+        res._value = value
+        return res
+    
+    def _iterCompactNames(self):
+        """Iterate over the names of a compact sequence.
+        """
+        if self._size==0:
+            return
+        template = self._first._value
+        if len(self._numbers)==0:
+            for i in range(self._size):
+                res = SeqString()
+                res._value = list(template)
+                yield res
+            return
+        
+        for idx,nums in enumerate(itertools.izip(*self._numbers)):
+            widths = self._widthExceptions.get(idx, self._widths)
+            value = list(template)
+            for i,num in enumerate(nums):
+                value[2*i+1] = (num, widths[i])
+            res = SeqString()
+            res._value = value
+            yield res
         
     def sequenceNumberIndex(self):
         """Return the index of the sequence number.
@@ -700,16 +841,17 @@ class Sequence:
         whose range only consists of a single value will not be replaced
         by # or @ and will not appear in the "ranges" list.
         """
-        if len(self._names)==0:
+        first = self._firstName()
+        if first is None:
             return "", []
         
         # How many numbers do we have in the string?
-        n = self._names[0].numCount()
+        n = first.numCount()
         if n==0:
-            return str(self._names[0]), []
+            return str(first), []
         
         # The minimum width of every number
-        minWidths = self._names[0].getNumWidths()
+        minWidths = first.getNumWidths()
         # The maximum width of every number
         maxWidths = list(minWidths)
         # A flag indicating whether the number is unpadded or not
@@ -718,26 +860,34 @@ class Sequence:
         values = []
         for i in range(n):
             values.append([])
-                
-        # Collect all required values from the names
-        for name in self._names:
-            for i in range(name.numCount()):
-                v = name.getNum(i)
-                w = name.getNumWidth(i)
-                
-                # Update the minimum width
-                minWidths[i] = min(w, minWidths[i])
-                # Update the maximum width
-                maxWidths[i] = max(w, maxWidths[i])
-                # Update the unpadded flag
-                if len(str(v))<w:
+        
+        # Compact sequence where all names have the same padding? Then the
+        # information can be obtained from the runs directly
+        if self._compact and len(self._widthExceptions)==0:
+            for i,runs in enumerate(self._numbers):
+                values[i] = runs.distinctValues()
+                if runs.minDigits()<minWidths[i]:
                     unpadded[i] = False
-                # Update the value list (don't append if the last value is the same as v)
-                if len(values[i])==0 or values[i][-1]!=v:
-                    values[i].append(v)
+        else:
+            # Collect all required values from the names
+            for name in self.iterNames():
+                for i in range(name.numCount()):
+                    v = name.getNum(i)
+                    w = name.getNumWidth(i)
+                    
+                    # Update the minimum width
+                    minWidths[i] = min(w, minWidths[i])
+                    # Update the maximum width
+                    maxWidths[i] = max(w, maxWidths[i])
+                    # Update the unpadded flag
+                    if len(str(v))<w:
+                        unpadded[i] = False
+                    # Update the value list (don't append if the last value is the same as v)
+                    if len(values[i])==0 or values[i][-1]!=v:
+                        values[i].append(v)
                     
         # Compute the sequence name that has the numbers replaced by placeholders
-        res = copy.deepcopy(self._names[0])
+        res = copy.deepcopy(first)
         rangeStrs = []
         for i in range(len(minWidths)):
             # If there is only one single value anyway then just leave the number
@@ -764,6 +914,86 @@ class Sequence:
         return str(res), rangeStrs
 
 
+class _IntRuns:
+    """A list of integers that is stored as runs of equally spaced values.
+    
+    This is used by compact sequences to store the numbers of the names.
+    A sequence of consecutive frame numbers only requires a single run.
+    """
+    
+    def __init__(self):
+        # The first value, the step and the number of values of each run
+        self._starts = []
+        self._steps = []
+        self._counts = []
+        # The index of the first value of each run
+        self._offsets = []
+        self._len = 0
+    
+    def __len__(self):
+        return self._len
+    
+    def __getitem__(self, idx):
+        if idx<0:
+            idx += self._len
+        if idx<0 or idx>=self._len:
+            raise IndexError("index out of range")
+        i = bisect.bisect_right(self._offsets, idx)-1
+        return self._starts[i]+self._steps[i]*(idx-self._offsets[i])
+    
+    def __iter__(self):
+        for start,step,count in zip(self._starts, self._steps, self._counts):
+            for i in xrange(count):
+                yield start+i*step
+    
+    def append(self, value):
+        """Append a value.
+        """
+        if self._len>0:
+            count = self._counts[-1]
+            if count==1:
+                self._steps[-1] = value-self._starts[-1]
+                self._counts[-1] = 2
+                self._len += 1
+                return
+            elif value==self._starts[-1]+count*self._steps[-1]:
+                self._counts[-1] = count+1
+                self._len += 1
+                return
+        self._starts.append(value)
+        self._steps.append(0)
+        self._counts.append(1)
+        self._offsets.append(self._len)
+        self._len += 1
+    
+    def distinctValues(self):
+        """Return a list of the values where runs of equal values are only listed once.
+        """
+        res = []
+        for start,step,count in zip(self._starts, self._steps, self._counts):
+            if step==0:
+                res.append(start)
+            else:
+                res.extend(xrange(start, start+count*step, step))
+        return res
+    
+    def minDigits(self):
+        """Return the minimum number of characters of the values when converted to a string.
+        """
+        res = None
+        for start,step,count in zip(self._starts, self._steps, self._counts):
+            end = start+(count-1)*step
+            # The values of a run are monotonic, so the shortest value is
+            # either one of the end points or 0 if the run crosses 0
+            if start*end<=0:
+                n = 1
+            else:
+                n = min(len(str(start)), len(str(end)))
+            if res is None or n<res:
+                res = n
+        return res
+
+
 class Range:
     """Range class.
     
@@ -1726,7 +1956,7 @@ class OutputNameGenerator:
         return dstTemplate, numIdxs, seqNumIdx
 
 
-class _SequenceProcessor:
+class _SequenceProcessor(object):
     """Base class for move/copy/link.
     """
     
@@ -1829,24 +2059,196 @@ class _SequenceProcessor:
             if src!=dst:
                 outStream.write("%s -> %s\n"%(uiSrc, uiDst))
     
-    def run(self, outStream=None):
+    def run(self, outStream=None, numThreads=0, progress=None, journal=None):
         """Do the operation.
 
         *outStream* is an object with a :meth:`write()` and :meth:`flush()`
         method that will receive the text (only in verbose mode). If ``None``
         is passed, ``sys.stdout`` is used.
+        
+        If *numThreads* is greater than 1, the file operations are carried
+        out concurrently by that many threads. Operations that depend on
+        each other (because they refer to the same file) are still done in
+        the same order as they would be done sequentially.
+        
+        *progress* may be a callable that gets called with the arguments
+        (*numDone*, *numTotal*) after each file operation.
+        
+        *journal* may be the name of a file that keeps track of the
+        operations that have already been done. If the operation gets
+        interrupted, the journal file is left behind and calling :meth:`run()`
+        again with the same journal (or calling :func:`resumeJournal()`)
+        only carries out the remaining operations (the list of operations
+        is then taken from the journal). The journal is deleted when all
+        operations have been done successfully.
         """
         if outStream is None:
             outStream = sys.stdout
         
+        fileTab = self._fileTab
+        done = set()
+        if journal is not None:
+            if os.path.exists(journal):
+                clsName,fileTab,done = _readJournal(journal)
+                if clsName!=self.__class__.__name__:
+                    raise ValueError('Journal "%s" was written by a %s operation'%(journal, clsName))
+                # Operations that were done but not recorded anymore
+                done = self._probeUnrecorded(fileTab, done)
+            # (Re-)write the journal (this also gets rid of an incomplete
+            # last line if the previous run was interrupted while writing)
+            journalFile = open(journal, "wt")
+            _writeJournalHeader(journalFile, self.__class__.__name__, fileTab, done)
+        
+        todo = []
+        numTotal = 0
+        for idx,item in enumerate(fileTab):
+            if item[0]!=item[1]:
+                numTotal += 1
+                if idx not in done:
+                    todo.append((idx,item))
+        status = {"numDone" : numTotal-len(todo)}
+        
+        # Called (in the calling thread) after a file operation was done
+        def finished(idx):
+            if journal is not None:
+                journalFile.write("done\t%d\n"%idx)
+                journalFile.flush()
+            status["numDone"] += 1
+            if progress is not None:
+                progress(status["numDone"], numTotal)
+        
         # Execute the list
-        for src,dst,uiSrc,uiDst in self._fileTab:
-            if src!=dst:
+        try:
+            for stage in self._operationStages(todo):
+                self._runStage(stage, numThreads, outStream, finished)
+        finally:
+            if journal is not None:
+                journalFile.close()
+        
+        if journal is not None:
+            os.remove(journal)
+    
+    def _probeUnrecorded(self, fileTab, done):
+        """Find the operations that were done but not recorded in the journal.
+        
+        fileTab is the file table from the journal and done the set of
+        indices of the operations that are recorded as being done. Only
+        operations whose preceding operations (on the same files) are all
+        done can have been carried out, so only those are checked using
+        :meth:`_operationDone()` (other operations may look as if they were
+        done because their files haven't been touched yet). Returns the
+        updated set of indices.
+        """
+        done = set(done)
+        # Key: File name  Value: Index of the last operation on that file
+        lastOp = {}
+        for idx,item in enumerate(fileTab):
+            src = item[0]
+            dst = item[1]
+            if src==dst:
+                continue
+            if idx not in done:
+                deps = [lastOp[name] for name in (src, dst) if name in lastOp]
+                ready = len(filter(lambda dep: dep not in done, deps))==0
+                if ready and self._operationDone(src, dst):
+                    done.add(idx)
+            lastOp[src] = idx
+            lastOp[dst] = idx
+        return done
+    
+    def _operationStages(self, items):
+        """Split the file operations into stages of independent operations.
+        
+        items is a list of tuples (idx, fileTabItem). Returns a list of
+        stages where each stage is a list of items. Operations in the same
+        stage never refer to the same file, so they can be done in any
+        order. An operation that refers to a file that was already used by
+        a previous operation is put into a later stage.
+        """
+        stages = []
+        lastStage = {}
+        for item in items:
+            src = item[1][0]
+            dst = item[1][1]
+            stage = max(lastStage.get(src, -1), lastStage.get(dst, -1))+1
+            if stage==len(stages):
+                stages.append([])
+            stages[stage].append(item)
+            lastStage[src] = stage
+            lastStage[dst] = stage
+        return stages
+    
+    def _runStage(self, stage, numThreads, outStream, finished):
+        """Carry out the file operations of one stage.
+        
+        stage is a list of (idx, fileTabItem) tuples. finished is a callable
+        that gets called with idx after an operation was done (it is always
+        called in the calling thread). If an operation fails, the remaining
+        operations are not started anymore and the exception is raised
+        again in the calling thread.
+        """
+        if numThreads<=1 or len(stage)<2:
+            for idx,(src,dst,uiSrc,uiDst) in stage:
                 if self._verbose:
                     outStream.write("%s -> %s\n"%(uiSrc, uiDst))
                     outStream.flush()
                 self._fileOperation(src, dst)
-                
+                finished(idx)
+            return
+        
+        tasks = Queue.Queue()
+        results = Queue.Queue()
+        abort = threading.Event()
+        
+        def worker():
+            while 1:
+                try:
+                    idx,item = tasks.get(False)
+                except Queue.Empty:
+                    return
+                if abort.isSet():
+                    results.put((idx, "skipped", None))
+                    continue
+                try:
+                    self._fileOperation(item[0], item[1])
+                    results.put((idx, "ok", None))
+                except:
+                    results.put((idx, "error", sys.exc_info()))
+        
+        uiNames = {}
+        for idx,item in stage:
+            tasks.put((idx,item))
+            uiNames[idx] = item[2:4]
+        for i in range(min(numThreads, len(stage))):
+            thread = threading.Thread(target=worker, name="FileOperation%d"%i)
+            thread.setDaemon(True)
+            thread.start()
+        
+        error = None
+        try:
+            for i in range(len(stage)):
+                # Wait with a timeout so that the main thread remains interruptible
+                while 1:
+                    try:
+                        idx,res,excInfo = results.get(True, 0.5)
+                        break
+                    except Queue.Empty:
+                        pass
+                if res=="ok":
+                    if self._verbose:
+                        outStream.write("%s -> %s\n"%uiNames[idx])
+                        outStream.flush()
+                    finished(idx)
+                elif res=="error" and error is None:
+                    error = excInfo
+                    abort.set()
+        finally:
+            abort.set()
+        
+        if error is not None:
+            excType,excValue,tb = error
+            raise excType, excValue, tb
+    
     def _fileOperation(self, src, dst):
         """Do the file operation.
         
@@ -1854,6 +2256,17 @@ class _SequenceProcessor:
         """
         raise NotImplementedError("This method must be implemented in a derived class")
     
+    def _operationDone(self, src, dst):
+        """Check if a file operation has already been done.
+        
+        This is used when an interrupted operation is resumed from a journal.
+        It is only called for operations that are not recorded as being
+        done in the journal (because the operation was interrupted before the
+        journal was written). The default implementation returns False which
+        means the operation is done again.
+        """
+        return False
+    
     def _resolveCollisions(self, fileTable, srcFiles):
         """Modify the file table, so that moving files doesn't result in collisions.
         
@@ -1924,6 +2337,11 @@ class MoveSequence(_SequenceProcessor):
         """
         shutil.move(src, dst)
     
+    def _operationDone(self, src, dst):
+        """Check if a file has already been moved.
+        """
+        return not os.path.lexists(src) and os.path.lexists(dst)
+    
     def _checkCollisions(self, fileTable, srcFiles):
         """Check if moving/renaming the files would lead to collisions.
         
@@ -2114,8 +2532,82 @@ class SymLinkSequence(CopySequence):
         """
         os.symlink(src, dst)
 
+    def _operationDone(self, src, dst):
+        """Check if a link has already been created.
+        """
+        return os.path.islink(dst) and os.readlink(dst)==src
+
 
-def buildSequences(names, numPos=None, assumeFiles=False, nameFunc=None, numDelim=None):
+def resumeJournal(journal, outStream=None, numThreads=0, progress=None, verbose=False):
+    """Resume an interrupted move/copy/link operation.
+    
+    *journal* is the name of the journal file that was passed to the
+    :meth:`run()` method of the interrupted :class:`MoveSequence`,
+    :class:`CopySequence` or :class:`SymLinkSequence` object. The remaining
+    operations are carried out and the journal is deleted. See
+    :meth:`run()` for the remaining arguments. *verbose* determines whether
+    each file is printed during the operation.
+    """
+    clsName,fileTab,done = _readJournal(journal)
+    classes = {"MoveSequence" : MoveSequence,
+               "CopySequence" : CopySequence,
+               "SymLinkSequence" : SymLinkSequence}
+    cls = classes.get(clsName)
+    if cls is None:
+        raise ValueError('Journal "%s" was written by an unknown operation: %s'%(journal, clsName))
+    # The file table is taken from the journal, so the constructor is bypassed
+    processor = cls.__new__(cls)
+    processor._mergesNumbers = False
+    processor._verbose = verbose
+    processor._fileTab = fileTab
+    processor.run(outStream, numThreads=numThreads, progress=progress, journal=journal)
+
+def _writeJournalHeader(f, clsName, fileTab, done):
+    """Write the header of a journal file.
+    
+    The header contains the name of the processor class, the entire
+    file table (one operation per line) and the indices of the operations
+    that have already been done.
+    """
+    f.write("# cgkit sequence journal\n")
+    f.write("class\t%s\n"%clsName)
+    for item in fileTab:
+        for name in item:
+            if "\t" in name or "\n" in name:
+                raise ValueError("File names with tabs or newlines cannot be recorded in a journal: %r"%name)
+        f.write("op\t%s\n"%"\t".join(item))
+    for idx in sorted(done):
+        f.write("done\t%d\n"%idx)
+    f.flush()
+
+def _readJournal(fileName):
+    """Read a journal file.
+    
+    Returns a tuple (clsName, fileTab, done) where done is the set of
+    file table indices that have been recorded as being done.
+    """
+    clsName = None
+    fileTab = []
+    done = set()
+    f = open(fileName, "rt")
+    for line in f:
+        if not line.endswith("\n"):
+            # An incomplete line (the process was interrupted while writing)
+            break
+        fields = line[:-1].split("\t")
+        if fields[0]=="class":
+            clsName = fields[1]
+        elif fields[0]=="op":
+            fileTab.append(tuple(fields[1:5]))
+        elif fields[0]=="done":
+            done.add(int(fields[1]))
+    f.close()
+    if clsName is None:
+        raise ValueError('"%s" is not a valid journal file'%fileName)
+    return clsName, fileTab, done
+
+
+def buildSequences(names, numPos=None, assumeFiles=False, nameFunc=None, numDelim=None, compact=False):
     """Create sorted sequences from a list of names/objects.
     
     *names* is a list of objects (usually strings) that are grouped into sequences.
@@ -2139,10 +2631,16 @@ def buildSequences(names, numPos=None, assumeFiles=False, nameFunc=None, numDeli
     identify negative numbers from hyphen characters. For example, if ``numDelim=="."``, 
     then the parsing process can assume ``file.-001.tif`` should produce the number -1.   
     By default, the ``"-"`` character would be consumed as part of the string name.
+    
+    If *compact* is ``True``, the returned sequences are compact sequences
+    (see :class:`Sequence<cgkit.sequence.Sequence>`). This cannot be combined
+    with *nameFunc*.
 
     Returns a list of :class:`Sequence<cgkit.sequence.Sequence>` objects.
     The sequences and the files within the sequences are sorted.
     """
+    if compact and nameFunc is not None:
+        raise ValueError("Compact sequences cannot store objects")
     # Create the objects list which contains 2-tuples (seqString,obj).
     # obj is the original object from the "names" list or None.
     if nameFunc is None:
@@ -2153,27 +2651,32 @@ def buildSequences(names, numPos=None, assumeFiles=False, nameFunc=None, numDeli
     # The order of the result is already so that members of the same
     # sequence are together, we just don't know yet where a sequence ends
     # and the next one begins.
-    objects = sorted(objects, key=lambda tup: tup[0])
+    objects = sorted(objects, key=lambda tup: tup[0]._sortKey())
     
-    return _buildSequences(objects, numPos, assumeFiles, numDelim)
+    return _buildSequences(objects, numPos, assumeFiles, numDelim, compact)
     
-def _buildSequences(objects, numPos=None, assumeFiles=False, numDelim=None):
+def _buildSequences(objects, numPos=None, assumeFiles=False, numDelim=None, compact=False):
     """Helper function for buildSequences().
     
     objects is a sorted list of (name,obj) tuples.
     """
     res = []
     
+    # Key: Directory - Value: Number count in the directory name
+    pathNumCounts = {}
+    
     # Build sequences...
-    currentSeq = Sequence()
+    currentSeq = Sequence(compact)
     currentPath = None
     for name,obj in objects:
         # Are we dealing with file names? Then freeze directory numbers...
         if assumeFiles:
             path,n = os.path.split(str(name))
-            pathseq = SeqString(path,numDelim)
             # n: The number count in the path (these numbers have to be frozen)
-            n = pathseq.numCount()
+            n = pathNumCounts.get(path)
+            if n is None:
+                n = SeqString(path,numDelim).numCount()
+                pathNumCounts[path] = n
             for i in range(n):
                 name.replaceNum(0, name.getNumStr(0))
             
@@ -2197,7 +2700,7 @@ def _buildSequences(objects, numPos=None, assumeFiles=False, numDelim=None):
         # Do we have to begin a new sequence?
         if sequenceSplit:
             res.append(currentSeq)
-            currentSeq = Sequence()
+            currentSeq = Sequence(compact)
             
         # Add the current name to the current sequence
         currentSeq.append(name, obj)
@@ -2295,7 +2798,7 @@ def compactRange(values):
                 
     return ",".join(rs)
 
-def glob(name, numDelim=None):
+def glob(name, numDelim=None, compact=False):
     """Create file sequences from a name pattern.
     
     *name* is a file pattern that will get a ``'*'`` appended. The pattern is then
@@ -2307,6 +2810,9 @@ def glob(name, numDelim=None):
     identify negative numbers from hyphen characters. For example, if ``numDelim=="."``, 
     then the parsing process can assume ``file.-001.tif`` should produce the number -1.   
     By default, the ``"-"`` character would be consumed as part of the string name.
+    
+    If *compact* is ``True``, the returned sequences are compact sequences
+    (see :class:`Sequence<cgkit.sequence.Sequence>`).
 
     Returns a list of :class:`Sequence<cgkit.sequence.Sequence>` objects.
     The sequences and the files within the sequences are sorted.
@@ -2347,21 +2853,149 @@ def glob(name, numDelim=None):
         s = s[m.end():]
 
     regexp = "".join(regexp)
+    reg = re.compile(regexp)
     
-    # Get a list of potential file names    
-    fileNames = _glob.glob(globpattern)
+    # Get a list of potential file names. If the directory part doesn't
+    # contain any wildcards, the directory is scanned directly, otherwise
+    # glob is used to find the directories.
+    dirPattern,filePattern = os.path.split(globpattern)
+    if _glob.has_magic(dirPattern):
+        dirNames = filter(os.path.isdir, _glob.glob(dirPattern))
+    else:
+        dirNames = [dirPattern]
+    fileReg = re.compile(fnmatch.translate(os.path.normcase(filePattern)))
+    
+    objects = []
+    for dirName in dirNames:
+        for fileName,isDir in _scanDir(dirName):
+            # Skip directories and (like glob) hidden files unless the
+            # pattern explicitly asks for them
+            if isDir or (fileName[0]=="." and filePattern[0]!="."):
+                continue
+            if fileReg.match(os.path.normcase(fileName)) is None:
+                continue
+            # Remove files that don't have any number in their name (without ext)
+            if _numSplitRegexp.search(os.path.splitext(fileName)[0]) is None:
+                continue
+            # Remove files that don't match the regular expression
+            n = os.path.join(dirName, fileName)
+            if reg.match(n) is None:
+                continue
+            objects.append((SeqString(n, numDelim),None))
     
-    # Remove all directories
-    fileNames = filter(lambda n: not os.path.isdir(n), fileNames)
+    objects.sort(key=lambda tup: tup[0]._sortKey())
+    return _buildSequences(objects, assumeFiles=True, numDelim=numDelim, compact=compact)
+
+def findSequences(dirNames, recursive=False, numThreads=0, numDelim=None, compact=False):
+    """Find all file sequences in one or more directories.
     
-    # Remove files that don't match the regular expression
-    reg = re.compile(regexp)
-    fileNames = filter(lambda n: reg.match(n) is not None, fileNames)
+    *dirNames* is a directory name or a list of directory names that are
+    scanned for file sequences (only files that contain a number in their
+    name (excluding the extension) are considered).
+    If *recursive* is ``True``, the sub-directories are scanned as well.
+    If *numThreads* is greater than 0, the directories are scanned by that
+    many threads in parallel (which is mainly useful on network file systems
+    and when several directories are scanned).
     
-    # Remove files that don't have any number in their name (without ext)
-    fileNames = filter(lambda n: SeqString(os.path.splitext(n)[0]).numCount()>0, fileNames)
+    *numDelim* and *compact* have the same meaning as in :func:`glob()`.
+    
+    Returns a list of :class:`Sequence<cgkit.sequence.Sequence>` objects.
+    The sequences are sorted by directory, the sequences of one directory
+    and the files within the sequences are sorted.
+    """
+    if isinstance(dirNames, basestring):
+        dirNames = [dirNames]
+    
+    # Key: Directory name - Value: List of (SeqString,None) tuples
+    dirFiles = {}
+    lock = threading.Lock()
+    
+    def scan(dirName):
+        """Scan a directory and return the list of sub-directories.
+        """
+        objects = []
+        subDirs = []
+        for fileName,isDir in _scanDir(dirName):
+            n = os.path.join(dirName, fileName)
+            if isDir:
+                subDirs.append(n)
+            elif _numSplitRegexp.search(os.path.splitext(fileName)[0]) is not None:
+                objects.append((SeqString(n, numDelim),None))
+        lock.acquire()
+        dirFiles[dirName] = objects
+        lock.release()
+        if recursive:
+            return subDirs
+        else:
+            return []
+    
+    if numThreads>0:
+        _scanInThreads(scan, dirNames, numThreads)
+    else:
+        todo = list(dirNames)
+        while len(todo)>0:
+            todo.extend(scan(todo.pop()))
     
-    return buildSequences(fileNames, assumeFiles=True, numDelim=numDelim)
+    res = []
+    for dirName in sorted(dirFiles.keys()):
+        objects = dirFiles[dirName]
+        objects.sort(key=lambda tup: tup[0]._sortKey())
+        res.extend(_buildSequences(objects, assumeFiles=True, numDelim=numDelim, compact=compact))
+    return res
+
+def _scanDir(dirName):
+    """Return the contents of a directory.
+    
+    Returns a list of tuples (name, isDir) where name is the name of a
+    directory entry and isDir a flag that indicates whether the entry is a
+    directory (or a link to a directory). An empty string refers to the
+    current directory. If the directory cannot be read, an empty list is
+    returned.
+    """
+    if dirName=="":
+        dirName = os.curdir
+    try:
+        if _scandir is not None:
+            # The scandir entries cache the file type, so is_dir() usually
+            # doesn't require an additional system call
+            return [(entry.name, entry.is_dir()) for entry in _scandir(dirName)]
+        else:
+            return [(name, os.path.isdir(os.path.join(dirName, name))) for name in os.listdir(dirName)]
+    except OSError:
+        return []
+
+def _scanInThreads(scanFunc, dirNames, numThreads):
+    """Call scanFunc(dirName) for a set of directories using several threads.
+    
+    scanFunc must return a list of additional directories that should be
+    scanned. The function returns when all directories have been processed.
+    If scanFunc raises an exception, the exception is raised again in the
+    calling thread (after all threads have been finished).
+    """
+    queue = Queue.Queue()
+    errors = []
+    
+    def worker():
+        while 1:
+            dirName = queue.get()
+            try:
+                if len(errors)==0:
+                    for subDir in scanFunc(dirName):
+                        queue.put(subDir)
+            except:
+                errors.append(sys.exc_info())
+            queue.task_done()
+    
+    for dirName in dirNames:
+        queue.put(dirName)
+    for i in range(numThreads):
+        thread = threading.Thread(target=worker, name="DirScanner%d"%i)
+        thread.setDaemon(True)
+        thread.start()
+    queue.join()
+    if len(errors)>0:
+        excType,excValue,tb = errors[0]
+        raise excType, excValue, tb
 
 
 # The following function is obsolete and replaced by the SeqTemplate class.
@@ -53,18 +53,33 @@ dependant on the context as it is the case with random() or
 noise(). Here, those functions have to be prepended with the return
 type, for example float_random() or point_noise() (that is, the cast
 is part of the name).
+
+When numpy is available, the functions also accept numpy arrays and
+evaluate all elements in one call. Floats are passed as arrays of any
+shape, points, vectors and colors as arrays of shape (..., 3). The
+arguments are broadcast against each other (a float array of shape (...)
+is broadcast against a point array of shape (..., 3)). Scalar arguments
+are processed exactly as before.
 """
 
 import math, random, string, re
-from math import acos, asin, ceil, cos, exp, floor, pow, sin, sqrt, tan
 import noise
 from cgtypes import vec3 as _vec3
 
+try:
+    import numpy
+    _has_numpy = True
+    _arrayTypes = (numpy.ndarray,)
+except ImportError:
+    _has_numpy = False
+    _arrayTypes = ()
+
+_builtinmax = max
+_builtinmin = min
+_builtinround = round
+
 # Builtin functions
 abs = abs
-max = max
-min = min
-round = round
 
 PI = math.pi
 
@@ -86,7 +101,84 @@ def _tovec3(arg):
         return _vec3(x,y,z)
     else:
         return _vec3()
-    
+
+def _isarray(*args):
+    """Check if any of the arguments is a numpy array.
+    """
+    for a in args:
+        if isinstance(a, _arrayTypes):
+            return True
+    return False
+
+def _asarray(a):
+    """Convert a into a float array.
+    """
+    return numpy.asarray(a, dtype=numpy.float64)
+
+def _expand(f, *vs):
+    """Prepare a float array f for an operation with point arrays.
+
+    If one of the values in vs is a single point (e.g. a vec3) or an array
+    of points (i.e. it has one dimension more than f), an axis is appended
+    to f so that it gets broadcast correctly.
+    """
+    f = _asarray(f)
+    if f.ndim>0:
+        for v in vs:
+            if isinstance(v, _arrayTypes):
+                ispoint = (v.ndim==f.ndim+1)
+            else:
+                ispoint = (numpy.ndim(v)==1)
+            if ispoint:
+                return f[...,numpy.newaxis]
+    return f
+
+def _dot(a, b):
+    """Return the dot products of two point arrays.
+    """
+    return (a*b).sum(axis=-1)
+
+def _mathfunc(func, arrayfuncname):
+    """Wrap a function from the math module so that it also accepts arrays.
+    """
+    def f(*args):
+        if _isarray(*args):
+            return getattr(numpy, arrayfuncname)(*map(_asarray, args))
+        return func(*args)
+    f.__name__ = func.__name__
+    f.__doc__ = func.__doc__
+    return f
+
+acos = _mathfunc(math.acos, "arccos")
+asin = _mathfunc(math.asin, "arcsin")
+ceil = _mathfunc(math.ceil, "ceil")
+cos = _mathfunc(math.cos, "cos")
+exp = _mathfunc(math.exp, "exp")
+floor = _mathfunc(math.floor, "floor")
+pow = _mathfunc(math.pow, "power")
+sin = _mathfunc(math.sin, "sin")
+sqrt = _mathfunc(math.sqrt, "sqrt")
+tan = _mathfunc(math.tan, "tan")
+
+def max(*args, **kw):
+    """Returns the maximum of its arguments (element-wise for arrays)."""
+    if len(args)>=2 and len(kw)==0 and _isarray(*args):
+        return reduce(numpy.maximum, map(_asarray, args))
+    return _builtinmax(*args, **kw)
+
+def min(*args, **kw):
+    """Returns the minimum of its arguments (element-wise for arrays)."""
+    if len(args)>=2 and len(kw)==0 and _isarray(*args):
+        return reduce(numpy.minimum, map(_asarray, args))
+    return _builtinmin(*args, **kw)
+
+def round(x, ndigits=0):
+    """Rounds to the nearest value (halfway cases are rounded away from 0)."""
+    if _isarray(x):
+        s = 10.0**ndigits
+        x = _asarray(x)
+        return numpy.sign(x)*numpy.floor(numpy.abs(x)*s+0.5)/s
+    return _builtinround(x, ndigits)
 
 def atan(*args):
     """Returns the arc tangent.
@@ -95,6 +187,12 @@ def atan(*args):
     math.atan2() is called.
     """
     
+    if _isarray(*args):
+        args = map(_asarray, args)
+        if len(args)==1:
+            return numpy.arctan(args[0])
+        elif len(args)==2:
+            return numpy.arctan2(args[0],args[1])
     if len(args)==1:
         return math.atan(args[0])
     elif len(args)==2:
@@ -105,6 +203,12 @@ def atan(*args):
 def log(*args):
     """Returns the natural logarithm of x or the logarithm to the specified base."""
 
+    if _isarray(*args):
+        args = map(_asarray, args)
+        if len(args)==1:
+            return numpy.log(args[0])
+        elif len(args)==2:
+            return numpy.log(args[0])/numpy.log(args[1])
     if len(args)==1:
         return math.log(args[0])
     elif len(args)==2:
@@ -116,7 +220,9 @@ def log(*args):
 # clamp
 def clamp(a, amin, amax):
     """Returns amin if a < amin, amax if a > amax, otherwise a."""
-    return min(max(a,amin), amax)
+    if _isarray(a, amin, amax):
+        return numpy.minimum(numpy.maximum(_asarray(a), amin), amax)
+    return _builtinmin(_builtinmax(a,amin), amax)
 
 # degrees
 def degrees(rad):
@@ -151,28 +257,87 @@ def mix(val0, val1, t):
     returned. For values of t between 0 and 1 a linearly interpolated
     value is returned.
     """
-    
+
+    if _isarray(val0, val1, t):
+        t = _expand(t, val0, val1)
+        val0 = _asarray(val0)
+        val1 = _asarray(val1)
     return (1.0-t)*val0 + t*val1
 
 def mod(a,b):
     """Returns a%b. This is just an equivalent for the %-operator."""
+    if _isarray(a, b):
+        return numpy.mod(_asarray(a), b)
     return a%b
 
+def _noiseModule(args):
+    """Return the noise module that has to be used for the given arguments.
+
+    The numpy version of the noise functions from cgkit light is used
+    when there is an array among the arguments (it returns the same values
+    as the compiled version).
+    """
+    if _isarray(*args):
+        from light import noise as arraynoise
+        return arraynoise
+    return noise
+
+def _pointLen(p, t=None):
+    """Return the number of components of the point argument p.
+
+    An array is a point array if it has at least 2 dimensions (the last
+    axis contains the components) and if it has more dimensions than the
+    time argument t (if there is one).
+    """
+    if isinstance(p, _arrayTypes):
+        if p.ndim<2 or (t is not None and p.ndim<=numpy.ndim(t)):
+            return 1
+        return p.shape[-1]
+    try:
+        return len(p)
+    except:
+        return 1
+
+def _periodicPointLen(args):
+    """Return the number of components of the point argument of pnoise().
+
+    For arrays, the number is taken from the period argument.
+    """
+    if _isarray(*args):
+        if len(args)==2:
+            return numpy.size(args[1])
+        return numpy.size(args[2])
+    try:
+        return len(args[0])
+    except:
+        return 1
+
+def _toarray3(res, dim):
+    """Convert the result of an array noise function into a point array.
+    """
+    if dim==1:
+        res = res[...,numpy.newaxis]
+    n = res.shape[-1]
+    if n<3:
+        res = numpy.concatenate([res, numpy.zeros(res.shape[:-1]+(3-n,))], axis=-1)
+    return res[...,:3]
+
 def float_noise(*args):
     """Returns a float value which is a (pseudo) random function of its arguments.
 
     This function is imported from the noise module.
     """
     
+    nm = _noiseModule(args)
     la = len(args)
     if la==1:
-        return noise.noise(args[0])
+        return nm.noise(args[0])
     elif la==2:
-        return noise.noise(args[0],args[1])
+        return nm.noise(args[0],args[1])
     elif la==3:
-        return noise.noise(args[0],args[1],args[2])
+        return nm.noise(args[0],args[1],args[2])
     elif la==4:
-        return noise.noise(args[0],args[1],args[2],args[3])
+        return nm.noise(args[0],args[1],args[2],args[3])
     else:
         raise TypeError("the function takes between 1 and 4 arguments (%s given)"%(la))
 
@@ -180,35 +345,33 @@ def float_noise(*args):
 def point_noise(*args):
     """Returns a point whose value is a (pseudo) random function of its arguments."""
     
+    nm = _noiseModule(args)
     la = len(args)
     if la==1:
-        try:
-            a = len(args[0])
-        except:
-            a = 1
+        a = _pointLen(args[0])
         if a==1:
-            return noise.vnoise(args[0],0,0)
+            return nm.vnoise(args[0],0,0)
         elif a==2:
-            return noise.vnoise(args[0],0)
+            return nm.vnoise(args[0],0)
         elif a==3:
-            return noise.vnoise(args[0])
+            return nm.vnoise(args[0])
         else:
             raise ValueError("arg1: invalid argument length")
     elif la==2:
-        try:
-            a = len(args[0])
-        except:
-            a = 1
+        a = _pointLen(args[0], args[1])
         if a==1:
-            return noise.vnoise(args[0],args[1],0)
+            return nm.vnoise(args[0],args[1],0)
         elif a==3:
-            return noise.vnoise(args[0],args[1])
+            return nm.vnoise(args[0],args[1])
         else:
             raise ValueError("arg1: invalid argument length")
     elif la==3:
-        return noise.vnoise(args[0],args[1],args[2])
+        return nm.vnoise(args[0],args[1],args[2])
     elif la==4:
-        x,y,z,t = noise.vnoise(args[0],args[1],args[2],args[3])
+        res = nm.vnoise(args[0],args[1],args[2],args[3])
+        if _isarray(*args):
+            return res[...,:3]
+        x,y,z,t = res
         return _vec3(x,y,z)
     else:
         raise TypeError("the function takes between 1 and 4 arguments (%s given)"%(la))
@@ -221,47 +384,47 @@ def float_pnoise(*args):
 
     This function is imported from the noise module."""
     
+    nm = _noiseModule(args)
     la = len(args)
-    try:
-        a = len(args[0])
-    except:
-        a = 1
+    a = _periodicPointLen(args)
         
     if la==2:
         if a==1:
-            return noise.pnoise((args[0],),(args[1],))
+            return nm.pnoise((args[0],),(args[1],))
         else:
-            return noise.pnoise(args[0],args[1])
+            return nm.pnoise(args[0],args[1])
     elif la==4:
         if a==1:
-            return noise.pnoise((args[0],args[1]),(args[2],args[3]))
+            return nm.pnoise((args[0],args[1]),(args[2],args[3]))
         else:
-            return noise.pnoise(args[0],args[1],args[2],args[3])
+            return nm.pnoise(args[0],args[1],args[2],args[3])
     else:
         raise TypeError("the function takes between 1 and 4 arguments (%s given)"%(la))
 
 def point_pnoise(*args):
     """Returns a point whose value is a periodic (pseudo) random function of its arguments."""
     
+    nm = _noiseModule(args)
     la = len(args)
-    try:
-        a = len(args[0])
-    except:
-        a = 1
+    a = _periodicPointLen(args)
         
     if la==2:
         if a==1:
-            res = noise.vpnoise((args[0],),(args[1],))
+            res = nm.vpnoise((args[0],),(args[1],))
         else:
-            res = noise.vpnoise(args[0],args[1])
+            res = nm.vpnoise(args[0],args[1])
+        dim = a
     elif la==4:
         if a==1:
-            res = noise.vpnoise((args[0],args[1]),(args[2],args[3]))
+            res = nm.vpnoise((args[0],args[1]),(args[2],args[3]))
         else:
-            res = noise.vpnoise(args[0],args[1],args[2],args[3])
+            res = nm.vpnoise(args[0],args[1],args[2],args[3])
+        dim = _builtinmin(a+1, 3)
     else:
         raise TypeError("the function takes between 1 and 4 arguments (%s given)"%(la))
 
+    if _isarray(*args):
+        return _toarray3(res, dim)
     return _tovec3(res)
 
 color_pnoise = point_pnoise
@@ -274,15 +437,16 @@ def float_cellnoise(*args):
     function is imported from the noise module.
     """
     
+    nm = _noiseModule(args)
     la = len(args)
     if la==1:
-        return noise.cellnoise(args[0])
+        return nm.cellnoise(args[0])
     elif la==2:
-        return noise.cellnoise(args[0],args[1])
+        return nm.cellnoise(args[0],args[1])
     elif la==3:
-        return noise.cellnoise(args[0],args[1],args[2])
+        return nm.cellnoise(args[0],args[1],args[2])
     elif la==4:
-        return noise.cellnoise(args[0],args[1],args[2],args[3])
+        return nm.cellnoise(args[0],args[1],args[2],args[3])
     else:
         raise TypeError("the function takes between 1 and 4 arguments (%s given)"%(la))
 
@@ -292,35 +456,33 @@ def point_cellnoise(*args):
     The return value is constant between integer lattice points.
     """
     
+    nm = _noiseModule(args)
     la = len(args)
     if la==1:
-        try:
-            a = len(args[0])
-        except:
-            a = 1
+        a = _pointLen(args[0])
         if a==1:
-            return noise.vcellnoise(args[0],0,0)
+            return nm.vcellnoise(args[0],0,0)
         elif a==2:
-            return noise.vcellnoise(args[0],0)
+            return nm.vcellnoise(args[0],0)
         elif a==3:
-            return noise.vcellnoise(args[0])
+            return nm.vcellnoise(args[0])
         else:
             raise ValueError("arg1: invalid argument length")
     elif la==2:
-        try:
-            a = len(args[0])
-        except:
-            a = 1
+        a = _pointLen(args[0], args[1])
         if a==1:
-            return noise.vcellnoise(args[0],args[1],0)
+            return nm.vcellnoise(args[0],args[1],0)
         elif a==3:
-            return noise.vcellnoise(args[0],args[1])
+            return nm.vcellnoise(args[0],args[1])
         else:
             raise ValueError("arg1: invalid argument length")
     elif la==3:
-        return noise.vcellnoise(args[0],args[1],args[2])
+        return nm.vcellnoise(args[0],args[1],args[2])
     elif la==4:
-        x,y,z,t = noise.vcellnoise(args[0],args[1],args[2],args[3])
+        res = nm.vcellnoise(args[0],args[1],args[2],args[3])
+        if _isarray(*args):
+            return res[...,:3]
+        x,y,z,t = res
         return _vec3(x,y,z)
     else:
         raise TypeError("the function takes between 1 and 4 arguments (%s given)"%(la))
@@ -348,7 +510,9 @@ def point_random():
 
 def sign(x):
     """Returns -1 with a negative argument, +1 with a positive argument, and 0 if its argument is zero."""
-    
+
+    if _isarray(x):
+        return numpy.sign(x)
     if x<0:
         return -1
     elif x>0:
@@ -362,7 +526,16 @@ def smoothstep(min, max, x):
     Returns 0 if x < min, 1 if x > max, and performs a smooth Hermite
     interpolation between 0 and 1 in the interval min to max.
     """
-    
+
+    if _isarray(min, max, x):
+        x = _asarray(x)
+        err = numpy.seterr(divide="ignore", invalid="ignore")
+        try:
+            t = (x-min)/(max-min)
+            t = t*t*(3.0-2.0*t)
+        finally:
+            numpy.seterr(**err)
+        return numpy.where(x<min, 0.0, numpy.where(x>max, 1.0, t))
     if x<min:
         return 0.0
     if x>max:
@@ -384,6 +557,9 @@ def spline(x, knots):
     if nspans<1:
         raise ValueError("spline(): there must be at least 4 control points (%s given)"%nknots)
 
+    if _isarray(x):
+        return _arraySpline(_asarray(x), _asarray(knots))
+
     x = clamp(x, 0.0, 1.0)*nspans
     span = int(x)
     if span>=nknots-3:
@@ -398,9 +574,32 @@ def spline(x, knots):
 
     return ((c3*x + c2)*x + c1)*x + c0
 
+def _arraySpline(x, knots):
+    """Array version of spline().
+
+    x is an array of floats and knots an array that contains the
+    control points (floats or points).
+    """
+    nknots = len(knots)
+    x = numpy.clip(x, 0.0, 1.0)*(nknots-3)
+    span = numpy.minimum(x.astype(int), nknots-4)
+    x = x-span
+    knot0, knot1, knot2, knot3 = [knots[span+i] for i in range(4)]
+    # Append axes so that x broadcasts against point knots
+    x = x.reshape(x.shape+(1,)*(knots.ndim-1))
+
+    c3 = -0.5*knot0 + 1.5*knot1 - 1.5*knot2 + 0.5*knot3
+    c2 =      knot0 - 2.5*knot1 + 2.0*knot2 - 0.5*knot3
+    c1 = -0.5*knot0 + 0.5*knot2
+    c0 =      knot1
+
+    return ((c3*x + c2)*x + c1)*x + c0
+
 
 def step(min, x):
     """Returns 0 if x < min, otherwise 1."""
+    if _isarray(min, x):
+        return numpy.where(_asarray(x)<min, 0.0, 1.0)
     if x<min:
         return 0.0
     else:
@@ -411,6 +610,9 @@ def distance(P1,P2):
     """Returns the distance between two points.
 
     The arguments should be of type vec3."""
+    if _isarray(P1, P2):
+        d = _asarray(P2)-P1
+        return numpy.sqrt(_dot(d, d))
     return (P2-P1).length()
 
 def ptlined(P0,P1,Q):
@@ -418,6 +620,8 @@ def ptlined(P0,P1,Q):
 
     The arguments should be of type vec3.    
     """
+    if _isarray(P0, P1, Q):
+        return _arrayPtlined(_asarray(P0), _asarray(P1), _asarray(Q))
     a = P1-P0
     b = Q-P0
     
@@ -431,8 +635,28 @@ def ptlined(P0,P1,Q):
     
     return sqrt(b*b-(x*x/aa))
 
+def _arrayPtlined(P0, P1, Q):
+    """Array version of ptlined().
+    """
+    a = P1-P0
+    b = Q-P0
+    x = _dot(a, b)
+    aa = _dot(a, a)
+    bb = _dot(b, b)
+    c = Q-P1
+    err = numpy.seterr(divide="ignore", invalid="ignore")
+    try:
+        d = numpy.sqrt(numpy.maximum(bb-(x*x/aa), 0.0))
+    finally:
+        numpy.seterr(**err)
+    return numpy.where(x<=0, numpy.sqrt(bb), numpy.where(x>=aa, numpy.sqrt(_dot(c, c)), d))
+
 def faceforward(N,I,Nref):
     """Flips N so that it faces in the direction opposite to I."""
+    if _isarray(N, I, Nref):
+        N = _asarray(N)
+        s = numpy.sign(-_dot(_asarray(I), _asarray(Nref)))
+        return s[...,numpy.newaxis]*N
     return sign(-I*Nref)*N
 
 def length(v):
@@ -440,6 +664,8 @@ def length(v):
 
     This is equivalent to calling v.length().
     """
+    if _isarray(v):
+        return numpy.sqrt(_dot(v, v))
     return v.length()
 
 def normalize(v):
@@ -447,6 +673,9 @@ def normalize(v):
 
     This is equivalent to calling v.normalize().
     """
+    if _isarray(v):
+        v = _asarray(v)
+        return v/numpy.sqrt(_dot(v, v))[...,numpy.newaxis]
     return v.normalize()
 
 def reflect(I, N):
@@ -454,6 +683,10 @@ def reflect(I, N):
 
     This is equivalent to calling I.reflect(N).
     """
+    if _isarray(I, N):
+        I = _asarray(I)
+        N = _asarray(N)
+        return I - 2.0*_dot(I, N)[...,numpy.newaxis]*N
     return I.reflect(N)
 
 def refract(I, N, eta):
@@ -463,7 +696,16 @@ def refract(I, N, eta):
     normal vector N and the relative index of refraction eta. This is
     equivalent to calling I.refract(N, eta).
     """
-    
+
+    if _isarray(I, N, eta):
+        I = _asarray(I)
+        N = _asarray(N)
+        eta = _asarray(eta)
+        dot = _dot(I, N)
+        k = 1.0 - eta*eta*(1.0 - dot*dot)
+        eta = _expand(eta, I, N)
+        res = eta*I - (eta*dot + numpy.sqrt(numpy.maximum(k, 0.0)))[...,numpy.newaxis]*N
+        return numpy.where((k<0)[...,numpy.newaxis], 0.0, res)
     return I.refract(N,eta)
 
 def xcomp(P):
@@ -471,6 +713,8 @@ def xcomp(P):
 
     This is equivalent to p.x.
     """
+    if _isarray(P):
+        return P[...,0]
     return P.x
 
 def ycomp(P):
@@ -478,6 +722,8 @@ def ycomp(P):
 
     This is equivalent to p.y.
     """
+    if _isarray(P):
+        return P[...,1]
     return P.y
 
 def zcomp(P):
@@ -485,37 +731,53 @@ def zcomp(P):
 
     This is equivalent to p.z.
     """
+    if _isarray(P):
+        return P[...,2]
     return P.z
 
 def setxcomp(P,x):
     """Set the x component of p.
 
     This is equivalent to p.x = x."""
-    P.x = x
+    if _isarray(P):
+        P[...,0] = x
+    else:
+        P.x = x
 
 def setycomp(P,y):
     """Set the y component of p.
 
     This is equivalent to p.y = y."""
-    P.y = y
+    if _isarray(P):
+        P[...,1] = y
+    else:
+        P.y = y
 
 def setzcomp(P,z):
     """Set the z component of p.
 
     This is equivalent to p.z = z."""
-    P.z = z
+    if _isarray(P):
+        P[...,2] = z
+    else:
+        P.z = z
 
 def comp(c, index):
     """Get an individual color component.
 
     This is equivalent to c[index]."""
+    if _isarray(c):
+        return c[...,index]
     return c[index]
 
 def setcomp(c, index, value):
     """Set an individual color component.
 
     This is equivalent to c[index] = value."""
-    c[index]=value
+    if _isarray(c):
+        c[...,index] = value
+    else:
+        c[index]=value
 
 def concat(*args):
     """Returns a concatenated string."""
@@ -39,6 +39,20 @@ from cgtypes import *
 from trimesh import TriMesh
 import pluginmanager
 
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
+
+# The columns of the float values in an ASCII facet record
+# ("facet normal nx ny nz outer loop vertex x y z ... endloop endfacet")
+_ascii_value_cols = [2,3,4, 8,9,10, 12,13,14, 16,17,18]
+# The columns of the keywords in an ASCII facet record
+_ascii_keyword_cols = [(0,"facet"), (1,"normal"), (5,"outer"), (6,"loop"),
+                       (7,"vertex"), (11,"vertex"), (15,"vertex"),
+                       (19,"endloop"), (20,"endfacet")]
+
 # STLReader
 class STLReader:
     
@@ -74,6 +88,125 @@ class STLReader:
 
         self.end(objname)
 
+    # readArrays
+    def readArrays(self, chunksize=100000):
+        """Read the file using bulk array operations.
+
+        This is a faster alternative to read() that requires numpy.
+        The triangles are read in chunks of up to chunksize triangles
+        which are passed to triangleArray().
+        """
+        if not _has_numpy:
+            raise ImportError("STLReader.readArrays() requires the numpy package")
+
+        if self.isASCII():
+            self.read_ascii_arrays(chunksize)
+        else:
+            self.read_bin_arrays(chunksize)
+
+    # read_bin_arrays
+    def read_bin_arrays(self, chunksize=100000):
+        """Read a binary STL file in chunks.
+
+        This is the numpy version of read_bin().
+        """
+        f = file(self.filename, "rb")
+
+        s = f.read(80)
+        objname = s.split("\000")[0]
+        s = f.read(4)
+        numfaces = struct.unpack("<i", s)[0]
+
+        self.begin(objname)
+
+        dtype = numpy.dtype([("normal", "<f4", (3,)),
+                             ("verts", "<f4", (3,3)),
+                             ("attr", "<u2")])
+        while numfaces>0:
+            count = min(numfaces, chunksize)
+            data = numpy.fromfile(f, dtype=dtype, count=count)
+            if len(data)!=count:
+                raise IOError("Premature end of file in STL file %s"%self.filename)
+            self.triangleArray(data["normal"].astype(float), data["verts"].astype(float))
+            numfaces -= count
+
+        f.close()
+        self.end(objname)
+
+    # read_ascii_arrays
+    def read_ascii_arrays(self, chunksize=100000):
+        """Read an ASCII STL file in chunks.
+
+        This is the numpy version of read_ascii(). The facet records are
+        collected until chunksize facets are available and then converted
+        in one go.
+        """
+        f = file(self.filename)
+
+        objname = "unnamed"
+        lines = []
+        firstline = 0
+        insolid = False
+        linenr = 0
+        for s in f:
+            linenr+=1
+            a = s.split(None, 1)
+            if len(a)==0:
+                continue
+
+            # Begin of a solid
+            if not insolid:
+                if a[0]!="solid":
+                    raise SyntaxError('Keyword "solid" expected in line %d'%linenr)
+                if len(a)>1 and a[1].strip()!="":
+                    objname = a[1].split()[0]
+                self.begin(objname)
+                insolid = True
+            # End of a solid
+            elif a[0]=="endsolid":
+                self.parseFacets(lines, firstline, linenr-1)
+                lines = []
+                self.end(objname)
+                insolid = False
+            # A line of a facet record
+            else:
+                if lines==[]:
+                    firstline = linenr
+                lines.append(s)
+                if a[0]=="endfacet" and len(lines)>=7*chunksize:
+                    self.parseFacets(lines, firstline, linenr)
+                    lines = []
+
+        self.parseFacets(lines, firstline, linenr)
+        f.close()
+
+    # parseFacets
+    def parseFacets(self, lines, firstline, lastline):
+        """Convert the lines of several ASCII facet records.
+
+        lines is a list of strings that contain complete facet records.
+        firstline and lastline are the line numbers of the first and last
+        line (which are used for error messages). The triangles are passed
+        to triangleArray().
+        """
+        if lines==[]:
+            return
+
+        tokens = numpy.array(" ".join(lines).split())
+        n = len(tokens)//21
+        if len(tokens)!=21*n:
+            raise SyntaxError("Syntax error in lines %d-%d. Incomplete facet."%(firstline, lastline))
+        tokens = tokens.reshape((n, 21))
+        for col,keyword in _ascii_keyword_cols:
+            if not numpy.all(tokens[:,col]==keyword):
+                raise SyntaxError('Keyword "%s" expected in lines %d-%d.'%(keyword, firstline, lastline))
+        try:
+            values = tokens[:,_ascii_value_cols].astype(float)
+        except ValueError:
+            raise SyntaxError("Invalid float value in lines %d-%d"%(firstline, lastline))
+
+        self.triangleArray(values[:,:3], values[:,3:].reshape((n,3,3)))
+
     # read_ascii
     def read_ascii(self):
         """Read a ASCII STL file.
@@ -177,25 +310,72 @@ class STLReader:
         """
         pass
 
+    # triangleArray
+    def triangleArray(self, normals, verts):
+        """Triangle array callback.
+
+        This callback is used by readArrays(). normals is a numpy array
+        of shape (n,3) that contains the normals of n triangles and verts
+        an array of shape (n,3,3) that contains their vertices.
+        The default implementation calls triangle() for every triangle.
+        """
+        for normal,(a,b,c) in zip(normals.tolist(), verts.tolist()):
+            self.triangle(vec3(normal), [vec3(a), vec3(b), vec3(c)])
+
 
 # STLImport
 class STLImport(STLReader):
     
-    def __init__(self, filename):
+    def __init__(self, filename, weld=True):
         STLReader.__init__(self, filename)
+        self.weld = weld
         self.verts = []
+        self.vertarrays = []
         self.numfaces = 0
 
     # begin
     def begin(self, name):
-        pass
+        self.verts = []
+        self.vertarrays = []
+        self.numfaces = 0
 
     # end
     def end(self, name):
+        if _has_numpy:
+            if self.verts!=[]:
+                self.vertarrays.append(numpy.array(self.verts, dtype=float))
+            if self.vertarrays!=[]:
+                verts = numpy.concatenate(self.vertarrays)
+            else:
+                verts = numpy.zeros((0,3))
+            if self.weld:
+                verts,faces = weldVertices(verts)
+            else:
+                faces = numpy.arange(len(verts))
+            tm = TriMesh(name=name)
+            tm.geom.verts.resize(len(verts))
+            tm.geom.faces.resize(self.numfaces)
+            tm.geom.verts.setBuffer(verts)
+            tm.geom.faces.setBuffer(faces)
+            return
+
+        verts = self.verts
+        if self.weld:
+            verts = []
+            indices = []
+            vertdict = {}
+            for v in self.verts:
+                key = (v.x, v.y, v.z)
+                if key not in vertdict:
+                    vertdict[key] = len(verts)
+                    verts.append(v)
+                indices.append(vertdict[key])
+        else:
+            indices = range(len(verts))
         faces = []
         for i in range(self.numfaces):
-            faces.append(range(i*3, i*3+3))
-        TriMesh(name=name, verts=self.verts, faces=faces)
+            faces.append(indices[i*3:i*3+3])
+        TriMesh(name=name, verts=verts, faces=faces)
 
     # triangle
     def triangle(self, normal, verts):
@@ -207,6 +387,34 @@ class STLImport(STLReader):
         self.numfaces += 1
         self.verts += verts
 
+    # triangleArray
+    def triangleArray(self, normals, verts):
+        """Triangle array callback.
+        """
+        self.numfaces += len(verts)
+        self.vertarrays.append(verts.reshape((-1,3)))
+
+# weldVertices
+def weldVertices(verts):
+    """Merge vertices that are identical.
+
+    verts is a numpy array of shape (n,3). The return value is a tuple
+    (uniqueverts, indices) where uniqueverts contains every vertex only
+    once (in the order of their first occurrence) and indices is an
+    array of length n that contains the index of every original vertex
+    in uniqueverts.
+    """
+    # Adding 0 turns -0.0 into 0.0 (so that they are considered equal)
+    verts = numpy.ascontiguousarray(verts, dtype=float)+0.0
+    # View each vertex as one opaque value so that unique() works on rows
+    keys = verts.view(numpy.dtype((numpy.void, 3*verts.itemsize))).ravel()
+    keys,first,inverse = numpy.unique(keys, return_index=True, return_inverse=True)
+    # unique() sorts the vertices, restore their original order
+    order = numpy.argsort(first)
+    newindex = numpy.empty(len(order), dtype=int)
+    newindex[order] = numpy.arange(len(order))
+    return verts[first[order]], newindex[inverse]
+
 # STLImporter
 class STLImporter:
 
@@ -225,11 +433,18 @@ class STLImporter:
     description = staticmethod(description)
 
     # importFile
-    def importFile(self, filename):
-        """Import a STL file."""
+    def importFile(self, filename, weld=True):
+        """Import a STL file.
 
-        reader = STLImport(filename)
-        reader.read()
+        If weld is True, vertices that are shared by several triangles
+        are merged.
+        """
+
+        reader = STLImport(filename, weld)
+        if _has_numpy:
+            reader.readArrays()
+        else:
+            reader.read()
 
 
 ######################################################################
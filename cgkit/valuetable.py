@@ -39,36 +39,18 @@
 
 from globalscene import getScene
 import component
-import bisect
+import bisect, array
 from cgtypes import *
 from slots import *
+try:
+    import numpy
+    _has_numpy = True
+except ImportError:
+    _has_numpy = False
 
-# TableEntry
-class _TableEntry:
-    """Stores a time/value pair for the ValueTable component.
+# Supported interpolation modes
+_interpolationModes = ["step", "linear", "cubic"]
 
-    This is an internal class.
-    """
-    def __init__(self, t, v):
-        self.t = t
-        self.v = v
-
-    def __str__(self):
-        return "%f : %s"%(self.t, self.v)
-
-    __repr__ = __str__
-
-    def __cmp__(self, other):
-        if other==None:
-            return 1
-        else:
-            if self.t<other.t:
-                return -1
-            elif self.t>other.t:
-                return 1
-            else:
-                return 0
-            
 # ValueTable
 class ValueTable(component.Component):
     """ValueTable component.
@@ -77,6 +59,14 @@ class ValueTable(component.Component):
     holds the appropriate value for the current time. The type of
     the value can be specified in the constructor. The name of the
     output slot is always \c output_slot.
+
+    The values can be interpolated (linear or cubic) for all types
+    except int (quaternions always use slerp()). The times are stored in
+    a float array and the values are kept in a list. Adding values in
+    increasing time order (or loading all values at once using
+    setValues()) takes constant time per value, a lookup takes O(log n)
+    time. The sample() method evaluates the table for an entire array of
+    times at once (this requires numpy).
     """
     
     def __init__(self,
@@ -85,6 +75,7 @@ class ValueTable(component.Component):
                  values = [],
                  modulo = None,
                  tscale = 1.0,
+                 interpolation = "step",
                  auto_insert = True):
         """Constructor.
 
@@ -93,18 +84,28 @@ class ValueTable(component.Component):
         \param values A list of tuples (time, value).
         \param modulo (\c float) Loop duration (None = no loop)
         \param tscale (\c float) Scaling factor for the time. A value of less than 1.0 makes the animation slower.
+        \param interpolation (\c str) Interpolation mode ("step", "linear" or "cubic")
         """
         
         component.Component.__init__(self, name=name, auto_insert=auto_insert)
 
-        # Value list. Contains a sorted list of TableEntry objects
-        self.values = []
+        if interpolation not in _interpolationModes:
+            raise ValueError("Invalid interpolation mode: %s"%interpolation)
+
+        # Sorted time values
+        self._times = array.array("d")
+        # The values (in the same order as the times)
+        self._values = []
+        # Cached numpy arrays with the times and values (or None)
+        self._arrays = None
         # Time modulo value (or None)
         self.modulo = modulo
         # Scale factor for the time
         self.tscale = 1.0
         # Type of the value slot
         self.type = type
+        # Interpolation mode
+        self.interpolation = interpolation
         
         self.time_slot = DoubleSlot()
         self.addSlot("time", self.time_slot)
@@ -113,32 +114,88 @@ class ValueTable(component.Component):
         self.addSlot("output", self.output_slot)
         pytypes = {"double":"float"}
         exec "self.default_value = %s()"%pytypes.get(typ, typ)
+        self._typ = typ
 
         self.time_slot.addDependent(self.output_slot)
         getScene().timer().time_slot.connect(self.time_slot)
 
-        for t,v in values:
-            self.add(t,v)
+        if len(values)>0:
+            times = [t for t,v in values]
+            vals = [v for t,v in values]
+            self.setValues(times, vals)
+
+    # fromArrays
+    def fromArrays(cls, times, values, **keyargs):
+        """Create a ValueTable from a sequence of times and a sequence of values.
+
+        times and values may also be numpy arrays. A value array for vector
+        types has the shape (n, 3) or (n, 4), for matrices (n, 3, 3) or
+        (n, 4, 4) (or (n, 9)/(n, 16) in row-major order) and for
+        quaternions (n, 4) (w, x, y, z). The remaining keyword arguments
+        are passed to the constructor.
+        """
+        vt = cls(**keyargs)
+        vt.setValues(times, values)
+        return vt
+
+    fromArrays = classmethod(fromArrays)
+
+    def __len__(self):
+        return len(self._times)
 
     def __iter__(self):
         return self.iterValues()
 
     def __call__(self, time):
-        if len(self.values)==0:
+        n = len(self._times)
+        if n==0:
             return self.default_value
 
-        time *= self.tscale
+        time = float(time)*self.tscale
         if self.modulo!=None:
             time = time % self.modulo
 
-        idx = bisect.bisect_left(self.values, _TableEntry(time,self.default_value))
-        if idx>=len(self.values):
-            idx = len(self.values)-1
-        e = self.values[idx]
-        if time<e.t:
-            if idx>0:
-                return self.values[idx-1].v
-        return e.v       
+        times = self._times
+        if self.interpolation=="step" or n==1 or self._typ=="int":
+            idx = bisect.bisect_left(times, time)
+            if idx>=n:
+                idx = n-1
+            if time<times[idx]:
+                if idx>0:
+                    return self._values[idx-1]
+            return self._values[idx]
+
+        # Index of the segment that contains the time
+        i = bisect.bisect_right(times, time)-1
+        if i<0:
+            i = 0
+        elif i>n-2:
+            i = n-2
+        t0 = times[i]
+        t1 = times[i+1]
+        s = (time-t0)/(t1-t0)
+        if s<0.0:
+            s = 0.0
+        elif s>1.0:
+            s = 1.0
+        v0 = self._values[i]
+        v1 = self._values[i+1]
+
+        if self._typ=="quat":
+            return slerp(s, v0, v1)
+        if self.interpolation=="linear":
+            return v0 + (v1-v0)*s
+
+        # Cubic Hermite interpolation (with Catmull-Rom tangents)
+        dt = t1-t0
+        m0,m1 = self._tangents(i, n)
+        s2 = s*s
+        s3 = s2*s
+        h00 = 2*s3 - 3*s2 + 1
+        h10 = s3 - 2*s2 + s
+        h01 = -2*s3 + 3*s2
+        h11 = s3 - s2
+        return v0*h00 + m0*(h10*dt) + v1*h01 + m1*(h11*dt)
 
     def __getitem__(self, time):
         return self(time)
@@ -150,28 +207,137 @@ class ValueTable(component.Component):
     def iterValues(self):
         """Iterate over all time/value pairs.
         """
-        for e in self.values:
-            yield e.t, e.v
+        for t,v in zip(self._times, self._values):
+            yield t, v
 
     # add
     def add(self, t, v):
         """Add a value to the table.
 
+        If there already is a value at time t, it is replaced.
+
         \param t (\c float) Time
         \param v Value
         """
-        entry = _TableEntry(t, v)
-        idx = bisect.bisect_left(self.values, entry)
+        self._arrays = None
+        times = self._times
+        # Appending at the end is the common case (e.g. when loading a track)
+        if len(times)==0 or t>times[-1]:
+            times.append(t)
+            self._values.append(v)
+            return
+
+        idx = bisect.bisect_left(times, t)
         # Check if times are identical and the previous value has
         # to be replaced
-        if idx<len(self.values):
-            if self.values[idx].t==t:
+        if idx<len(times):
+            if times[idx]==t:
                 # Replace the value
-                self.values[idx] = entry
+                self._values[idx] = v
                 return
 
         # Insert the value
-        self.values.insert(idx, entry)
+        times.insert(idx, t)
+        self._values.insert(idx, v)
+
+    # setValues
+    def setValues(self, times, values):
+        """Replace the contents of the table.
+
+        times is a sequence of floats and values a sequence of values of the
+        same length (both may also be numpy arrays, see fromArrays()).
+        The times do not have to be sorted. If a time appears several times,
+        the last value is used (as if the values were added one by one
+        using add()).
+        """
+        if len(times)!=len(values):
+            raise ValueError("The number of times and values must be identical (%d != %d)"%(len(times), len(values)))
+        if _has_numpy and isinstance(values, numpy.ndarray):
+            values = self._fromArray(values)
+        times = map(float, times)
+        values = list(values)
+        self._arrays = None
+        # Fast path: The times are already sorted and unique
+        if times==sorted(times) and len(set(times))==len(times):
+            self._times = array.array("d", times)
+            self._values = values
+            return
+
+        # Sort by time (the sort is stable, so equal times keep their order)
+        order = range(len(times))
+        order.sort(key=times.__getitem__)
+        self._times = array.array("d")
+        self._values = []
+        for i in order:
+            t = times[i]
+            if len(self._times)>0 and self._times[-1]==t:
+                self._values[-1] = values[i]
+            else:
+                self._times.append(t)
+                self._values.append(values[i])
+
+    # sample
+    def sample(self, times):
+        """Evaluate the table at many times at once.
+
+        times is a sequence (or numpy array) of times. The return value is
+        a numpy array that contains the values at those times (the shape
+        of the array is the shape of times plus the shape of one value,
+        i.e. () for floats, (3,) for vec3, (3,3) for mat3, (4,) for quat
+        (w, x, y, z)). The result is the same as calling the table for
+        each time individually.
+        """
+        if not _has_numpy:
+            raise ImportError("ValueTable.sample() requires the numpy package")
+
+        time = numpy.asarray(times, dtype=numpy.float64)*self.tscale
+        if self.modulo!=None:
+            time = numpy.mod(time, self.modulo)
+
+        n = len(self._times)
+        if n==0:
+            v = self._toArray([self.default_value])[0]
+            return numpy.tile(v, time.shape+(1,)*v.ndim).reshape(time.shape+v.shape)
+
+        T,V = self._getArrays()
+        if self.interpolation=="step" or n==1 or self._typ=="int":
+            idx = numpy.minimum(numpy.searchsorted(T, time, "left"), n-1)
+            idx = numpy.where((time<T[idx]) & (idx>0), idx-1, idx)
+            return V[idx]
+
+        i = numpy.clip(numpy.searchsorted(T, time, "right")-1, 0, n-2)
+        t0 = T[i]
+        t1 = T[i+1]
+        s = numpy.clip((time-t0)/(t1-t0), 0.0, 1.0)
+        v0 = V[i]
+        v1 = V[i+1]
+        # Append axes so that s broadcasts against the values
+        s = s.reshape(s.shape+(1,)*(V.ndim-1))
+        if self._typ=="quat":
+            return _slerpArray(s, v0, v1)
+        if self.interpolation=="linear":
+            return v0 + (v1-v0)*s
+
+        dt = (t1-t0).reshape(s.shape)
+        M = self._tangentArray(T, V)
+        s2 = s*s
+        s3 = s2*s
+        h00 = 2*s3 - 3*s2 + 1
+        h10 = s3 - 2*s2 + s
+        h01 = -2*s3 + 3*s2
+        h11 = s3 - s2
+        return v0*h00 + M[i]*(h10*dt) + v1*h01 + M[i+1]*(h11*dt)
+
+    # "values" property...
+
+    def _getValues(self):
+        """Return a list of all (time, value) pairs.
+
+        This method is used for retrieving the \a values property.
+        """
+        return zip(self._times, self._values)
+
+    values = property(_getValues, None, None, "List of (time, value) pairs (read-only)")
 
     ## protected:
         
@@ -179,4 +345,73 @@ class ValueTable(component.Component):
         """Computes a new output value."""
         return self(self.time_slot.getValue())
 
+    def _tangents(self, i, n):
+        """Return the tangents at the points i and i+1 (for cubic interpolation).
+        """
+        res = []
+        for k in [i, i+1]:
+            k0 = max(k-1, 0)
+            k1 = min(k+1, n-1)
+            res.append((self._values[k1]-self._values[k0])*(1.0/(self._times[k1]-self._times[k0])))
+        return res
+
+    def _tangentArray(self, T, V):
+        """Array version of _tangents() (returns the tangents at all points).
+        """
+        n = len(T)
+        k0 = numpy.maximum(numpy.arange(n)-1, 0)
+        k1 = numpy.minimum(numpy.arange(n)+1, n-1)
+        f = 1.0/(T[k1]-T[k0])
+        return (V[k1]-V[k0])*f.reshape((n,)+(1,)*(V.ndim-1))
+
+    def _getArrays(self):
+        """Return the times and values as numpy arrays.
+
+        The arrays are cached until the table is modified.
+        """
+        if self._arrays is None:
+            T = numpy.array(self._times, dtype=numpy.float64)
+            self._arrays = (T, self._toArray(self._values))
+        return self._arrays
+
+    def _toArray(self, values):
+        """Convert a list of values into a numpy array.
+        """
+        typ = self._typ
+        if typ=="mat3" or typ=="mat4":
+            d = int(typ[-1])
+            return numpy.array([v.toList(rowmajor=True) for v in values], dtype=numpy.float64).reshape((-1, d, d))
+        if typ=="quat":
+            return numpy.array([(q.w, q.x, q.y, q.z) for q in values], dtype=numpy.float64)
+        if typ=="vec3" or typ=="vec4":
+            return numpy.array([tuple(v) for v in values], dtype=numpy.float64)
+        if typ=="int":
+            return numpy.array(values, dtype=numpy.int_)
+        return numpy.array(values, dtype=numpy.float64)
+
+    def _fromArray(self, a):
+        """Convert a numpy array with values into a list of values.
+        """
+        typ = self._typ
+        if typ=="double":
+            return map(float, a)
+        if typ=="int":
+            return map(int, a)
+        cls = type(self.default_value)
+        return [cls(*row) for row in a.reshape((len(a), -1)).tolist()]
+
     exec slotPropertyCode("output")
+
+def _slerpArray(s, q0, q1):
+    """Vectorized version of slerp() (for arrays of quaternions (w,x,y,z)).
+    """
+    ca = (q0*q1).sum(axis=-1)[...,numpy.newaxis]
+    q1 = numpy.where(ca<0, -q1, q1)
+    ca = numpy.clip(numpy.abs(ca), -1.0, 1.0)
+    o = numpy.arccos(ca)
+    so = numpy.sin(o)
+    small = numpy.abs(so)<=1E-12
+    so = numpy.where(small, 1.0, so)
+    a = numpy.where(small, 1.0, numpy.sin(o*(1.0-s))/so)
+    b = numpy.where(small, 0.0, numpy.sin(o*s)/so)
+    return q0*a + q1*b
@@ -555,6 +555,7 @@ class ArraySlot : public IArraySlot
 
   virtual const T* getValues(int index);
   virtual void setValues(int index, const T* vals);
+  virtual void setValueBlock(int index, int count, const T* vals);
   
   /**
      Return the raw pointer to the array data.
@@ -809,6 +810,45 @@ void ArraySlot<T>::setValues(int index, const T* vals)
   }
 }
 
+/**
+  Set several consecutive array values at once.
+
+  This method sets \a count values starting at position \a index.
+  \a vals must point to count*multiplicity elements that are stored
+  in the same order as in the array. The dependents are only notified
+  once about the entire range.
+  The index may be negative to count from the end of the array. If the
+  range exceeds the array, an EIndexError exception is thrown.
+
+  \param index Array index of the first value (0-based). May be negative.
+  \param count Number of values to set
+  \param vals New values (count*multiplicity elements)
+ */
+template<class T>
+void ArraySlot<T>::setValueBlock(int index, int count, const T* vals)
+{
+  if (controller!=0)
+  {
+    controller->setValueBlock(index, count, vals);
+  }
+  else
+  {
+    if (index<0)
+      index = size()+index;
+    if ((index<0) || (count<0) || (index+count>size()))
+      throw EIndexError();
+    if (count==0)
+      return;
+
+    T* ptr = &(values[index]);
+    int n = count*values.multiplicity();
+    for(int i=0; i<n; i++)
+    {
+      ptr[i] = vals[i];
+    }
+    notifyDependentsValue(index, index+count);
+  }
+}
 
 template<class T>
 ISlot* ArraySlot<T>::getController() const
@@ -169,14 +169,18 @@ def testTransformPoints(ri):
 #    else:
 #        print "RiTransformPoints() failed"
 
-def main(ri, name, archiveName="include.rib"):
+def main(ri, name, archiveName="include.rib", encoding=None):
     """Main function.
     
     ri: RenderMan API
     name: Argument for RiBegin()
     archiveName: Name of the test archive file
+    encoding: RIB encoding ("ascii" or "binary", None = default)
     """
-    ri.RiBegin(name)
+    if encoding is None:
+        ri.RiBegin(name)
+    else:
+        ri.RiBegin(name, ri.RI_ENCODING, encoding)
 
     ri.RiArchiveRecord(ri.RI_COMMENT, "Test RIB file %d", 1)
     ri.RiArchiveRecord(ri.RI_STRUCTURE, "Creator $CREATOR")
@@ -0,0 +1,115 @@
+# Test the array types of the light cgtypes package
+
+import unittest
+import random, math
+import numpy
+from cgkit.light.cgtypes import *
+
+class TestArrays_light(unittest.TestCase):
+    
+    def setUp(self):
+        rnd = random.Random(1)
+        self.vs = [vec3(rnd.uniform(-1,1), rnd.uniform(-1,1), rnd.uniform(-1,1)) for i in range(10)]
+        self.ws = [vec3(rnd.uniform(-1,1), rnd.uniform(-1,1), rnd.uniform(-1,1)) for i in range(10)]
+        self.qs = [quat(rnd.uniform(0,3), v).normalize() for v in self.ws]
+        self.ms = []
+        for v,w in zip(self.vs, self.ws):
+            M = mat4.rotation(abs(w.x)*3, v).translate(w)
+            M.setRow(3, vec4(0.1*v.x, 0.1*v.y, 0.1*v.z, 1))
+            self.ms.append(M)
+        # The vectorized operations may differ in the last bits
+        self.eps = setEpsilon(1E-9)
+    
+    def tearDown(self):
+        setEpsilon(self.eps)
+    
+    def testVec3Array(self):
+        a = vec3array(self.vs)
+        b = vec3array(self.ws)
+        self.assertEqual(10, len(a))
+        self.assertEqual((10,3), a.array.shape)
+        self.assertEqual(self.vs, a.toList())
+        self.assertEqual(self.vs, list(a))
+        self.assertEqual(self.vs[3], a[3])
+        self.assertEqual(self.vs[2:5], a[2:5].toList())
+        self.assertEqual(0, len(vec3array()))
+        self.assertEqual([vec3(0), vec3(0)], vec3array(2).toList())
+        self.assertEqual([vec3(1,2,3)], vec3array(vec3(1,2,3)).toList())
+        self.assertEqual([vec3(1,2,3), vec3(4,5,6)], vec3array([(1,2,3), (4,5,6)]).toList())
+        
+        self.assertEqual([v+w for v,w in zip(self.vs, self.ws)], (a+b).toList())
+        self.assertEqual([v-w for v,w in zip(self.vs, self.ws)], (a-b).toList())
+        self.assertEqual([v+vec3(1,2,3) for v in self.vs], (a+vec3(1,2,3)).toList())
+        self.assertEqual([vec3(1,2,3)-v for v in self.vs], (vec3array(vec3(1,2,3))-a).toList())
+        self.assertEqual([-v for v in self.vs], (-a).toList())
+        self.assertEqual([2*v for v in self.vs], (2*a).toList())
+        self.assertEqual([v*0.5 for v in self.vs], (a*0.5).toList())
+        self.assertEqual([v/4.0 for v in self.vs], (a/4.0).toList())
+        self.assertEqual([v*float(i) for i,v in enumerate(self.vs)], (a*numpy.arange(10)).toList())
+        self.assertTrue(numpy.allclose([v*w for v,w in zip(self.vs, self.ws)], a*b))
+        self.assertTrue(numpy.allclose([v*self.ws[0] for v in self.vs], self.ws[0]*a))
+        self.assertTrue(numpy.allclose([v*w for v,w in zip(self.vs, self.ws)], a.dot(b)))
+        self.assertTrue(numpy.allclose([v.length() for v in self.vs], a.length()))
+        self.assertTrue(numpy.allclose([abs(v) for v in self.vs], abs(a)))
+        self.assertEqual([v.cross(w) for v,w in zip(self.vs, self.ws)], a.cross(b).toList())
+        self.assertEqual([v.normalize() for v in self.vs], a.normalize().toList())
+        
+        # Slices share the data
+        a[1:3] = vec3(7)
+        self.assertEqual(vec3(7), a[2])
+        c = a[4:6]
+        c[0] = (1,2,3)
+        self.assertEqual(vec3(1,2,3), a[4])
+        self.assertRaises(TypeError, lambda: a+"spam")
+
+    def testVec4Array(self):
+        vs = [vec4(v.x, v.y, v.z, w.x) for v,w in zip(self.vs, self.ws)]
+        a = vec4array(vs)
+        self.assertEqual((10,4), a.array.shape)
+        self.assertEqual(vs, a.toList())
+        self.assertEqual([v+v for v in vs], (a+a).toList())
+        self.assertEqual([v.normalize() for v in vs], a.normalize().toList())
+        self.assertTrue(numpy.allclose([v*v for v in vs], a*a))
+
+    def testMat4Array(self):
+        m = mat4array(self.ms)
+        self.assertEqual((10,4,4), m.array.shape)
+        self.assertEqual(self.ms, m.toList())
+        self.assertEqual(self.ms[5], m[5])
+        a = vec3array(self.vs)
+        self.assertEqual([M*v for M,v in zip(self.ms, self.vs)], (m*a).toList())
+        self.assertEqual([v*M for M,v in zip(self.ms, self.vs)], (a*m).toList())
+        self.assertEqual([self.ms[0]*v for v in self.vs], (mat4array(self.ms[0])*a).toList())
+        self.assertEqual([self.ms[0]*v for v in self.vs], (self.ms[0]*a).toList())
+        self.assertEqual([v*self.ms[0] for v in self.vs], (a*self.ms[0]).toList())
+        self.assertEqual([self.ms[0]*v for v in self.vs[:1]], (m[:1]*self.vs[0]).toList())
+        v4 = [vec4(v.x, v.y, v.z, 1) for v in self.vs]
+        self.assertEqual([M*v for M,v in zip(self.ms, v4)], (m*vec4array(v4)).toList())
+        self.assertEqual([M*N for M,N in zip(self.ms, reversed(self.ms))], (m*mat4array(list(reversed(self.ms)))).toList())
+        self.assertEqual([M*self.ms[0] for M in self.ms], (m*self.ms[0]).toList())
+        self.assertEqual([self.ms[0]*M for M in self.ms], (self.ms[0]*m).toList())
+        self.assertEqual([2.0*M for M in self.ms], (2.0*m).toList())
+        self.assertEqual([M+M for M in self.ms], (m+m).toList())
+        self.assertEqual([M.transpose() for M in self.ms], m.transpose().toList())
+        self.assertEqual([M.inverse() for M in self.ms], m.inverse().toList())
+        self.assertTrue(numpy.allclose([M.determinant() for M in self.ms], m.determinant()))
+
+    def testQuatArray(self):
+        q = quatarray(self.qs)
+        self.assertEqual((10,4), q.array.shape)
+        self.assertEqual(self.qs, q.toList())
+        a = vec3array(self.vs)
+        self.assertEqual([Q.rotateVec(v) for Q,v in zip(self.qs, self.vs)], q.rotateVec(a).toList())
+        self.assertEqual([self.qs[0].rotateVec(v) for v in self.vs], quatarray(self.qs[0]).rotateVec(self.vs).toList())
+        self.assertEqual([Q.toMat4() for Q in self.qs], q.toMat4().toList())
+        self.assertEqual([Q*P for Q,P in zip(self.qs, reversed(self.qs))], (q*quatarray(list(reversed(self.qs)))).toList())
+        self.assertEqual([Q*self.qs[0] for Q in self.qs], (q*self.qs[0]).toList())
+        self.assertEqual([self.qs[0]*Q for Q in self.qs], (self.qs[0]*q).toList())
+        self.assertEqual([Q.conjugate() for Q in self.qs], q.conjugate().toList())
+        self.assertEqual([(2*Q).normalize() for Q in self.qs], (2*q).normalize().toList())
+        self.assertTrue(numpy.allclose([abs(Q) for Q in self.qs], abs(q)))
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
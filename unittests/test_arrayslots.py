@@ -177,6 +177,41 @@ class TestArraySlot(unittest.TestCase):
         for i in range(10):
             self.assertEqual(asl[i], (i,i+1,i+2))
 
+    def testSetBuffer(self):
+
+        try:
+            import numpy
+        except ImportError:
+            return
+
+        # Vec3 slot with multiplicity 1
+        asl = _core.Vec3ArraySlot()
+        asl.resize(4)
+        asl.setBuffer(numpy.arange(12, dtype=numpy.float32))
+        for i in range(4):
+            self.assertEqual(asl[i], vec3(3*i, 3*i+1, 3*i+2))
+        asl.setBuffer(numpy.array([[-1,-2,-3]]), 2)
+        self.assertEqual(asl[2], vec3(-1,-2,-3))
+        self.assertEqual(asl[3], vec3(9,10,11))
+
+        # Int slot with multiplicity 3
+        asl = _core.IntArraySlot(3)
+        asl.resize(3)
+        asl.setBuffer(numpy.arange(9).reshape(3,3))
+        for i in range(3):
+            self.assertEqual(asl[i], (3*i, 3*i+1, 3*i+2))
+
+        # Exceeding the slot or incomplete values
+        self.assertRaises(IndexError, lambda: asl.setBuffer(numpy.arange(6), 2))
+        self.assertRaises(ValueError, lambda: asl.setBuffer(numpy.arange(4)))
+
+        # The values must also arrive in a slot that is controlled
+        ctrl = _core.IntArraySlot(3)
+        ctrl.resize(3)
+        asl.setController(ctrl)
+        asl.setBuffer(numpy.ones(9, dtype=int))
+        self.assertEqual(list(ctrl), 3*[(1,1,1)])
+
     def testController(self):
 
         # Controller slot
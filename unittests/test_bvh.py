@@ -0,0 +1,86 @@
+# Test the bvh module
+
+import os, unittest
+from cgkit import bvh
+
+class TestReader(bvh.BVHReader):
+    def __init__(self, filename):
+        bvh.BVHReader.__init__(self, filename)
+        self.frames = []
+
+    def onHierarchy(self, root):
+        self.root = root
+
+    def onMotion(self, frames, dt):
+        self.numframes = frames
+        self.dt = dt
+
+    def onFrame(self, values):
+        self.frames.append(values)
+
+
+class TestBVH(unittest.TestCase):
+
+    def setUp(self):
+        self.has_numpy = bvh._has_numpy
+
+    def tearDown(self):
+        bvh._has_numpy = self.has_numpy
+
+    def testRead(self):
+        """Check reading the motion data (with and without numpy).
+        """
+        res = []
+        for flag in [self.has_numpy, False]:
+            bvh._has_numpy = flag
+            rd = TestReader("data/motion.bvh")
+            rd.read()
+            self.assertEqual("Hips", rd.root.name)
+            self.assertEqual(["Xposition", "Yposition", "Zposition", "Zrotation", "Xrotation", "Yrotation"], rd.root.channels)
+            self.assertEqual(3, rd.numframes)
+            self.assertEqual(0.04, rd.dt)
+            self.assertEqual(3, len(rd.frames))
+            self.assertEqual([2.1, 2.2, 2.3, 7.0, 8.0, 9.0, 10.0, 11.0, 12.125], rd.frames[2])
+            self.assertEqual(float, type(rd.frames[0][0]))
+            res.append(rd.frames)
+        self.assertEqual(res[0], res[1])
+
+    def testFrameArray(self):
+        """Check the onFrames() callback.
+        """
+        if not self.has_numpy:
+            return
+
+        class ArrayReader(TestReader):
+            def onFrames(self, data):
+                self.data = data
+
+        rd = ArrayReader("data/motion.bvh")
+        rd.read()
+        self.assertEqual((3, 9), rd.data.shape)
+        self.assertEqual([1.1, 1.2, 1.3, 1.5, 2.5, 3.5, 4.5, 5.5, 6.25], list(rd.data[1]))
+        self.assertEqual([], rd.frames)
+
+    def testSyntaxError(self):
+        """Check that an invalid number of values is reported.
+        """
+        if not os.path.exists("tmp"):
+            os.mkdir("tmp")
+        s = file("data/motion.bvh", "rt").read()
+        f = file("tmp/invalid.bvh", "wt")
+        f.write(s.replace("1.1 1.2 1.3 1.5", "1.1 1.2 1.5"))
+        f.close()
+        for flag in [self.has_numpy, False]:
+            bvh._has_numpy = flag
+            rd = TestReader("tmp/invalid.bvh")
+            try:
+                rd.read()
+            except SyntaxError, e:
+                self.assertEqual("Syntax error in line 20: 9 float values expected, got 8 instead", str(e))
+            else:
+                self.fail("SyntaxError expected")
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
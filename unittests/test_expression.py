@@ -0,0 +1,48 @@
+# Test the Expression component
+
+import unittest
+from cgkit.all import *
+import math
+
+class TestExpression(unittest.TestCase):
+
+    def setUp(self):
+        getScene().clear()
+
+    def testEval(self):
+        """Check evaluating an expression."""
+        e = Expression("1.0 + amp*sin(freq*t)", amp=0.2, freq=2.0)
+        self.assertEqual("float", e.exprtype)
+        getScene().timer().time = 0.5
+        self.assertEqual(1.0+0.2*math.sin(1.0), e.output)
+        e.amp_slot.setValue(0.5)
+        self.assertEqual(1.0+0.5*math.sin(1.0), e.output)
+
+        e = Expression("vec3(v, 2*v, 3*v)", v=1.5)
+        self.assertEqual("vec3", e.exprtype)
+        self.assertEqual(vec3(1.5, 3.0, 4.5), e.output)
+
+        e = Expression("1,2,3")
+        self.assertEqual(vec3(1,2,3), e.output)
+
+    def testRecompile(self):
+        """Check that the expression is only recompiled when it changes."""
+        e = Expression("a*2", "float", a=3.0)
+        self.assertEqual(6.0, e.outProc())
+        func = e._func
+        self.assertEqual(6.0, e.outProc())
+        self.assertTrue(func is e._func)
+        e.expr = "a*3"
+        self.assertEqual(9.0, e.outProc())
+        self.assertTrue(func is not e._func)
+
+    def testSelf(self):
+        """Check that the expression can refer to the component."""
+        e = Expression("len(self.name)*t", "float", name="spam")
+        getScene().timer().time = 0.5
+        self.assertEqual(2.0, e.output)
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+# Test the hammersley module
+
+import unittest
+from cgkit.hammersley import *
+import numpy
+
+class TestHammersley(unittest.TestCase):
+
+    def testGenerators(self):
+        """Compare the array versions with the generators."""
+        self.assertPoints(planeHammersleyArray(100), planeHammersley(100))
+        self.assertPoints(sphereHammersleyArray(100), sphereHammersley(100))
+        self.assertPoints(planeHaltonArray(100), planeHalton(101))
+        self.assertPoints(planeHaltonArray(100, 5), planeHalton(101, 5))
+        self.assertPoints(sphereHaltonArray(100, 7), sphereHalton(101, 7))
+
+    def testChunks(self):
+        """Check computing the points in chunks."""
+        for scramble in [None, 12]:
+            a = sphereHammersleyArray(1000, scramble=scramble)
+            b = numpy.concatenate([sphereHammersleyArray(1000, start, 250, scramble=scramble) for start in range(0, 1000, 250)])
+            self.assertEqual(a.tolist(), b.tolist())
+            a = planeHaltonArray(1000, scramble=scramble, rotation=(0.2, 0.4))
+            b = numpy.concatenate([planeHaltonArray(250, start=start, scramble=scramble, rotation=(0.2, 0.4)) for start in range(0, 1000, 250)])
+            self.assertEqual(a.tolist(), b.tolist())
+        self.assertRaises(ValueError, lambda: planeHammersleyArray(100, 90, 20))
+
+    def testScramble(self):
+        """Check scrambled and rotated sequences."""
+        a = planeHaltonArray(256, scramble=5)
+        self.assertEqual(a.tolist(), planeHaltonArray(256, scramble=5).tolist())
+        self.assertNotEqual(a.tolist(), planeHaltonArray(256, scramble=6).tolist())
+        self.assertTrue(a.min()>=0.0 and a.max()<1.0)
+        # The first 2^k points are still stratified in x
+        self.assertEqual(range(256), sorted(numpy.floor(a[:,0]*256).astype(int).tolist()))
+
+        a = planeHammersleyArray(64, rotation=(0.25, 0.5))
+        b = planeHammersleyArray(64)
+        self.assertTrue(numpy.allclose(a, numpy.mod(b+(0.25, 0.5), 1.0)))
+
+    def testHemisphere(self):
+        """Check the hemisphere versions."""
+        for a in [hemisphereHammersleyArray(500, scramble=1), hemisphereHaltonArray(500)]:
+            self.assertEqual((500, 3), a.shape)
+            self.assertTrue(a[:,2].min()>=0.0)
+            self.assertTrue(numpy.allclose((a*a).sum(axis=1), 1.0))
+            self.assertTrue(abs(a[:,2].mean()-0.5)<0.01)
+
+    def assertPoints(self, a, gen):
+        ref = [tuple(p) for p in gen]
+        self.assertEqual(len(ref), len(a))
+        self.assertEqual(ref, map(tuple, a.tolist()))
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
@@ -2,7 +2,7 @@
 
 import unittest, os.path
 import sys, shutil
-from cgkit.jobqueue import createJobQueue, JobQueue, JobQueueError
+from cgkit.jobqueue import createJobQueue, JobQueue, JobQueueError, JobRunner
 from cgkit.jobqueue.jobhandle import JobHandle
 
 class TestJobQueue(unittest.TestCase):
@@ -66,6 +66,191 @@ class TestJobQueue(unittest.TestCase):
         j3.addDependency(j1)
         self.assertRaises(JobQueueError, lambda: jr.activate())
         
+    def testJobDefFormats(self):
+        """Check writing/reading job definition files.
+        """
+        if not os.path.exists("tmp"):
+            os.mkdir("tmp")
+        params = {"a":1, "b":(1.5, "x", None), "c":[True, -2, "y"]}
+        jq = self.queue()
+        jr = jq.createJobRoot("blender", blendFile="jobdef.blend")
+        # New jobs are written in JSON format
+        self.assertEqual("{", open(JobHandle(jr._location, None).procDefFile+"_tmp", "rb").read(1))
+        for fmt in ["json", "xml"]:
+            fileName = os.path.join("tmp", "jobdef.%s"%fmt)
+            jr._jobDefFormat = fmt
+            jr._writeJobDef(fileName, "foo", params)
+            jobType,res = jq._readJobDef(fileName)
+            self.assertEqual("foo", jobType)
+            self.assertEqual(params, res)
+            self.assertEqual(tuple, type(res["b"]))
+            self.assertEqual(str, type(res["b"][1]))
+        
+        # Dicts with non-string keys and non-ASCII strings (JSON only)
+        params = {"d":{1:(2,3), "e":{}}, "f":"\xe4"}
+        jr._jobDefFormat = "json"
+        jr._writeJobDef(fileName, "foo", params)
+        self.assertEqual(params, jq._readJobDef(fileName)[1])
+        
+    def testCreateJobs(self):
+        """Check creating several sub-jobs at once.
+        """
+        jq = self.queue()
+        for numThreads in [0, 4]:
+            jr = jq.createJobRoot("blender", blendFile="bulk.blend")
+            table = [{"frames":i} for i in range(1, 21)]
+            jobs = jr.createJobs("blender", table, commonParams={"blendFile":"frame"}, numThreads=numThreads)
+            self.assertEqual(20, len(jobs))
+            jr.activate()
+            
+            jh = JobHandle(jr._location, jr._location)
+            subJobs = list(jh.listSubJobs())
+            self.assertEqual(20, len(subJobs))
+            for i,job in enumerate(sorted(subJobs, key=lambda job: int(os.path.basename(job.location)[3:]))):
+                self.assertEqual('Blender "frame"', job.label)
+                jobType,params = jq._readJobDef(job.procDefFile)
+                self.assertEqual("blender", jobType)
+                self.assertEqual({"blendFile":"frame", "frames":i+1}, params)
+        
+        # Invalid parameters must be detected before anything is written
+        jr = jq.createJobRoot("blender", blendFile="bulk.blend")
+        self.assertRaises(TypeError, lambda: jr.createJobs("blender", [{"blendFile":"foo"}, {"blendFile":"foo", "frames":"x"}]))
+        self.assertEqual(False, os.path.exists(os.path.join(jr._location, ".jobs")))
+        
+    def testReadyList(self):
+        """Check that jobs are picked up in order using the ready-list.
+        """
+        if os.path.exists("tstqueue_ready"):
+            shutil.rmtree("tstqueue_ready")
+        createJobQueue("tstqueue_ready")
+        f = open(os.path.join("tstqueue_ready", "procs", "logjob.py"), "wt")
+        f.write(_logJobProc)
+        f.close()
+        jq = JobQueue("tstqueue_ready")
+        logFile = os.path.abspath(os.path.join("tstqueue_ready", "log.txt"))
+        
+        jr = jq.createJobRoot("logjob", name="root", logFile=logFile)
+        shad = jr.createJob("logjob", name="shadow", logFile=logFile)
+        j1 = jr.createJob("logjob", name="frame1", logFile=logFile)
+        j2 = jr.createJob("logjob", name="frame2", logFile=logFile)
+        j1.addDependency(shad)
+        j2.addDependency(shad)
+        jr.activate()
+        
+        # Only the shadow job has no sub-jobs
+        readyDir = os.path.join("tstqueue_ready", ".ready")
+        self.assertEqual(1, len(os.listdir(readyDir)))
+        
+        cwd = os.getcwd()
+        try:
+            while jq.runNextAvailableJob():
+                pass
+        finally:
+            os.chdir(cwd)
+        
+        lines = [s.strip() for s in open(logFile, "rt").readlines()]
+        self.assertEqual(["shadow", "frame1", "frame2", "root"], lines)
+        self.assertEqual([], os.listdir(readyDir))
+        self.assertEqual(True, JobHandle(jr._location, jr._location).isFinished())
+        
+    def testJobRunner(self):
+        """Check running jobs with several worker processes.
+        """
+        if os.path.exists("tstqueue_runner"):
+            shutil.rmtree("tstqueue_runner")
+        createJobQueue("tstqueue_runner")
+        f = open(os.path.join("tstqueue_runner", "procs", "logjob.py"), "wt")
+        f.write(_logJobProc)
+        f.close()
+        f = open(os.path.join("tstqueue_runner", "queue.cfg"), "at")
+        f.write("logjob = 1\n")
+        f.close()
+        jq = JobQueue("tstqueue_runner")
+        self.assertEqual({"logjob":1}, jq.jobTypeLimits)
+        logFile = os.path.abspath(os.path.join("tstqueue_runner", "log.txt"))
+        
+        jr = jq.createJobRoot("logjob", name="root", logFile=logFile)
+        for i in range(10):
+            jr.createJob("logjob", name="frame%d"%i, logFile=logFile)
+        jr.activate()
+        
+        cwd = os.getcwd()
+        runner = JobRunner("tstqueue_runner", numWorkers=3, pollInterval=0.05)
+        self.assertEqual(11, runner.run())
+        self.assertEqual(cwd, os.getcwd())
+        self.assertEqual({"logjob":11}, runner.finishedJobs)
+        self.assertEqual(0, runner.restarts)
+        
+        lines = [s.strip() for s in open(logFile, "rt").readlines()]
+        self.assertEqual(["frame%d"%i for i in range(10)], sorted(lines[:-1]))
+        self.assertEqual("root", lines[-1])
+        self.assertEqual(True, JobHandle(jr._location, jr._location).isFinished())
+        
+    def testJobTypeLimit(self):
+        """Check that jobs whose type limit is reached are skipped.
+        """
+        for readyList in [True, False]:
+            jq,logFile = self.limitQueue("tstqueue_limit", "")
+            jr = jq.createJobRoot("logjob", name="root", logFile=logFile)
+            jr.createJob("blockedjob", name="blocked", logFile=logFile)
+            jr.createJob("logjob", name="frame1", logFile=logFile)
+            jr.activate()
+            # Creating the jobs has already instantiated the procedures
+            open(logFile, "wt").close()
+            if not readyList:
+                # Old queue without ready-list
+                shutil.rmtree(os.path.join("tstqueue_limit", ".ready"))
+            jq._resourceGuard = _TestGuard(["blockedjob"])
+            
+            cwd = os.getcwd()
+            try:
+                self.assertEqual(True, jq.runNextAvailableJob())
+                self.assertEqual(False, jq.runNextAvailableJob())
+            finally:
+                os.chdir(cwd)
+            # The blocked job procedure must not even be instantiated
+            lines = [s.strip() for s in open(logFile, "rt").readlines()]
+            self.assertEqual(["frame1"], lines)
+        
+    def testJobRunnerBlocked(self):
+        """Check that the job runner stops when the remaining jobs can't be run.
+        """
+        jq,logFile = self.limitQueue("tstqueue_limit", "logjob = 1\n")
+        jr = jq.createJobRoot("logjob", name="root", logFile=logFile)
+        jr.createJob("blockedjob", name="blocked", logFile=logFile)
+        jr.createJob("logjob", name="frame1", logFile=logFile)
+        jr.activate()
+        # Remove the procedure so that the blocked job can never be run
+        os.remove(os.path.join("tstqueue_limit", "procs", "blockedjob.py"))
+        open(logFile, "wt").close()
+        
+        runner = JobRunner("tstqueue_limit", numWorkers=2, pollInterval=0.05)
+        self.assertEqual(1, runner.run())
+        lines = [s.strip() for s in open(logFile, "rt").readlines()]
+        self.assertEqual(["frame1"], lines)
+        
+    def limitQueue(self, location, limits):
+        """Create a job queue with the logjob and blockedjob procedures.
+        
+        limits is appended to the config file. Returns the JobQueue
+        object and the name of the log file.
+        """
+        if os.path.exists(location):
+            shutil.rmtree(location)
+        createJobQueue(location)
+        f = open(os.path.join(location, "procs", "logjob.py"), "wt")
+        f.write(_logJobProc)
+        f.close()
+        f = open(os.path.join(location, "procs", "blockedjob.py"), "wt")
+        f.write(_blockedJobProc)
+        f.close()
+        f = open(os.path.join(location, "queue.cfg"), "at")
+        f.write(limits)
+        f.close()
+        logFile = os.path.abspath(os.path.join(location, "log.txt"))
+        open(logFile, "wt").close()
+        return JobQueue(location), logFile
+        
     def queue(self):
         """Return a JobQueue object.
         """
@@ -73,11 +258,60 @@ class TestJobQueue(unittest.TestCase):
             createJobQueue("tstqueue")
         return JobQueue("tstqueue")
 
+# A job procedure that only writes its name into a log file
+_logJobProc = """
+import cgkit.jobqueue
+
+class logjob(cgkit.jobqueue.JobProc):
+    def __init__(self, name, logFile):
+        cgkit.jobqueue.JobProc.__init__(self, label=name)
+        self._name = name
+        self._logFile = logFile
+    
+    def run(self):
+        f = open(self._logFile, "at")
+        f.write("%s\\n"%self._name)
+        f.close()
+"""
+
+# A job procedure that logs when it is instantiated
+_blockedJobProc = """
+import cgkit.jobqueue
+
+class blockedjob(cgkit.jobqueue.JobProc):
+    def __init__(self, name, logFile):
+        cgkit.jobqueue.JobProc.__init__(self, label=name)
+        f = open(logFile, "at")
+        f.write("init %s\\n"%name)
+        f.close()
+    
+    def run(self):
+        pass
+"""
+
+class _TestGuard:
+    """Resource guard that doesn't allow any job of the given types."""
+    
+    def __init__(self, blockedTypes):
+        self.blockedTypes = blockedTypes
+    
+    def acquire(self, jobType):
+        return jobType not in self.blockedTypes
+    
+    def release(self, jobType):
+        pass
+
 ######################################################################
 
 # Remove the queue from a previous run
 if os.path.exists("tstqueue"):
     shutil.rmtree("tstqueue")
+if os.path.exists("tstqueue_ready"):
+    shutil.rmtree("tstqueue_ready")
+if os.path.exists("tstqueue_runner"):
+    shutil.rmtree("tstqueue_runner")
+if os.path.exists("tstqueue_limit"):
+    shutil.rmtree("tstqueue_limit")
 
 if __name__=="__main__":
     unittest.main()
@@ -622,6 +622,27 @@ class TestMat4_light(unittest.TestCase):
 
         self.assertEqual(m, n)
 
+    ######################################################################
+    def testInPlace(self):
+        """Check that the in-place operators modify the matrix itself.
+        """
+        M = mat4(1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16)
+        N = mat4.rotation(0.5, vec3(1,2,3))
+        R = M*N
+        mlist = M.mlist
+        A = M
+        M *= N
+        self.failUnless(M is A and M.mlist is mlist)
+        self.assertEqual(M, R)
+        M += N
+        M -= N
+        self.assertEqual(M, R)
+        M *= 2
+        M /= 2.0
+        self.failUnless(M is A)
+        self.assertEqual(M, R)
+        self.assertRaises(TypeError, M.__imul__, vec3(1,2,3))
+
     ######################################################################
     def testCopy(self):
         """Test copying an internal mat4.
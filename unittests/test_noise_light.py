@@ -0,0 +1,94 @@
+# Test the noise functions of cgkit light
+
+import unittest
+import numpy
+from cgkit.light import noise
+from cgkit.light.cgtypes import vec3, vec4
+
+class TestNoise_light(unittest.TestCase):
+
+    def testReference(self):
+        """Compare with values from the C++ implementation."""
+        self.assertEqual(0.34936404219909351, noise.snoise(0.3, 0.7))
+        self.assertEqual(0.17530817891625072, noise.snoise(0.3, 0.7, 1.2))
+        self.assertEqual(-0.19884242967572635, noise.snoise(0.3, 0.7, 1.2, 0.4))
+        self.assertEqual(0.39852943591323386, noise.cellnoise(-2.5, 3.25, -0.75, 1.5))
+        self.assertEqual(0.5*(-0.35543187071201315+1.0), noise.noise(vec3(-2.5, 3.25, -0.75)))
+        self.assertEqual(-0.29795860802760982, noise.spnoise((-2.5, 3.25), (3, 2)))
+        self.assertEqual(-0.19252842776518711, noise.spnoise((-2.5, 3.25, -0.75), (3, -2, 4)))
+        self.assertEqual(0.66779816655917579, noise.turbulence((0.3, 0.7, 1.2), 4, 2.1, 0.6))
+        self.assertEqual(0.60485911316248409, noise.fBm((0.3, 0.7, 1.2), 5))
+
+        v = noise.vsnoise(0.3, 0.7, 1.2, 0.4)
+        self.assertEqual(vec4, type(v))
+        self.assertEqual((-0.19884242967572635, -0.05323108815860722, -0.079635372780189728, -0.196425869596175), tuple(v))
+        self.assertEqual((0.34936404219909351, 0.12113576101895596), noise.vsnoise(0.3, 0.7))
+        v = noise.vspnoise((-2.5, 3.25, -0.75), (3, 2, 4))
+        self.assertEqual(vec3, type(v))
+        self.assertEqual((-0.19252842776518711, 0.18937984523371343, 0.025339062951267234), tuple(v))
+        v = noise.vturbulence((-2.5, 3.25, -0.75), 3)
+        self.assertEqual((0.68421885074864131, 0.63460186731745005, 0.51372407156080024), tuple(v))
+
+    def testArgs(self):
+        """Check the different ways to pass the arguments."""
+        self.assertEqual(noise.snoise(0.3, 0.0), noise.snoise(0.3))
+        self.assertEqual(noise.snoise(0.3, 0.7, 1.2), noise.snoise((0.3, 0.7, 1.2)))
+        self.assertEqual(noise.snoise(0.3, 0.7, 0.0, 0.4), noise.snoise((0.3, 0.7), 0.4))
+        self.assertEqual(vec3, type(noise.vnoise((0.3, 0.7), 0.4)))
+        self.assertEqual(float, type(noise.vnoise(0.3)))
+        self.assertEqual(noise.pnoise((0.3, 0.7, 1.2), 0.4, (2, 3, 4), 5),
+                         noise.pnoise((0.3, 0.7, 1.2, 0.4), (2, 3, 4, 5)))
+        self.assertRaises(ValueError, lambda: noise.pnoise((0.3, 0.7), (2, 0)))
+        self.assertRaises(ValueError, lambda: noise.pnoise((0.3, 0.7), (2, 3, 4)))
+
+    def testArrays(self):
+        """Check array arguments."""
+        rnd = numpy.random.RandomState(1)
+        P = rnd.uniform(-20, 20, (5, 7, 4))
+        x,y,z,t = [P[...,i] for i in range(4)]
+
+        res = noise.snoise(P)
+        self.assertEqual((5, 7), res.shape)
+        self.assertEqual(noise.snoise(x, y, z, t).tolist(), res.tolist())
+        self.assertEqual(noise.snoise(tuple(P[2,3])), res[2,3])
+        res = noise.noise(x[0])
+        self.assertEqual((7,), res.shape)
+        self.assertEqual(noise.noise(x[0,4]), res[4])
+        # Broadcasting
+        res = noise.snoise(x[0], 1.5, z[0])
+        self.assertEqual(noise.snoise(x[0,2], 1.5, z[0,2]), res[2])
+
+        res = noise.vcellnoise(P[...,:3])
+        self.assertEqual((5, 7, 3), res.shape)
+        self.assertEqual(tuple(noise.vcellnoise(tuple(P[4,1,:3]))), tuple(res[4,1]))
+        res = noise.vspnoise(P[...,:2], t, (3, 4), 2)
+        self.assertEqual((5, 7, 3), res.shape)
+        self.assertEqual(tuple(noise.vspnoise(tuple(P[1,6,:2]), t[1,6], (3, 4), 2)), tuple(res[1,6]))
+        res = noise.vfBm(P[...,:3], 4)
+        self.assertEqual((5, 7, 3), res.shape)
+        self.assertEqual(tuple(noise.vfBm(tuple(P[3,3,:3]), 4)), tuple(res[3,3]))
+
+    def testPeriodic(self):
+        """Check the periodic noise functions."""
+        rnd = numpy.random.RandomState(2)
+        P = rnd.uniform(-5, 5, (100, 3))
+        period = numpy.array([3, 2, 5])
+        a = noise.vpnoise(P, period)
+        b = noise.vpnoise(P+period, period)
+        c = noise.vpnoise(P-2*period, period)
+        self.assertTrue(numpy.allclose(a, b, atol=1E-12))
+        self.assertTrue(numpy.allclose(a, c, atol=1E-12))
+
+    def testRange(self):
+        """Check the range of the return values."""
+        rnd = numpy.random.RandomState(3)
+        P = rnd.uniform(-100, 100, (1000, 3))
+        res = noise.noise(P)
+        self.assertTrue(res.min()>=0.0 and res.max()<=1.0)
+        res = noise.scellnoise(P)
+        self.assertTrue(res.min()>=-1.0 and res.max()<=1.0)
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+# Test the objmtl module
+
+import unittest
+from cStringIO import StringIO
+from cgkit import objmtl
+from cgkit.cgtypes import *
+
+OBJ = """# test file
+v 0 0 0
+v 1 0 0
+v 1 1 0 2.0
+v 0 1 0
+vt 0 0
+vt 1 0
+vt 1 1 0.5
+vn 0 0 1
+vn 0 0 -1
+g front
+f 1/1/1 2/2/1 3/3/1
+f -4/-3/-2 -2/-1/-2 -1/-1/-2
+usemtl spam
+f 1//2 3//2 4//2 2//2
+f 1 2 4
+"""
+
+class TestReader(objmtl.OBJReader):
+    def __init__(self):
+        objmtl.OBJReader.__init__(self)
+        self.events = []
+
+    def v(self, vert):
+        self.events.append(("v", tuple(vert)))
+
+    def vt(self, tvert):
+        self.events.append(("vt", tuple(tvert)))
+
+    def vn(self, normal):
+        self.events.append(("vn", tuple(normal)))
+
+    def f(self, *verts):
+        self.events.append(("f", verts))
+
+    def g(self, *groups):
+        self.events.append(("g", groups))
+
+    def usemtl(self, name):
+        self.events.append(("usemtl", name))
+
+
+class ArrayReader(objmtl.OBJReader):
+    def __init__(self):
+        objmtl.OBJReader.__init__(self)
+        self.arrays = []
+
+    def vArray(self, verts):
+        self.arrays.append(("v", verts.tolist()))
+
+    def vtArray(self, tverts):
+        self.arrays.append(("vt", tverts.tolist()))
+
+    def vnArray(self, normals):
+        self.arrays.append(("vn", normals.tolist()))
+
+    def fArray(self, sizes, verts, tverts, normals):
+        if tverts is not None:
+            tverts = tverts.tolist()
+        if normals is not None:
+            normals = normals.tolist()
+        self.arrays.append(("f", sizes.tolist(), verts.tolist(), tverts, normals))
+
+
+class TestOBJReader(unittest.TestCase):
+
+    def testReadArrays(self):
+        """Check that readArrays() delivers the same data as read().
+        """
+        if not objmtl._has_numpy:
+            return
+
+        rd = TestReader()
+        rd.read(StringIO(OBJ))
+        self.assertEqual(("v", (1.0, 1.0, 0.0, 2.0)), rd.events[2])
+        self.assertEqual(("vt", (1.0, 1.0, 0.5)), rd.events[6])
+        self.assertEqual(("f", ((1,1,1), (2,2,1), (3,3,1))), rd.events[10])
+        self.assertEqual(("f", ((1,1,1), (3,3,1), (4,3,1))), rd.events[11])
+        self.assertEqual(("f", ((1,None,2), (3,None,2), (4,None,2), (2,None,2))), rd.events[13])
+        self.assertEqual(("f", ((1,None,None), (2,None,None), (4,None,None))), rd.events[14])
+
+        for chunksize in [1, 2, 3, 100]:
+            ard = TestReader()
+            ard.readArrays(StringIO(OBJ), chunksize)
+            self.assertEqual(rd.events, ard.events)
+
+    def testArrays(self):
+        """Check the arrays that are passed to the array methods.
+        """
+        if not objmtl._has_numpy:
+            return
+
+        rd = ArrayReader()
+        rd.readArrays(StringIO(OBJ))
+        self.assertEqual([("v", [[0,0,0,1], [1,0,0,1], [1,1,0,2], [0,1,0,1]]),
+                          ("vt", [[0,0,0], [1,0,0], [1,1,0.5]]),
+                          ("vn", [[0,0,1], [0,0,-1]]),
+                          ("f", [3,3], [1,2,3,1,3,4], [1,2,3,1,3,3], [1,1,1,1,1,1]),
+                          ("f", [4,3], [1,3,4,2,1,2,4], None, [2,2,2,2,0,0,0])],
+                         rd.arrays)
+
+    def testErrors(self):
+        """Check invalid data in readArrays().
+        """
+        if not objmtl._has_numpy:
+            return
+
+        rd = ArrayReader()
+        self.assertRaises(ValueError, lambda: rd.readArrays(StringIO("v 0 0 0\nf 1 0 1\n")))
+        self.assertRaises(ValueError, lambda: rd.readArrays(StringIO("v 0 0 0\nf 1 -2 1\n")))
+        self.assertRaises(SyntaxError, lambda: rd.readArrays(StringIO("v 0 0 0\nf 1 1\n")))
+        self.assertRaises(SyntaxError, lambda: rd.readArrays(StringIO("v 0 0\n")))
+
+        # Records with a different number of values must not be combined
+        self.assertError(SyntaxError, 1, "v 0 0\nv 0 0 0 1\n")
+        self.assertError(SyntaxError, 3, "v 0 0 0\nvt 0 0\nv 0 0\nv 0 0 0 1\n")
+        self.assertError(SyntaxError, 4, "v 0 0 0\nv 0 0 0\nv 0 0 0\nv 0 0\n", chunksize=2)
+        self.assertError(ValueError, 4, "v 1 2 3\n# comment\nvt 0 0\nv 1 x 3\n")
+        self.assertError(SyntaxError, 3, "v 0 0 0\nf 1 1 1\nf 1 1\n")
+        self.assertError(ValueError, 3, "v 0 0 0\nf 1 1 1\nf 1 0 1\n")
+        self.assertError(ValueError, 3, "v 0 0 0\nf 1 1 1\nf 1 -2 1\n")
+        self.assertError(ValueError, 3, "v 0 0 0\nf 1 1 1\nf 1 a 1\n")
+        self.assertError(SyntaxError, 3, "v 0 0 0\nf 1 1 1\nf 1/1/1/1 1 1\n")
+
+    def assertError(self, exccls, linenr, data, **keyargs):
+        """Check that reading data raises an error that refers to linenr.
+        """
+        try:
+            ArrayReader().readArrays(StringIO(data), **keyargs)
+        except exccls, e:
+            self.assertTrue(" in line %d:"%linenr in str(e), str(e))
+        else:
+            self.fail("%s not raised"%exccls.__name__)
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# Test the offimport module
+
+import os
+import unittest
+from cgkit import offimport
+
+VERTS = ["0 0 0", "1 0 0", "0 1 0", "1 1 0"]
+
+def writeOFF(filename, faces):
+    f = file(filename, "wt")
+    f.write("OFF\n")
+    f.write("%d %d 0\n"%(len(VERTS), len(faces)))
+    for v in VERTS:
+        f.write("%s\n"%v)
+    for face in faces:
+        f.write("%s\n"%face)
+    f.close()
+
+class TestOffImport(unittest.TestCase):
+
+    def setUp(self):
+        if not os.path.exists("tmp"):
+            os.mkdir("tmp")
+
+    def importFaces(self, filename, chunksize, bulk):
+        """Import a file and return the importer and the faces."""
+        has_numpy = offimport._has_numpy
+        offimport._has_numpy = bulk
+        try:
+            imp = offimport.OffImporter()
+            imp.chunksize = chunksize
+            imp.importFile(filename)
+        finally:
+            offimport._has_numpy = has_numpy
+        geom = imp.geom
+        if imp.is_trimesh:
+            faces = [tuple(map(int, geom.faces[i])) for i in range(geom.faces.size())]
+        else:
+            faces = [geom.getPoly(i) for i in range(geom.getNumPolys())]
+        return imp, faces
+
+    def testDegenerateFaces(self):
+        """Check faces with less than three vertices.
+        """
+        if not offimport._has_numpy:
+            return
+
+        writeOFF("tmp/degenerate.off", ["3 0 1 2", "2 0 1"])
+        for chunksize in [1, 100]:
+            imp,faces = self.importFaces("tmp/degenerate.off", chunksize, True)
+            self.assertTrue(imp.is_trimesh)
+            self.assertEqual([(0,1,2), (0,0,0)], faces)
+            self.assertEqual([1], imp.invalidfaces)
+            self.assertEqual(faces, self.importFaces("tmp/degenerate.off", chunksize, False)[1])
+
+        writeOFF("tmp/degenerate2.off", ["3 0 1 2", "4 0 1 3 2", "2 0 1"])
+        for chunksize in [1, 2, 100]:
+            imp,faces = self.importFaces("tmp/degenerate2.off", chunksize, True)
+            self.assertFalse(imp.is_trimesh)
+            self.assertEqual([[[0,1,2]], [[0,1,3,2]]], faces[:2])
+            self.assertEqual([2], imp.invalidfaces)
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
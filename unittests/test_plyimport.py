@@ -0,0 +1,112 @@
+# Test the plyimport module
+
+import os, struct
+import unittest
+from cgkit import plyimport
+
+VERTS = [(0,0,0,255), (1,0,0,128), (0,1,0,0), (1,1,0.5,3)]
+FACES = [[0,1,2], [0,1,3,2], [1,3,2]]
+
+def plyHeader(format):
+    return "\n".join(["ply",
+                      "format %s 1.0"%format,
+                      "comment test file",
+                      "element vertex %d"%len(VERTS),
+                      "property float x",
+                      "property float y",
+                      "property double z",
+                      "property uchar red",
+                      "element face %d"%len(FACES),
+                      "property list uchar int vertex_indices",
+                      "end_header"])+"\n"
+
+class TestPLYReader(unittest.TestCase):
+
+    def setUp(self):
+        if not os.path.exists("tmp"):
+            os.mkdir("tmp")
+
+        f = file("tmp/ascii.ply", "wb")
+        f.write(plyHeader("ascii"))
+        for v in VERTS:
+            f.write("%r %r %r %d\n"%v)
+        for face in FACES:
+            f.write("%d %s\n"%(len(face), " ".join(map(str, face))))
+        f.close()
+
+        for format,byteorder in [("binary_little_endian", "<"), ("binary_big_endian", ">")]:
+            f = file("tmp/%s.ply"%format, "wb")
+            f.write(plyHeader(format))
+            for v in VERTS:
+                f.write(struct.pack(byteorder+"ffdB", *v))
+            for face in FACES:
+                f.write(struct.pack(byteorder+"B%di"%len(face), len(face), *face))
+            f.close()
+
+    def testRead(self):
+        """Check reading ASCII and binary files in chunks.
+        """
+        if not plyimport._has_numpy:
+            return
+
+        for filename in ["tmp/ascii.ply", "tmp/binary_little_endian.ply", "tmp/binary_big_endian.ply"]:
+            for chunksize in [1, 2, 100]:
+                rd = plyimport.PLYReader(chunksize)
+                rd.open(filename)
+                elements,comment,objinfo = rd.readHeader()
+                self.assertEqual("test file", comment)
+                self.assertEqual("", objinfo)
+                self.assertEqual(["vertex", "face"], [el[0] for el in elements])
+                self.assertEqual(("vertex_indices", "list", "uchar", "int"), elements[1][2][0])
+
+                verts = []
+                for start,data in rd.iterChunks(elements[0]):
+                    self.assertEqual(len(verts), start)
+                    verts += zip(data["x"], data["y"], data["z"], data["red"])
+                self.assertEqual(VERTS, verts)
+
+                faces = []
+                for start,data in rd.iterChunks(elements[1]):
+                    lengths,offsets,values = data["vertex_indices"]
+                    for n,offset in zip(lengths, offsets):
+                        faces.append(list(values[offset:offset+n]))
+                self.assertEqual(FACES, faces)
+                rd.close()
+
+    def testAsciiLines(self):
+        """Check ASCII instances that don't match the lines of the file.
+        """
+        if not plyimport._has_numpy:
+            return
+
+        # Several instances in one line and instances that span lines
+        f = file("tmp/lines.ply", "wb")
+        f.write(plyHeader("ascii"))
+        f.write("%r %r %r %d %r %r %r %d\n"%(VERTS[0]+VERTS[1]))
+        f.write("%r %r\n%r %d\n"%VERTS[2])
+        f.write("%r %r %r %d 3 0\n"%VERTS[3])
+        f.write("1\n2\n4 0 1 3 2 3 1 3 2\n")
+        f.close()
+
+        for chunksize in [1, 2, 100]:
+            rd = plyimport.PLYReader(chunksize)
+            rd.open("tmp/lines.ply")
+            elements,comment,objinfo = rd.readHeader()
+            verts = []
+            for start,data in rd.iterChunks(elements[0]):
+                self.assertEqual(len(verts), start)
+                verts += zip(data["x"], data["y"], data["z"], data["red"])
+            self.assertEqual(VERTS, verts)
+
+            faces = []
+            for start,data in rd.iterChunks(elements[1]):
+                lengths,offsets,values = data["vertex_indices"]
+                for n,offset in zip(lengths, offsets):
+                    faces.append(list(values[offset:offset+n]))
+            self.assertEqual(FACES, faces)
+            rd.close()
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
@@ -223,6 +223,75 @@ class TestPointCloud(unittest.TestCase):
         self.assertEqual(0, n)
         ptc.close()
 
+class TestCgPtc(TestPointCloud):
+    """Test the built-in point cloud format.
+    
+    This runs the tests from TestPointCloud on the built-in format.
+    """
+
+    def __init__(self, *args, **kwargs):
+        TestPointCloud.__init__(self, *args, **kwargs)
+        self.libName = "cgptc"
+        self.accuracy = 6
+    
+    def testMemoryMap(self):
+        """Test the array access of the built-in format.
+        """
+        if not numpy_available:
+            return
+        
+        n = 1000
+        pnts = numpy.arange(3*n, dtype=numpy.float32).reshape(n, 3)
+        norms = numpy.zeros((n,3), dtype=numpy.float32)
+        norms[:,2] = 1
+        rads = numpy.linspace(0, 1, n).astype(numpy.float32)
+        data = numpy.zeros((n,20), dtype=numpy.float32)
+        data[:,0] = -rads
+        data[:,1:4] = pnts*2
+        data[:,4:] = numpy.arange(16)
+        ptc = pointcloud.open("tmp/pointcloud4.ptc", "w", self.libName, vars=[("float", "spam"), ("color", "Ci"), ("matrix", "m")], world2eye=None, world2ndc=None, format=(320,240,1))
+        ptc.writeDataPoints(n-1, (pnts,norms,rads,data))
+        ptc.writeDataPoint(pnts[-1], norms[-1], rads[-1], {"spam":-rads[-1], "Ci":pnts[-1]*2, "m":range(16)})
+        ptc.close()
+        self.assertFalse(os.path.exists("tmp/pointcloud4.ptc.tmp"))
+        
+        # The format is recognized without library name
+        ptc = pointcloud.open("tmp/pointcloud4.ptc")
+        self.assertTrue(isinstance(ptc, pointcloud.CgPtcReader))
+        self.assertEqual(n, ptc.npoints)
+        self.assertEqual(20, ptc.datasize)
+        self.assertEqual([0,1,2,3*n-3,3*n-2,3*n-1], ptc.bbox)
+        self.assertEqual(mat4(1).toList(), ptc.world2eye)
+        self.assertEqual((320,240,1), ptc.format)
+        self.assertTrue(isinstance(ptc.points, numpy.memmap))
+        self.assertEqual((n,3), ptc.points.shape)
+        self.assertEqual(pnts.tolist(), ptc.points.tolist())
+        self.assertEqual(norms[10:20].tolist(), ptc.normals[10:20].tolist())
+        self.assertEqual(rads.tolist(), ptc.radii.tolist())
+        self.assertEqual((-rads).tolist(), ptc.variableData("spam").tolist())
+        self.assertEqual((pnts[::7]*2).tolist(), ptc.variableData("Ci")[::7].tolist())
+        self.assertEqual(n*[range(16)], ptc.variableData("m").tolist())
+        self.assertRaises(KeyError, lambda: ptc.variableData("foo"))
+        
+        # Sequential reading
+        self.assertEqual(pnts[0].tolist(), list(ptc.readDataPoint()[0]))
+        idx = 1
+        for buf in ptc.iterBatches(300, combinedBuffer=True, numpyArray=True):
+            self.assertEqual(min(300, n-idx), len(buf))
+            self.assertEqual(data[idx].tolist(), buf[0][7:].tolist())
+            self.assertEqual(rads[idx+len(buf)-1], buf[-1][6])
+            idx += len(buf)
+        self.assertEqual(n, idx)
+        ptc.close()
+        
+        # Convert into a new file
+        self.assertEqual(n, pointcloud.convert("tmp/pointcloud4.ptc", "tmp/pointcloud5.ptc", batchSize=128))
+        ptc = pointcloud.open("tmp/pointcloud5.ptc", "r", self.libName)
+        self.assertEqual([("float","spam"), ("color","Ci"), ("matrix","m")], ptc.variables)
+        self.assertEqual(pnts.tolist(), ptc.points.tolist())
+        self.assertEqual(n*[range(16)], ptc.variableData("m").tolist())
+        ptc.close()
+
 ######################################################################
 
 if __name__=="__main__":
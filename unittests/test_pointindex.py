@@ -0,0 +1,82 @@
+# Test the pointindex module
+
+import unittest
+import os, os.path
+import numpy
+from cgkit import pointcloud
+from cgkit.cgtypes import *
+from cgkit.pointindex import PointIndex
+
+class TestPointIndex(unittest.TestCase):
+    """Test the PointIndex class.
+    """
+    
+    def setUp(self):
+        rng = numpy.random.RandomState(42)
+        self.points = rng.rand(2000, 3)
+        # Add a few duplicates
+        self.points[100:110] = self.points[0]
+        self.queries = numpy.concatenate((rng.rand(50, 3), rng.rand(10, 3)*3-1, self.points[:5]))
+    
+    def testKnn(self):
+        for leafSize in [1, 16]:
+            index = PointIndex(self.points, leafSize=leafSize)
+            self.assertEqual(2000, len(index))
+            for k in [1, 5, 20]:
+                indices,distances = index.knnQueries(self.queries, k)
+                self.assertEqual((len(self.queries), k), indices.shape)
+                for q,idx,dist in zip(self.queries, indices, distances):
+                    d = numpy.sqrt(((self.points-q)**2).sum(axis=1))
+                    ref = numpy.sort(d)[:k]
+                    self.assertTrue(numpy.allclose(ref, dist))
+                    self.assertTrue(numpy.allclose(d[idx], dist))
+        
+        idx,dist = index.knnQuery((0.5,0.5,0.5), 3)
+        self.assertEqual(3, len(idx))
+        self.assertEqual(sorted(dist), list(dist))
+        # More neighbors than points
+        index = PointIndex([(0,0,0), (1,0,0), (3,0,0)])
+        idx,dist = index.knnQuery(vec3(2.1,0,0), 5)
+        self.assertEqual([2,1,0], list(idx))
+        self.assertTrue(numpy.allclose([0.9,1.1,2.1], dist))
+
+    def testRadius(self):
+        index = PointIndex(self.points, leafSize=8)
+        for radius in [0.0, 0.05, 0.2]:
+            result = index.radiusQueries(self.queries, radius)
+            self.assertEqual(len(self.queries), len(result))
+            for q,idx in zip(self.queries, result):
+                d = numpy.sqrt(((self.points-q)**2).sum(axis=1))
+                self.assertEqual(sorted(numpy.nonzero(d<=radius)[0]), sorted(idx))
+        
+        # Individual radii
+        radii = numpy.linspace(0, 0.3, len(self.queries))
+        result = index.radiusQueries(self.queries, radii)
+        for q,r,idx in zip(self.queries, radii, result):
+            d = numpy.sqrt(((self.points-q)**2).sum(axis=1))
+            self.assertEqual(sorted(numpy.nonzero(d<=r)[0]), sorted(idx))
+        
+        self.assertEqual(11, len(index.radiusQuery(self.points[0], 0)))
+        self.assertEqual([], list(PointIndex(numpy.zeros((0,3))).radiusQuery((0,0,0), 1)))
+        self.assertRaises(ValueError, lambda: PointIndex([(0,0)]))
+
+    def testPointCloud(self):
+        if not os.path.exists("tmp"):
+            os.mkdir("tmp")
+        pnts = self.points.astype(numpy.float32)
+        n = len(pnts)
+        ptc = pointcloud.open("tmp/pointindex.ptc", "w", "cgptc", vars=[], world2eye=None, world2ndc=None, format=(1,1,1))
+        ptc.writeDataPoints(n, (pnts, numpy.zeros((n,3), dtype=numpy.float32), numpy.zeros(n, dtype=numpy.float32), numpy.zeros(0, dtype=numpy.float32)))
+        ptc.close()
+        
+        ptc = pointcloud.open("tmp/pointindex.ptc")
+        index = PointIndex(ptc)
+        idx,dist = index.knnQuery(pnts[10], 1)
+        self.assertEqual(0.0, dist[0])
+        self.assertTrue(numpy.allclose(pnts[10], pnts[idx[0]]))
+        ptc.close()
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
@@ -168,6 +168,15 @@ class TestQuat_light(unittest.TestCase):
         a*=2
         self.assertEqual(a, quat(3,4,6,4))
 
+    ######################################################################
+    def testiMulQuat(self):
+        a = quat(0.5, vec3(1,2,3)).normalize()
+        b = quat(-1.2, vec3(0,1,1)).normalize()
+        c = a
+        a*=b
+        self.failUnless(a is c)
+        self.assertEqual(a, quat(0.5, vec3(1,2,3)).normalize()*b)
+
     ######################################################################
     def testiDiv(self):
         a = quat(1.5, 2, 3, 2)
@@ -1,11 +1,92 @@
 # Test the ri module
 
-import os, os.path, shutil
+import os, os.path, shutil, struct, re
 import unittest
 import cgkit.ri
 import cgkit.cri
 import ritest
 
+# Regular expression that matches one ASCII RIB token (or whitespace)
+_asciitoken = re.compile(r'\s+|#[^\n]*|"((?:[^"\\]|\\.)*)"|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|(\w+)|([\[\]])')
+
+def readRIB(data):
+    """Split ASCII or binary RIB into a list of tokens.
+
+    Each token is a tuple (kind, value) where kind is "request",
+    "string", "number" or "array" (value is "[" or "]"). Float arrays
+    are returned as individual numbers enclosed in array tokens.
+    Comments are skipped.
+    """
+    res = []
+    requests = {}
+    strings = {}
+    pos = 0
+
+    def readString(pos):
+        c = ord(data[pos])
+        if c<0240:
+            n = c-0220
+            pos += 1
+        else:
+            w = c-0237
+            n = struct.unpack(">I", (4-w)*"\0"+data[pos+1:pos+1+w])[0]
+            pos += 1+w
+        return data[pos:pos+n], pos+n
+
+    while pos<len(data):
+        c = ord(data[pos])
+        if c<0200:
+            m = _asciitoken.match(data, pos)
+            pos = m.end()
+            string,number,request,bracket = m.groups()
+            if string is not None:
+                res.append(("string", re.sub(r"\\(.)", r"\1", string)))
+            elif number is not None:
+                res.append(("number", float(number)))
+            elif request is not None:
+                res.append(("request", request))
+            elif bracket is not None:
+                res.append(("array", bracket))
+        elif c<=0203:
+            w = c-0200+1
+            v = struct.unpack(">i", data[pos+1:pos+1+w]+(4-w)*"\0")[0]>>(8*(4-w))
+            res.append(("number", float(v)))
+            pos += 1+w
+        elif 0220<=c<=0243:
+            s,pos = readString(pos)
+            res.append(("string", s))
+        elif c==0244:
+            res.append(("number", struct.unpack(">f", data[pos+1:pos+5])[0]))
+            pos += 5
+        elif c==0245:
+            res.append(("number", struct.unpack(">d", data[pos+1:pos+9])[0]))
+            pos += 9
+        elif c==0246:
+            res.append(("request", requests[data[pos+1]]))
+            pos += 2
+        elif 0310<=c<=0313:
+            w = c-0310+1
+            n = struct.unpack(">I", (4-w)*"\0"+data[pos+1:pos+1+w])[0]
+            pos += 1+w
+            res.append(("array", "["))
+            for v in struct.unpack(">%df"%n, data[pos:pos+4*n]):
+                res.append(("number", v))
+            res.append(("array", "]"))
+            pos += 4*n
+        elif c==0314:
+            requests[data[pos+1]],pos = readString(pos+2)
+        elif c in (0315, 0316):
+            w = c-0314
+            token = data[pos+1:pos+1+w]
+            strings[token],pos = readString(pos+1+w)
+        elif c in (0317, 0320):
+            w = c-0316
+            res.append(("string", strings[data[pos+1:pos+1+w]]))
+            pos += 1+w
+        else:
+            raise ValueError("Unknown binary RIB code %o at position %d"%(c, pos))
+    return res
+
 class TestRi(unittest.TestCase):
     
     def setUp(self):
@@ -69,6 +150,120 @@ class TestRi(unittest.TestCase):
         self.assertFiles("tmp/cinclude_norm.rib", "data/cinclude_ref.rib")
         
         
+    def testPrecision(self):
+        """Check the RI_PRECISION option and large arrays."""
+        ri = cgkit.ri
+        ri.RiBegin("tmp/precision.rib")
+        ri.RiOption(ri.RI_RIBOUTPUT, ri.RI_PRECISION, 3)
+        ri.RiPoints(P=[(0.12345,1,2)], width=[1.0/3])
+        ri.RiOption(ri.RI_RIBOUTPUT, ri.RI_PRECISION, 0)
+        ri.RiPoints(P=[0.5,1,2], width=[0.25])
+        ri.RiCurves(ri.RI_LINEAR, 10000*[2], ri.RI_NONPERIODIC, P=range(60000))
+        ri.RiEnd()
+
+        lines = file("tmp/precision.rib", "rt").readlines()
+        self.assertEqual(3, len(lines))
+        self.assertEqual('Points "P" [0.123 1 2] "width" [0.333]\n', lines[0])
+        self.assertEqual('Points "P" [0.5 1 2] "width" [0.25]\n', lines[1])
+        self.assertEqual('Curves "linear" [%s] "nonperiodic" "P" [%s]\n'%(" ".join(10000*["2"]), " ".join(map(str, range(60000)))), lines[2])
+
+    def testArrays(self):
+        """Check numpy arrays as parameter values."""
+        try:
+            import numpy
+        except ImportError:
+            print ("numpy not available, array test skipped")
+            return
+
+        ri = cgkit.ri
+        ri.RiBegin("tmp/arrays.rib")
+        ri.RiPoints(ri.RI_P, numpy.array([1/7., 2/7., 3/7.]))
+        ri.RiPoints(ri.RI_P, numpy.array([0.5, 1, 2], dtype=numpy.float32))
+        ri.RiTransform([numpy.array([1,0,0,0], dtype=numpy.float32),
+                        numpy.array([0,1,0,0], dtype=numpy.float32),
+                        numpy.array([0,0,1,0], dtype=numpy.float32),
+                        [0.5,0,0,1]])
+        ri.RiEnd()
+
+        lines = file("tmp/arrays.rib", "rt").readlines()
+        self.assertEqual(3, len(lines))
+        self.assertEqual('Points "P" [%r %r %r]\n'%(1/7., 2/7., 3/7.), lines[0])
+        self.assertEqual('Points "P" [0.5 1 2]\n', lines[1])
+        self.assertEqual('Transform [1 0 0 0 0 1 0 0 0 0 1 0 0.5 0 0 1]\n', lines[2])
+
+        # Binary RIB (the nested arrays are written as one float array)
+        ri.RiBegin("tmp/arrays.rib", ri.RI_ENCODING, "binary")
+        ri.RiPoints(P=[numpy.array([1,0,0], dtype=numpy.float32), [0.5,0,2]])
+        ri.RiEnd()
+
+        data = file("tmp/arrays.rib", "rb").read()
+        ref = ('\xcc\x00\x96Points\xa6\x00\xcd\x00\x91P\xcf\x00\xc8\x06' +
+               struct.pack(">6f", 1,0,0, 0.5,0,2))
+        self.assertEqual(ref, data)
+
+    def testBinary(self):
+        """Check binary encoded RIB."""
+        ri = cgkit.ri
+        ri.RiBegin("tmp/binary.rib", ri.RI_ENCODING, "binary")
+        ri.RiSphere(1,-1,1,360)
+        ri.RiSphere(0.5,-1,1,360)
+        ri.RiPoints(P=[0,1,2])
+        ri.RiPointsPolygons([3], [0,1,2], P=[(0.0,0,0),(1,0,0),(0,1,0)])
+        ri.RiEnd()
+
+        data = file("tmp/binary.rib", "rb").read()
+        ref = ('\xcc\x00\x96Sphere\xa6\x00\x80\x01\x80\xff\x80\x01\x81\x01\x68'
+               '\xa6\x00\xa4\x3f\x00\x00\x00\x80\xff\x80\x01\x81\x01\x68'
+               '\xcc\x01\x96Points\xa6\x01\xcd\x00\x91P\xcf\x00[\x80\x00\x80\x01\x80\x02]'
+               '\xcc\x02\x9ePointsPolygons\xa6\x02[\x80\x03][\x80\x00\x80\x01\x80\x02]'
+               '\xcf\x00\xc8\x09' + 3*4*'\x00' + '\x3f\x80\x00\x00' + 3*4*'\x00' +
+               '\x3f\x80\x00\x00' + 4*'\x00')
+        self.assertEqual(ref, data)
+
+        # Infinity and NaN are floats, not requests
+        ri.RiBegin("tmp/binary_inf.rib", ri.RI_ENCODING, "binary")
+        ri.RiSphere(float("inf"), float("-inf"), float("nan"), 360)
+        ri.RiEnd()
+
+        data = file("tmp/binary_inf.rib", "rb").read()
+        ref = ('\xcc\x00\x96Sphere\xa6\x00\xa4\x7f\x80\x00\x00\xa4\xff\x80\x00\x00'
+               '\xa4' + struct.pack(">f", float("nan")) + '\x81\x01\x68')
+        self.assertEqual(ref, data)
+
+    def testBinaryRequests(self):
+        """Check that binary RIB contains the same requests as ASCII RIB."""
+        ritest.main(cgkit.ri, "tmp/riout_ascii.rib", archiveName="tmp/include.rib")
+        ritest.main(cgkit.ri, "tmp/riout_binary.rib", archiveName="tmp/include.rib", encoding="binary")
+
+        tokens = readRIB(file("tmp/riout_ascii.rib", "rb").read())
+        data = file("tmp/riout_binary.rib", "rb").read()
+        bintokens = readRIB(data)
+        # Make sure the requests were really encoded
+        self.assertEqual(-1, data.find("WorldBegin\n"))
+
+        self.assertEqual(len(tokens), len(bintokens))
+        for i,(tok,bintok) in enumerate(zip(tokens, bintokens)):
+            msg = "Mismatch in token %d: %r != %r"%(i, tok, bintok)
+            self.assertEqual(tok[0], bintok[0], msg)
+            if tok[0]=="number":
+                # The binary encoding uses single precision floats
+                self.failUnless(abs(tok[1]-bintok[1])<=1E-6*max(1.0, abs(tok[1])), msg)
+            else:
+                self.assertEqual(tok[1], bintok[1], msg)
+
+        # Floats are written as floats, strings keep their quotes
+        ri = cgkit.ri
+        ri.RiBegin("tmp/binary_values.rib", ri.RI_ENCODING, "binary")
+        ri.RiTransform([1,0,0,0, 0,1,0,0, 0,0,1,0, 0.5,0,0,1])
+        ri.RiSystem('echo "a"')
+        ri.RiEnd()
+
+        data = file("tmp/binary_values.rib", "rb").read()
+        ref = ('\xcc\x00\x99Transform\xa6\x00\xc8\x10' +
+               struct.pack(">16f", 1,0,0,0, 0,1,0,0, 0,0,1,0, 0.5,0,0,1) +
+               '\xcc\x01\x96System\xa6\x01\xcd\x00\x98echo "a"\xcf\x00')
+        self.assertEqual(ref, data)
+
     def assertFiles(self, fileName, refFileName):
         lines = file(fileName, "rt").readlines()
         reflines = file(refFileName, "rt").readlines()
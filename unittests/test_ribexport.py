@@ -0,0 +1,156 @@
+# Test the ribexport module
+
+import os, shutil, re
+import unittest
+from cgkit.all import *
+from cgkit.ribexport import RIBExporter
+
+class Mover:
+    """Simple simulation that moves an object further on every frame step."""
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.speed = 0.0
+
+    def onStepFrame(self):
+        self.speed += 0.5
+        self.obj.pos = self.obj.pos+vec3(self.speed, 0, 0)
+
+class TestExportFrames(unittest.TestCase):
+
+    def setUp(self):
+        if not os.path.exists("tmp"):
+            os.mkdir("tmp")
+
+    def exportFrames(self, dir, frames, **keyargs):
+        """Export the test scene into dir and return the RIB files."""
+        getScene().clear()
+        getScene().timer().frame = 0
+        TargetCamera(pos=(0,-5,1), target=(0,0,0))
+        mover = Mover(Sphere(radius=0.5))
+        eventManager().connect(STEP_FRAME, mover)
+
+        shutil.rmtree(dir, ignore_errors=True)
+        os.mkdir(dir)
+        cwd = os.getcwd()
+        os.chdir(dir)
+        try:
+            RIBExporter().exportFrames("frame%02d.rib", frames, **keyargs)
+        finally:
+            os.chdir(cwd)
+            eventManager().disconnect(STEP_FRAME, mover)
+        return [file(os.path.join(dir, "frame%02d.rib"%frame), "rt").read() for frame in frames]
+
+    def testChunks(self):
+        """Check that the output doesn't depend on the chunks.
+        """
+        frames = range(1, 9)
+        ref = self.exportFrames("tmp/frames_seq", frames, processes=1)
+        # The simulation has an effect on the output
+        self.assertNotEqual(ref[0], ref[-1])
+        for chunksize in [1, 3]:
+            ribs = self.exportFrames("tmp/frames_%d"%chunksize, frames, processes=2, chunksize=chunksize)
+            self.assertEqual(ref, ribs)
+
+class TestGeomInstances(unittest.TestCase):
+
+    def setUp(self):
+        if not os.path.exists("tmp"):
+            os.mkdir("tmp")
+
+    def exportScene(self, dir, shadows):
+        """Export a scene where one geom is shared by two objects.
+
+        The scene also contains a box that is used only once. If shadows
+        is True, a shadow casting light adds a second pass.
+        """
+        getScene().clear()
+        TargetCamera(pos=(0,-5,1), target=(0,0,0))
+        s1 = Sphere(name="sphere1", radius=0.5)
+        s2 = Sphere(name="sphere2", pos=(2,0,0))
+        s2.geom = s1.geom
+        Box(name="box", pos=(-2,0,0))
+        if shadows:
+            SpotLight3DS(pos=(0,-3,4), target=(0,0,0), shadowed=True)
+
+        shutil.rmtree(dir, ignore_errors=True)
+        os.mkdir(dir)
+        cwd = os.getcwd()
+        os.chdir(dir)
+        try:
+            RIBExporter().exportFile("main.rib")
+        finally:
+            os.chdir(cwd)
+        return file(os.path.join(dir, "main.rib"), "rt").read()
+
+    def checkInstances(self, rib, numPasses):
+        """Check the instancing in rib and return the instanced archives.
+
+        The return value is a dict with the archive names as keys and
+        the object handles as values.
+        """
+        instances = {}
+        for handle,archive in re.findall(r'ObjectBegin (\S+)\s+ReadArchive "([^"]+)"\s+ObjectEnd', rib):
+            self.assertFalse(archive in instances)
+            instances[archive] = handle
+        self.assertEqual(len(instances), rib.count("ObjectBegin"))
+        # The instances must be defined in front of the first frame
+        self.assertTrue(rib.rfind("ObjectEnd")<rib.find("FrameBegin"))
+
+        # The shared sphere is written once and referenced by both
+        # objects in every pass
+        sphere = [a for a in instances if a.startswith("SphereGeom")]
+        self.assertEqual(1, len(sphere))
+        self.assertEqual(1, rib.count('ReadArchive "SphereGeom'))
+        self.assertEqual(2*numPasses, rib.count("ObjectInstance %s\n"%instances[sphere[0]]))
+        return instances
+
+    def testSinglePass(self):
+        """Check that shared geoms are instanced and other geoms stay inline.
+        """
+        rib = self.exportScene("tmp/instances_single", False)
+        instances = self.checkInstances(rib, 1)
+        self.assertEqual(1, len(instances))
+        # The box is only used once and is read directly
+        self.assertEqual(1, rib.count('ReadArchive "BoxGeom'))
+        self.assertEqual(2, rib.count("ReadArchive"))
+        self.assertEqual(2, rib.count("ObjectInstance"))
+
+    def testMultiPass(self):
+        """Check that all geoms are instanced when there are several passes.
+        """
+        rib = self.exportScene("tmp/instances_multi", True)
+        self.assertEqual(2, rib.count("FrameBegin"))
+        instances = self.checkInstances(rib, 2)
+        self.assertEqual(2, len(instances))
+        box = [a for a in instances if a.startswith("BoxGeom")]
+        self.assertEqual(1, len(box))
+        self.assertEqual(2, rib.count("ObjectInstance %s\n"%instances[box[0]]))
+        self.assertEqual(2, rib.count("ReadArchive"))
+
+    def testSinglePass(self):
+        """Check that shared geoms are instanced and other geoms stay inline.
+        """
+        rib = self.exportScene("tmp/instances_single", False)
+        instances = self.checkInstances(rib, 1)
+        self.assertEqual(1, len(instances))
+        # The box is only used once and is read directly
+        self.assertEqual(1, rib.count('ReadArchive "BoxGeom'))
+        self.assertEqual(1, self.numInline(rib))
+
+    def testMultiPass(self):
+        """Check that all geoms are instanced when there are several passes.
+        """
+        rib = self.exportScene("tmp/instances_multi", True)
+        self.assertEqual(2, rib.count("FrameBegin"))
+        instances = self.checkInstances(rib, 2)
+        self.assertEqual(2, len(instances))
+        box = [a for a in instances if a.startswith("BoxGeom")]
+        self.assertEqual(1, len(box))
+        self.assertEqual(2, rib.count("ObjectInstance %s\n"%instances[box[0]]))
+        self.assertEqual(0, self.numInline(rib))
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
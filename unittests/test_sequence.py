@@ -3,6 +3,7 @@
 import unittest
 import os, os.path
 import glob as globmod
+import StringIO
 from cgkit.sequence import *
 
 def cmp(a, b):
@@ -438,6 +439,44 @@ class TestSequence(unittest.TestCase):
         self.assertEqual(("clip@_02", ["1-2"]), seq.sequenceName())
         self.assertEqual(0, seq.sequenceNumberIndex())
 
+    def testCompactSequence(self):
+        """Check that compact sequences behave like regular sequences.
+        """
+        nameLists = [[],
+                     ["spam1", "spam3", "spam2", "spam3"],
+                     ["clip1_02", "clip1_03", "clip2_02", "clip2_010"],
+                     ["img%04d.tif"%i for i in range(1, 50)+range(60, 100, 3)],
+                     ["img%d.tif"%i for i in range(5, 120)],
+                     ["nonum", "nonum"]]
+        for names in nameLists:
+            seq = Sequence()
+            cseq = Sequence(compact=True)
+            for name in names:
+                seq.append(name)
+                cseq.append(name)
+            self.assertEqual(len(seq), len(cseq))
+            self.assertEqual(list(seq), list(cseq))
+            self.assertEqual(list(seq.iterNames()), list(cseq.iterNames()))
+            self.assertEqual(seq.sequenceName(), cseq.sequenceName())
+            self.assertEqual(seq.ranges(), cseq.ranges())
+            self.assertEqual(seq.sequenceNumberIndex(), cseq.sequenceNumberIndex())
+            self.assertEqual(str(seq), str(cseq))
+            for i in range(-len(seq), len(seq)):
+                self.assertEqual(str(seq[i]), str(cseq[i]))
+            self.assertEqual(seq[1:3], cseq[1:3])
+            self.assertRaises(IndexError, lambda: cseq[len(seq)])
+        
+        self.assertEqual(True, isinstance(cseq[0], SeqString))
+        self.assertRaises(ValueError, lambda: cseq.append("spam1"))
+        self.assertRaises(ValueError, lambda: Sequence(compact=True).append("spam1", obj=1))
+        
+        seqs = buildSequences(["spam%d"%i for i in range(1000)], compact=True)
+        self.assertEqual(1, len(seqs))
+        self.assertEqual(("spam@", ["0-999"]), seqs[0].sequenceName())
+        self.assertEqual(1, len(seqs[0]._numbers[0]._starts))
+        self.assertEqual("spam999", str(seqs[0][-1]))
+        self.assertRaises(ValueError, lambda: buildSequences([1,2], nameFunc=lambda obj: "obj%d"%obj, compact=True))
+
     def testSequenceObjects(self):
         """Test inserting objects instead of just names.
         """
@@ -488,6 +527,45 @@ class TestBuildSequences(unittest.TestCase):
         self.assertEqual(1, len(seqs))
         self.assertEqual(("/dir1/dir2/spam@", ["1-2"]), seqs[0].sequenceName())
 
+class TestGlob(unittest.TestCase):
+    """Test the glob() and findSequences() functions.
+    """
+    
+    def setUp(self):
+        for dirName in ["tmp/globtest", "tmp/globtest/sub", "tmp/globtest/frame0001.dir"]:
+            if not os.path.exists(dirName):
+                os.makedirs(dirName)
+        for fileName in ["a0001.tif", "a0002.tif", "a0003.tif", "b_1.exr", "b_2.exr",
+                         "nonum.tif", ".hidden1.tif", "sub/s1.png", "sub/s2.png"]:
+            open(os.path.join("tmp/globtest", fileName), "w").close()
+    
+    def testGlob(self):
+        seqs = glob("tmp/globtest/a")
+        self.assertEqual(1, len(seqs))
+        self.assertEqual(["tmp/globtest/a0001.tif", "tmp/globtest/a0002.tif", "tmp/globtest/a0003.tif"], list(seqs[0]))
+        
+        seqs = glob("tmp/globtest/b_@")
+        self.assertEqual(1, len(seqs))
+        self.assertEqual(("tmp/globtest/b_@.exr", ["1-2"]), seqs[0].sequenceName())
+
+        # Directories, hidden files and files without numbers are ignored
+        seqs = glob("tmp/globtest/*")
+        self.assertEqual(["tmp/globtest/a#.tif", "tmp/globtest/b_@.exr"], [seq.sequenceName()[0] for seq in seqs])
+        
+        seqs = glob("tmp/glob*/s")
+        self.assertEqual([], seqs)
+        seqs = glob("tmp/glob*/sub/s")
+        self.assertEqual(1, len(seqs))
+        self.assertEqual(["tmp/globtest/sub/s1.png", "tmp/globtest/sub/s2.png"], list(seqs[0]))
+
+    def testFindSequences(self):
+        seqs = findSequences("tmp/globtest")
+        self.assertEqual(["tmp/globtest/.hidden1.tif", "tmp/globtest/a#.tif", "tmp/globtest/b_@.exr"], [seq.sequenceName()[0] for seq in seqs])
+        
+        for numThreads in [0, 3]:
+            seqs = findSequences(["tmp/globtest"], recursive=True, numThreads=numThreads)
+            self.assertEqual(["tmp/globtest/.hidden1.tif", "tmp/globtest/a#.tif", "tmp/globtest/b_@.exr", "tmp/globtest/sub/s@.png"], [seq.sequenceName()[0] for seq in seqs])
+
 class TestSeqTemplate(unittest.TestCase):
     """Test the SeqTemplate class.
     """
@@ -614,6 +692,99 @@ class TestOutputNameGenerator(unittest.TestCase):
                           ("spam1_5.tif", "foo0006.tif")], list(ong))
 
 
+class TestSequenceProcessor(unittest.TestCase):
+    """Test the concurrent mode and the journal of the move/copy classes.
+    """
+    
+    def setUp(self):
+        if not os.path.exists("tmp/proctest"):
+            os.makedirs("tmp/proctest")
+        for fileName in globmod.glob("tmp/proctest/*"):
+            os.remove(fileName)
+    
+    def testConcurrentMove(self):
+        for numThreads in [0, 4]:
+            self.createFiles("tmp/proctest/spam#.txt", Range("2-20x2"))
+            # Overlapping ranges (requires a temporary sequence)
+            mover = MoveSequence(glob("tmp/proctest/spam"), "tmp/proctest/spam", dstRange=Range("4-"))
+            progress = []
+            mover.run(numThreads=numThreads, progress=lambda n,total: progress.append((n,total)))
+            self.assertFiles("tmp/proctest/spam#.txt", Range("4-13"), Range("2-20x2"))
+            self.assertEqual(10, len(globmod.glob("tmp/proctest/*")))
+            self.assertEqual([(i,20) for i in range(1,21)], progress)
+            for fileName in globmod.glob("tmp/proctest/*"):
+                os.remove(fileName)
+    
+    def testConcurrentCopy(self):
+        self.createFiles("tmp/proctest/spam#.txt", Range("1-50"))
+        out = StringIO.StringIO()
+        copier = CopySequence(glob("tmp/proctest/spam"), "tmp/proctest/foo", verbose=True)
+        copier.run(out, numThreads=8)
+        self.assertFiles("tmp/proctest/foo#.txt", Range("1-50"))
+        self.assertFiles("tmp/proctest/spam#.txt", Range("1-50"))
+        self.assertEqual(50, len(out.getvalue().split("\n"))-1)
+        
+        # An error stops the operation and is raised again
+        copier = CopySequence(glob("tmp/proctest/spam"), "tmp/proctest/bar")
+        os.remove("tmp/proctest/spam0025.txt")
+        self.assertRaises(IOError, lambda: copier.run(numThreads=8))
+
+    def testJournal(self):
+        self.createFiles("tmp/proctest/spam#.txt", Range("1-10"))
+        journal = "tmp/proctest/journal.txt"
+        mover = MoveSequence(glob("tmp/proctest/spam"), "tmp/proctest/foo")
+        # Simulate an interrupted operation
+        def interrupt(n, total):
+            if n==4:
+                raise KeyboardInterrupt()
+        self.assertRaises(KeyboardInterrupt, lambda: mover.run(progress=interrupt, journal=journal))
+        self.assertTrue(os.path.exists(journal))
+        self.assertFiles("tmp/proctest/foo#.txt", Range("1-4"))
+        # The 5th file was moved but not recorded in the journal
+        os.rename("tmp/proctest/spam0005.txt", "tmp/proctest/foo0005.txt")
+        
+        progress = []
+        resumeJournal(journal, numThreads=3, progress=lambda n,total: progress.append((n,total)))
+        self.assertFalse(os.path.exists(journal))
+        self.assertFiles("tmp/proctest/foo#.txt", Range("1-10"))
+        self.assertEqual(10, len(globmod.glob("tmp/proctest/*")))
+        self.assertEqual([(i,10) for i in range(6,11)], progress)
+        
+        # The journal can't be used for a different operation
+        open(journal, "wt").write("# cgkit sequence journal\nclass\tMoveSequence\n")
+        copier = CopySequence(glob("tmp/proctest/foo"), "tmp/proctest/bar")
+        self.assertRaises(ValueError, lambda: copier.run(journal=journal))
+
+    def testJournalOverlap(self):
+        """Resume an overlapping move that uses temporary file names."""
+        self.createFiles("tmp/proctest/spam#.txt", Range("2-20x2"))
+        journal = "tmp/proctest/journal.txt"
+        mover = MoveSequence(glob("tmp/proctest/spam"), "tmp/proctest/spam", dstRange=Range("4-"))
+        def interrupt(n, total):
+            if n==3:
+                raise KeyboardInterrupt()
+        self.assertRaises(KeyboardInterrupt, lambda: mover.run(progress=interrupt, journal=journal))
+        self.assertTrue(os.path.exists(journal))
+        
+        resumeJournal(journal)
+        self.assertFalse(os.path.exists(journal))
+        self.assertFiles("tmp/proctest/spam#.txt", Range("4-13"), Range("2-20x2"))
+        self.assertEqual(10, len(globmod.glob("tmp/proctest/*")))
+    
+    def assertFiles(self, namePattern, rng, origRng=None):
+        if origRng is None:
+            origRng = rng
+        tmpl = SeqTemplate(namePattern)
+        for i,j in zip(rng, origRng):
+            self.assertEqual(str(j), open(tmpl([i]), "rt").read())
+
+    def createFiles(self, pattern, rng):
+        tmpl = SeqTemplate(pattern)
+        for i in rng:
+            f = open(tmpl([i]), "wt")
+            f.write(str(i))
+            f.close()
+
 class TestSeqUtils(unittest.TestCase):
     """Test the sequence utilities.
     """
@@ -31,6 +31,10 @@ class TestSL(unittest.TestCase):
         self.assertEqual(math.log(8, 2), sl.log(8, 2))
         self.assertEqual(5, sl.max(1, 5, 3))
         self.assertEqual(1, sl.min(1, 5, 3))
+        self.assertEqual(5, sl.max([1, 5, 3]))
+        self.assertEqual(1, sl.min([1, 5, 3]))
+        self.assertEqual(-5, sl.max([1, -5, 3], key=abs))
+        self.assertEqual(1, sl.min([1, -5, 3], key=abs))
         self.assertEqual(0.5, sl.mix(0.0, 1.0, 0.5))
         self.assertEqual(0.5, sl.mod(2.5, 1))
         self.assertEqual(16, sl.pow(4, 2))
@@ -105,6 +109,53 @@ class TestSL(unittest.TestCase):
         self.assertEqual(True, sl.match("pa", "spam"))
         self.assertEqual(False, sl.match("ap", "spam"))
 
+    def testArrays(self):
+        """Test the functions with numpy arrays.
+        """
+        try:
+            import numpy
+        except ImportError:
+            print ("numpy not available, array test skipped")
+            return
+
+        rnd = numpy.random.RandomState(1)
+        x = rnd.uniform(-0.5, 1.5, 20)
+        P = rnd.uniform(-3, 3, (20,3))
+        Q = rnd.uniform(-3, 3, (20,3))
+        N = sl.normalize(Q)
+        knots = [vec3(0,1,2), vec3(1,0,3), vec3(2,2,2), vec3(-1,0,1), vec3(5,5,0)]
+
+        def check(arrayres, scalarres):
+            self.assertEqual(numpy.array(map(list, scalarres)).tolist(), numpy.asarray(arrayres).tolist())
+
+        check(sl.clamp(x, 0.0, 1.0)[:,None], [[sl.clamp(a, 0.0, 1.0)] for a in x])
+        check(sl.max(x, 0.5, -x)[:,None], [[sl.max(a, 0.5, -a)] for a in x])
+        check(sl.min(x, 0.5)[:,None], [[sl.min(a, 0.5)] for a in x])
+        self.assertEqual(x.max(), sl.max(x))
+        self.assertEqual(x.min(), sl.min(x))
+        check(sl.smoothstep(0.0, 1.0, x)[:,None], [[sl.smoothstep(0.0, 1.0, a)] for a in x])
+        check(sl.step(0.5, x)[:,None], [[sl.step(0.5, a)] for a in x])
+        check(sl.spline(x, [0.0, 1.0, 3.0, 2.0, 5.0])[:,None], [[sl.spline(a, [0.0, 1.0, 3.0, 2.0, 5.0])] for a in x])
+        check(sl.spline(x, knots), [sl.spline(a, knots) for a in x])
+        check(sl.mix(P, Q, x), [sl.mix(vec3(*p), vec3(*q), a) for p,q,a in zip(P, Q, x)])
+        check(sl.faceforward(P, Q, N), [sl.faceforward(vec3(*p), vec3(*q), vec3(*n)) for p,q,n in zip(P, Q, N)])
+        check(sl.reflect(P, N), [sl.reflect(vec3(*p), vec3(*n)) for p,n in zip(P, N)])
+        check(sl.refract(P, N, 1.3), [sl.refract(vec3(*p), vec3(*n), 1.3) for p,n in zip(P, N)])
+        check(sl.distance(P, Q)[:,None], [[sl.distance(vec3(*p), vec3(*q))] for p,q in zip(P, Q)])
+        check(sl.ptlined(P, Q, N)[:,None], [[sl.ptlined(vec3(*p), vec3(*q), vec3(*n))] for p,q,n in zip(P, Q, N)])
+        check(sl.float_noise(P)[:,None], [[sl.float_noise(vec3(*p))] for p in P])
+        check(sl.point_noise(x, 2*x), [sl.point_noise(a, 2*a) for a in x])
+        check(sl.color_cellnoise(3*P), [sl.color_cellnoise(vec3(*(3*p))) for p in P])
+        check(sl.point_pnoise(P, x, (3,2,4), 2), [sl.point_pnoise(vec3(*p), a, (3,2,4), 2) for p,a in zip(P, x)])
+        check(sl.float_pnoise(4*x, 3)[:,None], [[sl.float_pnoise(4*a, 3)] for a in x])
+
+        # Broadcasting over a 2D grid
+        s,t = numpy.meshgrid(numpy.linspace(0, 1, 8), numpy.linspace(0, 1, 6))
+        self.assertEqual((6,8), sl.float_noise(s, t).shape)
+        self.assertEqual((6,8,3), sl.color_noise(s, t).shape)
+        self.assertEqual((6,8,3), sl.mix(vec3(1,0,0), vec3(0,0,1), s).shape)
+        self.assertEqual(s.tolist(), sl.xcomp(sl.mix(vec3(0,0,0), vec3(1,0,0), s)).tolist())
+
 ######################################################################
 
 if __name__=="__main__":
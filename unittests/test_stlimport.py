@@ -0,0 +1,101 @@
+# Test the stlimport module
+
+import os, struct
+import unittest
+from cgkit import stlimport
+
+TRIANGLES = [((0,0,1), [(0,0,0), (1,0,0), (0,1,0)]),
+             ((0,0,1), [(1,0,0), (1,1,0), (-0.0,1,0)]),
+             ((0,0,-1), [(0.5,0.25,0.125), (2,3,4), (0,0,0)])]
+
+class TestReader(stlimport.STLReader):
+    def __init__(self, filename):
+        stlimport.STLReader.__init__(self, filename)
+        self.events = []
+        self.triangles = []
+
+    def begin(self, name):
+        self.events.append(("begin", name))
+
+    def end(self, name):
+        self.events.append(("end", name))
+
+    def triangle(self, normal, verts):
+        self.triangles.append((tuple(normal), map(tuple, verts)))
+
+
+class TestSTLImport(unittest.TestCase):
+
+    def setUp(self):
+        if not os.path.exists("tmp"):
+            os.mkdir("tmp")
+
+        f = file("tmp/binary.stl", "wb")
+        f.write("binobj".ljust(80, "\000"))
+        f.write(struct.pack("<i", len(TRIANGLES)))
+        for normal,verts in TRIANGLES:
+            f.write(struct.pack("<3f", *normal))
+            for v in verts:
+                f.write(struct.pack("<3f", *v))
+            f.write("\000\000")
+        f.close()
+
+        f = file("tmp/ascii.stl", "wt")
+        f.write("solid ascobj\n")
+        for normal,verts in TRIANGLES:
+            f.write("  facet normal %g %g %g\n"%normal)
+            f.write("    outer loop\n")
+            for v in verts:
+                f.write("      vertex %r %r %r\n"%v)
+            f.write("    endloop\n")
+            f.write("  endfacet\n\n")
+        f.write("endsolid ascobj\n")
+        f.close()
+
+    def testReadArrays(self):
+        """Check that readArrays() delivers the same data as read().
+        """
+        if not stlimport._has_numpy:
+            return
+
+        for filename,name in [("tmp/ascii.stl", "ascobj"), ("tmp/binary.stl", "binobj")]:
+            ref = TestReader(filename)
+            ref.read()
+            self.assertEqual([("begin", name), ("end", name)], ref.events)
+            self.assertEqual(TRIANGLES[2][1], ref.triangles[2][1])
+            for chunksize in [1, 2, 100]:
+                rd = TestReader(filename)
+                rd.readArrays(chunksize)
+                self.assertEqual(ref.events, rd.events)
+                self.assertEqual(ref.triangles, rd.triangles)
+
+    def testSyntaxError(self):
+        """Check the errors of the ASCII reader.
+        """
+        if not stlimport._has_numpy:
+            return
+
+        s = file("tmp/ascii.stl", "rt").read()
+        f = file("tmp/invalid.stl", "wt")
+        f.write(s.replace("endloop", "endlop", 1))
+        f.close()
+        rd = TestReader("tmp/invalid.stl")
+        self.assertRaises(SyntaxError, lambda: rd.readArrays())
+
+    def testWeld(self):
+        """Check the weldVertices() function.
+        """
+        if not stlimport._has_numpy:
+            return
+
+        verts = []
+        for normal,vs in TRIANGLES:
+            verts += vs
+        uniqueverts,indices = stlimport.weldVertices(verts)
+        self.assertEqual([(0,0,0), (1,0,0), (0,1,0), (1,1,0), (0.5,0.25,0.125), (2,3,4)], map(tuple, uniqueverts.tolist()))
+        self.assertEqual([0,1,2, 1,3,2, 4,5,0], list(indices))
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+# Test the ValueTable component
+
+import unittest
+from cgkit.all import *
+import numpy
+
+class TestValueTable(unittest.TestCase):
+
+    def setUp(self):
+        getScene().clear()
+
+    def testStep(self):
+        """Check the default (step) interpolation."""
+        vt = ValueTable(type="double")
+        vt.add(0, 1)
+        vt.add(1.5, -2)
+        vt.add(1.0, 0.5)
+        self.assertEqual([(0.0, 1), (1.0, 0.5), (1.5, -2)], list(vt))
+        self.assertEqual(1, vt(-1.0))
+        self.assertEqual(1, vt(0.2))
+        self.assertEqual(0.5, vt(1.0))
+        self.assertEqual(0.5, vt(1.2))
+        self.assertEqual(-2, vt[5.0])
+        vt[1.0] = 0.7
+        self.assertEqual([(0.0, 1), (1.0, 0.7), (1.5, -2)], list(vt))
+        self.assertEqual([(0.0, 1), (1.0, 0.7), (1.5, -2)], vt.values)
+        self.assertEqual(3, len(vt))
+
+    def testInterpolation(self):
+        """Check linear and cubic interpolation."""
+        vt = ValueTable(type="vec3", values=[(0, vec3(0)), (1, vec3(1,2,3)), (2, vec3(2,4,6))], interpolation="linear")
+        self.assertEqual(vec3(0.5,1,1.5), vt(0.5))
+        self.assertEqual(vec3(2,4,6), vt(3.0))
+        vt.interpolation = "cubic"
+        # The points lie on a line, so the cubic interpolation is linear as well
+        self.assertTrue((vt(1.5)-vec3(1.5,3,4.5)).length()<1E-12)
+        self.assertRaises(ValueError, lambda: ValueTable(interpolation="spam"))
+
+    def testBulk(self):
+        """Check setValues() and fromArrays()."""
+        vt = ValueTable(type="double")
+        vt.setValues([2.0, 0.0, 1.0, 2.0], [3, 1, 2, 4])
+        self.assertEqual([(0.0, 1), (1.0, 2), (2.0, 4)], list(vt))
+
+        times = numpy.arange(100)/24.0
+        values = numpy.random.rand(100, 3)
+        vt = ValueTable.fromArrays(times, values, type="vec3")
+        self.assertEqual(100, len(vt))
+        self.assertEqual(vec3(*values[10]), vt(times[10]))
+
+    def testSample(self):
+        """Check sample()."""
+        times = numpy.arange(20)*0.5
+        values = numpy.random.rand(20, 3, 3)
+        for mode in ["step", "linear", "cubic"]:
+            vt = ValueTable.fromArrays(times, values, type="mat3", interpolation=mode, modulo=9.0)
+            ts = numpy.linspace(-1.0, 12.0, 53)
+            res = vt.sample(ts)
+            self.assertEqual((53, 3, 3), res.shape)
+            for t,m in zip(ts, res):
+                ref = vt(t).toList(rowmajor=True)
+                self.assertTrue(numpy.allclose(ref, m.flatten(), atol=1E-12))
+
+######################################################################
+
+if __name__=="__main__":
+    unittest.main()
@@ -477,6 +477,27 @@ class TestVec3_light(unittest.TestCase):
 
         self.assertEqual(v, w)
 
+    ######################################################################
+    def testSlots(self):
+        """Check that vec3 instances have no instance dict.
+        """
+        v = vec3(1,2,3)
+        self.failIf(hasattr(v, "__dict__"))
+        self.assertRaises(AttributeError, setattr, v, "foo", 1)
+
+        # Results of operations must be proper vec3 instances
+        w = (v+v).cross(v*2.0)
+        self.failUnless(type(w) is vec3)
+        self.assertEqual(w, vec3(0,0,0))
+
+    ######################################################################
+    def testSetState(self):
+        """Check unpickling the state of older (dict-based) versions.
+        """
+        v = vec3()
+        v.__setstate__({"x":1.0, "y":2.5, "z":-3.7})
+        self.assertEqual(v, vec3(1, 2.5, -3.7))
+
 ######################################################################
 
 #cgtypes.setEpsilon(1E-12)
@@ -0,0 +1,12 @@
+
+import cgkit.jobqueue
+
+class blockedjob(cgkit.jobqueue.JobProc):
+    def __init__(self, name, logFile):
+        cgkit.jobqueue.JobProc.__init__(self, label=name)
+        f = open(logFile, "at")
+        f.write("init %s\n"%name)
+        f.close()
+    
+    def run(self):
+        pass
@@ -0,0 +1,13 @@
+
+import cgkit.jobqueue
+
+class logjob(cgkit.jobqueue.JobProc):
+    def __init__(self, name, logFile):
+        cgkit.jobqueue.JobProc.__init__(self, label=name)
+        self._name = name
+        self._logFile = logFile
+    
+    def run(self):
+        f = open(self._logFile, "at")
+        f.write("%s\n"%self._name)
+        f.close()
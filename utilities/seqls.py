@@ -131,6 +131,8 @@ def main():
     parser = optparse.OptionParser(usage="%prog [options] paths")
     parser.add_option("-l", "--long", action="store_true", default=False, help="Print additional information per sequence")
     parser.add_option("-d", "--directories", action="store_true", default=False, help="List directories")
+    parser.add_option("-r", "--recursive", action="store_true", default=False, help="List the sequences in the given directories and all their sub-directories")
+    parser.add_option("-j", "--threads", type="int", default=0, help="Number of threads used for scanning directories in recursive mode")
     parser.add_option("-V", "--version", action="store_true", default=False, help="Display version information")
     opts,args = parser.parse_args()
 
@@ -139,9 +141,18 @@ def main():
         sys.exit(0)
 
     if len(args)==0:
-        args = ["*"]
+        if opts.recursive:
+            args = [os.curdir]
+        else:
+            args = ["*"]
 
     args.sort()
+    
+    # List the sequences of entire directory trees
+    if opts.recursive:
+        fseqs = sequence.findSequences(args, recursive=True, numThreads=opts.threads, compact=True)
+        printSequences(fseqs, opts.long)
+        return
 
     # List directories first
     if opts.directories:
@@ -155,18 +166,23 @@ def main():
     
     # List sequences
     for pattern in args: 
-        fseqs = sequence.glob(pattern)
-        for fseq in fseqs:
-            if opts.long:
-                info = SequenceInfo(fseq)
-                print ("%8s  %12s - %12s %-12s %s [%d files]"%(info.sizeStr(),
-                                                        info.minMTimeStr(),
-                                                        info.maxMTimeStr(),
-                                                        "(%s)"%info.timeSpanStr(),
-                                                        fseq,
-                                                        len(fseq)))
-            else:
-                print (fseq)
+        fseqs = sequence.glob(pattern, compact=True)
+        printSequences(fseqs, opts.long)
+
+def printSequences(fseqs, long):
+    """Print a list of sequences.
+    """
+    for fseq in fseqs:
+        if long:
+            info = SequenceInfo(fseq)
+            print ("%8s  %12s - %12s %-12s %s [%d files]"%(info.sizeStr(),
+                                                    info.minMTimeStr(),
+                                                    info.maxMTimeStr(),
+                                                    "(%s)"%info.timeSpanStr(),
+                                                    fseq,
+                                                    len(fseq)))
+        else:
+            print (fseq)
   
 ##########################################################################
   
@@ -35,6 +35,7 @@
 # ***** END LICENSE BLOCK *****
 
 import sys
+import os.path
 import optparse
 import cgkit.cgkitinfo
 from cgkit import sequence
@@ -54,6 +55,14 @@ def promptUser(question):
             return True
         print ("Expected 'y' or 'n'")
 
+def printProgress(numDone, numTotal):
+    """Progress callback that prints the number of processed files.
+    """
+    sys.stdout.write("\r%d/%d files"%(numDone, numTotal))
+    if numDone==numTotal:
+        sys.stdout.write("\n")
+    sys.stdout.flush()
+
 
 def main():
     """Main function.
@@ -65,6 +74,9 @@ def main():
     parser.add_option("-f", "--force", action="store_true", default=False, help="Never query the user for confirmation")
     parser.add_option("-t", "--test", action="store_true", default=False, help="Only print what would be done, but don't move anything")
     parser.add_option("-v", "--verbose", action="store_true", default=False, help="Print every file when it is moved")
+    parser.add_option("-j", "--threads", type="int", default=0, metavar="N", help="Process N files concurrently")
+    parser.add_option("-p", "--progress", action="store_true", default=False, help="Print the number of processed files")
+    parser.add_option("-J", "--journal", default=None, metavar="FILE", help="Keep track of the processed files so that an interrupted operation can be resumed by running the command again with the same journal")
     parser.add_option("-V", "--version", action="store_true", default=False, help="Display version information")
     opts,args = parser.parse_args()
 
@@ -72,6 +84,17 @@ def main():
         print ("seqmv (cgkit %s)"%cgkit.cgkitinfo.version)
         sys.exit(0)
         
+    progress = None
+    if opts.progress:
+        progress = printProgress
+
+    # Resume an interrupted operation?
+    if opts.journal is not None and os.path.exists(opts.journal):
+        print ('Resuming the operation from journal "%s"'%opts.journal)
+        if not opts.test:
+            sequence.resumeJournal(opts.journal, numThreads=opts.threads, progress=progress, verbose=opts.verbose)
+        return
+
     if len(args)!=2:
         parser.print_usage()
         return
@@ -113,7 +136,7 @@ def main():
     if opts.test:
         mover.dryRun()
     else:
-        mover.run()
+        mover.run(numThreads=opts.threads, progress=progress, journal=opts.journal)
     
 ##########################################################################
 try:
@@ -55,6 +55,7 @@ using std::string;
     .def("__setitem__", &ArraySlotWrapper<stype>::__setitem__) \
     .def("getValue", &ArraySlotWrapper<stype>::__getitem__) \
     .def("setValue", &ArraySlotWrapper<stype>::__setitem__) \
+    .def("setBuffer", &ArraySlotWrapper<stype>::setBuffer, (arg("data"), arg("index")=0)) \
     .def("__str__", &ArraySlotWrapper<stype>::__str__) \
     .def("__iter__", &ArraySlotWrapper<stype>::__iter__, return_value_policy<manage_new_object>())
 //    .def("onValueChanged", &ArraySlotWrapper<stype>::base_onValueChanged) 
@@ -116,6 +117,108 @@ object _ArraySlotIterator<T>::next()
 }
 
 
+/*
+  Conversion of a flat sequence of scalars into an array slot value.
+
+  This is used by the setBuffer() method of the array slots. The generic
+  version is used for all types that cannot be initialized from a buffer.
+ */
+template<class T>
+struct BufferValue
+{
+  /// Return the number of scalars per value (0 if not supported)
+  static int numScalars() { return 0; }
+  static void set(T& v, const double* s) { }
+};
+
+template<>
+struct BufferValue<double>
+{
+  static int numScalars() { return 1; }
+  static void set(double& v, const double* s) { v = s[0]; }
+};
+
+template<>
+struct BufferValue<int>
+{
+  static int numScalars() { return 1; }
+  static void set(int& v, const double* s) { v = int(s[0]); }
+};
+
+template<>
+struct BufferValue<bool>
+{
+  static int numScalars() { return 1; }
+  static void set(bool& v, const double* s) { v = (s[0]!=0.0); }
+};
+
+template<>
+struct BufferValue<vec3d>
+{
+  static int numScalars() { return 3; }
+  static void set(vec3d& v, const double* s) { v.set(s[0], s[1], s[2]); }
+};
+
+template<>
+struct BufferValue<vec4d>
+{
+  static int numScalars() { return 4; }
+  static void set(vec4d& v, const double* s) { v.set(s[0], s[1], s[2], s[3]); }
+};
+
+/*
+  Return the format character of a buffer (as used by the struct module).
+
+  Returns 0 if the format is not a single native scalar type.
+ */
+inline char bufferFormat(const Py_buffer& view)
+{
+  const char* fmt = view.format;
+  if (fmt==0)
+    return 'B';
+  if (fmt[0]=='@' || fmt[0]=='=')
+  {
+    fmt++;
+  }
+  else if (fmt[0]=='<' || fmt[0]=='>' || fmt[0]=='!')
+  {
+    int one = 1;
+    bool little = *((char*)&one)==1;
+    if ((fmt[0]=='<')!=little)
+      return 0;
+    fmt++;
+  }
+  if (fmt[0]==0 || fmt[1]!=0)
+    return 0;
+  return fmt[0];
+}
+
+/*
+  Return the scalar at position i of a buffer as a double.
+
+  fmt is the format character as returned by bufferFormat().
+ */
+inline double bufferScalar(const void* buf, char fmt, Py_ssize_t i)
+{
+  switch(fmt)
+  {
+  case 'd': return ((const double*)buf)[i];
+  case 'f': return ((const float*)buf)[i];
+  case 'b': return ((const signed char*)buf)[i];
+  case 'B': return ((const unsigned char*)buf)[i];
+  case '?': return ((const unsigned char*)buf)[i];
+  case 'h': return ((const short*)buf)[i];
+  case 'H': return ((const unsigned short*)buf)[i];
+  case 'i': return ((const int*)buf)[i];
+  case 'I': return ((const unsigned int*)buf)[i];
+  case 'l': return double(((const long*)buf)[i]);
+  case 'L': return double(((const unsigned long*)buf)[i]);
+  case 'q': return double(((const long long*)buf)[i]);
+  case 'Q': return double(((const unsigned long long*)buf)[i]);
+  }
+  return 0.0;
+}
+
 // Wrapper class for the Dependent class
 class DependentWrapper : public Dependent
 {
@@ -412,6 +515,87 @@ class ArraySlotWrapper : public ArraySlot<T>
     delete [] vals;
   }
 
+  /* Set several values at once from an object supporting the buffer
+     protocol (such as a numpy array).
+
+     The buffer must be C-contiguous and contain scalars (int or float)
+     that are stored in the same order as in the slot (i.e. a vec3 slot
+     with multiplicity 1 takes n*3 scalars). The number of values is
+     determined by the size of the buffer. The slot is not resized.
+     The dependents are only notified once.
+   */
+  static void setBuffer(ArraySlot<T>* self, object data, int index)
+  {
+    int nscalars = BufferValue<T>::numScalars();
+    if (nscalars==0)
+    {
+      throw EValueError("This array slot type cannot be set from a buffer.");
+    }
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(data.ptr(), &view, PyBUF_C_CONTIGUOUS | PyBUF_FORMAT)!=0)
+    {
+      throw_error_already_set();
+    }
+
+    char fmt = bufferFormat(view);
+    if (fmt==0 || view.itemsize==0)
+    {
+      PyBuffer_Release(&view);
+      throw EValueError("The buffer must contain native int or float values.");
+    }
+
+    int mult = self->multiplicity();
+    Py_ssize_t total = view.len/view.itemsize;
+    if (total%(nscalars*mult)!=0)
+    {
+      PyBuffer_Release(&view);
+      boost::python::object msg = "The number of scalars in the buffer (%d) is not a multiple of %d."%make_tuple(total, nscalars*mult);
+      throw EValueError(PyString_AsString(msg.ptr()));
+    }
+    int count = int(total/(nscalars*mult));
+
+    if (index<0)
+      index = self->size()+index;
+    if ((index<0) || (index+count>self->size()))
+    {
+      PyBuffer_Release(&view);
+      throw EIndexError("The buffer exceeds the size of the array slot.");
+    }
+
+    if (count==0)
+    {
+      PyBuffer_Release(&view);
+      return;
+    }
+
+    // Convert the buffer values...
+    T* vals = new T[count*mult];
+    double s[4];
+    Py_ssize_t k = 0;
+    for(int i=0; i<count*mult; i++)
+    {
+      for(int j=0; j<nscalars; j++)
+      {
+	s[j] = bufferScalar(view.buf, fmt, k);
+	k++;
+      }
+      BufferValue<T>::set(vals[i], s);
+    }
+    PyBuffer_Release(&view);
+
+    try
+    {
+      self->setValueBlock(index, count, vals);
+    }
+    catch(...)
+    {
+      delete [] vals;
+      throw;
+    }
+    delete [] vals;
+  }
+
   // this method is called when onValueChanged() is called from C++ code
   /*  void onValueChanged(int start, int end)
   {